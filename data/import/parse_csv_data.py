@@ -0,0 +1,10 @@
+"""Entry point used by run_import.sh; the import logic lives in park_management.importer."""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from park_management.importer import main  # noqa: E402
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+"""Python tooling for the park_management database (data generation, loading, analysis)."""
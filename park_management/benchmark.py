@@ -0,0 +1,228 @@
+"""Scale-factor benchmark suite for the requirement queries and the main write paths.
+
+For each scale factor the suite generates data (park_management.generator), loads it
+into a scratch database with park_management.loader and times:
+
+* the queries of sql/analyze_execution_plans.sql, read from the file itself: every
+  EXPLAIN FORMAT=JSON statement of the FR1-FR3 and AR3-AR4 sections, named after its
+  section and, for the alternative formulations, the label above it (e.g. "fr2" and
+  "fr2:with_species_park_counts");
+* visitor registration: one transaction inserting a visitor and its excursion;
+* census update: park_management.census.apply_census on a batch of area_elements rows.
+
+Every operation reports p50/p95/p99 and mean latency and its throughput (operations/s
+for queries and registrations, rows/s for the census). Results are written as JSON;
+given a baseline JSON from an earlier run, operations whose p95 grew by more than
+--threshold (and by more than --min-ms) are reported as regressions and the exit
+status is 1.
+
+Usage:
+    python -m park_management.benchmark --scale-factors 0.01 0.1 --output results/benchmarks/sf.json
+    python -m park_management.benchmark --scale-factors 0.01 --baseline results/benchmarks/sf.json
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from park_management import census, db, generator, schema
+from park_management.loader import ParallelLoader
+from park_management.species_counts import BENCHMARK_DB
+from park_management.trigger_profile import percentiles
+
+ANALYZE_SQL = os.path.join(schema.SQL_DIR, 'analyze_execution_plans.sql')
+DEFAULT_SECTIONS = ('fr1', 'fr2', 'fr3', 'ar3', 'ar4')
+_SECTION = re.compile(r"SELECT '-- ANALYSIS: (.*?) --'", re.I)
+_LABEL = re.compile(r"SELECT '-- Execution Plan(.*?)\(JSON\): --'", re.I)
+_REQUIREMENT = re.compile(r'(FUNCTIONAL|ADDITIONAL) REQUIREMENT (\d+)', re.I)
+
+
+def _slug(text):
+    return re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')
+
+
+def parse_queries(path=ANALYZE_SQL):
+    """{name: query} for every EXPLAIN FORMAT=JSON statement of the analysis script, in file order."""
+    with open(path, encoding='utf-8') as f:
+        statements = db.split_statements(f.read())
+    queries, section, label = {}, None, ''
+    for statement in statements:
+        match = _SECTION.match(statement)
+        if match:
+            requirement = _REQUIREMENT.search(match.group(1))
+            section = (f"{'fr' if requirement.group(1).upper() == 'FUNCTIONAL' else 'ar'}{requirement.group(2)}"
+                       if requirement else _slug(match.group(1)))
+            continue
+        match = _LABEL.match(statement)
+        if match:
+            label = _slug(match.group(1))
+            continue
+        if section and statement.upper().startswith('EXPLAIN FORMAT=JSON'):
+            query = statement[len('EXPLAIN FORMAT=JSON'):].strip()
+            queries[f"{section}:{label}" if label else section] = query
+            label = ''
+    return queries
+
+
+def summarize(name, kind, timings, rows=1):
+    """Result dict of one operation from its latencies in seconds (rows per operation for throughput)."""
+    p50, p95, p99 = percentiles(timings)
+    return {'name': name, 'kind': kind, 'iterations': len(timings), 'rows': rows,
+            'p50_ms': round(p50 * 1000, 3), 'p95_ms': round(p95 * 1000, 3), 'p99_ms': round(p99 * 1000, 3),
+            'mean_ms': round(statistics.fmean(timings) * 1000, 3),
+            'throughput': round(len(timings) * rows / sum(timings), 1) if sum(timings) else 0.0}
+
+
+def compare(results, baseline, threshold=0.2, min_ms=1.0):
+    """[(result, baseline result)] whose p95 exceeds the baseline's by more than threshold and min_ms."""
+    previous = {(entry['scale_factor'], entry['name']): entry for entry in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        old = previous.get((result['scale_factor'], result['name']))
+        if old and result['p95_ms'] > old['p95_ms'] * (1 + threshold) and result['p95_ms'] - old['p95_ms'] > min_ms:
+            regressions.append((result, old))
+    return regressions
+
+
+def time_query(connection, sql, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            cursor.fetchall()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def time_registrations(connection, count, rng):
+    """Latencies of count visitor registrations (visitor row plus one visitor_excursions row)."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT id FROM parks")
+        parks = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT id FROM excursions")
+        excursions = [row[0] for row in cursor.fetchall()]
+    timings = []
+    with connection.cursor() as cursor:
+        for number in range(count):
+            started = time.perf_counter()
+            cursor.execute("INSERT INTO visitors (DNI, name, address, profession, park_id) VALUES (%s, %s, %s, %s, %s)",
+                           (f"BENCH{number:08d}", f"Visitante {number}", "Calle Mitre 1", "Docente",
+                            rng.choice(parks)))
+            cursor.execute("INSERT INTO visitor_excursions (visitor_id, excursion_id) VALUES (%s, %s)",
+                           (cursor.lastrowid, rng.choice(excursions)))
+            connection.commit()
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+def time_census(connection, batches, batch_rows, rng):
+    """Latencies of apply_census over batches of batch_rows random area_elements rows."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT park_id, area_number, element_id, number_of_individuals FROM area_elements")
+        rows = [tuple(row) for row in cursor.fetchall()]
+    timings = []
+    for _ in range(batches):
+        sample = rng.sample(rows, min(batch_rows, len(rows)))
+        census_rows = [(park_id, area, element, max(0, (count or 0) + rng.randint(-5, 5)))
+                       for park_id, area, element, count in sample]
+        timings.append(census.apply_census(connection, census_rows).seconds)
+    return timings, len(sample) if rows else 0
+
+
+def run_suite(connection, queries, repeat=20, registrations=200, census_batches=10, census_rows=1000, seed=0):
+    """Result dicts for every query, then the write paths (which change the data)."""
+    rng = random.Random(seed)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE TABLE area_elements, natural_elements, parks, visitors, species_park_counts")
+        cursor.fetchall()
+    results = []
+    for name, sql in queries.items():
+        time_query(connection, sql, 1)  # warm the buffer pool
+        results.append(summarize(name, 'query', time_query(connection, sql, repeat)))
+    if registrations:
+        results.append(summarize('visitor_registration', 'write', time_registrations(connection, registrations, rng)))
+    if census_batches:
+        timings, rows = time_census(connection, census_batches, census_rows, rng)
+        results.append(summarize('census_update', 'write', timings, rows))
+    return results
+
+
+def benchmark(scale_factors, queries, workers=4, seed=0, connection_options=None, log=print, **suite_options):
+    """Generate, load and run the suite per scale factor; returns the JSON document."""
+    connection_options = {**(connection_options or {}), 'database': BENCHMARK_DB}
+    document = {'created': datetime.datetime.now().isoformat(timespec='seconds'), 'results': []}
+    for scale_factor in scale_factors:
+        work_dir = tempfile.mkdtemp(prefix='park_bench_')
+        server = db.connect(**{**connection_options, 'database': None})
+        try:
+            generator.generate(work_dir, scale_factor, seed, log=None)
+            with server.cursor() as cursor:
+                cursor.execute(f"DROP DATABASE IF EXISTS {BENCHMARK_DB}")
+                cursor.execute("SELECT VERSION()")
+                document['mysql_version'] = cursor.fetchone()[0]
+            db.run_script(server, schema.SETUP_SQL, {'park_management': BENCHMARK_DB})
+            ParallelLoader(work_dir, workers, connection_options=connection_options, log=None).run()
+            connection = db.connect(**connection_options)
+            try:
+                for result in run_suite(connection, queries, seed=seed, **suite_options):
+                    document['results'].append({'scale_factor': scale_factor, **result})
+                    if log:
+                        log(f"SF{scale_factor} {result['name']}: p50 {result['p50_ms']:.2f} ms, "
+                            f"p95 {result['p95_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms, "
+                            f"{result['throughput']:.1f} {'rows' if result['name'] == 'census_update' else 'ops'}/s")
+            finally:
+                connection.close()
+        finally:
+            with server.cursor() as cursor:
+                cursor.execute(f"DROP DATABASE IF EXISTS {BENCHMARK_DB}")
+            server.close()
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return document
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the requirement queries and write paths per scale factor.")
+    parser.add_argument('--scale-factors', type=float, nargs='+', default=[0.01])
+    parser.add_argument('--sections', nargs='+', default=list(DEFAULT_SECTIONS),
+                        help="Sections of analyze_execution_plans.sql to time (fr1 ... ar4)")
+    parser.add_argument('--repeat', type=int, default=20, help="Runs per query")
+    parser.add_argument('--registrations', type=int, default=200)
+    parser.add_argument('--census-batches', type=int, default=10)
+    parser.add_argument('--census-rows', type=int, default=1000, help="area_elements rows per census batch")
+    parser.add_argument('--workers', type=int, default=4, help="Loader connections")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="JSON file for the results")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed relative p95 growth")
+    parser.add_argument('--min-ms', type=float, default=1.0, help="Ignore p95 growth below this many ms")
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    queries = {name: sql for name, sql in parse_queries().items() if name.split(':')[0] in args.sections}
+    document = benchmark(args.scale_factors, queries, args.workers, args.seed, db.connection_options(args),
+                         repeat=args.repeat, registrations=args.registrations,
+                         census_batches=args.census_batches, census_rows=args.census_rows)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(document['results'], json.load(f), args.threshold, args.min_ms)
+        for result, old in regressions:
+            print(f"REGRESSION SF{result['scale_factor']} {result['name']}: "
+                  f"p95 {old['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms")
+        print(f"{len(regressions)} regressions against {args.baseline}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""Set-based bulk census updates of area_elements.number_of_individuals.
+
+Applying a census as one UPDATE per (park, area, element) row fires
+species_decrease_email for every row, each with its own INSERT into email_log, plus
+the population_history trigger. apply_census instead, in one transaction:
+
+1. stages the batch in a session TEMPORARY TABLE (multi-row INSERTs; a key given
+   twice keeps its last count);
+2. writes the email_log rows for every decrease with one INSERT ... SELECT: same
+   columns, values and row order (by key) as the trigger would produce;
+3. applies the counts with one joined UPDATE, with @skip_decrease_email and
+   @skip_summary_triggers set so no per-row trigger work is done (a census never
+   changes keys, so the species summaries are unaffected);
+4. records the changed counts in population_history and population_monthly with two
+   INSERT ... SELECTs, as area_elements_history_after_update would.
+
+Census rows whose (park, area, element) is not in area_elements are not inserted;
+they are counted as missing.
+
+Usage:
+    python -m park_management.census census.csv   # park_id,area_number,element_id,number_of_individuals
+"""
+import argparse
+import datetime
+import time
+from dataclasses import dataclass
+
+from park_management import db, loadfiles
+
+STAGE_BATCH_ROWS = 5000
+
+_STAGE_TABLE = """
+    CREATE TEMPORARY TABLE census_staging (
+        park_id INT NOT NULL,
+        area_number INT NOT NULL,
+        element_id INT NOT NULL,
+        new_count INT,
+        PRIMARY KEY (park_id, area_number, element_id)
+    )
+"""
+
+_STAGE_INSERT = """
+    INSERT INTO census_staging (park_id, area_number, element_id, new_count) VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE new_count = VALUES(new_count)
+"""
+
+# Same condition and values as species_decrease_email, in key order
+_LOG_DECREASES = """
+    INSERT INTO email_log (park_id, element_id, old_count, new_count)
+    SELECT s.park_id, s.element_id, ae.number_of_individuals, s.new_count
+    FROM census_staging s
+    JOIN area_elements ae
+      ON ae.park_id = s.park_id AND ae.area_number = s.area_number AND ae.element_id = s.element_id
+    WHERE s.new_count < ae.number_of_individuals
+    ORDER BY s.park_id, s.area_number, s.element_id
+"""
+
+# Only changed rows are kept in staging for the UPDATE and the history inserts.
+_DROP_UNCHANGED = """
+    DELETE s FROM census_staging s
+    LEFT JOIN area_elements ae
+      ON ae.park_id = s.park_id AND ae.area_number = s.area_number AND ae.element_id = s.element_id
+    WHERE ae.park_id IS NULL OR ae.number_of_individuals <=> s.new_count
+"""
+
+_UPDATE = """
+    UPDATE area_elements ae
+    JOIN census_staging s
+      ON ae.park_id = s.park_id AND ae.area_number = s.area_number AND ae.element_id = s.element_id
+    SET ae.number_of_individuals = s.new_count
+"""
+
+_RECORD_HISTORY = """
+    INSERT INTO population_history (park_id, element_id, census_day, area_number, individuals)
+    SELECT park_id, element_id, DATEDIFF(%s, '2000-01-01'), area_number, new_count
+    FROM census_staging
+    WHERE new_count IS NOT NULL
+    ON DUPLICATE KEY UPDATE individuals = VALUES(individuals)
+"""
+
+_RECORD_MONTHLY = """
+    INSERT INTO population_monthly
+        (park_id, element_id, month_index, area_number, last_day, last_count, min_count, max_count)
+    SELECT park_id, element_id, (YEAR(%s) - 2000) * 12 + MONTH(%s) - 1, area_number, DATEDIFF(%s, '2000-01-01'),
+           new_count, new_count, new_count
+    FROM census_staging
+    WHERE new_count IS NOT NULL
+    ON DUPLICATE KEY UPDATE
+        last_count = IF(VALUES(last_day) >= last_day, VALUES(last_count), last_count),
+        last_day = GREATEST(last_day, VALUES(last_day)),
+        min_count = LEAST(min_count, VALUES(min_count)),
+        max_count = GREATEST(max_count, VALUES(max_count))
+"""
+
+
+@dataclass
+class CensusResult:
+    staged: int = 0
+    missing: int = 0
+    updated: int = 0
+    decreases: int = 0
+    seconds: float = 0.0
+
+
+def _int_or_none(value):
+    return None if value is None or value == '' else int(value)
+
+
+def apply_census(connection, rows, batch_size=STAGE_BATCH_ROWS, today=None):
+    """Apply (park_id, area_number, element_id, new_count) rows in one transaction; returns a CensusResult."""
+    started = time.perf_counter()
+    today = today or datetime.date.today()
+    result = CensusResult()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TEMPORARY TABLE IF EXISTS census_staging")
+            cursor.execute(_STAGE_TABLE)
+            batch = []
+            for park_id, area_number, element_id, new_count in rows:
+                batch.append((int(park_id), int(area_number), int(element_id), _int_or_none(new_count)))
+                if len(batch) >= batch_size:
+                    cursor.executemany(_STAGE_INSERT, batch)
+                    result.staged += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(_STAGE_INSERT, batch)
+                result.staged += len(batch)
+
+            cursor.execute("""
+                SELECT COUNT(*) FROM census_staging s
+                LEFT JOIN area_elements ae
+                  ON ae.park_id = s.park_id AND ae.area_number = s.area_number AND ae.element_id = s.element_id
+                WHERE ae.park_id IS NULL
+            """)
+            result.missing = cursor.fetchone()[0]
+            result.decreases = cursor.execute(_LOG_DECREASES)
+            cursor.execute(_DROP_UNCHANGED)
+            # The caller may have set the flags itself (e.g. a bulk load); put its values back.
+            cursor.execute("SET @census_skip_decrease_email = @skip_decrease_email, "
+                           "@census_skip_summary_triggers = @skip_summary_triggers")
+            cursor.execute("SET @skip_decrease_email = 1, @skip_summary_triggers = 1")
+            try:
+                result.updated = cursor.execute(_UPDATE)
+            finally:
+                cursor.execute("SET @skip_decrease_email = @census_skip_decrease_email, "
+                               "@skip_summary_triggers = @census_skip_summary_triggers, "
+                               "@census_skip_decrease_email = NULL, @census_skip_summary_triggers = NULL")
+            cursor.execute(_RECORD_HISTORY, (today,))
+            cursor.execute(_RECORD_MONTHLY, (today, today, today))
+            cursor.execute("DROP TEMPORARY TABLE census_staging")
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply a census CSV to area_elements with set-based statements.")
+    parser.add_argument('census_csv', help="CSV with a header and park_id,area_number,element_id,number_of_individuals")
+    parser.add_argument('--batch-size', type=int, default=STAGE_BATCH_ROWS, help="Rows per staging INSERT")
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    connection = db.connect(**db.connection_options(args))
+    try:
+        result = apply_census(connection, loadfiles.read_rows(args.census_csv), args.batch_size)
+    finally:
+        connection.close()
+    print(f"{result.staged} census rows: {result.updated} counts changed, {result.decreases} decreases logged, "
+          f"{result.missing} not in area_elements ({result.seconds:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
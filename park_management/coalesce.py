@@ -0,0 +1,169 @@
+"""Coalescing of repeated species-decrease alerts in email_log.
+
+species_decrease_email (and the bulk census path) write one email_log row per
+decrease, so a species declining in several areas of a park, or several times in one
+census, produces one row and, through the outbox, one alert line per UPDATE. This
+stage merges the pending rows of the same (park, element) whose timestamps fall
+within `window` seconds of the group's first row into that first row: it keeps the
+first old_count, takes the last new_count, adds up event_count, and deletes the
+merged rows. Both the alert volume and email_log stop growing with update frequency.
+
+Rows are read as a stream in log_id order, a page at a time, and only the groups
+whose window is still open are kept in memory, so memory is bounded by the number
+of (park, element) keys declining within one window (and at most `max_open`; the
+oldest group is closed early when that is exceeded). The outbox worker runs this
+stage before each claim when --coalesce-window is set, and only claims rows whose
+window has closed. Each pass reports where the next one can start (the first row of
+the earliest group still open at the end), so the outbox only rescans the rows that
+can still merge instead of every pending row each round.
+
+Usage:
+    python -m park_management.coalesce --window 300
+"""
+import argparse
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from park_management import db
+
+DEFAULT_MAX_OPEN = 100_000
+PAGE_ROWS = 5000
+
+
+@dataclass
+class AlertGroup:
+    log_id: int
+    first_seen: object
+    old_count: int
+    new_count: int
+    events: int = 1
+    merged_ids: list = field(default_factory=list)
+
+
+@dataclass
+class CoalesceStats:
+    rows_read: int = 0
+    groups_merged: int = 0
+    rows_merged: int = 0
+    early_closes: int = 0
+    resume_id: int = 0  # pass as after_id next time: later rows can only merge into rows after it
+
+
+class Coalescer:
+    """Streaming merge of (key, timestamp, old, new) events into one group per key and window.
+
+    feed() returns the groups that closed because the stream moved past their window
+    (or because max_open was exceeded); close_all() returns the rest.
+    """
+
+    def __init__(self, window_seconds, max_open=DEFAULT_MAX_OPEN):
+        self.window_seconds = window_seconds
+        self.max_open = max_open
+        self.open = OrderedDict()  # key -> AlertGroup, oldest first
+        self.early_closes = 0
+
+    def _expired(self, group, now):
+        return (now - group.first_seen).total_seconds() > self.window_seconds
+
+    def feed(self, log_id, key, logged_at, old_count, new_count, events=1):
+        closed = []
+        while self.open:
+            oldest = next(iter(self.open.values()))
+            if not self._expired(oldest, logged_at):
+                break
+            closed.append(self.open.popitem(last=False)[1])
+        group = self.open.get(key)
+        if group is not None:
+            group.new_count = new_count
+            group.events += events
+            group.merged_ids.append(log_id)
+        else:
+            self.open[key] = AlertGroup(log_id, logged_at, old_count, new_count, events)
+            if len(self.open) > self.max_open:
+                closed.append(self.open.popitem(last=False)[1])
+                self.early_closes += 1
+        return closed
+
+    def close_all(self):
+        closed = list(self.open.values())
+        self.open.clear()
+        return closed
+
+
+def _apply(cursor, groups, stats):
+    merged = [group for group in groups if group.merged_ids]
+    if not merged:
+        return
+    cursor.executemany("UPDATE email_log SET new_count = %s, event_count = %s WHERE log_id = %s",
+                       [(group.new_count, min(group.events, 65535), group.log_id) for group in merged])
+    merged_ids = [log_id for group in merged for log_id in group.merged_ids]
+    for start in range(0, len(merged_ids), PAGE_ROWS):
+        chunk = merged_ids[start:start + PAGE_ROWS]
+        cursor.execute(f"DELETE FROM email_log WHERE log_id IN ({', '.join(['%s'] * len(chunk))})", chunk)
+    stats.groups_merged += len(merged)
+    stats.rows_merged += len(merged_ids)
+
+
+def coalesce_pending(connection, window_seconds, max_open=DEFAULT_MAX_OPEN, page_rows=PAGE_ROWS, after_id=0):
+    """Merge pending, unclaimed email_log rows after after_id in one transaction; returns CoalesceStats.
+
+    Rows are locked page by page (FOR UPDATE), so outbox workers claiming with
+    SKIP LOCKED pass over them until the pass commits. Running it again is harmless:
+    groups whose window already closed cannot absorb later rows. Groups still open
+    when the rows run out are written as they are and rescanned from their first
+    row by the next pass, which starts after stats.resume_id. A row that commits
+    after the pass has moved past its log_id is sent on its own.
+    """
+    coalescer = Coalescer(window_seconds, max_open)
+    stats = CoalesceStats()
+    last_id = after_id
+    try:
+        with connection.cursor() as cursor:
+            while True:
+                cursor.execute("""
+                    SELECT log_id, park_id, element_id, log_timestamp, old_count, new_count, event_count
+                    FROM email_log
+                    WHERE status = 'pending' AND log_id > %s
+                      AND (claimed_until IS NULL OR claimed_until < NOW())
+                    ORDER BY log_id
+                    LIMIT %s
+                    FOR UPDATE
+                """, (last_id, page_rows))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                closed = []
+                for log_id, park_id, element_id, logged_at, old_count, new_count, events in rows:
+                    closed.extend(coalescer.feed(log_id, (park_id, element_id), logged_at, old_count, new_count,
+                                                 events))
+                stats.rows_read += len(rows)
+                last_id = rows[-1][0]
+                _apply(cursor, closed, stats)
+            stats.resume_id = min((group.log_id - 1 for group in coalescer.open.values()), default=last_id)
+            _apply(cursor, coalescer.close_all(), stats)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    stats.early_closes = coalescer.early_closes
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge repeated pending email_log alerts per park and element.")
+    parser.add_argument('--window', type=int, default=300, help="Seconds after a group's first alert to merge into it")
+    parser.add_argument('--max-open', type=int, default=DEFAULT_MAX_OPEN, help="Open groups kept in memory")
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    connection = db.connect(**db.connection_options(args))
+    try:
+        stats = coalesce_pending(connection, args.window, args.max_open)
+    finally:
+        connection.close()
+    print(f"{stats.rows_read} pending alerts read: {stats.rows_merged} merged into {stats.groups_merged} alerts"
+          + (f" ({stats.early_closes} groups closed early at --max-open)" if stats.early_closes else ''))
+
+
+if __name__ == '__main__':
+    main()
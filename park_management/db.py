@@ -0,0 +1,126 @@
+"""Connection helpers shared by the Python tools.
+
+Defaults match the rest of the project (root with no password on localhost, database
+park_management); every tool exposes the same --host/--port/--user/--password/--database
+flags. The password defaults to $MYSQL_PWD, like the mysql client.
+"""
+import os
+import queue
+import re
+from contextlib import contextmanager
+
+import pymysql
+
+from park_management.schema import SUMMARY_TABLES
+
+DEFAULT_CONNECTION = {
+    'host': 'localhost',
+    'port': 3306,
+    'user': 'root',
+    'password': '',
+    'database': 'park_management',
+}
+
+
+def connect(**options):
+    """Open a pymysql connection with the project defaults, overridden by options."""
+    return pymysql.connect(**{**DEFAULT_CONNECTION, **options})
+
+
+def add_connection_arguments(parser):
+    group = parser.add_argument_group('connection')
+    group.add_argument('--host', default=DEFAULT_CONNECTION['host'])
+    group.add_argument('--port', type=int, default=DEFAULT_CONNECTION['port'])
+    group.add_argument('--user', default=DEFAULT_CONNECTION['user'])
+    group.add_argument('--password', default=os.environ.get('MYSQL_PWD', DEFAULT_CONNECTION['password']))
+    group.add_argument('--database', default=DEFAULT_CONNECTION['database'])
+
+
+def connection_options(args):
+    """Connection keyword arguments from the flags added by add_connection_arguments."""
+    return {key: getattr(args, key) for key in DEFAULT_CONNECTION}
+
+
+class ConnectionPool:
+    """Fixed-size pool of connections that worker threads borrow one at a time."""
+
+    def __init__(self, size, **options):
+        self._connections = queue.Queue()
+        self._all = []
+        for _ in range(size):
+            connection = connect(**options)
+            self._all.append(connection)
+            self._connections.put(connection)
+
+    @contextmanager
+    def connection(self):
+        connection = self._connections.get()
+        try:
+            yield connection
+        finally:
+            self._connections.put(connection)
+
+    def close(self):
+        for connection in self._all:
+            connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def split_statements(sql):
+    """Split a .sql script into statements, honouring DELIMITER blocks like the mysql client."""
+    statements, delimiter, current = [], ';', []
+    for line in sql.splitlines():
+        stripped = line.strip()
+        match = re.match(r'DELIMITER\s+(\S+)', stripped, re.I)
+        if match:
+            delimiter = match.group(1)
+            continue
+        if not current and (not stripped or stripped.startswith('--')):
+            continue
+        # A statement ends at the delimiter, optionally followed by a trailing "-- comment".
+        end = re.search(re.escape(delimiter) + r"\s*(--[^']*)?$", line)
+        if end:
+            current.append(line[:end.start()])
+            statements.append('\n'.join(current).strip())
+            current = []
+        else:
+            current.append(line)
+    if ''.join(current).strip():
+        statements.append('\n'.join(current).strip())
+    return statements
+
+
+def run_script(connection, path, replacements=None):
+    """Execute every statement of a .sql file (e.g. sql/setup.sql) on connection.
+
+    replacements maps literal strings to substitutes, e.g. {'park_management': 'scratch_db'}
+    to create the schema under another database name.
+    """
+    with open(path, encoding='utf-8') as f:
+        sql = f.read()
+    for old, new in (replacements or {}).items():
+        sql = sql.replace(old, new)
+    with connection.cursor() as cursor:
+        for statement in split_statements(sql):
+            cursor.execute(statement)
+    connection.commit()
+
+
+def rebuild_summaries(connection, record_census=True):
+    """Recompute every trigger-maintained summary table (after loads that skipped the triggers).
+
+    @skip_summary_triggers also skips the population history triggers, so like
+    populate_data.sql the loaded counts are then recorded as today's census, unless
+    the history was loaded itself (record_census=False).
+    """
+    with connection.cursor() as cursor:
+        for procedure in dict.fromkeys(SUMMARY_TABLES.values()):
+            cursor.execute(f"CALL {procedure}()")
+        if record_census:
+            cursor.execute("CALL record_population_census(CURRENT_DATE)")
+    connection.commit()
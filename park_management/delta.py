@@ -0,0 +1,368 @@
+"""Incremental delta sync of data/load into an already populated database.
+
+Instead of teardown.sql + setup.sql + populate_data.sql, each CSV is compared with
+the version that was last synced, by primary key, and only the difference is
+applied:
+
+* rows whose key is new are INSERTed,
+* rows whose key exists but whose values changed are upserted
+  (INSERT ... ON DUPLICATE KEY UPDATE), which fires the UPDATE triggers as usual,
+* rows whose key disappeared are DELETEd.
+
+Statements are batched (multi-row INSERTs, DELETE ... WHERE (pk) IN (...)) and the
+whole sync runs in one transaction. Every changed table is diffed first; then all
+deletes run, children first, and after them the inserts/updates, parents first, so
+FOREIGN_KEY_CHECKS stays enabled and a row whose key changed but whose UNIQUE value
+(parks.code, visitors.DNI, ...) did not is gone before its replacement arrives.
+
+Deleting a parent also deletes (ON DELETE CASCADE) or clears (ON DELETE SET NULL) its
+child rows in the database, including rows that no delta would touch. If a child CSV
+still has rows referencing a deleted parent key, the sync stops before changing
+anything and reports those rows instead of silently losing them; fix the CSVs (drop
+the children too, or keep the parent) and run it again.
+
+The last synced version of every table is kept in a state directory as a copy of the
+CSV sorted by primary key, together with its SHA-256. Files whose hash did not change
+are skipped without reading them; changed files are sorted with an external merge
+sort (bounded memory) and merge-joined with the previous copy. Database work is
+therefore proportional to the number of changed rows, not to the table size.
+
+The first run after a full load must record the baseline:
+
+    python -m park_management.delta --baseline   # after populate_data.sql
+    python -m park_management.delta              # later refreshes
+"""
+import argparse
+import csv
+import heapq
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+
+from park_management import db, loadfiles, schema
+
+DEFAULT_BATCH_SIZE = 1000
+SORT_RUN_ROWS = 200_000
+STATE_FILE = 'state.json'
+
+
+@dataclass
+class TableDelta:
+    table: str
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    skipped: bool = False
+
+    @property
+    def changes(self):
+        return self.inserted + self.updated + self.deleted
+
+
+def _read_sorted_run(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        for values in csv.reader(f):
+            yield [None if value == loadfiles.NULL else value for value in values]
+
+
+def sorted_rows(rows, key, work_dir, run_rows=SORT_RUN_ROWS):
+    """Yield rows ordered by key using sorted runs on disk, holding at most run_rows in memory."""
+    runs = []
+    iterator = iter(rows)
+    while True:
+        run = list(itertools.islice(iterator, run_rows))
+        if not run:
+            break
+        run.sort(key=key)
+        path = os.path.join(work_dir, f"run{len(runs):05d}.csv")
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            loadfiles.write_rows(f, run)
+        runs.append(path)
+    yield from heapq.merge(*(_read_sorted_run(path) for path in runs), key=key)
+
+
+def diff_sorted(previous, current, key):
+    """Merge-join two key-sorted row streams; yields ('insert'|'update'|'delete', row)."""
+    missing = object()
+    old, new = next(previous, missing), next(current, missing)
+    while old is not missing or new is not missing:
+        if new is missing or (old is not missing and key(old) < key(new)):
+            yield 'delete', old
+            old = next(previous, missing)
+        elif old is missing or key(new) < key(old):
+            yield 'insert', new
+            new = next(current, missing)
+        else:
+            if old != new:
+                yield 'update', new
+            old, new = next(previous, missing), next(current, missing)
+
+
+class BatchApplier:
+    """Buffers one table's changes and flushes them as batched statements on a cursor."""
+
+    def __init__(self, cursor, table, batch_size=DEFAULT_BATCH_SIZE):
+        self.cursor = cursor
+        self.table = table
+        self.batch_size = batch_size
+        self.columns = table.load_columns
+        self.key_positions = [self.columns.index(name) for name in table.primary_key]
+        self.buffers = {'insert': [], 'update': [], 'delete': []}
+        placeholders = ', '.join(['%s'] * len(self.columns))
+        column_list = ', '.join(self.columns)
+        self.insert_sql = f"INSERT INTO {table.name} ({column_list}) VALUES ({placeholders})"
+        assignments = ', '.join(f"{name} = VALUES({name})" for name in self.columns if name not in table.primary_key)
+        self.update_sql = f"{self.insert_sql} ON DUPLICATE KEY UPDATE {assignments}" if assignments else None
+
+    def add(self, action, row):
+        if action == 'update' and self.update_sql is None:
+            return  # key-only tables: equal keys mean equal rows, so this never happens
+        buffer = self.buffers[action]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush(action)
+
+    def flush(self, action):
+        rows = self.buffers[action]
+        if not rows:
+            return
+        if action == 'delete':
+            key_columns = ', '.join(self.table.primary_key)
+            one_key = '(' + ', '.join(['%s'] * len(self.key_positions)) + ')'
+            self.cursor.execute(
+                f"DELETE FROM {self.table.name} WHERE ({key_columns}) IN ({', '.join([one_key] * len(rows))})",
+                [row[position] for row in rows for position in self.key_positions])
+        else:
+            self.cursor.executemany(self.insert_sql if action == 'insert' else self.update_sql, rows)
+        self.buffers[action] = []
+
+    def flush_all(self, actions=('delete', 'update', 'insert')):
+        for action in actions:
+            self.flush(action)
+
+
+class DeltaSync:
+    """Applies the difference between data/load and the last synced snapshot."""
+
+    def __init__(self, load_dir=schema.LOAD_DIR, state_dir=None, batch_size=DEFAULT_BATCH_SIZE,
+                 tables=None, connection_options=None, log=print):
+        self.connection_options = connection_options or {}
+        database = self.connection_options.get('database', db.DEFAULT_CONNECTION['database'])
+        self.load_dir = load_dir
+        self.state_dir = state_dir or os.path.join(schema.PROJECT_ROOT, 'data', '.sync_state', database)
+        self.batch_size = batch_size
+        self.log = log
+        self.schema = schema.parse_schema()
+        order = schema.load_order(self.schema, [table.name for table in schema.loaded_tables(self.schema)])
+        self.tables = [name for name in order if not tables or name in tables]
+
+    def csv_path(self, name):
+        return os.path.join(self.load_dir, os.path.basename(self.schema[name].load_file))
+
+    def snapshot_path(self, name):
+        return os.path.join(self.state_dir, f"{name}.sorted.csv")
+
+    def _load_state(self):
+        path = os.path.join(self.state_dir, STATE_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_state(self, state):
+        path = os.path.join(self.state_dir, STATE_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(path + '.tmp', path)
+
+    def _write_snapshot(self, rows, path):
+        """Copy key-sorted rows to path while passing them through."""
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            for row in rows:
+                writer.writerow(loadfiles.encode_row(row))
+                yield row
+
+    def baseline(self):
+        """Record the current data/load files as already loaded (run after a full load)."""
+        os.makedirs(self.state_dir, exist_ok=True)
+        state = {'tables': {}}
+        work_dir = tempfile.mkdtemp(prefix='park_delta_', dir=self.state_dir)
+        try:
+            for name in self.tables:
+                key = loadfiles.key_function(self.schema[name])
+                current = sorted_rows(loadfiles.read_rows(self.csv_path(name)), key, work_dir)
+                temporary = os.path.join(work_dir, f"{name}.snapshot.csv")
+                for _ in self._write_snapshot(current, temporary):
+                    pass
+                os.replace(temporary, self.snapshot_path(name))
+                state['tables'][name] = loadfiles.file_hash(self.csv_path(name))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        self._save_state(state)
+        if self.log:
+            self.log(f"Baseline recorded for {len(self.tables)} tables in {self.state_dir}")
+
+    def run(self):
+        """Apply the delta for every changed table in one transaction; returns {table: TableDelta}."""
+        state = self._load_state()
+        if state is None:
+            raise RuntimeError(f"No sync state in {self.state_dir}. After a full load "
+                               "(populate_data.sql or the parallel loader) run with --baseline first.")
+        results = {name: TableDelta(name) for name in self.tables}
+        changed = {}
+        for name in self.tables:
+            current_hash = loadfiles.file_hash(self.csv_path(name))
+            if state['tables'].get(name) == current_hash and os.path.exists(self.snapshot_path(name)):
+                results[name].skipped = True
+            else:
+                changed[name] = current_hash
+        if not changed:
+            return results
+
+        work_dir = tempfile.mkdtemp(prefix='park_delta_', dir=self.state_dir)
+        try:
+            # Diff everything first, then deletes children first and upserts parents first.
+            for name in changed:
+                self._spool_changes(name, results[name], work_dir)
+            survivors = self.cascaded_survivors(changed, work_dir)
+            if survivors:
+                raise RuntimeError("Deleting these parent rows would cascade to rows the CSVs still have; "
+                                   "nothing was applied:\n" + '\n'.join(
+                                       f"  {child} ({', '.join(columns)}) = ({', '.join(sample)}) references a row deleted from {parent} "
+                                       f"({count} {child} rows in total)"
+                                       for child, columns, parent, count, sample in survivors))
+        except Exception:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+        connection = db.connect(**self.connection_options)
+        try:
+            with connection.cursor() as cursor:
+                for name in reversed(list(changed)):
+                    self._apply_deletes(cursor, name, work_dir)
+                for name in changed:
+                    self._apply_upserts(cursor, name, work_dir)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+        finally:
+            connection.close()
+
+        for name, current_hash in changed.items():
+            os.replace(os.path.join(work_dir, f"{name}.snapshot.csv"), self.snapshot_path(name))
+            state['tables'][name] = current_hash
+            self._report(results[name])
+        self._save_state(state)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        return results
+
+    def _spool_changes(self, name, result, work_dir):
+        """Diff one table against its last snapshot into a deletes and an upserts spool file."""
+        table = self.schema[name]
+        key = loadfiles.key_function(table)
+        run_dir = tempfile.mkdtemp(dir=work_dir)
+        snapshot = self.snapshot_path(name)
+        previous = _read_sorted_run(snapshot) if os.path.exists(snapshot) else iter(())
+        current = self._write_snapshot(sorted_rows(loadfiles.read_rows(self.csv_path(name)), key, run_dir),
+                                       os.path.join(work_dir, f"{name}.snapshot.csv"))
+        with open(os.path.join(work_dir, f"{name}.deletes.csv"), 'w', newline='', encoding='utf-8') as delete_spool, \
+                open(os.path.join(work_dir, f"{name}.upserts.csv"), 'w', newline='', encoding='utf-8') as upsert_spool:
+            deletes = csv.writer(delete_spool, lineterminator='\n')
+            upserts = csv.writer(upsert_spool, lineterminator='\n')
+            for action, row in diff_sorted(previous, current, key):
+                if action == 'delete':
+                    deletes.writerow(loadfiles.encode_row(row))
+                    result.deleted += 1
+                    continue
+                upserts.writerow([action] + loadfiles.encode_row(row))
+                if action == 'insert':
+                    result.inserted += 1
+                else:
+                    result.updated += 1
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+    def cascaded_survivors(self, changed, work_dir):
+        """[(child, fk columns, parent, rows, sample key)] of current CSV rows whose parent is deleted.
+
+        Only foreign keys with ON DELETE CASCADE or SET NULL are checked (the others make
+        the DELETE fail), and only child tables whose CSV is in load_dir. Child CSVs are
+        read only when their parent has deletes.
+        """
+        survivors = []
+        for parent in changed:
+            delete_path = os.path.join(work_dir, f"{parent}.deletes.csv")
+            if not os.path.getsize(delete_path):
+                continue
+            for child, foreign_key in self._cascading_references(parent):
+                parent_columns = self.schema[parent].load_columns
+                positions = [parent_columns.index(column) for column in foreign_key.ref_columns]
+                deleted = {tuple(row[position] for position in positions) for row in _read_sorted_run(delete_path)}
+                child_columns = self.schema[child].load_columns
+                positions = [child_columns.index(column) for column in foreign_key.columns]
+                count, sample = 0, None
+                for row in loadfiles.read_rows(self.csv_path(child)):
+                    if tuple(row[position] for position in positions) in deleted:
+                        count += 1
+                        sample = sample or tuple(row[position] for position in positions)
+                if count:
+                    survivors.append((child, foreign_key.columns, parent, count, sample))
+        return survivors
+
+    def _cascading_references(self, parent):
+        """(child, ForeignKey) pairs through which deleting a parent row changes child rows."""
+        for table in schema.loaded_tables(self.schema):
+            if not os.path.exists(self.csv_path(table.name)):
+                continue
+            for foreign_key in table.foreign_keys:
+                if (foreign_key.ref_table == parent and foreign_key.on_delete in ('CASCADE', 'SET NULL')
+                        and set(foreign_key.columns) <= set(table.load_columns)
+                        and set(foreign_key.ref_columns) <= set(self.schema[parent].load_columns)):
+                    yield table.name, foreign_key
+
+    def _apply_deletes(self, cursor, name, work_dir):
+        applier = BatchApplier(cursor, self.schema[name], self.batch_size)
+        for row in _read_sorted_run(os.path.join(work_dir, f"{name}.deletes.csv")):
+            applier.add('delete', row)
+        applier.flush('delete')
+
+    def _apply_upserts(self, cursor, name, work_dir):
+        applier = BatchApplier(cursor, self.schema[name], self.batch_size)
+        for action, *row in _read_sorted_run(os.path.join(work_dir, f"{name}.upserts.csv")):
+            applier.add(action, row)
+        applier.flush_all(('update', 'insert'))
+
+    def _report(self, result):
+        if self.log:
+            self.log(f"{result.table}: +{result.inserted} ~{result.updated} -{result.deleted}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply only the changes in data/load since the last sync.")
+    parser.add_argument('--load-dir', default=schema.LOAD_DIR)
+    parser.add_argument('--state-dir', help="Where synced snapshots are kept (default: data/.sync_state/<database>)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--tables', nargs='*')
+    parser.add_argument('--baseline', action='store_true',
+                        help="Record the current files as loaded without touching the database")
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    sync = DeltaSync(args.load_dir, args.state_dir, args.batch_size, args.tables, db.connection_options(args))
+    if args.baseline:
+        sync.baseline()
+        return
+    started = time.perf_counter()
+    results = sync.run()
+    skipped = sum(result.skipped for result in results.values())
+    changes = sum(result.changes for result in results.values())
+    print(f"Applied {changes} row changes ({skipped} unchanged tables skipped) in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""The natural_elements.kind discriminator behind the element_food checks.
+
+check_element_food_before_insert/_update used to run a COUNT(*) on mineral_elements
+and on vegetal_elements for every element_food row. setup.sql now keeps
+natural_elements.kind (a SET of 'vegetal', 'animal', 'mineral') current with
+triggers on the three subtype tables, and the element_food triggers read both
+elements of a row with one primary-key lookup on natural_elements. This module
+checks kind against the subtype tables, rebuilds it, and benchmarks element_food
+bulk loads with the previous (subtype-probing) and the current triggers at several
+scale factors on generated data.
+
+Usage:
+    python -m park_management.element_kinds --check
+    python -m park_management.element_kinds --benchmark 0.01 0.1 --output results/benchmarks/element_kinds.csv
+"""
+import argparse
+import csv
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+
+from park_management import db, generator, schema
+from park_management.loader import ParallelLoader
+from park_management.species_counts import BENCHMARK_DB
+
+_DRIFT = """
+    SELECT id, kind,
+           CONCAT_WS(',', IF(v.element_id IS NULL, NULL, 'vegetal'), IF(a.element_id IS NULL, NULL, 'animal'),
+                     IF(m.element_id IS NULL, NULL, 'mineral')) AS actual
+    FROM natural_elements ne
+    LEFT JOIN vegetal_elements v ON v.element_id = ne.id
+    LEFT JOIN animal_elements a ON a.element_id = ne.id
+    LEFT JOIN mineral_elements m ON m.element_id = ne.id
+    HAVING kind <> actual
+    ORDER BY id
+"""
+
+# The element_food triggers before natural_elements.kind, for the benchmark baseline
+_SUBTYPE_CHECK = """
+    CREATE TRIGGER check_element_food_before_{event}
+    BEFORE {event} ON element_food
+    FOR EACH ROW
+    BEGIN
+        DECLARE is_mineral INT;
+        DECLARE is_vegetal INT;
+        SELECT COUNT(*) INTO is_mineral FROM mineral_elements me WHERE me.element_id = NEW.food_element_id;
+        IF is_mineral > 0 THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Constraint violation: Minerals cannot be food (element_food).';
+        END IF;
+        SELECT COUNT(*) INTO is_vegetal FROM vegetal_elements ve WHERE ve.element_id = NEW.element_id;
+        IF is_vegetal > 0 THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Constraint violation: Vegetals cannot feed on other elements (element_food).';
+        END IF;
+    END
+"""
+
+
+def check(connection):
+    """[(element id, stored kind, kind implied by the subtype tables)] that disagree."""
+    with connection.cursor() as cursor:
+        cursor.execute(_DRIFT)
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+def rebuild(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("CALL rebuild_element_kinds()")
+    connection.commit()
+
+
+def install_subtype_checks(connection):
+    """Replace the element_food triggers with the subtype-probing versions (benchmark only)."""
+    with connection.cursor() as cursor:
+        for event in ('insert', 'update'):
+            cursor.execute(f"DROP TRIGGER IF EXISTS check_element_food_before_{event}")
+            cursor.execute(_SUBTYPE_CHECK.format(event=event))
+
+
+def time_food_load(load_dir, repeat, workers, connection_options):
+    """Median (seconds, rows) of loading element_food from load_dir into an emptied table."""
+    timings = []
+    for _ in range(repeat):
+        connection = db.connect(**connection_options)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM element_food")
+            connection.commit()
+        finally:
+            connection.close()
+        stats = ParallelLoader(load_dir, workers, tables=['element_food'], check_foreign_keys=True,
+                               connection_options=connection_options, log=None).run()['element_food']
+        timings.append((stats.seconds, stats.rows))
+    return statistics.median(seconds for seconds, _ in timings), timings[-1][1]
+
+
+def benchmark(scale_factors, repeat=3, workers=4, seed=0, connection_options=None, log=print):
+    """Time element_food bulk loads with both trigger versions; returns a list of result dicts."""
+    connection_options = {**(connection_options or {}), 'database': BENCHMARK_DB}
+    loaded = [table.name for table in schema.loaded_tables(schema.parse_schema()) if table.name != 'element_food']
+    results = []
+    for scale_factor in scale_factors:
+        work_dir = tempfile.mkdtemp(prefix='park_bench_')
+        server = db.connect(**{**connection_options, 'database': None})
+        try:
+            generator.generate(work_dir, scale_factor, seed, log=None)
+            with server.cursor() as cursor:
+                cursor.execute(f"DROP DATABASE IF EXISTS {BENCHMARK_DB}")
+            db.run_script(server, schema.SETUP_SQL, {'park_management': BENCHMARK_DB})
+            ParallelLoader(work_dir, workers, tables=loaded, connection_options=connection_options, log=None).run()
+
+            kind_seconds, rows = time_food_load(work_dir, repeat, workers, connection_options)
+            connection = db.connect(**connection_options)
+            try:
+                install_subtype_checks(connection)
+            finally:
+                connection.close()
+            subtype_seconds, _ = time_food_load(work_dir, repeat, workers, connection_options)
+            result = {'scale_factor': scale_factor, 'rows': rows,
+                      'subtype_rows_per_s': round(rows / subtype_seconds) if subtype_seconds else 0,
+                      'kind_rows_per_s': round(rows / kind_seconds) if kind_seconds else 0,
+                      'speedup': round(subtype_seconds / kind_seconds, 2) if kind_seconds else 0}
+            results.append(result)
+            if log:
+                log(f"SF{scale_factor} element_food ({rows} rows): subtype checks {result['subtype_rows_per_s']} rows/s, "
+                    f"kind {result['kind_rows_per_s']} rows/s ({result['speedup']:.2f}x)")
+        finally:
+            with server.cursor() as cursor:
+                cursor.execute(f"DROP DATABASE IF EXISTS {BENCHMARK_DB}")
+            server.close()
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check, rebuild or benchmark natural_elements.kind.")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--check', action='store_true', help="Compare kind with the subtype tables")
+    action.add_argument('--rebuild', action='store_true')
+    action.add_argument('--benchmark', type=float, nargs='+', metavar='SCALE_FACTOR',
+                        help=f"Generate, load (into {BENCHMARK_DB}) and time element_food loads per scale factor")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--output', help="CSV file for --benchmark results")
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        results = benchmark(args.benchmark, args.repeat, args.workers, connection_options=db.connection_options(args))
+        if args.output:
+            os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+            with open(args.output, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=list(results[0]), lineterminator='\n')
+                writer.writeheader()
+                writer.writerows(results)
+        return
+
+    connection = db.connect(**db.connection_options(args))
+    try:
+        if args.rebuild:
+            rebuild(connection)
+            print("natural_elements.kind rebuilt")
+        else:
+            drift = check(connection)
+            for element_id, kind, actual in drift:
+                print(f"element {element_id}: kind '{kind}', subtype tables '{actual}'")
+            print(f"{len(drift)} elements with a stale kind" if drift else "natural_elements.kind is consistent")
+            sys.exit(1 if drift else 0)
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""Monthly partition maintenance and retention of email_log.
+
+email_log is RANGE COLUMNS-partitioned by month of log_timestamp (setup.sql), so
+retention never runs a DELETE: a month is dropped with ALTER TABLE ... DROP
+PARTITION, which takes about as long for ten million rows as for ten. Months still
+holding pending alerts are kept, so the outbox never loses an undelivered alert. New
+months are split off p_future ahead of time, while it is still empty, which makes the
+REORGANIZE instant too.
+
+Databases created before email_log v2 (park_email and element_scientific_name
+strings) are converted when setup.sql runs again, or by --migrate without it: the rows
+are copied into a v2 table with the emails and names resolved to ids, marked as sent
+because v1 had no outbox (otherwise the outbox would mail every historical alert), and
+the old table is kept as email_log_v1.
+
+Usage:
+    python -m park_management.email_retention --ensure-months 3 --keep-months 12
+    python -m park_management.email_retention --add-partitions 2027-06
+    python -m park_management.email_retention --drop-before 2025-07
+    python -m park_management.email_retention --migrate
+"""
+import argparse
+import datetime
+
+from park_management import db, schema
+
+_MIGRATE_ROWS = """
+    INSERT INTO email_log_v2 (park_id, element_id, old_count, new_count, log_timestamp, status)
+    SELECT p.id, ne.id, v1.old_count, v1.new_count, COALESCE(v1.log_timestamp, NOW()), 'sent'
+    FROM email_log v1
+    LEFT JOIN (SELECT contact_email, MIN(id) AS id FROM parks GROUP BY contact_email) p
+      ON p.contact_email = v1.park_email
+    LEFT JOIN natural_elements ne ON ne.scientific_name = v1.element_scientific_name
+    ORDER BY v1.log_id
+"""
+
+
+def month_start(date):
+    return datetime.date(date.year, date.month, 1)
+
+
+def add_months(date, months):
+    index = date.year * 12 + date.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def parse_month(text):
+    """'YYYY-MM' as the first day of that month."""
+    return datetime.datetime.strptime(text, '%Y-%m').date()
+
+
+def partitions(connection):
+    """[(partition name, upper bound date or None for MAXVALUE)] of email_log in order."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT partition_name, partition_description
+            FROM information_schema.partitions
+            WHERE table_schema = DATABASE() AND table_name = 'email_log'
+            ORDER BY partition_ordinal_position
+        """)
+        return [(name, None if bound == 'MAXVALUE' else datetime.date.fromisoformat(bound.strip("'")[:10]))
+                for name, bound in cursor.fetchall()]
+
+
+def reorganize_statement(existing, through_month):
+    """ALTER TABLE splitting p_future into monthly partitions up to through_month (None if not needed)."""
+    month = max(bound for _, bound in existing if bound is not None)
+    if month > through_month:
+        return None
+    new = []
+    while month <= through_month:
+        new.append(f"PARTITION p{month:%Y%m} VALUES LESS THAN ('{add_months(month, 1)}')")
+        month = add_months(month, 1)
+    return ("ALTER TABLE email_log REORGANIZE PARTITION p_future INTO (\n    "
+            + ",\n    ".join(new + ["PARTITION p_future VALUES LESS THAN (MAXVALUE)"]) + "\n)")
+
+
+def add_partitions(connection, through_month):
+    """Give every month up to through_month its own partition; returns the statement run, if any."""
+    statement = reorganize_statement(partitions(connection), month_start(through_month))
+    if statement:
+        with connection.cursor() as cursor:
+            cursor.execute(statement)
+    return statement
+
+
+def drop_before(connection, month):
+    """Drop the partitions holding only alerts logged before month; returns (dropped, kept) names.
+
+    A partition that still holds pending alerts is kept until the outbox has sent or
+    given up on them.
+    """
+    cutoff = month_start(month)
+    dropped, kept = [], []
+    with connection.cursor() as cursor:
+        for name, bound in partitions(connection):
+            if bound is None or bound > cutoff:
+                continue
+            cursor.execute(f"SELECT COUNT(*) FROM email_log PARTITION ({name}) WHERE status = 'pending'")
+            (kept if cursor.fetchone()[0] else dropped).append(name)
+        if dropped:
+            cursor.execute(f"ALTER TABLE email_log DROP PARTITION {', '.join(dropped)}")
+    return dropped, kept
+
+
+def migrate_v1(connection):
+    """Convert a v1 email_log (email and name strings) to v2; returns the rows copied, or None if already v2.
+
+    The rows are copied into a new email_log_v2 first and the two tables are swapped
+    with one RENAME only once the copy has committed, so a failed migration leaves the
+    v1 table in place and can simply be run again.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = 'email_log' AND column_name = 'park_email'
+        """)
+        if not cursor.fetchone()[0]:
+            return None
+        cursor.execute("DROP TABLE IF EXISTS email_log_v2")
+        cursor.execute(schema.create_statement('email_log').rstrip(';')
+                       .replace('CREATE TABLE IF NOT EXISTS email_log ', 'CREATE TABLE email_log_v2 ', 1))
+        try:
+            copied = cursor.execute(_MIGRATE_ROWS)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            cursor.execute("DROP TABLE IF EXISTS email_log_v2")
+            raise
+        cursor.execute("RENAME TABLE email_log TO email_log_v1, email_log_v2 TO email_log")
+    return copied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="email_log monthly partitions and retention.")
+    parser.add_argument('--migrate', action='store_true', help="Convert a v1 email_log to ids and partitions")
+    parser.add_argument('--ensure-months', type=int, metavar='N', help="Create partitions for the next N months")
+    parser.add_argument('--add-partitions', type=parse_month, metavar='YYYY-MM',
+                        help="Create monthly partitions up to this month")
+    parser.add_argument('--keep-months', type=int, metavar='N', help="Drop months older than the last N")
+    parser.add_argument('--drop-before', type=parse_month, metavar='YYYY-MM', help="Drop months before this one")
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    this_month = month_start(datetime.date.today())
+    through = args.add_partitions
+    if args.ensure_months is not None:
+        through = max(filter(None, (through, add_months(this_month, args.ensure_months))))
+    cutoff = args.drop_before
+    if args.keep_months is not None:
+        cutoff = min(filter(None, (cutoff, add_months(this_month, 1 - args.keep_months))))
+
+    connection = db.connect(**db.connection_options(args))
+    try:
+        if args.migrate:
+            copied = migrate_v1(connection)
+            print("email_log is already v2" if copied is None
+                  else f"Copied {copied} rows to email_log v2; the old rows are in email_log_v1")
+        if through:
+            statement = add_partitions(connection, through)
+            print(statement or f"Partitions already cover {through:%Y-%m}")
+        if cutoff:
+            dropped, kept = drop_before(connection, cutoff)
+            print(f"Dropped partitions: {', '.join(dropped)}" if dropped else "No partitions to drop")
+            if kept:
+                print(f"Kept (pending alerts): {', '.join(kept)}")
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+"""In-memory food-web graph over element_food.
+
+element_food(element_id, food_element_id) is an edge list "element_id eats
+food_element_id". FoodWeb loads it once into CSR adjacency arrays (NumPy), in both
+directions, so questions that would need recursive SQL round trips are answered in
+memory:
+
+* dependents / food chains: batched breadth-first search from thousands of species at
+  once; each source is one bit of a uint64 word per node, and one BFS level is a single
+  gather + np.bitwise_or.reduceat over the CSR arrays for all sources together;
+* trophic levels: 1 for species with no recorded food, otherwise 1 + the mean level of
+  what they eat (NaN for species whose food chains never reach a basal species);
+* cycle detection: strongly connected components (iterative Tarjan);
+* incremental refresh: edges are kept as sorted packed int64 keys; refresh() re-reads
+  only the two key columns, applies the difference with sorted-array operations and
+  rebuilds the CSR arrays in O(edges) without Python loops.
+
+Usage:
+    python -m park_management.foodweb --dependents 12 40 77     # what depends on these species
+    python -m park_management.foodweb --food-chain 12           # everything 12 feeds on, transitively
+    python -m park_management.foodweb --trophic-levels --cycles
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from park_management import db
+
+_WORD_BITS = 64
+
+
+def pack_edges(predators, preys):
+    """Sorted unique int64 keys predator << 32 | prey."""
+    predators = np.asarray(predators, dtype=np.int64)
+    preys = np.asarray(preys, dtype=np.int64)
+    return np.unique((predators << 32) | (preys & 0xFFFFFFFF))
+
+
+def unpack_edges(keys):
+    return keys >> 32, keys & 0xFFFFFFFF
+
+
+def _csr(sources, targets, node_count):
+    """(indptr, indices) with the targets of each source node, sources given as dense indices."""
+    order = np.argsort(sources, kind='stable')
+    indptr = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=node_count), out=indptr[1:])
+    return indptr, targets[order].astype(np.int64)
+
+
+class FoodWeb:
+    """CSR food web; every public method takes and returns natural_elements ids."""
+
+    def __init__(self, predators=(), preys=(), element_ids=()):
+        self._element_ids = np.asarray(element_ids, dtype=np.int64)
+        self.edges = pack_edges(predators, preys)
+        self._build()
+
+    # --- construction and refresh ---
+
+    def _build(self):
+        predators, preys = unpack_edges(self.edges)
+        self.ids = np.unique(np.concatenate([self._element_ids, predators, preys]))
+        n = len(self.ids)
+        predator_index = np.searchsorted(self.ids, predators)
+        prey_index = np.searchsorted(self.ids, preys)
+        # prey of each node, and predators of each node
+        self.prey_indptr, self.prey_indices = _csr(predator_index, prey_index, n)
+        self.predator_indptr, self.predator_indices = _csr(prey_index, predator_index, n)
+        self._levels = None
+        self._components = None
+
+    @property
+    def node_count(self):
+        return len(self.ids)
+
+    @property
+    def edge_count(self):
+        return len(self.edges)
+
+    def add_edges(self, predators, preys):
+        keys = pack_edges(predators, preys)
+        new = keys[~np.isin(keys, self.edges, assume_unique=True)]
+        if len(new):
+            self.edges = np.union1d(self.edges, new)
+            self._build()
+        return len(new)
+
+    def remove_edges(self, predators, preys):
+        keys = pack_edges(predators, preys)
+        keep = ~np.isin(self.edges, keys, assume_unique=True)
+        removed = int(len(self.edges) - keep.sum())
+        if removed:
+            self.edges = self.edges[keep]
+            self._build()
+        return removed
+
+    def replace_edges(self, predators, preys):
+        """Make the edge set equal to the given one; returns (added, removed)."""
+        keys = pack_edges(predators, preys)
+        added = int((~np.isin(keys, self.edges, assume_unique=True)).sum())
+        removed = int((~np.isin(self.edges, keys, assume_unique=True)).sum())
+        if added or removed:
+            self.edges = keys
+            self._build()
+        return added, removed
+
+    @staticmethod
+    def _read_edges(connection):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT element_id, food_element_id FROM element_food")
+            rows = cursor.fetchall()
+        edges = np.array(rows, dtype=np.int64).reshape(-1, 2)
+        return edges[:, 0], edges[:, 1]
+
+    @classmethod
+    def load(cls, connection):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT id FROM natural_elements")
+            element_ids = [row[0] for row in cursor.fetchall()]
+        return cls(*cls._read_edges(connection), element_ids=element_ids)
+
+    def refresh(self, connection):
+        """Re-read element_food and apply only the difference; returns (added, removed)."""
+        return self.replace_edges(*self._read_edges(connection))
+
+    # --- lookups ---
+
+    def positions(self, element_ids):
+        """(dense node positions, known mask) for element ids."""
+        element_ids = np.asarray(element_ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.zeros(len(element_ids), dtype=np.int64), np.zeros(len(element_ids), dtype=bool)
+        positions = np.searchsorted(self.ids, element_ids)
+        positions[positions == len(self.ids)] = 0
+        return positions, self.ids[positions] == element_ids
+
+    def prey_of(self, element_id):
+        position, known = self.positions([element_id])
+        if not known[0]:
+            return np.empty(0, dtype=np.int64)
+        start, stop = self.prey_indptr[position[0]], self.prey_indptr[position[0] + 1]
+        return self.ids[np.sort(self.prey_indices[start:stop])]
+
+    def predators_of(self, element_id):
+        position, known = self.positions([element_id])
+        if not known[0]:
+            return np.empty(0, dtype=np.int64)
+        start, stop = self.predator_indptr[position[0]], self.predator_indptr[position[0] + 1]
+        return self.ids[np.sort(self.predator_indices[start:stop])]
+
+    # --- batched traversal ---
+
+    def _reach(self, seeds, gather_indptr, gather_indices, max_depth=None):
+        """Bit matrix (nodes x words): bit c of node v is set when v is reachable from seed c.
+
+        A node v joins the next level when any node listed in its gather row is in the
+        frontier, so gathering over "prey of v" walks towards predators.
+        """
+        n, k = self.node_count, len(seeds)
+        words = max(1, -(-k // _WORD_BITS))
+        frontier = np.zeros((n, words), dtype=np.uint64)
+        columns = np.arange(k)
+        np.bitwise_or.at(frontier, (seeds, columns // _WORD_BITS),
+                         np.left_shift(np.uint64(1), (columns % _WORD_BITS).astype(np.uint64)))
+        reached = np.zeros_like(frontier)
+        starts = gather_indptr[:-1]
+        nonempty = gather_indptr[1:] > starts
+        depth = 0
+        while frontier.any() and len(gather_indices) and (max_depth is None or depth < max_depth):
+            step = np.zeros_like(frontier)
+            step[nonempty] = np.bitwise_or.reduceat(frontier[gather_indices], starts[nonempty], axis=0)
+            frontier = step & ~reached
+            reached |= frontier
+            depth += 1
+        return reached
+
+    def _closure(self, element_ids, gather_indptr, gather_indices, max_depth):
+        element_ids = list(element_ids)
+        positions, known = self.positions(element_ids)
+        result = {element_id: np.empty(0, dtype=np.int64) for element_id in element_ids}
+        if not known.any():
+            return result
+        seeds = positions[known]
+        reached = self._reach(seeds, gather_indptr, gather_indices, max_depth)
+        for column, element_id in enumerate(np.asarray(element_ids)[known]):
+            bits = (reached[:, column // _WORD_BITS] >> np.uint64(column % _WORD_BITS)) & np.uint64(1)
+            result[int(element_id)] = self.ids[bits.astype(bool)]
+        return result
+
+    def dependents(self, element_ids, max_depth=None):
+        """{id: ids of every species that eats it directly or transitively} for many ids at once.
+
+        A species only appears in its own result when it lies on a feeding cycle.
+        """
+        return self._closure(element_ids, self.prey_indptr, self.prey_indices, max_depth)
+
+    def food_chain(self, element_ids, max_depth=None):
+        """{id: ids of everything it feeds on directly or transitively}."""
+        return self._closure(element_ids, self.predator_indptr, self.predator_indices, max_depth)
+
+    # --- trophic levels ---
+
+    def trophic_levels(self, tolerance=1e-9, max_iterations=10_000):
+        """{id: level}; basal species are 1, unreachable loops are NaN."""
+        if self._levels is None:
+            self._levels = self._compute_levels(tolerance, max_iterations)
+        return dict(zip(self.ids.tolist(), self._levels.tolist()))
+
+    def _compute_levels(self, tolerance, max_iterations):
+        n = self.node_count
+        counts = np.diff(self.prey_indptr)
+        basal = counts == 0
+        levels = np.ones(n)
+        if basal.all():
+            return levels
+        # Species whose food chains reach a basal species: basal nodes plus their dependents.
+        grounded = basal | self._reach_any(np.flatnonzero(basal), self.prey_indptr, self.prey_indices)
+        # Only food that is itself grounded counts towards the mean.
+        weights = grounded[self.prey_indices].astype(float)
+        starts = self.prey_indptr[:-1]
+        eats = ~basal
+        grounded_counts = np.zeros(n)
+        grounded_counts[eats] = np.add.reduceat(weights, starts[eats])
+        update = eats & grounded
+        for _ in range(max_iterations):
+            sums = np.zeros(n)
+            sums[eats] = np.add.reduceat(levels[self.prey_indices] * weights, starts[eats])
+            updated = levels.copy()
+            updated[update] = 1.0 + sums[update] / grounded_counts[update]
+            change = np.abs(updated - levels).max()
+            levels = updated
+            if change < tolerance:
+                break
+        levels[~grounded] = np.nan
+        return levels
+
+    def _reach_any(self, seeds, gather_indptr, gather_indices):
+        """Boolean mask of nodes reachable from any seed (a single-column BFS)."""
+        reached = np.zeros(self.node_count, dtype=bool)
+        frontier = np.zeros(self.node_count, dtype=bool)
+        frontier[seeds] = True
+        starts = gather_indptr[:-1]
+        nonempty = gather_indptr[1:] > starts
+        while frontier.any() and len(gather_indices):
+            step = np.zeros(self.node_count, dtype=bool)
+            step[nonempty] = np.logical_or.reduceat(frontier[gather_indices], starts[nonempty])
+            frontier = step & ~reached
+            reached |= frontier
+        return reached
+
+    # --- cycles ---
+
+    def cycles(self):
+        """Feeding cycles as lists of ids: strongly connected components with more than
+        one species, plus species that eat themselves."""
+        if self._components is None:
+            self._components = self._strongly_connected()
+        return [self.ids[component].tolist() for component in self._components]
+
+    def _strongly_connected(self):
+        indptr, indices = self.prey_indptr, self.prey_indices
+        n = self.node_count
+        index = np.full(n, -1, dtype=np.int64)
+        low = np.zeros(n, dtype=np.int64)
+        on_stack = np.zeros(n, dtype=bool)
+        stack, components, counter = [], [], 0
+        for root in range(n):
+            if index[root] != -1 or indptr[root] == indptr[root + 1]:
+                continue
+            work = [(root, indptr[root])]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            while work:
+                node, edge = work[-1]
+                if edge < indptr[node + 1]:
+                    work[-1] = (node, edge + 1)
+                    target = indices[edge]
+                    if index[target] == -1:
+                        index[target] = low[target] = counter
+                        counter += 1
+                        stack.append(target)
+                        on_stack[target] = True
+                        work.append((target, indptr[target]))
+                    elif on_stack[target]:
+                        low[node] = min(low[node], index[target])
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    targets = indices[indptr[node]:indptr[node + 1]]
+                    if len(component) > 1 or node in targets:
+                        components.append(np.array(sorted(component), dtype=np.int64))
+        return components
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the element_food food web in memory.")
+    parser.add_argument('--dependents', type=int, nargs='+', metavar='ELEMENT_ID',
+                        help="Species that depend on these, directly or transitively")
+    parser.add_argument('--food-chain', type=int, nargs='+', metavar='ELEMENT_ID',
+                        help="Everything these species feed on, directly or transitively")
+    parser.add_argument('--max-depth', type=int)
+    parser.add_argument('--trophic-levels', action='store_true')
+    parser.add_argument('--cycles', action='store_true')
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    connection = db.connect(**db.connection_options(args))
+    try:
+        web = FoodWeb.load(connection)
+    finally:
+        connection.close()
+    print(f"{web.node_count} species, {web.edge_count} feeding relations")
+    for element_id, reached in web.dependents(args.dependents or [], args.max_depth).items():
+        print(f"dependents of {element_id}: {reached.tolist()}")
+    for element_id, reached in web.food_chain(args.food_chain or [], args.max_depth).items():
+        print(f"food chain of {element_id}: {reached.tolist()}")
+    if args.trophic_levels:
+        for element_id, level in sorted(web.trophic_levels().items()):
+            print(f"{element_id}\t{level:.3f}")
+    if args.cycles:
+        cycles = web.cycles()
+        for cycle in cycles:
+            print(f"cycle: {cycle}")
+        print(f"{len(cycles)} feeding cycles")
+        sys.exit(1 if cycles else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,409 @@
+"""Scale-factor synthetic data generator for the data/load CSV files.
+
+Writes every CSV loaded by sql/populate_data.sql, in the same format (header row,
+quoted strings, '\\n' line endings), sized by a scale factor:
+
+    SF1 = 1,000 parks / 1,000,000 visitors / 10,000,000 area_elements
+
+Rows are produced by per-table generators and written one at a time, so memory
+use does not depend on the scale factor. Every table gets its own RNG derived
+from the seed, which makes each file reproducible on its own. Foreign keys are
+satisfied by construction (ids are dense 1..N ranges) and distinct pairs for
+composite primary keys are drawn with a coprime stride instead of a "seen" set.
+
+Natural element ids are laid out as animals, then vegetals, then minerals, so
+element_food can follow the rules of check_element_food_before_insert: only
+animals eat, and minerals are never food.
+
+Usage:
+    python -m park_management.generator --scale-factor 0.01 --seed 42 --output-dir data/generated
+"""
+import argparse
+import csv
+import math
+import os
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from park_management import schema
+
+# Row counts at scale factor 1
+BASE_PARKS = 1_000
+BASE_VISITORS = 1_000_000
+BASE_AREA_ELEMENTS = 10_000_000
+BASE_NATURAL_ELEMENTS = 20_000
+
+AREAS_PER_PARK = 10
+FOODS_PER_ANIMAL = 5
+PERSONNEL_PER_PARK = 20
+PROJECTS_PER_PARK = 2
+PROJECTS_PER_RESEARCHER = 2
+ACCOMMODATIONS_PER_PARK = 5
+EXCURSIONS_PER_PARK = 4
+EXCURSIONS_PER_ACCOMMODATION = 3
+UBIQUITOUS_SPECIES = 3  # vegetal species present in every park (Additional Req 3)
+
+PROVINCES = [
+    ("Buenos Aires", "Organismo Provincial para el Desarrollo Sostenible"),
+    ("Catamarca", "Secretaría de Estado del Ambiente y Desarrollo Sustentable"),
+    ("Ciudad A. de Buenos Aires", "Agencia de Protección Ambiental"),
+    ("Chaco", "Ministerio de Planificación, Ambiente e Innovación Tecnológica"),
+    ("Chubut", "Ministerio de Ambiente y Control del Desarrollo Sustentable"),
+    ("Córdoba", "Secretaría de Ambiente y Cambio Climático"),
+    ("Corrientes", "Instituto de Conservación del Iberá"),
+    ("Entre Ríos", "Secretaría de Ambiente"),
+    ("Formosa", "Ministerio de la Producción y Ambiente"),
+    ("Jujuy", "Ministerio de Ambiente"),
+    ("La Pampa", "Subsecretaría de Ambiente"),
+    ("La Rioja", "Secretaría de Ambiente"),
+    ("Mendoza", "Secretaría de Ambiente y Ordenamiento Territorial"),
+    ("Misiones", "Ministerio de Ecología y Recursos Naturales Renovables"),
+    ("Neuquén", "Secretaría de Desarrollo Territorial y Ambiente"),
+    ("Río Negro", "Secretaría de Ambiente y Desarrollo Sustentable"),
+    ("Salta", "Ministerio de Producción y Desarrollo Sustentable"),
+    ("San Juan", "Secretaría de Estado de Ambiente y Desarrollo Sustentable"),
+    ("San Luis", "Ministerio de Medio Ambiente, Campo y Producción"),
+    ("Santa Cruz", "Secretaría de Estado de Ambiente"),
+    ("Santa Fe", "Ministerio de Ambiente y Cambio Climático"),
+    ("Santiago del Estero", "Dirección General de Bosques y Fauna"),
+    ("Tierra del Fuego", "Secretaría de Ambiente, Desarrollo Sostenible y Cambio Climático"),
+    ("Tucumán", "Secretaría de Estado de Medio Ambiente"),
+]
+
+FIRST_NAMES = ["Carlos", "María", "Juan", "Ana", "Jorge", "Marta", "Luis", "Lucía", "Diego", "Sofía",
+               "Pablo", "Valeria", "Martín", "Carolina", "Federico", "Paula"]
+LAST_NAMES = ["Gómez", "Rodríguez", "Pérez", "Fernández", "López", "Martínez", "García", "Sánchez",
+              "Romero", "Díaz", "Álvarez", "Torres", "Ruiz", "Ramírez", "Flores", "Acosta"]
+STREETS = ["Av. Rivadavia", "Calle San Martín", "Av. Colón", "Calle Mitre", "Av. Corrientes", "Calle Belgrano"]
+PROFESSIONS = ["Ingeniero", "Médica", "Docente", "Abogado", "Estudiante", "Contadora", "Arquitecto", "Fotógrafa"]
+DIETS = ["carnivore", "herbivore", "omnivore"]
+SEASONS = ["Spring", "Summer", "Autumn", "Winter", "Spring-Summer", "Year-round"]
+MINERAL_KINDS = ["crystal", "rock"]
+SPECIALTIES = ["Mantenimiento de Senderos", "Restauración de Hábitat", "Limpieza", "Control de Especies Invasoras"]
+TITLES = ["Biólogo", "Zoóloga", "Botánico", "Geóloga", "Ecólogo"]
+VEHICLES = ["4x4 Toyota Hilux", "4x4 Ford Ranger", "Moto Honda XR", "Lancha"]
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def plan_row_counts(scale_factor):
+    """Target number of rows for every loaded table at the given scale factor.
+
+    At very small scale factors area_elements comes out lower than its target,
+    because an area cannot hold more distinct species than exist.
+    """
+    def scaled(base, minimum=1):
+        return max(minimum, round(base * scale_factor))
+
+    parks = scaled(BASE_PARKS)
+    park_areas = parks * AREAS_PER_PARK
+    natural_elements = scaled(BASE_NATURAL_ELEMENTS, minimum=10)
+    animals, vegetals, minerals = _element_split(natural_elements)
+    personnel = parks * PERSONNEL_PER_PARK
+    researchers = _personnel_split(personnel)[2]
+    research_projects = parks * PROJECTS_PER_PARK
+    accommodations = parks * ACCOMMODATIONS_PER_PARK
+    excursions = max(len(DAYS), parks * EXCURSIONS_PER_PARK)
+    visitors = scaled(BASE_VISITORS)
+    return {
+        'provinces': len(PROVINCES),
+        'parks': parks,
+        'park_provinces': parks + parks // 4,
+        'park_areas': park_areas,
+        'natural_elements': natural_elements,
+        'animal_elements': animals,
+        'vegetal_elements': vegetals,
+        'mineral_elements': minerals,
+        'area_elements': min(scaled(BASE_AREA_ELEMENTS, minimum=park_areas), park_areas * natural_elements),
+        'element_food': animals * min(FOODS_PER_ANIMAL, animals + vegetals),
+        'personnel': personnel,
+        'research_projects': research_projects,
+        'management_personnel': _personnel_split(personnel)[0],
+        'surveillance_personnel': _personnel_split(personnel)[1],
+        'research_personnel': researchers * min(PROJECTS_PER_RESEARCHER, research_projects),
+        'conservation_personnel': _personnel_split(personnel)[3],
+        'accommodations': accommodations,
+        'excursions': excursions,
+        'accommodation_excursions': accommodations * min(EXCURSIONS_PER_ACCOMMODATION, excursions),
+        'visitors': visitors,
+        'visitor_excursions': visitors + visitors // 2,
+    }
+
+
+def _element_split(natural_elements):
+    """(animals, vegetals, minerals): 50% / 40% / 10%, at least one of each."""
+    animals = max(1, natural_elements // 2)
+    vegetals = max(1, natural_elements * 4 // 10)
+    return animals, vegetals, natural_elements - animals - vegetals
+
+
+def _personnel_split(personnel):
+    """(management, surveillance, research, conservation) as consecutive id ranges."""
+    quarter = personnel // 4
+    return quarter, quarter, quarter, personnel - 3 * quarter
+
+
+def _stride(rng, population):
+    """A step coprime with population: (start + i * step) % population visits each value once."""
+    if population <= 1:
+        return 1
+    while True:
+        step = rng.randrange(1, population)
+        if math.gcd(step, population) == 1:
+            return step
+
+
+def _distinct(rng, population, count):
+    """Yield min(count, population) distinct values in [0, population) without a seen-set."""
+    start, step = rng.randrange(population), _stride(rng, population)
+    for i in range(min(count, population)):
+        yield (start + i * step) % population
+
+
+def _park_code(park_id):
+    """Unique code of two or more letters (BA, BB, ...), leaving single letters to hand-made data."""
+    n, letters = park_id + 25, ''
+    while n:
+        n, remainder = divmod(n, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def _person_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _address(rng):
+    return f"{rng.choice(STREETS)} {rng.randrange(1, 5000)}, {rng.choice(PROVINCES)[0]}"
+
+
+class DataGenerator:
+    """Streams the rows of every loaded table for one (scale factor, seed) pair."""
+
+    def __init__(self, scale_factor=1.0, seed=0):
+        self.scale_factor = scale_factor
+        self.seed = seed
+        self.counts = plan_row_counts(scale_factor)
+        self.parks = self.counts['parks']
+        self.animals, self.vegetals, self.minerals = _element_split(self.counts['natural_elements'])
+        self.personnel_split = _personnel_split(self.counts['personnel'])
+
+    def rng(self, table):
+        return random.Random(f"{self.seed}:{table}")
+
+    def rows(self, table):
+        """Yield the rows of table as tuples in its populate_data.sql column order."""
+        return getattr(self, f'_{table}')(self.rng(table))
+
+    # --- geography ---
+
+    def _provinces(self, rng):
+        for province_id, (name, organization) in enumerate(PROVINCES, start=1):
+            yield province_id, name, organization
+
+    def _park_area(self, park_id):
+        # Derived from the park id alone so park_provinces and park_areas agree with parks.
+        return random.Random(f"{self.seed}:park_area:{park_id}").randrange(5_000, 800_000)
+
+    def _parks(self, rng):
+        first = date(1934, 1, 1)
+        for park_id in range(1, self.parks + 1):
+            code = _park_code(park_id)
+            declared = first + timedelta(days=rng.randrange(33_000))
+            yield (park_id, f"Parque Nacional {code}", declared.isoformat(),
+                   f"{code.lower()}@parquesnacionales.gob.ar", code, self._park_area(park_id))
+
+    def _park_provinces(self, rng):
+        # Every fourth park is shared between two provinces (Data Req 2.c).
+        for park_id in range(1, self.parks + 1):
+            total = self._park_area(park_id)
+            province_id = rng.randrange(len(PROVINCES)) + 1
+            if park_id % 4:
+                yield park_id, province_id, total
+            else:
+                other = province_id % len(PROVINCES) + 1
+                share = rng.randrange(1, total)
+                yield park_id, province_id, share
+                yield park_id, other, total - share
+
+    def _park_areas(self, rng):
+        for park_id in range(1, self.parks + 1):
+            extension = self._park_area(park_id) // AREAS_PER_PARK
+            for area_number in range(1, AREAS_PER_PARK + 1):
+                yield park_id, area_number, f"Área {area_number}", extension
+
+    # --- natural elements ---
+
+    def _natural_elements(self, rng):
+        kinds = ((self.animals, "Animalia"), (self.vegetals, "Plantae"), (self.minerals, "Mineralis"))
+        element_id = 0
+        for count, prefix in kinds:
+            for _ in range(count):
+                element_id += 1
+                yield element_id, f"{prefix} species{element_id}", f"{prefix} {element_id}"
+
+    def _animal_elements(self, rng):
+        for element_id in range(1, self.animals + 1):
+            yield element_id, rng.choice(DIETS), rng.choice(SEASONS)
+
+    def _vegetal_elements(self, rng):
+        for element_id in range(self.animals + 1, self.animals + self.vegetals + 1):
+            yield element_id, rng.choice(SEASONS)
+
+    def _mineral_elements(self, rng):
+        first = self.animals + self.vegetals + 1
+        for element_id in range(first, first + self.minerals):
+            yield element_id, rng.choice(MINERAL_KINDS)
+
+    def _element_food(self, rng):
+        # Eaters are animals only (vegetals cannot feed) and food is drawn from
+        # animals + vegetals (minerals cannot be food).
+        edible = self.animals + self.vegetals
+        for element_id in range(1, self.animals + 1):
+            for index in _distinct(rng, edible, FOODS_PER_ANIMAL):
+                yield element_id, index + 1
+
+    def _area_elements(self, rng):
+        # Area 1 of every park holds the ubiquitous vegetal species and that park's
+        # endemic species; the remaining quota is drawn from the common pool.
+        total_elements = self.counts['natural_elements']
+        ubiquitous = min(UBIQUITOUS_SPECIES, self.vegetals)
+        first_ubiquitous = self.animals + 1
+        pool = total_elements - ubiquitous
+        endemic = min(self.parks, pool // 10)
+        common = pool - endemic
+
+        def pool_id(index):
+            return index + 1 if index < self.animals else index + ubiquitous + 1
+
+        areas = self.counts['park_areas']
+        per_area, remainder = divmod(self.counts['area_elements'], areas)
+        area_index = 0
+        for park_id in range(1, self.parks + 1):
+            for area_number in range(1, AREAS_PER_PARK + 1):
+                quota = per_area + (area_index < remainder)
+                area_index += 1
+                if area_number == 1:
+                    for element_id in range(first_ubiquitous, first_ubiquitous + ubiquitous):
+                        yield park_id, area_number, element_id, rng.randrange(1, 1000)
+                    quota -= ubiquitous
+                    for index in range(park_id - 1, endemic, self.parks):
+                        yield park_id, area_number, pool_id(index), rng.randrange(1, 100)
+                        quota -= 1
+                if quota > 0 and common:
+                    for index in _distinct(rng, common, quota):
+                        yield park_id, area_number, pool_id(endemic + index), rng.randrange(1, 1000)
+
+    # --- personnel ---
+
+    def _personnel(self, rng):
+        for person_id in range(1, self.counts['personnel'] + 1):
+            prefix = rng.choice((20, 23, 27))
+            yield (person_id, f"P{person_id:09d}", f"{prefix}-{person_id:09d}-{person_id % 10}",
+                   _person_name(rng), _address(rng), f"11-{rng.randrange(1000, 10000)}-{rng.randrange(1000, 10000)}",
+                   Decimal(rng.randrange(6_000_000, 15_000_000)) / 100)
+
+    def _personnel_range(self, index):
+        first = sum(self.personnel_split[:index]) + 1
+        return range(first, first + self.personnel_split[index])
+
+    def _management_personnel(self, rng):
+        for person_id in self._personnel_range(0):
+            yield person_id, rng.randrange(1, 6)
+
+    def _surveillance_personnel(self, rng):
+        for person_id in self._personnel_range(1):
+            yield person_id, rng.choice(VEHICLES), f"A{rng.choice('ABCDEFGH')}{person_id:06d}"
+
+    def _research_projects(self, rng):
+        for project_id in range(1, self.counts['research_projects'] + 1):
+            yield (project_id, Decimal(rng.randrange(5_000_000, 50_000_000)) / 100,
+                   f"{rng.randrange(6, 49)} months", rng.randrange(self.counts['natural_elements']) + 1)
+
+    def _research_personnel(self, rng):
+        projects = self.counts['research_projects']
+        for person_id in self._personnel_range(2):
+            for index in _distinct(rng, projects, PROJECTS_PER_RESEARCHER):
+                yield person_id, index + 1, rng.choice(TITLES)
+
+    def _conservation_personnel(self, rng):
+        for person_id in self._personnel_range(3):
+            yield (person_id, rng.choice(SPECIALTIES), rng.randrange(self.parks) + 1,
+                   rng.randrange(AREAS_PER_PARK) + 1)
+
+    # --- tourism ---
+
+    def _accommodations(self, rng):
+        for accommodation_id in range(1, self.counts['accommodations'] + 1):
+            yield accommodation_id, rng.choice((2, 4, 6, 8, 20, 40)), f"Alojamiento {accommodation_id}"
+
+    def _excursions(self, rng):
+        for excursion_id in range(1, self.counts['excursions'] + 1):
+            hour = f"{rng.randrange(7, 19):02d}:{rng.choice(('00', '30'))}:00"
+            yield excursion_id, DAYS[excursion_id % len(DAYS)], hour, rng.choice(('foot', 'vehicle'))
+
+    def _accommodation_excursions(self, rng):
+        for accommodation_id in range(1, self.counts['accommodations'] + 1):
+            for index in _distinct(rng, self.counts['excursions'], EXCURSIONS_PER_ACCOMMODATION):
+                yield accommodation_id, index + 1
+
+    def _visitors(self, rng):
+        # Squaring the uniform draw skews registrations toward low park ids ("hot" parks).
+        accommodations = self.counts['accommodations']
+        for visitor_id in range(1, self.counts['visitors'] + 1):
+            park_id = int(self.parks * rng.random() ** 2) + 1
+            yield (visitor_id, f"V{visitor_id:09d}", _person_name(rng), _address(rng),
+                   rng.choice(PROFESSIONS), rng.randrange(accommodations) + 1, park_id)
+
+    def _visitor_excursions(self, rng):
+        excursions = self.counts['excursions']
+        for visitor_id in range(1, self.counts['visitors'] + 1):
+            for index in _distinct(rng, excursions, 1 + visitor_id % 2):
+                yield visitor_id, index + 1
+
+
+def write_csv(path, header, rows):
+    """Write rows in the data/load format and return the number of rows written."""
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        f.write(','.join(header) + '\n')
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC, lineterminator='\n')
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def generate(output_dir, scale_factor=1.0, seed=0, tables=None, log=print):
+    """Write the CSVs for the given tables (default: all loaded tables) into output_dir.
+
+    Returns {table: rows written}.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    generator = DataGenerator(scale_factor, seed)
+    written = {}
+    for table in schema.loaded_tables(schema.parse_schema()):
+        if tables and table.name not in tables:
+            continue
+        path = os.path.join(output_dir, os.path.basename(table.load_file))
+        started = time.perf_counter()
+        written[table.name] = write_csv(path, table.load_columns, generator.rows(table.name))
+        if log:
+            log(f"{table.name}: {written[table.name]} rows in {time.perf_counter() - started:.2f}s")
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic data/load CSV files at a scale factor.")
+    parser.add_argument('--scale-factor', type=float, default=1.0,
+                        help="1.0 = 1k parks / 1M visitors / 10M area_elements (default: 1.0)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output-dir', required=True, help="Directory to write the CSV files to")
+    parser.add_argument('--tables', nargs='*', help="Only generate these tables")
+    args = parser.parse_args(argv)
+    generate(args.output_dir, args.scale_factor, args.seed, args.tables)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""Cascade-impact analysis of population declines.
+
+species_decrease_email logs one row per decline in email_log, but says nothing about
+the species that feed on the declining one. This batch analysis takes a set of
+declines (by default every email_log row not analysed by a previous run, or
+changed since by the outbox's coalescing), and finds, in every park area where a
+declining species lives, the predators (element_food) that live in the same area
+and are therefore at risk.
+
+Dependency strength of a predator on a declining prey in one area is the prey's
+share of the predator's food in that area, weighted by abundance
+(individuals of the prey / individuals of everything the predator eats there),
+and its risk is that share times the decline fraction (old - new) / old, summed over
+all declining prey (capped at 1). With --depth > 1 the at-risk predators are treated
+as declines of their own, so second-order effects are reported too.
+
+Everything runs on NumPy arrays for all parks at once: area_elements is loaded
+once as sorted (area, element) keys, predators and prey come from the CSR arrays of
+park_management.foodweb, and every join is a searchsorted over sorted keys.
+
+Usage:
+    python -m park_management.impact                      # declines since the last run
+    python -m park_management.impact --all --depth 2 --output results/impact/report.csv
+"""
+import argparse
+import csv
+import json
+import os
+import time
+
+import numpy as np
+
+from park_management import db, schema
+from park_management.foodweb import FoodWeb
+from park_management.verify import fetch_int_columns
+
+STATE_DIR = os.path.join(schema.PROJECT_ROOT, 'data', '.impact_state')
+DEFAULT_OUTPUT = os.path.join(schema.PROJECT_ROOT, 'results', 'impact', 'cascade_impact.csv')
+
+RESULT_DTYPE = np.dtype([
+    ('park_id', np.int64), ('area_number', np.int64), ('element_id', np.int64), ('risk', np.float64),
+    ('declining_prey', np.int64), ('individuals', np.int64), ('level', np.int64),
+])
+
+
+def _expand(indptr, indices, positions):
+    """For CSR rows at positions: (row number of each neighbour, neighbour node)."""
+    starts = indptr[positions]
+    degrees = indptr[positions + 1] - starts
+    rows = np.repeat(np.arange(len(positions)), degrees)
+    within = np.arange(degrees.sum()) - np.repeat(np.cumsum(degrees) - degrees, degrees)
+    return rows, indices[np.repeat(starts, degrees) + within]
+
+
+class CascadeImpact:
+    """area_elements as sorted (location, element) keys plus a FoodWeb."""
+
+    def __init__(self, parks, areas, elements, individuals, web):
+        parks, areas, elements = (np.asarray(values, dtype=np.int64) for values in (parks, areas, elements))
+        self.locations, location_index = np.unique((parks << 32) | areas, return_inverse=True)
+        keys = (location_index.astype(np.int64) << 32) | elements
+        order = np.argsort(keys)
+        self.keys = keys[order]
+        self.individuals = np.asarray(individuals, dtype=np.int64)[order]
+        self.row_parks = self.locations[self.keys >> 32] >> 32
+        self.web = web
+
+    @classmethod
+    def load(cls, connection):
+        rows = fetch_int_columns(connection, 'area_elements',
+                                 ('park_id', 'area_number', 'element_id', 'COALESCE(number_of_individuals, 0)'))
+        return cls(rows[:, 0], rows[:, 1], rows[:, 2], rows[:, 3], FoodWeb.load(connection))
+
+    def lookup(self, locations, elements):
+        """Individuals of each (location index, element) pair; 0 where the element is absent."""
+        keys = (np.asarray(locations, dtype=np.int64) << 32) | np.asarray(elements, dtype=np.int64)
+        if not len(self.keys):
+            return np.zeros(len(keys), dtype=np.int64)
+        positions = np.searchsorted(self.keys, keys)
+        positions[positions == len(self.keys)] = 0
+        return np.where(self.keys[positions] == keys, self.individuals[positions], 0)
+
+    def area_declines(self, parks, elements, fractions):
+        """Map park-level declines onto every area of the park where the element lives."""
+        decline_keys = (np.asarray(parks, dtype=np.int64) << 32) | np.asarray(elements, dtype=np.int64)
+        fractions = np.asarray(fractions, dtype=np.float64)
+        # Several declines of the same species in the same park: keep the largest.
+        order = np.lexsort((-fractions, decline_keys))
+        decline_keys, first = np.unique(decline_keys[order], return_index=True)
+        fractions = fractions[order][first]
+        row_keys = (self.row_parks << 32) | (self.keys & 0xFFFFFFFF)
+        if not len(decline_keys):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+        positions = np.searchsorted(decline_keys, row_keys)
+        positions[positions == len(decline_keys)] = 0
+        hit = decline_keys[positions] == row_keys
+        return self.keys[hit] >> 32, self.keys[hit] & 0xFFFFFFFF, fractions[positions[hit]]
+
+    def analyze(self, parks, elements, fractions, depth=1):
+        """Structured array (RESULT_DTYPE) of at-risk (area, predator) pairs, highest risk first."""
+        locations, prey, fraction = self.area_declines(parks, elements, fractions)
+        results = []
+        seen = np.empty(0, dtype=np.int64)
+        for level in range(1, depth + 1):
+            if not len(locations):
+                break
+            positions, known = self.web.positions(prey)
+            locations, prey, fraction, positions = locations[known], prey[known], fraction[known], positions[known]
+            rows, predator_nodes = _expand(self.web.predator_indptr, self.web.predator_indices, positions)
+            predators = self.web.ids[predator_nodes]
+            edge_locations, edge_prey, edge_fraction = locations[rows], prey[rows], fraction[rows]
+
+            # Only predators living in the same area as the declining prey are affected.
+            present = self.lookup(edge_locations, predators) > 0
+            edge_locations, edge_prey, edge_fraction = edge_locations[present], edge_prey[present], edge_fraction[present]
+            predators = predators[present]
+            if not len(predators):
+                break
+
+            pair_keys, pair_index = np.unique((edge_locations << 32) | predators, return_inverse=True)
+            pair_locations, pair_predators = pair_keys >> 32, pair_keys & 0xFFFFFFFF
+            food = self._available_food(pair_locations, self.web.positions(pair_predators)[0])
+            share = self.lookup(edge_locations, edge_prey) / np.maximum(food[pair_index], 1)
+            risk = np.minimum(np.bincount(pair_index, share * edge_fraction, minlength=len(pair_keys)), 1.0)
+
+            new = ~np.isin(pair_keys, seen)
+            pair_keys, pair_locations, pair_predators, risk = (
+                pair_keys[new], pair_locations[new], pair_predators[new], risk[new])
+            level_result = np.empty(len(pair_keys), dtype=RESULT_DTYPE)
+            level_result['park_id'] = self.locations[pair_locations] >> 32
+            level_result['area_number'] = self.locations[pair_locations] & 0xFFFFFFFF
+            level_result['element_id'] = pair_predators
+            level_result['risk'] = risk
+            level_result['declining_prey'] = np.bincount(pair_index, minlength=len(new))[new]
+            level_result['individuals'] = self.lookup(pair_locations, pair_predators)
+            level_result['level'] = level
+            results.append(level_result)
+            seen = np.union1d(seen, pair_keys)
+            # At-risk predators decline in turn at the next level.
+            locations, prey, fraction = pair_locations, pair_predators, risk
+
+        if not results:
+            return np.empty(0, dtype=RESULT_DTYPE)
+        result = np.concatenate(results)
+        return result[np.lexsort((result['element_id'], result['area_number'], result['park_id'], -result['risk']))]
+
+    def _available_food(self, locations, predator_positions):
+        """Individuals of everything each predator eats in its location."""
+        rows, prey_nodes = _expand(self.web.prey_indptr, self.web.prey_indices, predator_positions)
+        available = self.lookup(locations[rows], self.web.ids[prey_nodes])
+        return np.bincount(rows, available, minlength=len(locations))
+
+
+def declines_since(connection, last_log_id=0, processed=None, settle_seconds=0):
+    """(park ids, element ids, decline fractions, last_log_id, processed rows) of new email_log rows.
+
+    Every row is one decline, (old_count - new_count) / old_count. email_log does not say
+    which area declined, so rows of one species in one park are not chained together;
+    area_declines keeps the largest.
+
+    Rows after last_log_id are read, except those in processed ({log_id: event_count} of
+    rows after last_log_id already analysed). A decrease logged by a long transaction can
+    commit after rows with higher log_ids, so last_log_id only moves past rows logged at
+    least settle_seconds ago. Newer rows are returned as processed rows.
+
+    email_log is only read. The outbox's coalescing merges later declines into the first
+    row of a window and raises its event_count, so a processed row whose event_count has
+    changed is read again. settle_seconds must be at least the outbox's --coalesce-window:
+    rows behind last_log_id can then no longer absorb declines that were not read.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT log_id, park_id, element_id, old_count, new_count, event_count,
+                   log_timestamp <= NOW() - INTERVAL %s SECOND AS settled
+            FROM email_log WHERE log_id > %s ORDER BY log_id
+        """, (settle_seconds, last_log_id))
+        rows = cursor.fetchall()
+
+    processed = processed or {}
+    parks, elements, fractions, recent = [], [], [], {}
+    for log_id, park_id, element_id, old_count, new_count, event_count, settled in rows:
+        if settled and not recent:
+            last_log_id = log_id
+        else:
+            recent[log_id] = event_count
+        if processed.get(log_id) == event_count or not old_count or park_id is None or element_id is None:
+            continue
+        parks.append(park_id)
+        elements.append(element_id)
+        fractions.append(min(max((old_count - (new_count or 0)) / old_count, 0.0), 1.0))
+    return parks, elements, fractions, last_log_id, recent
+
+
+def write_report(path, result):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(RESULT_DTYPE.names)
+        for row in result.tolist():
+            writer.writerow(row[:3] + (f"{row[3]:.6f}",) + row[4:])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank predators put at risk by logged population declines.")
+    parser.add_argument('--all', action='store_true', help="Use every email_log row, not only new ones")
+    parser.add_argument('--depth', type=int, default=1, help="Levels of predators to follow")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--top', type=int, default=20, help="Rows to print")
+    parser.add_argument('--state-dir', default=STATE_DIR)
+    parser.add_argument('--settle-seconds', type=int, default=600,
+                        help="Age after which no earlier alert can still commit or be coalesced into "
+                             "(longer than any census transaction and the outbox's --coalesce-window)")
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    state_path = os.path.join(args.state_dir, f"{args.database}.json")
+    state = {}
+    if not args.all and os.path.exists(state_path):
+        with open(state_path, encoding='utf-8') as f:
+            state = json.load(f)
+
+    started = time.perf_counter()
+    connection = db.connect(**db.connection_options(args))
+    try:
+        processed = {int(log_id): events for log_id, events in state.get('processed', {}).items()}
+        parks, elements, fractions, last_log_id, processed = declines_since(
+            connection, state.get('last_log_id', 0), processed, args.settle_seconds)
+        analysis = CascadeImpact.load(connection)
+    finally:
+        connection.close()
+    loaded = time.perf_counter()
+    result = analysis.analyze(parks, elements, fractions, args.depth)
+    write_report(args.output, result)
+    print(f"{len(parks)} declines -> {len(result)} at-risk predator/area pairs "
+          f"(load {loaded - started:.2f}s, analysis {time.perf_counter() - loaded:.2f}s); report: {args.output}")
+    for row in result[:args.top]:
+        print(f"park {row['park_id']} area {row['area_number']}: element {row['element_id']} "
+              f"risk {row['risk']:.3f} ({row['declining_prey']} declining prey, level {row['level']})")
+
+    os.makedirs(args.state_dir, exist_ok=True)
+    with open(state_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'last_log_id': last_log_id, 'processed': processed}, f)
+    os.replace(state_path + '.tmp', state_path)
+
+
+if __name__ == '__main__':
+    main()
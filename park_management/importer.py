@@ -0,0 +1,211 @@
+"""Streaming import of the public datasets in data/ into the data/load CSV format.
+
+The datasets published by the national parks administration are semicolon separated,
+fully quoted, CRLF terminated and not always UTF-8. Each one is streamed through a
+generator pipeline (read -> clean -> map -> write) and written as a comma separated,
+'\\n' terminated UTF-8 file with quoted strings, i.e. the format LOAD DATA in
+sql/populate_data.sql expects.
+
+The stage is incremental: a manifest in the output directory stores the SHA-256 of
+every source file, and a source whose hash and outputs are unchanged since the last
+run is skipped.
+
+Outputs are written to data/import, but populate_data.sql and the loaders read
+data/load. With --publish, the outputs that are tables of setup.sql (provinces.csv)
+are copied into data/load, which is what run_import.sh does before populate_data.sql.
+The other outputs are reference statistics with no table in the schema and stay in
+data/import.
+
+Usage (normally through run_import.sh):
+    python3 data/import/parse_csv_data.py [--output-dir data/import] [--force] [--publish]
+"""
+import argparse
+import csv
+import json
+import os
+import shutil
+from dataclasses import dataclass
+
+from park_management import schema
+from park_management.generator import write_csv
+from park_management.loadfiles import file_hash
+
+DATA_DIR = os.path.join(schema.PROJECT_ROOT, 'data')
+IMPORT_DIR = os.path.join(DATA_DIR, 'import')
+MANIFEST = '.import_manifest.json'
+
+# Tried in order; latin-1 decodes any byte sequence, so it is the last resort.
+ENCODINGS = ('utf-8-sig', 'cp1252', 'latin-1')
+
+# Rows of the jurisdiction dataset that are not provinces
+NON_PROVINCE_JURISDICTIONS = {'Áreas Marinas Protegidas', 'Espacio marítimo argentino'}
+UNKNOWN_ORGANIZATION = 'Sin información'
+
+
+def detect_encoding(path, sample_bytes=1 << 20):
+    with open(path, 'rb') as f:
+        sample = f.read(sample_bytes)
+    for encoding in ENCODINGS:
+        try:
+            sample.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return ENCODINGS[-1]
+
+
+def read_rows(path, delimiter=';'):
+    """Yield one dict per data row, keyed by the header, with whitespace trimmed."""
+    with open(path, newline='', encoding=detect_encoding(path)) as f:
+        reader = csv.reader(f, delimiter=delimiter, quotechar='"')
+        header = [name.strip() for name in next(reader)]
+        for values in reader:
+            if not any(value.strip() for value in values):
+                continue
+            yield dict(zip(header, (value.strip() for value in values)))
+
+
+def to_int(value):
+    return int(value.replace('.', '')) if value else None
+
+
+def to_decimal(value):
+    """Parse '5.34' or the Spanish-locale '5,34'."""
+    return float(value.replace(',', '.')) if value else None
+
+
+@dataclass
+class Source:
+    filename: str
+    output: str
+    header: tuple
+    transform: object
+
+
+def _jurisdictions(rows):
+    for row in rows:
+        yield (row['jurisdicción'], to_int(row['número']), to_int(row['superficie_en_ha']),
+               to_decimal(row['porcentaje_de_superficie_protegida']))
+
+
+def _provinces(rows, reference_path=None):
+    """provinces rows; ids and organizations are kept from data/load/provinces.csv when the name matches."""
+    reference_path = reference_path or os.path.join(schema.LOAD_DIR, 'provinces.csv')
+    known = {}
+    if os.path.exists(reference_path):
+        with open(reference_path, newline='', encoding='utf-8') as f:
+            known = {row['name']: row for row in csv.DictReader(f)}
+    next_id = max((int(row['id']) for row in known.values()), default=0) + 1
+    for row in rows:
+        name = row['jurisdicción']
+        if name in NON_PROVINCE_JURISDICTIONS:
+            continue
+        if name in known:
+            yield int(known[name]['id']), name, known[name]['responsible_organization']
+        else:
+            yield next_id, name, UNKNOWN_ORGANIZATION
+            next_id += 1
+
+
+def _species_groups(rows):
+    for row in rows:
+        yield (row['grupo'], to_int(row['numero_de_especies_en_argentina']),
+               to_int(row['numero_de_especies_en_apn']), to_decimal(row['porcentaje']))
+
+
+def _visitor_residency(rows):
+    for row in rows:
+        yield (to_int(row['año']), to_decimal(row['residentes_en_porcentaje']),
+               to_decimal(row['no_residentes_en_porcentaje']))
+
+
+SOURCES = [
+    Source('areas_protegidas_nacionales_y_provinciales_por_jurisdiccion.csv', 'provinces.csv',
+           ('id', 'name', 'responsible_organization'), _provinces),
+    Source('areas_protegidas_nacionales_y_provinciales_por_jurisdiccion.csv', 'protected_areas_by_jurisdiction.csv',
+           ('jurisdiction', 'protected_area_count', 'protected_hectares', 'protected_percentage'), _jurisdictions),
+    Source('representatividad_de_las_especies_en_areas_protegidas_nacionales.csv', 'species_representation.csv',
+           ('species_group', 'species_in_argentina', 'species_in_national_parks', 'percentage'), _species_groups),
+    Source('visitantes_registrados_en_los_parques_nacionales.csv', 'visitor_residency.csv',
+           ('year', 'residents_percentage', 'non_residents_percentage'), _visitor_residency),
+]
+
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def run_import(source_dir=DATA_DIR, output_dir=IMPORT_DIR, sources=SOURCES, force=False, log=print):
+    """Convert every changed source; returns {output file: rows written or None if skipped}."""
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    results = {}
+    hashes = {}
+    for source in sources:
+        source_path = os.path.join(source_dir, source.filename)
+        if source.filename not in hashes:
+            hashes[source.filename] = file_hash(source_path)
+        output_path = os.path.join(output_dir, source.output)
+        previous = manifest.get(source.output, {})
+        if (not force and previous.get('sha256') == hashes[source.filename]
+                and previous.get('source') == source.filename and os.path.exists(output_path)):
+            results[source.output] = None
+            if log:
+                log(f"{source.output}: {source.filename} unchanged, skipped")
+            continue
+
+        # Write to a temporary file first so an interrupted run never leaves a partial output.
+        rows = write_csv(output_path + '.tmp', source.header, source.transform(read_rows(source_path)))
+        os.replace(output_path + '.tmp', output_path)
+        manifest[source.output] = {'source': source.filename, 'sha256': hashes[source.filename], 'rows': rows}
+        save_manifest(output_dir, manifest)
+        results[source.output] = rows
+        if log:
+            log(f"{source.output}: {rows} rows from {source.filename}")
+    return results
+
+
+def publish(output_dir=IMPORT_DIR, load_dir=schema.LOAD_DIR, sources=SOURCES, log=print):
+    """Copy the outputs that populate_data.sql loads into load_dir; returns their file names."""
+    loaded = {os.path.basename(table.load_file) for table in schema.loaded_tables(schema.parse_schema())}
+    published = []
+    for output in dict.fromkeys(source.output for source in sources):
+        output_path = os.path.join(output_dir, output)
+        if output not in loaded or not os.path.exists(output_path):
+            continue
+        target = os.path.join(load_dir, output)
+        shutil.copyfile(output_path, target + '.tmp')
+        os.replace(target + '.tmp', target)
+        published.append(output)
+        if log:
+            log(f"{output}: copied to {load_dir}")
+    return published
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert the public datasets in data/ to the data/load CSV format.")
+    parser.add_argument('--source-dir', default=DATA_DIR)
+    parser.add_argument('--output-dir', default=IMPORT_DIR)
+    parser.add_argument('--force', action='store_true', help="Re-import sources even if they are unchanged")
+    parser.add_argument('--publish', action='store_true',
+                        help="Copy the outputs that are schema tables into --load-dir for populate_data.sql")
+    parser.add_argument('--load-dir', default=schema.LOAD_DIR)
+    args = parser.parse_args(argv)
+    run_import(args.source_dir, args.output_dir, force=args.force)
+    if args.publish:
+        publish(args.output_dir, args.load_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,406 @@
+"""Workload-driven index advisor.
+
+The workload is the statement digests of the database in performance_schema
+(events_statements_summary_by_digest, using QUERY_SAMPLE_TEXT, weighted by
+COUNT_STAR). With --workload analysis it is the queries of
+sql/analyze_execution_plans.sql instead, each with weight 1.
+
+Candidates come from the EXPLAIN FORMAT=JSON plan of each statement. Every table
+read by a full table or index scan, or by a ref lookup that still reads the row,
+gets two candidates:
+- an index on the columns its attached condition compares with '=';
+- a covering index that appends the other columns the statement uses there.
+
+Candidates are skipped when an existing index already starts with their columns.
+
+Each candidate is measured in two ways:
+- Read benefit: the candidate is added INVISIBLE, so other sessions' plans do not
+  change. The benefit is the drop in optimizer query_cost of the statements on
+  its table with use_invisible_indexes=on, weighted by digest count.
+- Write cost: rows are copied into a scratch copy of the table (CREATE TABLE ...
+  LIKE, so no triggers or foreign keys fire), timed with and without the index.
+  The difference is given in µs per written row and multiplied by the writes
+  seen on the table in performance_schema.table_io_waits_summary_by_table.
+
+Drop candidates are the redundant and unused indexes reported by the sys schema
+(schema_redundant_indexes, schema_unused_indexes). Their read cost is the increase
+in weighted query_cost with a NO_INDEX optimizer hint. Their write cost is the
+maintenance that dropping them saves, timed the same way.
+
+Usage:
+    python -m park_management.index_advisor --limit 50 --output results/index_advisor.json
+    python -m park_management.index_advisor --workload analysis
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import time
+from dataclasses import asdict, dataclass, field
+
+import pymysql
+
+from park_management import db
+from park_management.benchmark import parse_queries
+
+COPY_TABLE = '_index_advisor_copy'
+MAX_INDEX_COLUMNS = 5
+_ALIAS = re.compile(r'\b(?:FROM|JOIN|UPDATE)\s+`?(\w+)`?(?:\s+(?:AS\s+)?`?(?!ON\b|WHERE\b|JOIN\b|SET\b|GROUP\b|ORDER\b|'
+                    r'LEFT\b|RIGHT\b|INNER\b|CROSS\b|STRAIGHT_JOIN\b|USING\b|LIMIT\b|HAVING\b)(\w+)`?)?', re.I)
+_STATEMENT_START = re.compile(r'^\s*(SELECT|UPDATE|DELETE)\b', re.I)
+
+
+@dataclass
+class Statement:
+    text: str
+    count: int = 1
+    rows_examined: int = 0
+
+
+@dataclass
+class IndexCandidate:
+    table: str
+    columns: tuple
+    reason: str
+    read_benefit: float = 0.0
+    statements_improved: int = 0
+    write_us_per_row: float = 0.0
+    writes_observed: int = 0
+
+    @property
+    def name(self):
+        return f"idx_adv_{self.table}_{'_'.join(self.columns)}"[:64]
+
+    @property
+    def workload_write_ms(self):
+        return self.write_us_per_row * self.writes_observed / 1000
+
+
+@dataclass
+class DropCandidate:
+    table: str
+    index: str
+    columns: tuple
+    reason: str
+    read_cost: float = 0.0
+    statements_affected: int = 0
+    write_us_per_row: float = 0.0
+    writes_observed: int = 0
+    drop_statement: str = None
+
+    @property
+    def workload_write_ms(self):
+        return self.write_us_per_row * self.writes_observed / 1000
+
+
+@dataclass
+class Advice:
+    add: list = field(default_factory=list)
+    drop: list = field(default_factory=list)
+
+
+def aliases(sql):
+    """{alias or table name: table} for the tables named after FROM, JOIN and UPDATE."""
+    mapping = {}
+    for table, alias in _ALIAS.findall(sql):
+        mapping[table] = table
+        if alias:
+            mapping[alias] = table
+    return mapping
+
+
+def equality_columns(condition, alias):
+    """Columns of alias compared with '=' in an attached_condition, in order of appearance."""
+    columns = []
+    pattern = re.compile(rf'`{re.escape(alias)}`\.`(\w+)`\s*=|=\s*`{re.escape(alias)}`\.`(\w+)`')
+    for left, right in pattern.findall(condition or ''):
+        column = left or right
+        if column not in columns:
+            columns.append(column)
+    return columns
+
+
+def _table_nodes(node):
+    if isinstance(node, list):
+        for item in node:
+            yield from _table_nodes(item)
+    elif isinstance(node, dict):
+        table = node.get('table')
+        if isinstance(table, dict) and 'table_name' in table:
+            yield table
+        for value in node.values():
+            yield from _table_nodes(value)
+
+
+def candidates_from_plan(plan, alias_map, existing):
+    """IndexCandidates for the table accesses of one EXPLAIN FORMAT=JSON document.
+
+    existing maps table -> list of column tuples of its current indexes.
+    """
+    candidates = []
+    for node in _table_nodes(plan):
+        alias = node['table_name']
+        table = alias_map.get(alias)
+        access = node.get('access_type')
+        if table is None or access in ('const', 'system', 'eq_ref') or node.get('using_index'):
+            continue
+        used = node.get('used_columns', [])
+        equal = equality_columns(node.get('attached_condition'), alias)
+        if access == 'ref':
+            key_parts = node.get('used_key_parts', [])
+            equal = key_parts + [column for column in equal if column not in key_parts]
+        elif access not in ('ALL', 'index', 'range'):
+            continue
+        shapes = []
+        if equal and access != 'ref':
+            shapes.append((tuple(equal[:MAX_INDEX_COLUMNS]), f"{access} access filtered on {', '.join(equal)}"))
+        covering = tuple((equal + [column for column in used if column not in equal])[:MAX_INDEX_COLUMNS])
+        if covering and set(used) <= set(covering):
+            shapes.append((covering, f"covers {alias} ({access} access)"))
+        for columns, reason in shapes:
+            if any(index[:len(columns)] == columns for index in existing.get(table, ())):
+                continue
+            candidates.append(IndexCandidate(table, columns, reason))
+    return candidates
+
+
+def with_hints(sql, hints):
+    """sql with an optimizer hint comment after its first SELECT / UPDATE / DELETE keyword."""
+    return _STATEMENT_START.sub(lambda match: f"{match.group(0)} /*+ {' '.join(hints)} */", sql, count=1)
+
+
+def rank(advice):
+    """Sort additions by read benefit per µs of write cost, drops by saved writes per unit of read cost."""
+    advice.add.sort(key=lambda c: (-c.read_benefit / (1 + c.write_us_per_row), c.table, c.columns))
+    advice.drop.sort(key=lambda c: (c.read_cost > 0, c.read_cost, -c.write_us_per_row, c.table, c.index))
+    return advice
+
+
+class IndexAdvisor:
+    """Workload, candidates and their measurements on one database."""
+
+    def __init__(self, connection, sample_rows=5000, repeat=3, log=print):
+        self.connection = connection
+        self.sample_rows = sample_rows
+        self.repeat = repeat
+        self.log = log
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT DATABASE()")
+            self.schema = cursor.fetchone()[0]
+
+    def digest_workload(self, limit=50):
+        """Statements of this schema from performance_schema, heaviest first."""
+        with self.connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT QUERY_SAMPLE_TEXT, COUNT_STAR, SUM_ROWS_EXAMINED
+                FROM performance_schema.events_statements_summary_by_digest
+                WHERE SCHEMA_NAME = %s AND QUERY_SAMPLE_TEXT REGEXP '^[[:space:]]*(SELECT|UPDATE|DELETE)'
+                  AND QUERY_SAMPLE_TEXT NOT REGEXP 'performance_schema|information_schema|EXPLAIN'
+                ORDER BY SUM_TIMER_WAIT DESC
+                LIMIT %s
+            """, (self.schema, limit))
+            return [Statement(text, count, rows or 0) for text, count, rows in cursor.fetchall()]
+
+    def existing_indexes(self):
+        """{table: {index name: column tuple}} from information_schema.statistics."""
+        with self.connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT table_name, index_name, column_name FROM information_schema.statistics
+                WHERE table_schema = %s ORDER BY table_name, index_name, seq_in_index
+            """, (self.schema,))
+            indexes = {}
+            for table, index, column in cursor.fetchall():
+                indexes.setdefault(table, {}).setdefault(index, ())
+                indexes[table][index] += (column,)
+            return indexes
+
+    def observed_writes(self):
+        """{table: rows inserted, updated or deleted} since performance_schema was last reset."""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT OBJECT_NAME, COUNT_INSERT + COUNT_UPDATE + COUNT_DELETE
+                    FROM performance_schema.table_io_waits_summary_by_table
+                    WHERE OBJECT_SCHEMA = %s AND INDEX_NAME IS NULL
+                """, (self.schema,))
+                return {table: int(count) for table, count in cursor.fetchall()}
+        except pymysql.MySQLError:
+            return {}
+
+    def plan(self, sql):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN FORMAT=JSON {sql}")
+            return json.loads(cursor.fetchone()[0])
+
+    def cost(self, sql):
+        return float(self.plan(sql)['query_block'].get('cost_info', {}).get('query_cost', 0))
+
+    def _weighted_cost(self, statements):
+        return sum(statement.count * self.cost(statement.text) for statement in statements)
+
+    def _on_table(self, statements, table):
+        return [statement for statement in statements if table in aliases(statement.text).values()]
+
+    def measure_read_benefit(self, candidate, statements):
+        """Weighted query_cost saved by the candidate, added as an INVISIBLE index for the measurement."""
+        relevant = self._on_table(statements, candidate.table)
+        if not relevant:
+            return
+        before = [self.cost(statement.text) for statement in relevant]
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {candidate.table} ADD INDEX {candidate.name} "
+                           f"({', '.join(candidate.columns)}) INVISIBLE")
+            try:
+                cursor.execute("SET SESSION optimizer_switch = 'use_invisible_indexes=on'")
+                after = [self.cost(statement.text) for statement in relevant]
+            finally:
+                cursor.execute("SET SESSION optimizer_switch = 'use_invisible_indexes=off'")
+                cursor.execute(f"ALTER TABLE {candidate.table} DROP INDEX {candidate.name}")
+        savings = [(statement.count * (old - new)) for statement, old, new in zip(relevant, before, after)]
+        candidate.read_benefit = round(sum(savings), 2)
+        candidate.statements_improved = sum(saving > 0 for saving in savings)
+
+    def measure_read_cost(self, candidate, statements):
+        """Weighted query_cost added when the optimizer may not use the index (NO_INDEX hints)."""
+        relevant = self._on_table(statements, candidate.table)
+        added = []
+        for statement in relevant:
+            names = [alias for alias, table in aliases(statement.text).items() if table == candidate.table]
+            hinted = with_hints(statement.text, [f"NO_INDEX({name} {candidate.index})" for name in names])
+            added.append(statement.count * (self.cost(hinted) - self.cost(statement.text)))
+        candidate.read_cost = round(sum(added), 2)
+        candidate.statements_affected = sum(cost > 0 for cost in added)
+
+    def _time_copy(self, cursor, table):
+        timings = []
+        for _ in range(self.repeat):
+            cursor.execute(f"TRUNCATE TABLE {COPY_TABLE}")
+            started = time.perf_counter()
+            rows = cursor.execute(f"INSERT INTO {COPY_TABLE} SELECT * FROM {table} LIMIT %s", (self.sample_rows,))
+            self.connection.commit()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings), rows
+
+    def measure_write_cost(self, table, columns=None, index=None):
+        """µs per inserted row that one index adds on a scratch copy of table.
+
+        columns: a new index to add to the copy; index: an existing index to drop from it.
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {COPY_TABLE}")
+            cursor.execute(f"CREATE TABLE {COPY_TABLE} LIKE {table}")
+            try:
+                if columns:
+                    without, rows = self._time_copy(cursor, table)
+                    cursor.execute(f"ALTER TABLE {COPY_TABLE} ADD INDEX advised ({', '.join(columns)})")
+                    with_index, _ = self._time_copy(cursor, table)
+                else:
+                    with_index, rows = self._time_copy(cursor, table)
+                    cursor.execute(f"ALTER TABLE {COPY_TABLE} DROP INDEX {index}")
+                    without, _ = self._time_copy(cursor, table)
+            finally:
+                cursor.execute(f"DROP TABLE IF EXISTS {COPY_TABLE}")
+        return round(max(0.0, (with_index - without) / max(rows, 1) * 1e6), 3)
+
+    def redundant_indexes(self):
+        """DropCandidates from sys.schema_redundant_indexes and sys.schema_unused_indexes."""
+        drops = {}
+        indexes = self.existing_indexes()
+        with self.connection.cursor() as cursor:
+            try:
+                cursor.execute("""
+                    SELECT table_name, redundant_index_name, dominant_index_name, sql_drop_index
+                    FROM sys.schema_redundant_indexes WHERE table_schema = %s
+                """, (self.schema,))
+                for table, index, dominant, statement in cursor.fetchall():
+                    drops[(table, index)] = DropCandidate(table, index, indexes.get(table, {}).get(index, ()),
+                                                          f"redundant with {dominant}", drop_statement=statement)
+                cursor.execute("""
+                    SELECT object_name, index_name FROM sys.schema_unused_indexes WHERE object_schema = %s
+                """, (self.schema,))
+                for table, index in cursor.fetchall():
+                    drops.setdefault((table, index), DropCandidate(
+                        table, index, indexes.get(table, {}).get(index, ()), "unused since server start",
+                        drop_statement=f"ALTER TABLE `{self.schema}`.`{table}` DROP INDEX `{index}`"))
+            except pymysql.MySQLError as error:
+                if self.log:
+                    self.log(f"sys schema unavailable ({error}); no drop candidates")
+        return list(drops.values())
+
+    def advise(self, statements, max_candidates=20):
+        """Measured and ranked Advice for the workload statements."""
+        existing = {table: list(index.values()) for table, index in self.existing_indexes().items()}
+        # Digest samples can be truncated or otherwise not EXPLAINable: leave them out of every measurement.
+        plans = []
+        for statement in statements:
+            try:
+                plans.append((statement, self.plan(statement.text)))
+            except pymysql.MySQLError as error:
+                if self.log:
+                    self.log(f"skipped a statement that cannot be explained ({error}): {statement.text[:80]}")
+        statements = [statement for statement, _ in plans]
+        seen, candidates = set(), []
+        for statement, plan in plans:
+            for candidate in candidates_from_plan(plan, aliases(statement.text), existing):
+                if (candidate.table, candidate.columns) not in seen:
+                    seen.add((candidate.table, candidate.columns))
+                    candidates.append(candidate)
+        writes = self.observed_writes()
+        advice = Advice()
+        for candidate in candidates[:max_candidates]:
+            self.measure_read_benefit(candidate, statements)
+            if candidate.read_benefit <= 0:
+                continue
+            candidate.write_us_per_row = self.measure_write_cost(candidate.table, columns=candidate.columns)
+            candidate.writes_observed = writes.get(candidate.table, 0)
+            advice.add.append(candidate)
+        for drop in self.redundant_indexes():
+            self.measure_read_cost(drop, statements)
+            drop.write_us_per_row = self.measure_write_cost(drop.table, index=drop.index)
+            drop.writes_observed = writes.get(drop.table, 0)
+            advice.drop.append(drop)
+        return rank(advice)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recommend indexes to add and drop for the observed workload.")
+    parser.add_argument('--workload', choices=('digests', 'analysis'), default='digests',
+                        help="performance_schema digests, or the queries of sql/analyze_execution_plans.sql")
+    parser.add_argument('--limit', type=int, default=50, help="Digests to read")
+    parser.add_argument('--max-candidates', type=int, default=20)
+    parser.add_argument('--sample-rows', type=int, default=5000, help="Rows copied to time index maintenance")
+    parser.add_argument('--output', help="JSON file for the advice")
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    connection = db.connect(**db.connection_options(args))
+    try:
+        advisor = IndexAdvisor(connection, args.sample_rows)
+        statements = (advisor.digest_workload(args.limit) if args.workload == 'digests'
+                      else [Statement(sql) for sql in parse_queries().values()])
+        if not statements:
+            print("No statements in performance_schema for this schema; try --workload analysis")
+            return
+        advice = advisor.advise(statements, args.max_candidates)
+    finally:
+        connection.close()
+
+    print(f"Indexes to add ({len(statements)} statements):")
+    for rank_number, candidate in enumerate(advice.add, 1):
+        print(f"  {rank_number}. {candidate.table} ({', '.join(candidate.columns)}): read cost -{candidate.read_benefit} "
+              f"over {candidate.statements_improved} statements, write +{candidate.write_us_per_row} µs/row "
+              f"({candidate.workload_write_ms:.1f} ms for observed writes) [{candidate.reason}]")
+    print("Indexes to drop:")
+    for drop in advice.drop:
+        print(f"  {drop.table}.{drop.index} ({', '.join(drop.columns)}): {drop.reason}; read cost +{drop.read_cost}, "
+              f"write -{drop.write_us_per_row} µs/row ({drop.workload_write_ms:.1f} ms for observed writes)")
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'add': [{**asdict(c), 'name': c.name} for c in advice.add],
+                       'drop': [asdict(d) for d in advice.drop]}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+"""Named index profiles, applied idempotently and compared on the benchmark workload.
+
+PROFILES declares every optional secondary index in one place. Indexes that setup.sql
+creates itself (primary keys, UNIQUE keys, summary-table indexes) belong to no profile
+and are never touched.
+
+* baseline: the indexes sql/analyze_execution_plans.sql has always created. The
+  script calls ensure_index for exactly this list.
+* write_optimized: only the indexes that back foreign keys. It drops
+  idx_parks_code and idx_natural_elements_scientific_name, which duplicate UNIQUE keys,
+  and idx_area_elements_park_id, which duplicates the first column of the primary key.
+* read_optimized: write_optimized with area_elements (element_id, park_id) instead of
+  (element_id). The wider index covers COUNT(DISTINCT ae.park_id) in FR2, AR3 and AR4.
+
+Applying a profile follows these steps:
+* Missing indexes are added with the ensure_index procedure of setup.sql, online
+  (ALGORITHM=INPLACE, LOCK=NONE).
+* The indexes of other profiles are then dropped, also online. Adds come first, so a
+  foreign key always keeps an index.
+* An index whose columns differ from the profile is dropped and added again.
+* A drop that MySQL refuses because a foreign key still needs the index is reported
+  and skipped.
+Re-applying a profile changes nothing.
+
+--compare generates data and loads it into a scratch database (park_management.generator
+and loader). Then, for each profile, it:
+* applies the profile;
+* runs park_management.benchmark.run_suite;
+* records the size of the secondary indexes;
+* reverts to the indexes found before.
+The benchmark visitors are deleted between profiles. The census updates stay, which
+changes a few counts but not the shape of the data.
+
+Usage:
+    python -m park_management.index_profiles --list
+    python -m park_management.index_profiles --apply read_optimized
+    python -m park_management.index_profiles --compare --scale-factor 0.1 --output results/index_profiles.json
+"""
+import argparse
+import datetime
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+
+import pymysql
+
+from park_management import db, generator, schema
+from park_management.benchmark import DEFAULT_SECTIONS, parse_queries, run_suite
+from park_management.loader import ParallelLoader
+from park_management.species_counts import BENCHMARK_DB
+
+FK_NEEDS_INDEX = 1553  # ER_DROP_INDEX_FK
+
+
+@dataclass(frozen=True)
+class ProfileIndex:
+    table: str
+    name: str
+    columns: tuple
+
+
+_PARK_PROVINCES = ProfileIndex('park_provinces', 'idx_park_provinces_province_id', ('province_id',))
+_AREA_ELEMENTS = ProfileIndex('area_elements', 'idx_area_elements_element_id', ('element_id',))
+_VISITORS = ProfileIndex('visitors', 'idx_visitors_park_id', ('park_id',))
+
+PROFILES = {
+    'baseline': (
+        _PARK_PROVINCES,
+        _AREA_ELEMENTS,
+        ProfileIndex('area_elements', 'idx_area_elements_park_id', ('park_id',)),
+        ProfileIndex('natural_elements', 'idx_natural_elements_scientific_name', ('scientific_name',)),
+        ProfileIndex('parks', 'idx_parks_code', ('code',)),
+        _VISITORS,
+    ),
+    'read_optimized': (
+        _PARK_PROVINCES,
+        ProfileIndex('area_elements', 'idx_area_elements_element_park', ('element_id', 'park_id')),
+        _VISITORS,
+    ),
+    'write_optimized': (
+        _PARK_PROVINCES,
+        _AREA_ELEMENTS,
+        _VISITORS,
+    ),
+}
+MANAGED = {index.name for profile in PROFILES.values() for index in profile}
+
+
+def managed_indexes(connection):
+    """{name: ProfileIndex} of the profile indexes the current database has."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT table_name, index_name, column_name FROM information_schema.statistics
+            WHERE table_schema = DATABASE() ORDER BY table_name, index_name, seq_in_index
+        """)
+        columns = {}
+        for table, index, column in cursor.fetchall():
+            if index in MANAGED:
+                columns.setdefault((table, index), []).append(column)
+    return {index: ProfileIndex(table, index, tuple(names)) for (table, index), names in columns.items()}
+
+
+def steps(current, profile):
+    """[('add' | 'drop', ProfileIndex)] turning the current managed indexes into profile."""
+    wanted = {index.name: index for index in profile}
+    changed = [index for index in profile if index.name in current and current[index.name] != index]
+    return ([('add', index) for index in profile if index.name not in current]
+            + [('drop', index) for name, index in sorted(current.items())
+               if name not in wanted or current[name] != wanted[name]]
+            + [('add', index) for index in changed])
+
+
+def apply(connection, profile, log=print):
+    """Bring the managed indexes to profile (a name or ProfileIndexes); returns the steps done."""
+    if isinstance(profile, str):
+        profile = PROFILES[profile]
+    done = []
+    with connection.cursor() as cursor:
+        for action, index in steps(managed_indexes(connection), profile):
+            if action == 'add':
+                cursor.execute("CALL ensure_index(%s, %s, %s)", (index.table, index.name, ', '.join(index.columns)))
+            else:
+                try:
+                    cursor.execute(f"ALTER TABLE {index.table} DROP INDEX {index.name}, ALGORITHM=INPLACE, LOCK=NONE")
+                except pymysql.MySQLError as error:
+                    if error.args[0] != FK_NEEDS_INDEX:
+                        raise
+                    if log:
+                        log(f"kept {index.table}.{index.name}: a foreign key needs it")
+                    continue
+            done.append((action, index))
+            if log:
+                log(f"{action} {index.table}.{index.name} ({', '.join(index.columns)})")
+    return done
+
+
+def index_sizes(connection):
+    """{(table, index): bytes} of the secondary indexes, after refreshing their statistics."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT DISTINCT table_name FROM information_schema.statistics "
+                       "WHERE table_schema = DATABASE() AND index_name <> 'PRIMARY'")
+        tables = [row[0] for row in cursor.fetchall()]
+        cursor.execute(f"ANALYZE TABLE {', '.join(tables)}")
+        cursor.fetchall()
+        cursor.execute("""
+            SELECT s.table_name, s.index_name, s.stat_value * @@innodb_page_size
+            FROM mysql.innodb_index_stats s
+            WHERE s.database_name = DATABASE() AND s.stat_name = 'size' AND s.index_name <> 'PRIMARY'
+        """)
+        sizes = {}
+        for table, index, size in cursor.fetchall():
+            # Partitioned tables have one row per partition (table#p#partition).
+            key = (table.split('#')[0], index)
+            sizes[key] = sizes.get(key, 0) + int(size)
+    return sizes
+
+
+def measure(connection, profile, log=print, **suite_options):
+    """Apply profile, run the benchmark suite, revert; returns the profile's result dict."""
+    before = managed_indexes(connection)
+    apply(connection, profile, log)
+    try:
+        sizes = index_sizes(connection)
+        results = run_suite(connection, **suite_options)
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM visitors WHERE DNI LIKE 'BENCH%'")
+        connection.commit()
+        apply(connection, tuple(before.values()), log)
+    names = {index.name for index in PROFILES[profile]}
+    by_name = {result['name']: result for result in results}
+    return {'profile': profile,
+            'profile_index_bytes': sum(size for (_, index), size in sizes.items() if index in names),
+            'secondary_index_bytes': sum(sizes.values()),
+            'registrations_per_s': by_name.get('visitor_registration', {}).get('throughput'),
+            'census_rows_per_s': by_name.get('census_update', {}).get('throughput'),
+            'results': results}
+
+
+def compare(profiles, scale_factor, queries, workers=4, seed=0, connection_options=None, log=print,
+            **suite_options):
+    """Load generated data once and measure every profile on it; returns the JSON document."""
+    connection_options = {**(connection_options or {}), 'database': BENCHMARK_DB}
+    document = {'created': datetime.datetime.now().isoformat(timespec='seconds'), 'scale_factor': scale_factor,
+                'profiles': []}
+    work_dir = tempfile.mkdtemp(prefix='park_profiles_')
+    server = db.connect(**{**connection_options, 'database': None})
+    try:
+        generator.generate(work_dir, scale_factor, seed, log=None)
+        with server.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS {BENCHMARK_DB}")
+            cursor.execute("SELECT VERSION()")
+            document['mysql_version'] = cursor.fetchone()[0]
+        db.run_script(server, schema.SETUP_SQL, {'park_management': BENCHMARK_DB})
+        ParallelLoader(work_dir, workers, connection_options=connection_options, log=None).run()
+        connection = db.connect(**connection_options)
+        try:
+            for profile in profiles:
+                document['profiles'].append(measure(connection, profile, log, queries=queries, seed=seed,
+                                                    **suite_options))
+        finally:
+            connection.close()
+    finally:
+        with server.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS {BENCHMARK_DB}")
+        server.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return document
+
+
+def report(document, log=print):
+    """Print query p95, write throughput and index size side by side, one column per profile."""
+    profiles = document['profiles']
+    log(f"{'':40}" + ''.join(f"{entry['profile']:>18}" for entry in profiles))
+    p95 = [{result['name']: result['p95_ms'] for result in entry['results'] if result['kind'] == 'query'}
+           for entry in profiles]
+    for name in p95[0] if p95 else ():
+        log(f"{name + ' p95 ms':40}" + ''.join(f"{row.get(name, float('nan')):>18.3f}" for row in p95))
+    for key, label in (('registrations_per_s', 'visitor registrations/s'), ('census_rows_per_s', 'census rows/s')):
+        log(f"{label:40}" + ''.join(f"{entry[key] or 0:>18.1f}" for entry in profiles))
+    for key, label in (('profile_index_bytes', 'profile index MB'), ('secondary_index_bytes', 'all secondary index MB')):
+        log(f"{label:40}" + ''.join(f"{entry[key] / 2 ** 20:>18.2f}" for entry in profiles))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply and compare the named index profiles.")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--list', action='store_true', help="Print the profiles and their indexes")
+    action.add_argument('--apply', choices=sorted(PROFILES), help="Bring --database to this profile")
+    action.add_argument('--compare', nargs='*', choices=sorted(PROFILES), metavar='PROFILE',
+                        help="Benchmark these profiles (default: all) on generated data")
+    parser.add_argument('--scale-factor', type=float, default=0.01)
+    parser.add_argument('--sections', nargs='+', default=list(DEFAULT_SECTIONS),
+                        help="Sections of analyze_execution_plans.sql to time (fr1 ... ar4)")
+    parser.add_argument('--repeat', type=int, default=20, help="Runs per query")
+    parser.add_argument('--registrations', type=int, default=200)
+    parser.add_argument('--census-batches', type=int, default=10)
+    parser.add_argument('--census-rows', type=int, default=1000, help="area_elements rows per census batch")
+    parser.add_argument('--workers', type=int, default=4, help="Loader connections")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="JSON file for the comparison")
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, profile in PROFILES.items():
+            print(f"{name}: " + ', '.join(f"{index.table}({', '.join(index.columns)})" for index in profile))
+        return
+    if args.apply:
+        connection = db.connect(**db.connection_options(args))
+        try:
+            if not apply(connection, args.apply):
+                print(f"already at {args.apply}")
+        finally:
+            connection.close()
+        return
+
+    queries = {name: sql for name, sql in parse_queries().items() if name.split(':')[0] in args.sections}
+    document = compare(args.compare or list(PROFILES), args.scale_factor, queries, args.workers, args.seed,
+                       db.connection_options(args), repeat=args.repeat, registrations=args.registrations,
+                       census_batches=args.census_batches, census_rows=args.census_rows)
+    report(document)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
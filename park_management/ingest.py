@@ -0,0 +1,297 @@
+"""INSERT-based ingest of data/load for servers where local_infile is disabled.
+
+populate_data.sql and the parallel loader need LOAD DATA LOCAL INFILE. On managed
+MySQL instances where local_infile is off, this module streams the same CSV files
+into multi-row INSERT statements instead:
+
+* every statement is packed with as many rows as fit in max_allowed_packet
+  (read from the server, minus a safety margin), so the number of round trips is
+  as small as the server allows;
+* the calling thread parses the CSV and builds statements while several worker
+  threads execute them on their own connections, so parsing overlaps with server work;
+* sessions use the same shortcuts as populate_data.sql (FOREIGN_KEY_CHECKS=0, summary
+  triggers skipped and the summaries rebuilt at the end) plus UNIQUE_CHECKS=0, and
+  commit every few statements instead of every row.
+
+Tables are processed in FK order, so --check-foreign-keys is also valid here.
+
+A load is not atomic: each worker commits its own statements, and one worker's error
+only rolls back that worker's open transaction. A failed run therefore leaves the
+tables before the failing one fully loaded, the failing table with the rows other
+workers already committed, and the summary tables not rebuilt. run() raises
+PartialIngestError with exactly that state; empty the partial table (or start from
+teardown.sql + setup.sql) and re-run with --tables for the remaining ones.
+
+--benchmark times this ingest against the LOAD DATA parallel loader on generated
+data, so its throughput can be compared per scale factor.
+
+Usage:
+    python -m park_management.ingest --workers 4 --load-dir data/generated/sf0.1
+    python -m park_management.ingest --benchmark 0.01 0.1 --output results/benchmarks/ingest.csv
+"""
+import argparse
+import csv
+import os
+import queue
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from pymysql.converters import escape_item
+
+from park_management import db, generator, loadfiles, schema
+from park_management.loader import ParallelLoader, TableStats
+from park_management.species_counts import BENCHMARK_DB
+
+PACKET_MARGIN_BYTES = 64 * 1024
+MAX_STATEMENT_BYTES = 16 * 1024 * 1024
+COMMIT_EVERY = 8  # statements per transaction on each worker
+
+
+def build_statements(table, rows, max_bytes, charset='utf8mb4'):
+    """Yield (sql, row_count) multi-row INSERTs for rows, each at most max_bytes long."""
+    prefix = f"INSERT INTO {table.name} ({', '.join(table.load_columns)}) VALUES "
+    parts, size, count = [], len(prefix), 0
+    for row in rows:
+        literal = '(' + ','.join(escape_item(value, charset) for value in row) + ')'
+        literal_bytes = len(literal.encode('utf-8'))
+        if parts and size + literal_bytes + 1 > max_bytes:
+            yield prefix + ','.join(parts), count
+            parts, size, count = [], len(prefix), 0
+        parts.append(literal)
+        size += literal_bytes + 1
+        count += 1
+    if parts:
+        yield prefix + ','.join(parts), count
+
+
+class PartialIngestError(RuntimeError):
+    """An ingest failed part way: loaded tables are complete, table has committed_rows of its rows."""
+
+    def __init__(self, loaded, table, committed_rows, remaining, error):
+        self.loaded = loaded
+        self.table = table
+        self.committed_rows = committed_rows
+        self.remaining = remaining
+        super().__init__(
+            f"ingest stopped in {table} ({error}): {committed_rows} of its rows were committed; "
+            f"loaded: {', '.join(loaded) or 'none'}; not started: {', '.join(remaining) or 'none'}; "
+            f"summary tables were not rebuilt")
+
+
+class InsertIngest:
+    """Loads data/load CSVs with batched INSERTs over several connections."""
+
+    def __init__(self, load_dir=schema.LOAD_DIR, workers=4, tables=None, check_foreign_keys=False,
+                 max_statement_bytes=MAX_STATEMENT_BYTES, connection_options=None, log=print):
+        self.load_dir = load_dir
+        self.workers = workers
+        self.check_foreign_keys = check_foreign_keys
+        self.max_statement_bytes = max_statement_bytes
+        self.connection_options = connection_options or {}
+        self.log = log
+        self.schema = schema.parse_schema()
+        loaded = [table.name for table in schema.loaded_tables(self.schema)]
+        self.tables = [name for name in schema.load_order(self.schema, loaded) if not tables or name in tables]
+
+    def csv_path(self, name):
+        return os.path.join(self.load_dir, os.path.basename(self.schema[name].load_file))
+
+    def statement_budget(self, connection):
+        """Bytes per statement: max_allowed_packet minus a margin, capped by max_statement_bytes."""
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT @@max_allowed_packet")
+            packet = int(cursor.fetchone()[0])
+        return max(1024, min(packet - PACKET_MARGIN_BYTES, self.max_statement_bytes))
+
+    def _prepare(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SET FOREIGN_KEY_CHECKS={int(self.check_foreign_keys)}")
+            cursor.execute("SET UNIQUE_CHECKS=0")
+            cursor.execute("SET @skip_summary_triggers = 1")
+        connection.autocommit(False)
+
+    def run(self):
+        """Ingest every selected table; returns {table: TableStats}.
+
+        Raises PartialIngestError if a statement fails (see the module docstring).
+        """
+        with db.ConnectionPool(self.workers, **self.connection_options) as pool:
+            with pool.connection() as connection:
+                budget = self.statement_budget(connection)
+            for _ in range(self.workers):
+                with pool.connection() as connection:
+                    self._prepare(connection)
+            stats = {}
+            for position, name in enumerate(self.tables):
+                committed = TableStats(name)
+                try:
+                    stats[name] = self._ingest_table(pool, name, budget, committed)
+                except Exception as error:
+                    raise PartialIngestError(list(stats), name, committed.rows,
+                                             self.tables[position + 1:], error) from error
+            with pool.connection() as connection:
+                db.rebuild_summaries(connection)
+            return stats
+
+    def _ingest_table(self, pool, name, budget, committed):
+        """Ingest one table; committed.rows counts the rows already committed if it fails."""
+        stats = TableStats(name, started=time.perf_counter())
+        statements = queue.Queue(maxsize=self.workers * 2)
+        errors = []
+        lock = threading.Lock()
+
+        def worker():
+            with pool.connection() as connection:
+                pending, pending_rows = 0, 0
+                while True:
+                    item = statements.get()
+                    if item is None:
+                        break
+                    if errors:
+                        continue  # drain the queue so the reader never blocks
+                    sql, count = item
+                    try:
+                        with connection.cursor() as cursor:
+                            cursor.execute(sql)
+                        pending += 1
+                        pending_rows += count
+                        with lock:
+                            stats.rows += count
+                            stats.chunks += 1
+                        if pending >= COMMIT_EVERY:
+                            connection.commit()
+                            with lock:
+                                committed.rows += pending_rows
+                            pending, pending_rows = 0, 0
+                    except Exception as error:  # re-raised in the calling thread below
+                        errors.append(error)
+                        break
+                if errors:
+                    connection.rollback()  # drop this worker's uncommitted statements
+                    while statements.get() is not None:
+                        pass
+                else:
+                    connection.commit()
+                    with lock:
+                        committed.rows += pending_rows
+
+        threads = [threading.Thread(target=worker) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            rows = loadfiles.read_rows(self.csv_path(name))
+            for item in build_statements(self.schema[name], rows, budget):
+                statements.put(item)
+                if errors:
+                    break
+        finally:
+            for _ in threads:
+                statements.put(None)
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
+        stats.finished = time.perf_counter()
+        if self.log:
+            self.log(f"{name}: {stats.rows} rows in {stats.seconds:.2f}s "
+                     f"({stats.rows_per_second:,.0f} rows/s, {stats.chunks} statements)")
+        return stats
+
+
+def _fresh_schema(server):
+    with server.cursor() as cursor:
+        cursor.execute(f"DROP DATABASE IF EXISTS {BENCHMARK_DB}")
+    db.run_script(server, schema.SETUP_SQL, {'park_management': BENCHMARK_DB})
+
+
+def _time_load(loader):
+    started = time.perf_counter()
+    stats = loader.run()
+    return time.perf_counter() - started, sum(table_stats.rows for table_stats in stats.values())
+
+
+def benchmark(scale_factors, repeat=3, workers=4, seed=0, connection_options=None, log=print):
+    """Time full loads with LOAD DATA (ParallelLoader) and with INSERTs; returns a list of result dicts.
+
+    Each run starts from an empty schema and includes the summary rebuild, for both loaders.
+    """
+    connection_options = {**(connection_options or {}), 'database': BENCHMARK_DB}
+    results = []
+    for scale_factor in scale_factors:
+        work_dir = tempfile.mkdtemp(prefix='park_bench_')
+        server = db.connect(**{**connection_options, 'database': None})
+        try:
+            generator.generate(work_dir, scale_factor, seed, log=None)
+            timings = {'load_data': [], 'insert': []}
+            for _ in range(repeat):
+                _fresh_schema(server)
+                timings['load_data'].append(_time_load(ParallelLoader(
+                    work_dir, workers, connection_options=connection_options, log=None)))
+                _fresh_schema(server)
+                timings['insert'].append(_time_load(InsertIngest(
+                    work_dir, workers, connection_options=connection_options, log=None)))
+            rows = timings['insert'][-1][1]
+            load_data_seconds = statistics.median(seconds for seconds, _ in timings['load_data'])
+            insert_seconds = statistics.median(seconds for seconds, _ in timings['insert'])
+            result = {'scale_factor': scale_factor, 'rows': rows,
+                      'load_data_rows_per_s': round(rows / load_data_seconds) if load_data_seconds else 0,
+                      'insert_rows_per_s': round(rows / insert_seconds) if insert_seconds else 0,
+                      'insert_vs_load_data': round(load_data_seconds / insert_seconds, 2) if insert_seconds else 0}
+            results.append(result)
+            if log:
+                log(f"SF{scale_factor} ({rows} rows): LOAD DATA {result['load_data_rows_per_s']} rows/s, "
+                    f"INSERT {result['insert_rows_per_s']} rows/s ({result['insert_vs_load_data']:.2f}x)")
+        finally:
+            with server.cursor() as cursor:
+                cursor.execute(f"DROP DATABASE IF EXISTS {BENCHMARK_DB}")
+            server.close()
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load data/load CSVs with batched INSERTs (no local_infile needed).")
+    parser.add_argument('--load-dir', default=schema.LOAD_DIR)
+    parser.add_argument('--workers', type=int, default=4, help="Parallel connections")
+    parser.add_argument('--tables', nargs='*')
+    parser.add_argument('--check-foreign-keys', action='store_true')
+    parser.add_argument('--max-statement-mb', type=int, default=MAX_STATEMENT_BYTES // (1024 * 1024),
+                        help="Upper bound for one INSERT, below max_allowed_packet")
+    parser.add_argument('--benchmark', type=float, nargs='+', metavar='SCALE_FACTOR',
+                        help=f"Generate data and compare full loads with LOAD DATA and with INSERTs "
+                             f"(into {BENCHMARK_DB}) per scale factor")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per loader for --benchmark")
+    parser.add_argument('--output', help="CSV file for --benchmark results")
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        results = benchmark(args.benchmark, args.repeat, args.workers, connection_options=db.connection_options(args))
+        if args.output:
+            os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+            with open(args.output, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=list(results[0]), lineterminator='\n')
+                writer.writeheader()
+                writer.writerows(results)
+        return
+
+    ingest = InsertIngest(args.load_dir, args.workers, args.tables, args.check_foreign_keys,
+                          args.max_statement_mb * 1024 * 1024, db.connection_options(args))
+    started = time.perf_counter()
+    try:
+        stats = ingest.run()
+    except PartialIngestError as error:
+        print(error, file=sys.stderr)
+        sys.exit(1)
+    total_rows = sum(table_stats.rows for table_stats in stats.values())
+    elapsed = time.perf_counter() - started
+    print(f"Inserted {total_rows} rows into {len(stats)} tables in {elapsed:.2f}s "
+          f"({total_rows / elapsed if elapsed else 0:,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""Parallel, foreign-key-aware replacement for sql/populate_data.sql.
+
+populate_data.sql runs one LOAD DATA LOCAL INFILE per table, one after another, on
+a single connection. This loader:
+
+* builds the table dependency DAG from the foreign keys in sql/setup.sql and starts
+  a table as soon as every table it references has finished, so independent
+  tables (e.g. parks, natural_elements, personnel, accommodations) load at the same time;
+* splits large CSVs into line-aligned chunks that are loaded concurrently;
+* runs everything over a fixed pool of pymysql connections (one per worker);
+* reports rows and rows/s per table;
+* like populate_data.sql, skips the summary-table triggers and rebuilds the
+  summaries once at the end.
+
+Because parents always finish before their children start, the load is also valid
+with --check-foreign-keys, which keeps FOREIGN_KEY_CHECKS on instead of disabling it
+like populate_data.sql does.
+
+Chunks are split on '\\n', so CSV fields must not contain embedded newlines (the
+files in data/load and the generator output never do).
+
+Usage:
+    python -m park_management.loader --load-dir data/generated/sf1 --workers 8
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+from park_management import db, schema
+
+DEFAULT_CHUNK_BYTES = 64 * 1024 * 1024
+
+LOAD_STATEMENT = """LOAD DATA LOCAL INFILE %s
+INTO TABLE {table}
+FIELDS TERMINATED BY ',' ENCLOSED BY '"'
+LINES TERMINATED BY '\\n'
+IGNORE {ignore} ROWS
+({columns})"""
+
+
+@dataclass
+class Chunk:
+    table: str
+    path: str
+    ignore_lines: int
+
+
+@dataclass
+class TableStats:
+    table: str
+    rows: int = 0
+    chunks: int = 0
+    started: float = None
+    finished: float = None
+
+    @property
+    def seconds(self):
+        return (self.finished or 0.0) - (self.started or 0.0)
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else float('inf')
+
+
+def split_csv(table, path, chunk_bytes, work_dir):
+    """Split a headed CSV into Chunks of about chunk_bytes, cut on line boundaries.
+
+    Small files are not copied: the single chunk is the file itself with its header skipped.
+    """
+    if os.path.getsize(path) <= chunk_bytes:
+        return [Chunk(table, path, 1)]
+    chunks = []
+    with open(path, 'rb') as source:
+        source.readline()  # header
+        while True:
+            chunk_path = os.path.join(work_dir, f"{table}.{len(chunks):05d}.csv")
+            with open(chunk_path, 'wb') as target:
+                written = 0
+                while written < chunk_bytes:
+                    block = source.read(min(1024 * 1024, chunk_bytes - written))
+                    if not block:
+                        break
+                    target.write(block)
+                    written += len(block)
+                if written and not block.endswith(b'\n'):
+                    # Finish the partial line so the next chunk starts on a row boundary.
+                    rest = source.readline()
+                    target.write(rest)
+                    written += len(rest)
+            if not written:
+                os.remove(chunk_path)
+                break
+            chunks.append(Chunk(table, chunk_path, 0))
+    return chunks
+
+
+class ParallelLoader:
+    """Loads the data/load CSVs (or generator output) into an existing schema."""
+
+    def __init__(self, load_dir=schema.LOAD_DIR, workers=4, chunk_bytes=DEFAULT_CHUNK_BYTES,
+                 tables=None, check_foreign_keys=False, connection_options=None, log=print):
+        self.load_dir = load_dir
+        self.workers = workers
+        self.chunk_bytes = chunk_bytes
+        self.check_foreign_keys = check_foreign_keys
+        self.connection_options = connection_options or {}
+        self.log = log
+        self.schema = schema.parse_schema()
+        loaded = [table.name for table in schema.loaded_tables(self.schema)]
+        self.tables = [name for name in loaded if not tables or name in tables]
+
+    def csv_path(self, table):
+        return os.path.join(self.load_dir, os.path.basename(self.schema[table].load_file))
+
+    def load_statement(self, chunk):
+        table = self.schema[chunk.table]
+        return LOAD_STATEMENT.format(table=table.name, ignore=chunk.ignore_lines,
+                                     columns=', '.join(table.load_columns))
+
+    def _prepare(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SET FOREIGN_KEY_CHECKS={int(self.check_foreign_keys)}")
+            # Summary tables are rebuilt once at the end instead of row by row.
+            cursor.execute("SET @skip_summary_triggers = 1")
+
+    def _load_chunk(self, pool, chunk):
+        """Load one chunk on a pooled connection and return the number of rows inserted."""
+        with pool.connection() as connection:
+            with connection.cursor() as cursor:
+                rows = cursor.execute(self.load_statement(chunk), (chunk.path,))
+            connection.commit()
+        return rows
+
+    def _open_pool(self):
+        pool = db.ConnectionPool(self.workers, local_infile=True, **self.connection_options)
+        for _ in range(self.workers):
+            with pool.connection() as connection:
+                self._prepare(connection)
+        return pool
+
+    def _rebuild_summaries(self, pool):
+        with pool.connection() as connection:
+            db.rebuild_summaries(connection)
+
+    def run(self):
+        """Load every selected table; returns {table: TableStats}."""
+        work_dir = tempfile.mkdtemp(prefix='park_loader_')
+        try:
+            with self._open_pool() as pool:
+                stats = self._run(pool, work_dir)
+                self._rebuild_summaries(pool)
+                return stats
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _run(self, pool, work_dir):
+        pending_deps = {name: {dep for dep in self.schema[name].dependencies if dep in self.tables}
+                        for name in self.tables}
+        stats = {name: TableStats(name) for name in self.tables}
+        remaining_chunks = {}
+        running = {}
+
+        def start(executor, name):
+            chunks = split_csv(name, self.csv_path(name), self.chunk_bytes, work_dir)
+            stats[name].chunks = len(chunks)
+            stats[name].started = time.perf_counter()
+            remaining_chunks[name] = len(chunks)
+            for chunk in chunks:
+                running[executor.submit(self._load_chunk, pool, chunk)] = chunk
+            del pending_deps[name]
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for name in [name for name, deps in pending_deps.items() if not deps]:
+                start(executor, name)
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = running.pop(future)
+                    stats[chunk.table].rows += future.result()
+                    remaining_chunks[chunk.table] -= 1
+                    if remaining_chunks[chunk.table]:
+                        continue
+                    stats[chunk.table].finished = time.perf_counter()
+                    self._report(stats[chunk.table])
+                    for name, deps in list(pending_deps.items()):
+                        deps.discard(chunk.table)
+                        if not deps:
+                            start(executor, name)
+        return stats
+
+    def _report(self, table_stats):
+        if self.log:
+            self.log(f"{table_stats.table}: {table_stats.rows} rows in {table_stats.seconds:.2f}s "
+                     f"({table_stats.rows_per_second:,.0f} rows/s, {table_stats.chunks} chunks)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load data/load CSVs in parallel, following the FK graph.")
+    parser.add_argument('--load-dir', default=schema.LOAD_DIR, help="Directory with the CSV files (default: data/load)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help="Parallel connections")
+    parser.add_argument('--chunk-mb', type=int, default=DEFAULT_CHUNK_BYTES // (1024 * 1024),
+                        help="Split CSVs larger than this into chunks loaded in parallel")
+    parser.add_argument('--tables', nargs='*', help="Only load these tables")
+    parser.add_argument('--check-foreign-keys', action='store_true',
+                        help="Keep FOREIGN_KEY_CHECKS enabled during the load")
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    loader = ParallelLoader(args.load_dir, args.workers, args.chunk_mb * 1024 * 1024, args.tables,
+                            args.check_foreign_keys, db.connection_options(args))
+    started = time.perf_counter()
+    stats = loader.run()
+    total_rows = sum(table_stats.rows for table_stats in stats.values())
+    elapsed = time.perf_counter() - started
+    print(f"Loaded {total_rows} rows into {len(stats)} tables in {elapsed:.2f}s "
+          f"({total_rows / elapsed if elapsed else 0:,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
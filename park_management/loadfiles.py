@@ -0,0 +1,64 @@
+"""Reading the data/load CSV files row by row in Python.
+
+LOAD DATA parses these files on the server; tools that need the rows client side
+(delta sync, INSERT-based ingest, ...) use read_rows so they agree on the format:
+comma separated, '"' quoted, one header line, '\\N' for NULL. Lines starting with
+'--' are notes left in the hand-written files (e.g. data/load/area_elements.csv) and
+are skipped. area_elements.csv also has a ' -- note' trailing the last field of some
+rows (LOAD DATA only warns about it, but a strict-mode INSERT would reject
+'1000 -- Lenga in Iguazú'); it is dropped for the files in INLINE_NOTE_FILES only, so
+a ' -- ' inside a value of any other file is kept.
+"""
+import csv
+import hashlib
+import os
+
+NULL = '\\N'
+INLINE_NOTE = ' -- '
+INLINE_NOTE_FILES = {'area_elements.csv'}
+
+
+def read_rows(path):
+    """Yield each data row of a data/load CSV as a list of strings (None for \\N)."""
+    inline_notes = os.path.basename(path) in INLINE_NOTE_FILES
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for values in reader:
+            if not values or values[0].startswith('--'):
+                continue
+            if inline_notes and INLINE_NOTE in values[-1]:
+                values[-1] = values[-1].split(INLINE_NOTE, 1)[0].rstrip()
+            yield [None if value == NULL else value for value in values]
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def encode_row(row):
+    return [NULL if value is None else value for value in row]
+
+
+def write_rows(f, rows):
+    """Write rows (lists of strings / None) to an open text file in the same format."""
+    writer = csv.writer(f, lineterminator='\n')
+    for row in rows:
+        writer.writerow(encode_row(row))
+
+
+def key_function(table, columns=None):
+    """Sort key over a table's primary key, comparing integer columns numerically."""
+    columns = list(columns or table.load_columns)
+    positions = [columns.index(name) for name in table.primary_key]
+    numeric = [table.column(name).type.upper().startswith(('INT', 'BIGINT', 'SMALLINT', 'TINYINT'))
+               for name in table.primary_key]
+
+    def key(row):
+        return tuple(int(row[position]) if is_int else row[position]
+                     for position, is_int in zip(positions, numeric))
+    return key
@@ -0,0 +1,360 @@
+"""Asynchronous outbox worker that mails the species-decrease alerts in email_log.
+
+species_decrease_email (FR4) only inserts into email_log; this worker delivers those
+rows. Each round it:
+
+1. claims up to --batch-size pending rows in one short transaction
+   (SELECT ... FOR UPDATE SKIP LOCKED, then a lease in claimed_until), so several
+   workers can run against the same table without sending a row twice;
+2. resolves each alert's park contact_email and scientific name, and groups the
+   claimed alerts by contact email into one digest per park;
+3. sends the digests concurrently over --concurrency SMTP sessions, each kept open
+   across messages (smtplib runs in worker threads under asyncio);
+4. marks delivered rows sent, and gives failed ones an exponential-backoff retry time,
+   or status 'failed' after --max-attempts, with one UPDATE per outcome.
+
+A mass decline therefore becomes one message per park over a few reused SMTP
+sessions instead of one serial session per row. With --coalesce-window, repeated
+alerts for the same park and element are first merged (park_management.coalesce),
+and rows are only claimed once their window has closed. Throughput (alerts and digests per
+second, retries, failures) is printed at the end and every --report-every seconds.
+
+Usage:
+    python -m park_management.outbox --smtp-host localhost --smtp-port 1025 --once
+    python -m park_management.outbox --concurrency 8 --batch-size 1000 --coalesce-window 300
+"""
+import argparse
+import asyncio
+import os
+import smtplib
+import socket
+import time
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+
+from park_management import db
+from park_management.coalesce import DEFAULT_MAX_OPEN, coalesce_pending
+
+DEFAULT_SENDER = 'alerts@park-management.local'
+LAST_ERROR_CHARS = 255
+
+
+@dataclass
+class Alert:
+    log_id: int
+    park_email: str
+    scientific_name: str
+    old_count: int
+    new_count: int
+    logged_at: object = None
+    events: int = 1
+
+
+@dataclass
+class Digest:
+    park_email: str
+    alerts: list = field(default_factory=list)
+
+    @property
+    def log_ids(self):
+        return [alert.log_id for alert in self.alerts]
+
+    def message(self, sender=DEFAULT_SENDER):
+        message = EmailMessage()
+        message['From'] = sender
+        message['To'] = self.park_email
+        species = len({alert.scientific_name for alert in self.alerts})
+        message['Subject'] = f"Species decrease alert: {species} species declined"
+        lines = [f"{alert.scientific_name}: {alert.old_count} -> {alert.new_count}"
+                 + (f" ({alert.events} decreases)" if alert.events > 1 else '')
+                 + (f" (logged {alert.logged_at})" if alert.logged_at else '')
+                 for alert in self.alerts]
+        message.set_content("The following populations decreased in your park:\n\n" + '\n'.join(lines) + '\n')
+        return message
+
+
+def group_digests(alerts):
+    """One Digest per park_email, in the order each email first appears; alerts without an email are returned apart."""
+    digests, unaddressed = {}, []
+    for alert in alerts:
+        if not alert.park_email:
+            unaddressed.append(alert)
+            continue
+        digests.setdefault(alert.park_email, Digest(alert.park_email)).alerts.append(alert)
+    return list(digests.values()), unaddressed
+
+
+@dataclass
+class OutboxMetrics:
+    batches: int = 0
+    alerts_merged: int = 0
+    alerts_claimed: int = 0
+    alerts_sent: int = 0
+    digests_sent: int = 0
+    digests_failed: int = 0
+    alerts_given_up: int = 0
+    send_seconds: float = 0.0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def summary(self):
+        elapsed = self.elapsed or 1e-9
+        mean_ms = self.send_seconds / self.digests_sent * 1000 if self.digests_sent else 0.0
+        return (f"{self.batches} batches, {self.alerts_sent}/{self.alerts_claimed} alerts sent in "
+                f"{self.digests_sent} digests ({self.alerts_sent / elapsed:.1f} alerts/s, "
+                f"{self.digests_sent / elapsed:.1f} digests/s, {mean_ms:.1f} ms per digest); "
+                f"{self.digests_failed} failed sends, {self.alerts_given_up} alerts given up, "
+                f"{self.alerts_merged} alerts coalesced")
+
+
+class OutboxStore:
+    """email_log outbox operations on one connection (the worker calls them one at a time)."""
+
+    def __init__(self, connection, worker_id=None, lease_seconds=300, max_attempts=5,
+                 backoff_base=30, backoff_cap=3600, coalesce_window=0, coalesce_max_open=DEFAULT_MAX_OPEN):
+        self.connection = connection
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.coalesce_window = coalesce_window
+        self.coalesce_max_open = coalesce_max_open
+        self.coalesced_through = 0  # the next coalesce pass reads rows after this log_id
+
+    def coalesce(self):
+        """Merge repeated pending alerts (no-op without a coalescing window); returns CoalesceStats or None."""
+        if self.coalesce_window:
+            stats = coalesce_pending(self.connection, self.coalesce_window, self.coalesce_max_open,
+                                     after_id=self.coalesced_through)
+            self.coalesced_through = stats.resume_id
+            return stats
+        return None
+
+    def claim(self, batch_size):
+        """Lease up to batch_size pending, due, unclaimed rows to this worker; returns Alerts.
+
+        With a coalescing window, rows younger than the window may still absorb later
+        alerts and are left for a later round.
+        """
+        try:
+            with self.connection.cursor() as cursor:
+                # OF l: only email_log rows are locked, not the parks and elements they name
+                cursor.execute("""
+                    SELECT l.log_id, p.contact_email, ne.scientific_name, l.old_count, l.new_count,
+                           l.log_timestamp, l.event_count
+                    FROM email_log l
+                    LEFT JOIN parks p ON p.id = l.park_id
+                    LEFT JOIN natural_elements ne ON ne.id = l.element_id
+                    WHERE l.status = 'pending'
+                      AND (l.next_attempt_at IS NULL OR l.next_attempt_at <= NOW())
+                      AND (l.claimed_until IS NULL OR l.claimed_until < NOW())
+                      AND l.log_timestamp <= NOW() - INTERVAL %s SECOND
+                    ORDER BY l.log_id
+                    LIMIT %s
+                    FOR UPDATE OF l SKIP LOCKED
+                """, (self.coalesce_window, batch_size))
+                alerts = [Alert(*row) for row in cursor.fetchall()]
+                if alerts:
+                    cursor.execute(f"""
+                        UPDATE email_log
+                        SET claimed_until = NOW() + INTERVAL %s SECOND, claimed_by = %s
+                        WHERE log_id IN ({', '.join(['%s'] * len(alerts))})
+                    """, [self.lease_seconds, self.worker_id] + [alert.log_id for alert in alerts])
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return alerts
+
+    def mark_sent(self, log_ids):
+        if not log_ids:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE email_log
+                SET status = 'sent', sent_at = NOW(), attempts = attempts + 1,
+                    claimed_until = NULL, claimed_by = NULL, last_error = NULL
+                WHERE log_id IN ({', '.join(['%s'] * len(log_ids))})
+            """, list(log_ids))
+        self.connection.commit()
+
+    def mark_failed(self, log_ids, error, permanent=False):
+        """Schedule a retry with backoff, or give up after max_attempts (or at once when permanent).
+
+        Returns the number of rows given up on.
+        """
+        if not log_ids:
+            return 0
+        ids = ', '.join(['%s'] * len(log_ids))
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE email_log
+                SET attempts = LEAST(attempts + 1, 255),
+                    status = IF(%s OR attempts >= %s, 'failed', 'pending'),
+                    next_attempt_at = NOW() + INTERVAL LEAST(%s * POW(2, attempts - 1), %s) SECOND,
+                    claimed_until = NULL, claimed_by = NULL, last_error = %s
+                WHERE log_id IN ({ids})
+            """, [permanent, self.max_attempts, self.backoff_base, self.backoff_cap,
+                  str(error)[:LAST_ERROR_CHARS]] + list(log_ids))
+            cursor.execute(f"SELECT COUNT(*) FROM email_log WHERE status = 'failed' AND log_id IN ({ids})",
+                           list(log_ids))
+            given_up = cursor.fetchone()[0]
+        self.connection.commit()
+        return given_up
+
+
+class SmtpSession:
+    """One SMTP connection, opened on first use and reopened after a disconnect."""
+
+    def __init__(self, host, port, timeout=30, username=None, password=None, starttls=False):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.username, self.password, self.starttls = username, password, starttls
+        self._smtp = None
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password)
+        self._smtp = smtp
+
+    def send(self, message):
+        if self._smtp is None:
+            self._connect()
+        try:
+            self._smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            self._smtp = None
+            self._connect()
+            self._smtp.send_message(message)
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+
+class OutboxWorker:
+    """Claims email_log batches and sends per-park digests over concurrent SMTP sessions."""
+
+    def __init__(self, store, smtp_options, concurrency=4, batch_size=500, sender=DEFAULT_SENDER, log=print):
+        self.store = store
+        self.smtp_options = smtp_options
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.sender = sender
+        self.log = log
+        self.metrics = OutboxMetrics()
+
+    async def _send_all(self, digests):
+        """Send digests over `concurrency` sessions; returns (sent digests, [(digest, error)])."""
+        queue = asyncio.Queue()
+        for digest in digests:
+            queue.put_nowait(digest)
+        sent, failed = [], []
+
+        async def sender():
+            session = SmtpSession(**self.smtp_options)
+            try:
+                while not queue.empty():
+                    digest = queue.get_nowait()
+                    started = time.perf_counter()
+                    try:
+                        await asyncio.to_thread(session.send, digest.message(self.sender))
+                    except (smtplib.SMTPException, OSError) as error:
+                        session.close()
+                        failed.append((digest, error))
+                    else:
+                        self.metrics.send_seconds += time.perf_counter() - started
+                        sent.append(digest)
+            finally:
+                await asyncio.to_thread(session.close)
+
+        await asyncio.gather(*(sender() for _ in range(min(self.concurrency, len(digests)))))
+        return sent, failed
+
+    async def process_batch(self):
+        """Coalesce, then claim, send and mark one batch; returns the number of alerts claimed."""
+        coalesced = await asyncio.to_thread(self.store.coalesce)
+        if coalesced:
+            self.metrics.alerts_merged += coalesced.rows_merged
+        alerts = await asyncio.to_thread(self.store.claim, self.batch_size)
+        if not alerts:
+            return 0
+        self.metrics.batches += 1
+        self.metrics.alerts_claimed += len(alerts)
+        digests, unaddressed = group_digests(alerts)
+        sent, failed = await self._send_all(digests)
+
+        sent_ids = [log_id for digest in sent for log_id in digest.log_ids]
+        await asyncio.to_thread(self.store.mark_sent, sent_ids)
+        self.metrics.alerts_sent += len(sent_ids)
+        self.metrics.digests_sent += len(sent)
+        self.metrics.digests_failed += len(failed)
+        for digest, error in failed:
+            self.metrics.alerts_given_up += await asyncio.to_thread(self.store.mark_failed, digest.log_ids, error)
+        if unaddressed:
+            self.metrics.alerts_given_up += await asyncio.to_thread(
+                self.store.mark_failed, [alert.log_id for alert in unaddressed], 'park has no contact email', True)
+        return len(alerts)
+
+    async def run(self, once=False, poll_interval=5.0, report_every=60.0):
+        """Process batches until the outbox is empty (once) or forever, sleeping poll_interval when idle."""
+        last_report = time.perf_counter()
+        while True:
+            claimed = await self.process_batch()
+            if self.log and time.perf_counter() - last_report >= report_every:
+                self.log(self.metrics.summary())
+                last_report = time.perf_counter()
+            if not claimed:
+                if once:
+                    return self.metrics
+                await asyncio.sleep(poll_interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send email_log species-decrease alerts as per-park digests.")
+    parser.add_argument('--smtp-host', default='localhost')
+    parser.add_argument('--smtp-port', type=int, default=25)
+    parser.add_argument('--smtp-user')
+    parser.add_argument('--smtp-password', default=os.environ.get('SMTP_PASSWORD'))
+    parser.add_argument('--starttls', action='store_true')
+    parser.add_argument('--sender', default=DEFAULT_SENDER)
+    parser.add_argument('--concurrency', type=int, default=4, help="Parallel SMTP sessions")
+    parser.add_argument('--batch-size', type=int, default=500, help="email_log rows claimed per round")
+    parser.add_argument('--max-attempts', type=int, default=5)
+    parser.add_argument('--backoff', type=float, default=30, help="First retry delay in seconds (doubles each time)")
+    parser.add_argument('--lease', type=int, default=300, help="Seconds a claimed batch stays reserved")
+    parser.add_argument('--coalesce-window', type=int, default=0,
+                        help="Merge alerts for the same park and element within this many seconds")
+    parser.add_argument('--once', action='store_true', help="Exit when no claimable rows are left")
+    parser.add_argument('--poll-interval', type=float, default=5.0)
+    parser.add_argument('--report-every', type=float, default=60.0)
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    connection = db.connect(**db.connection_options(args))
+    store = OutboxStore(connection, lease_seconds=args.lease, max_attempts=args.max_attempts,
+                        backoff_base=args.backoff, coalesce_window=args.coalesce_window)
+    smtp_options = {'host': args.smtp_host, 'port': args.smtp_port, 'username': args.smtp_user,
+                    'password': args.smtp_password, 'starttls': args.starttls}
+    worker = OutboxWorker(store, smtp_options, args.concurrency, args.batch_size, args.sender)
+    try:
+        asyncio.run(worker.run(args.once, args.poll_interval, args.report_every))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        connection.close()
+        print(worker.metrics.summary())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+"""Structured EXPLAIN plans of the analysis queries, and plan diffs between runs or schemas.
+
+sql/analyze_execution_plans.sql prints EXPLAIN FORMAT=JSON for people to read. This
+harness runs the same queries (park_management.benchmark.parse_queries is the
+registry) and parses each plan into a Plan:
+
+* from EXPLAIN FORMAT=JSON, one PlanTable per table access: access type, index, rows
+  examined per scan, filtered %, and whether the plan uses a filesort or a temporary
+  table anywhere;
+* with --analyze, from EXPLAIN ANALYZE (MySQL 8.0.18+), the iterator tree with
+  estimated and actual rows, actual time and loops. Each table gets the actual time
+  and rows of the first iterator that reads it.
+
+Plans are saved as JSON. Two captures (two runs, or the same queries on two databases)
+are diffed table by table. These changes are flagged as regressions: a new full table
+scan, a new filesort or temporary table, a lost index, or rows examined growing
+beyond --growth.
+
+Usage:
+    python -m park_management.plans --capture results/plans/before.json --analyze
+    python -m park_management.plans --diff results/plans/before.json results/plans/after.json
+    python -m park_management.plans --against park_management_alt
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from dataclasses import asdict, dataclass, field
+
+import pymysql
+
+from park_management import db
+from park_management.benchmark import parse_queries
+
+_ANALYZE_LINE = re.compile(
+    r'^(?P<indent>\s*)-> (?P<operation>.*?)'
+    r'(?:\s+\(cost=(?P<cost>[\d.e+]+) rows=(?P<rows>[\d.e+]+)\))?'
+    r'(?:\s+\(actual time=(?P<first>[\d.e+]+)\.\.(?P<last>[\d.e+]+) rows=(?P<actual_rows>[\d.e+]+)'
+    r' loops=(?P<loops>\d+)\))?(?:\s+\(never executed\))?\s*$')
+_ANALYZE_TABLE = re.compile(r'\bon (\w+)')
+_ANALYZE_INDEX = re.compile(r'\busing (\w+)')
+
+
+@dataclass
+class PlanTable:
+    table: str
+    access_type: str = None
+    key: str = None
+    rows_examined: float = None
+    filtered: float = None
+    actual_ms: float = None
+    actual_rows: float = None
+
+    @property
+    def full_scan(self):
+        return self.access_type == 'ALL'
+
+
+@dataclass
+class AnalyzeStep:
+    depth: int
+    operation: str
+    table: str = None
+    index: str = None
+    estimated_rows: float = None
+    actual_ms: float = None
+    actual_rows: float = None
+    loops: int = None
+
+
+@dataclass
+class Plan:
+    name: str
+    tables: list = field(default_factory=list)
+    using_filesort: bool = False
+    using_temporary: bool = False
+    steps: list = field(default_factory=list)
+
+    @property
+    def flags(self):
+        flags = {f"full scan on {table.table}" for table in self.tables if table.full_scan}
+        if self.using_filesort:
+            flags.add('filesort')
+        if self.using_temporary:
+            flags.add('temporary table')
+        return flags
+
+    def table(self, name):
+        return next((table for table in self.tables if table.table == name), None)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], [PlanTable(**table) for table in data['tables']], data['using_filesort'],
+                   data['using_temporary'], [AnalyzeStep(**step) for step in data['steps']])
+
+
+@dataclass
+class PlanChange:
+    query: str
+    table: str
+    field: str
+    before: object
+    after: object
+    regression: bool
+
+
+def _number(value):
+    return None if value is None else float(value)
+
+
+def parse_json_plan(name, document):
+    """Plan from the EXPLAIN FORMAT=JSON document (str or parsed) of one query."""
+    if isinstance(document, str):
+        document = json.loads(document)
+    plan = Plan(name)
+
+    def walk(node):
+        if isinstance(node, list):
+            for item in node:
+                walk(item)
+            return
+        if not isinstance(node, dict):
+            return
+        plan.using_filesort |= node.get('using_filesort') is True
+        plan.using_temporary |= node.get('using_temporary_table') is True
+        table = node.get('table')
+        if isinstance(table, dict) and 'table_name' in table:
+            plan.tables.append(PlanTable(table['table_name'], table.get('access_type'), table.get('key'),
+                                         _number(table.get('rows_examined_per_scan')),
+                                         _number(table.get('filtered'))))
+        for value in node.values():
+            walk(value)
+
+    walk(document)
+    return plan
+
+
+def parse_analyze(text):
+    """AnalyzeSteps of an EXPLAIN ANALYZE tree (indentation of 4 spaces per level)."""
+    steps = []
+    for line in text.splitlines():
+        match = _ANALYZE_LINE.match(line)
+        if not match:
+            continue
+        operation = match.group('operation')
+        table = _ANALYZE_TABLE.search(operation)
+        index = _ANALYZE_INDEX.search(operation)
+        steps.append(AnalyzeStep(len(match.group('indent')) // 4, operation, table and table.group(1),
+                                 index and index.group(1), _number(match.group('rows')),
+                                 _number(match.group('last')), _number(match.group('actual_rows')),
+                                 int(match.group('loops')) if match.group('loops') else None))
+    return steps
+
+
+def attach_steps(plan, steps):
+    """Give each table of plan the actual time and rows of the first iterator reading it."""
+    plan.steps = steps
+    for table in plan.tables:
+        step = next((step for step in steps if step.table == table.table and step.actual_ms is not None), None)
+        if step:
+            table.actual_ms, table.actual_rows = step.actual_ms, step.actual_rows
+    return plan
+
+
+def capture(connection, queries, analyze=False):
+    """{name: Plan} of every query; EXPLAIN ANALYZE runs the query, so only with analyze."""
+    plans = {}
+    with connection.cursor() as cursor:
+        for name, sql in queries.items():
+            cursor.execute(f"EXPLAIN FORMAT=JSON {sql}")
+            plan = parse_json_plan(name, cursor.fetchone()[0])
+            if analyze:
+                try:
+                    cursor.execute(f"EXPLAIN ANALYZE {sql}")
+                    attach_steps(plan, parse_analyze(cursor.fetchone()[0]))
+                except pymysql.MySQLError:
+                    pass  # before 8.0.18: keep the estimated plan
+            plans[name] = plan
+    return plans
+
+
+def diff(before, after, growth=2.0):
+    """PlanChanges between two {name: Plan} captures, for the queries in both."""
+    changes = []
+    for name in before.keys() & after.keys():
+        old, new = before[name], after[name]
+        for flag in sorted(new.flags - old.flags):
+            changes.append(PlanChange(name, None, 'flag', None, flag, True))
+        for flag in sorted(old.flags - new.flags):
+            changes.append(PlanChange(name, None, 'flag', flag, None, False))
+        for table in new.tables:
+            previous = old.table(table.table)
+            if previous is None:
+                changes.append(PlanChange(name, table.table, 'table', None, table.access_type, False))
+                continue
+            if table.access_type != previous.access_type:
+                changes.append(PlanChange(name, table.table, 'access_type', previous.access_type, table.access_type,
+                                          table.full_scan))
+            if table.key != previous.key:
+                changes.append(PlanChange(name, table.table, 'key', previous.key, table.key, table.key is None))
+            if table.rows_examined and previous.rows_examined is not None \
+                    and table.rows_examined > max(previous.rows_examined, 1) * growth:
+                changes.append(PlanChange(name, table.table, 'rows_examined', previous.rows_examined,
+                                          table.rows_examined, True))
+    return sorted(changes, key=lambda change: (change.query, change.table or '', change.field))
+
+
+def save(path, plans):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({name: asdict(plan) for name, plan in plans.items()}, f, indent=2)
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return {name: Plan.from_dict(data) for name, data in json.load(f).items()}
+
+
+def report(plans, changes=None, log=print):
+    """Print flagged plans and changes; returns the number of regressions."""
+    for name, plan in plans.items():
+        if plan.flags:
+            log(f"{name}: {', '.join(sorted(plan.flags))}")
+    regressions = 0
+    for change in changes or ():
+        regressions += change.regression
+        where = f" {change.table}" if change.table else ''
+        log(f"{'REGRESSION' if change.regression else 'change'} {change.query}{where} {change.field}: "
+            f"{change.before} -> {change.after}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Capture, diff and flag the plans of the analysis queries.")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--capture', metavar='FILE', help="Save the plans of --database to FILE")
+    action.add_argument('--diff', nargs=2, metavar=('BEFORE', 'AFTER'), help="Diff two saved captures")
+    action.add_argument('--against', metavar='DATABASE', help="Diff the plans of --database and DATABASE")
+    parser.add_argument('--analyze', action='store_true', help="Also run EXPLAIN ANALYZE (executes the queries)")
+    parser.add_argument('--sections', nargs='+', help="Only these sections of analyze_execution_plans.sql")
+    parser.add_argument('--growth', type=float, default=2.0, help="Rows-examined growth factor that is a regression")
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.diff:
+        before, after = load(args.diff[0]), load(args.diff[1])
+        sys.exit(1 if report(after, diff(before, after, args.growth)) else 0)
+
+    queries = {name: sql for name, sql in parse_queries().items()
+               if not args.sections or name.split(':')[0] in args.sections}
+    options = db.connection_options(args)
+    connection = db.connect(**options)
+    try:
+        plans = capture(connection, queries, args.analyze)
+    finally:
+        connection.close()
+    if args.capture:
+        save(args.capture, plans)
+        report(plans)
+        return
+    connection = db.connect(**{**options, 'database': args.against})
+    try:
+        other = capture(connection, queries, args.analyze)
+    finally:
+        connection.close()
+    sys.exit(1 if report(other, diff(plans, other, args.growth)) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""Population history of area_elements: census trends and partition maintenance.
+
+setup.sql appends every change of area_elements.number_of_individuals to
+population_history (days since 2000-01-01, one row per area, element and day,
+partitioned by year) and keeps the population_monthly rollup current. A park's
+count on a date is the sum over its areas of each area's latest census up to that
+date, so trends carry each area's last count forward until it is censused again.
+
+Daily trends read population_history through its primary key (park, element, day),
+touching only the partitions of the range; monthly and yearly trends read the much
+smaller population_monthly and never the raw rows.
+
+Usage:
+    python -m park_management.population --trend 12 3 --years 5 --resolution month
+    python -m park_management.population --record            # census of today's counts
+    python -m park_management.population --add-partitions 2032
+    python -m park_management.population --drop-before 2015  # retention of raw rows
+"""
+import argparse
+import datetime
+
+from park_management import db
+
+EPOCH = datetime.date(2000, 1, 1)
+RESOLUTIONS = ('day', 'month', 'year')
+
+
+def census_day(date):
+    """SMALLINT UNSIGNED day number stored in population_history."""
+    return (date - EPOCH).days
+
+
+def day_date(day):
+    return EPOCH + datetime.timedelta(days=day)
+
+
+def month_index(date):
+    """SMALLINT UNSIGNED month number stored in population_monthly."""
+    return (date.year - EPOCH.year) * 12 + date.month - 1
+
+
+def month_date(index):
+    return datetime.date(EPOCH.year + index // 12, index % 12 + 1, 1)
+
+
+def carry_forward(opening, rows):
+    """[(bucket, total)] from (bucket, area_number, count) rows sorted by bucket.
+
+    opening holds {area_number: count} before the first bucket; each area keeps its
+    latest count until it appears again.
+    """
+    latest = dict(opening)
+    totals = []
+    for bucket, area_number, count in rows:
+        latest[area_number] = count
+        if totals and totals[-1][0] == bucket:
+            totals[-1] = (bucket, sum(latest.values()))
+        else:
+            totals.append((bucket, sum(latest.values())))
+    return totals
+
+
+def _opening(connection, element_id, park_id, first_month):
+    """{area_number: last count} of the latest month before first_month, per area."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT area_number, last_count
+            FROM (
+                SELECT area_number, last_count,
+                       ROW_NUMBER() OVER (PARTITION BY area_number ORDER BY month_index DESC) AS newest
+                FROM population_monthly
+                WHERE park_id = %s AND element_id = %s AND month_index < %s
+            ) t
+            WHERE newest = 1
+        """, (park_id, element_id, first_month))
+        return dict(cursor.fetchall())
+
+
+def trend(connection, element_id, park_id, years=5, resolution='month', today=None):
+    """[(date, individuals)] of an element in a park over the last `years` years.
+
+    The range starts on the first day of the month `years` years ago; dates are the
+    census day, the first of the month or the first of January depending on resolution.
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"resolution must be one of {RESOLUTIONS}")
+    today = today or datetime.date.today()
+    first_month = month_index(today) - 12 * years + 1
+    opening = _opening(connection, element_id, park_id, first_month)
+    with connection.cursor() as cursor:
+        if resolution == 'day':
+            cursor.execute("""
+                SELECT census_day, area_number, individuals
+                FROM population_history
+                WHERE park_id = %s AND element_id = %s AND census_day BETWEEN %s AND %s
+                ORDER BY census_day, area_number
+            """, (park_id, element_id, census_day(month_date(first_month)), census_day(today)))
+            return [(day_date(day), total) for day, total in carry_forward(opening, cursor.fetchall())]
+        months_per_bucket = 1 if resolution == 'month' else 12
+        cursor.execute("""
+            SELECT month_index DIV %s, area_number, last_count
+            FROM population_monthly
+            WHERE park_id = %s AND element_id = %s AND month_index BETWEEN %s AND %s
+            ORDER BY month_index, area_number
+        """, (months_per_bucket, park_id, element_id, first_month, month_index(today)))
+        rows = cursor.fetchall()
+    return [(month_date(bucket * months_per_bucket), total) for bucket, total in carry_forward(opening, rows)]
+
+
+def record_census(connection, date=None):
+    """Append the current count of every area_elements row as a census on date (default today)."""
+    with connection.cursor() as cursor:
+        cursor.execute("CALL record_population_census(%s)", (date or datetime.date.today(),))
+    connection.commit()
+
+
+def partitions(connection):
+    """[(partition name, upper bound day or None for MAXVALUE)] of population_history in order."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT partition_name, partition_description
+            FROM information_schema.partitions
+            WHERE table_schema = DATABASE() AND table_name = 'population_history'
+            ORDER BY partition_ordinal_position
+        """)
+        return [(name, None if bound == 'MAXVALUE' else int(bound)) for name, bound in cursor.fetchall()]
+
+
+def reorganize_statement(existing, through_year):
+    """ALTER TABLE splitting p_future into yearly partitions up to through_year (None if not needed)."""
+    last_bound = max(bound for _, bound in existing if bound is not None)
+    year = day_date(last_bound).year
+    if year > through_year:
+        return None
+    new = [f"PARTITION p{y} VALUES LESS THAN ({census_day(datetime.date(y + 1, 1, 1))})"
+           for y in range(year, through_year + 1)]
+    return ("ALTER TABLE population_history REORGANIZE PARTITION p_future INTO (\n    "
+            + ",\n    ".join(new + ["PARTITION p_future VALUES LESS THAN MAXVALUE"]) + "\n)")
+
+
+def add_partitions(connection, through_year):
+    """Give every year up to through_year its own partition; returns the statement run, if any."""
+    statement = reorganize_statement(partitions(connection), through_year)
+    if statement:
+        with connection.cursor() as cursor:
+            cursor.execute(statement)
+    return statement
+
+
+def drop_before(connection, year):
+    """Drop the raw partitions holding only days before January 1st of year; returns their names.
+
+    population_monthly is not touched, so monthly and yearly trends keep the dropped years.
+    """
+    cutoff = census_day(datetime.date(year, 1, 1))
+    names = [name for name, bound in partitions(connection) if bound is not None and bound <= cutoff]
+    if names:
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE population_history DROP PARTITION {', '.join(names)}")
+    return names
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Population history trends and partition maintenance.")
+    parser.add_argument('--trend', type=int, nargs=2, metavar=('ELEMENT_ID', 'PARK_ID'))
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--resolution', choices=RESOLUTIONS, default='month')
+    parser.add_argument('--record', nargs='?', const='today', metavar='DATE',
+                        help="Record every current count as a census on DATE (YYYY-MM-DD, default today)")
+    parser.add_argument('--add-partitions', type=int, metavar='YEAR', help="Create yearly partitions up to YEAR")
+    parser.add_argument('--drop-before', type=int, metavar='YEAR', help="Drop raw history before YEAR")
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    connection = db.connect(**db.connection_options(args))
+    try:
+        if args.record:
+            date = None if args.record == 'today' else datetime.date.fromisoformat(args.record)
+            record_census(connection, date)
+            print(f"Census recorded for {date or datetime.date.today()}")
+        if args.add_partitions:
+            statement = add_partitions(connection, args.add_partitions)
+            print(statement or f"Partitions already cover {args.add_partitions}")
+        if args.drop_before:
+            names = drop_before(connection, args.drop_before)
+            print(f"Dropped partitions: {', '.join(names)}" if names else "No partitions to drop")
+        if args.trend:
+            element_id, park_id = args.trend
+            for date, individuals in trend(connection, element_id, park_id, args.years, args.resolution):
+                print(f"{date}\t{individuals}")
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Queries over the trigger-maintained province_park_stats summary table.
+
+Data requirement 2.b asks for efficient "parks per province" and "protected area per
+province" queries. setup.sql keeps province_park_stats current with triggers on
+park_provinces and parks, so these functions are primary-key or park_count index
+lookups regardless of how many parks exist. check() compares the summary with a
+GROUP BY over park_provinces and rebuild() recomputes it.
+
+Usage:
+    python -m park_management.province_stats            # top provinces by park count
+    python -m park_management.province_stats --check    # exit 1 if the summary drifted
+    python -m park_management.province_stats --rebuild
+"""
+import argparse
+import sys
+
+import pymysql
+
+from park_management import db
+
+_PROVINCE_STATS = """
+    SELECT p.id AS province_id, p.name, s.park_count, s.total_extension
+    FROM province_park_stats s
+    JOIN provinces p ON p.id = s.province_id
+"""
+
+_DRIFT = """
+    SELECT p.id AS province_id, p.name,
+           COALESCE(s.park_count, 0) AS stored_park_count,
+           COALESCE(a.park_count, 0) AS actual_park_count,
+           COALESCE(s.total_extension, 0) AS stored_total_extension,
+           COALESCE(a.total_extension, 0) AS actual_total_extension
+    FROM provinces p
+    LEFT JOIN province_park_stats s ON s.province_id = p.id
+    LEFT JOIN (
+        SELECT province_id, COUNT(*) AS park_count, SUM(extension_in_province) AS total_extension
+        FROM park_provinces
+        GROUP BY province_id
+    ) a ON a.province_id = p.id
+    WHERE COALESCE(s.park_count, 0) <> COALESCE(a.park_count, 0)
+       OR COALESCE(s.total_extension, 0) <> COALESCE(a.total_extension, 0)
+"""
+
+
+def _fetch(connection, sql, args=None):
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(sql, args)
+        return cursor.fetchall()
+
+
+def province_with_most_parks(connection):
+    """FR1: the province with the most parks (a backward scan of the park_count index)."""
+    rows = top_provinces(connection, 1)
+    return rows[0] if rows else None
+
+
+def top_provinces(connection, limit=10):
+    return list(_fetch(connection, _PROVINCE_STATS + " ORDER BY s.park_count DESC LIMIT %s", (limit,)))
+
+
+def province_stats(connection, province_id):
+    """Park count and total protected extension of one province (zeros if it has no parks)."""
+    rows = _fetch(connection, _PROVINCE_STATS + " WHERE s.province_id = %s", (province_id,))
+    if rows:
+        return rows[0]
+    return {'province_id': province_id, 'name': None, 'park_count': 0, 'total_extension': 0}
+
+
+def check(connection):
+    """Provinces whose summary row disagrees with park_provinces (empty list when consistent)."""
+    return list(_fetch(connection, _DRIFT))
+
+
+def rebuild(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("CALL rebuild_province_park_stats()")
+    connection.commit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query, check or rebuild the province_park_stats summary.")
+    parser.add_argument('--check', action='store_true', help="Compare the summary with park_provinces")
+    parser.add_argument('--rebuild', action='store_true', help="Recompute the summary from park_provinces")
+    parser.add_argument('--limit', type=int, default=10)
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    connection = db.connect(**db.connection_options(args))
+    try:
+        if args.rebuild:
+            rebuild(connection)
+            print("province_park_stats rebuilt")
+        if args.check:
+            drift = check(connection)
+            for row in drift:
+                print(f"{row['name']}: stored {row['stored_park_count']} parks / {row['stored_total_extension']} ha, "
+                      f"actual {row['actual_park_count']} parks / {row['actual_total_extension']} ha")
+            print(f"{len(drift)} provinces out of date" if drift else "province_park_stats is consistent")
+            sys.exit(1 if drift else 0)
+        if not args.rebuild:
+            for row in top_provinces(connection, args.limit):
+                print(f"{row['name']}: {row['park_count']} parks, {row['total_extension']} ha")
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""Table metadata parsed from sql/setup.sql and sql/populate_data.sql.
+
+The SQL scripts stay the single source of truth for the schema: this module reads
+them to find every table's columns, primary key, foreign keys and the column
+list used by its LOAD DATA statement, so the Python tools never keep a second
+copy of the schema that could drift.
+"""
+import os
+import re
+from dataclasses import dataclass, field
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SQL_DIR = os.path.join(PROJECT_ROOT, 'sql')
+LOAD_DIR = os.path.join(PROJECT_ROOT, 'data', 'load')
+SETUP_SQL = os.path.join(SQL_DIR, 'setup.sql')
+POPULATE_SQL = os.path.join(SQL_DIR, 'populate_data.sql')
+
+# Tables maintained by triggers in setup.sql rather than loaded, with the procedure
+# that recomputes each one from the base tables.
+SUMMARY_TABLES = {
+    'province_park_stats': 'rebuild_province_park_stats',
+    'species_park_areas': 'rebuild_species_park_counts',
+    'species_park_counts': 'rebuild_species_park_counts',
+    'park_visitor_counts': 'rebuild_park_visitor_counts',
+}
+
+# Tables whose rows a table's BEFORE triggers check without a foreign key. The
+# element_food checks read natural_elements.kind, which the vegetal_elements and
+# mineral_elements triggers set, so element_food must load after both or invalid
+# edges slip through while they are half loaded.
+TRIGGER_DEPENDENCIES = {
+    'element_food': ('vegetal_elements', 'mineral_elements'),
+}
+
+
+@dataclass
+class Column:
+    name: str
+    type: str
+    nullable: bool = True
+    auto_increment: bool = False
+
+
+@dataclass
+class ForeignKey:
+    columns: tuple
+    ref_table: str
+    ref_columns: tuple
+    on_delete: str = None
+
+
+@dataclass
+class Table:
+    name: str
+    columns: list = field(default_factory=list)
+    primary_key: tuple = ()
+    unique: list = field(default_factory=list)
+    foreign_keys: list = field(default_factory=list)
+    load_file: str = None
+    load_columns: tuple = ()
+    load_position: int = None
+    indexes: list = field(default_factory=list)
+
+    def column(self, name):
+        for column in self.columns:
+            if column.name == name:
+                return column
+        raise KeyError(f"{self.name} has no column {name}")
+
+    @property
+    def column_names(self):
+        return tuple(column.name for column in self.columns)
+
+    @property
+    def dependencies(self):
+        """Tables this one references or its triggers check, excluding self references."""
+        return sorted({fk.ref_table for fk in self.foreign_keys if fk.ref_table != self.name}
+                      | set(TRIGGER_DEPENDENCIES.get(self.name, ())))
+
+
+_CREATE_TABLE = re.compile(r'CREATE TABLE IF NOT EXISTS (\w+)\s*\((.*?)\n\)(?:\s*PARTITION BY[^;]*)?;', re.S | re.I)
+_LOAD_DATA = re.compile(
+    r"LOAD DATA LOCAL INFILE '([^']+)'\s+INTO TABLE (\w+).*?IGNORE 1 ROWS[^\n]*\n\s*\(([^)]*)\);",
+    re.S | re.I)
+_FOREIGN_KEY = re.compile(
+    r'FOREIGN KEY \(([^)]*)\) REFERENCES (\w+)\s*\(([^)]*)\)(?:\s+ON DELETE (CASCADE|SET NULL|RESTRICT|NO ACTION))?',
+    re.I)
+
+
+def _names(text):
+    return tuple(name.strip() for name in text.split(',') if name.strip())
+
+
+def _split_definitions(body):
+    """Split a CREATE TABLE body on top-level commas (DECIMAL(15,2) stays whole)."""
+    body = re.sub(r'--[^\n]*', '', body)
+    parts, depth, current = [], 0, []
+    for char in body:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == ',' and depth == 0:
+            parts.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    parts.append(''.join(current).strip())
+    return [part for part in parts if part]
+
+
+def _parse_table(name, body):
+    table = Table(name)
+    for definition in _split_definitions(body):
+        upper = definition.upper()
+        if upper.startswith('PRIMARY KEY'):
+            table.primary_key = _names(re.search(r'\(([^)]*)\)', definition).group(1))
+        elif upper.startswith('FOREIGN KEY'):
+            match = _FOREIGN_KEY.match(definition)
+            on_delete = match.group(4).upper() if match.group(4) else None
+            table.foreign_keys.append(ForeignKey(
+                _names(match.group(1)), match.group(2), _names(match.group(3)), on_delete))
+        elif upper.startswith(('INDEX', 'KEY')):
+            table.indexes.append(_names(re.search(r'\(([^)]*)\)', definition).group(1)))
+        elif upper.startswith('UNIQUE'):
+            table.unique.append(_names(re.search(r'\(([^)]*)\)', definition).group(1)))
+        else:
+            column_name, rest = definition.split(None, 1)
+            type_match = re.match(r"(\w+(?:\s*\([^)]*\))?)", rest)
+            column = Column(
+                column_name,
+                type_match.group(1),
+                nullable='NOT NULL' not in rest.upper() and 'PRIMARY KEY' not in rest.upper(),
+                auto_increment='AUTO_INCREMENT' in rest.upper())
+            table.columns.append(column)
+            if 'PRIMARY KEY' in rest.upper():
+                table.primary_key = (column_name,)
+            if re.search(r'\bUNIQUE\b', rest, re.I):
+                table.unique.append((column_name,))
+    for column in table.columns:
+        if column.name in table.primary_key:
+            column.nullable = False
+    return table
+
+
+def parse_schema(setup_path=SETUP_SQL, populate_path=POPULATE_SQL):
+    """Return {table name: Table} in the order the tables appear in setup.sql.
+
+    Tables loaded by populate_data.sql get their CSV file and LOAD column list.
+    """
+    with open(setup_path, encoding='utf-8') as f:
+        setup = f.read()
+    tables = {name: _parse_table(name, body) for name, body in _CREATE_TABLE.findall(setup)}
+
+    if populate_path:
+        with open(populate_path, encoding='utf-8') as f:
+            populate = f.read()
+        for position, (load_file, name, columns) in enumerate(_LOAD_DATA.findall(populate)):
+            tables[name].load_position = position
+            tables[name].load_file = load_file
+            tables[name].load_columns = _names(columns)
+    return tables
+
+
+def create_statement(name, setup_path=SETUP_SQL):
+    """The CREATE TABLE statement of one table in setup.sql, partition clause included."""
+    with open(setup_path, encoding='utf-8') as f:
+        for match in _CREATE_TABLE.finditer(f.read()):
+            if match.group(1) == name:
+                return match.group(0)
+    raise KeyError(f"setup.sql does not create {name}")
+
+
+def loaded_tables(tables):
+    """Tables populated from data/load, in populate_data.sql order."""
+    return sorted((table for table in tables.values() if table.load_file),
+                  key=lambda table: table.load_position)
+
+
+def dependency_levels(tables, names=None):
+    """Group tables into FK levels: every table only references tables in earlier levels.
+
+    Tables in the same level have no FK path between them and can be loaded concurrently.
+    """
+    names = list(names) if names is not None else list(tables)
+    remaining = {name: {dep for dep in tables[name].dependencies if dep in names} for name in names}
+    levels = []
+    while remaining:
+        ready = [name for name in names if name in remaining and not remaining[name]]
+        if not ready:
+            raise ValueError(f"Foreign key cycle between tables: {sorted(remaining)}")
+        levels.append(ready)
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return levels
+
+
+def load_order(tables, names=None):
+    """Tables in an order that satisfies every foreign key (parents before children)."""
+    return [name for level in dependency_levels(tables, names) for name in level]
@@ -0,0 +1,414 @@
+"""Table size projection model for capacity planning (additional requirement 2).
+
+sql/analyze_table_sizes.sql reports information_schema.TABLES for the loaded sample,
+where every table still fits in a single 16 KB page. This model instead derives the
+cost of one row from the column types in sql/setup.sql and the InnoDB DYNAMIC row
+format:
+
+* Clustered index record: a 5-byte header, the NULL bitmap, 1-2 length bytes per
+  VARCHAR, DB_TRX_ID and DB_ROLL_PTR (13 bytes), then the columns.
+* Secondary index record: a header, the index columns and the primary key columns
+  the index does not already contain.
+* Secondary indexes are the INDEX and UNIQUE keys of setup.sql, plus the index InnoDB
+  adds for a foreign key no other index starts with. With --profile, the indexes of
+  that park_management.index_profiles profile are included too.
+
+Records fill 16 KB pages. Each page has 128 bytes of headers and 2 bytes of page
+directory per 4 records. The primary key is loaded in order, so clustered pages are
+15/16 full. Secondary indexes are filled in random order and end about 69% full.
+Segments allocate single pages up to 32, then whole 64-page extents. A partitioned
+table allocates at least one page per partition and index.
+
+VARCHAR columns default to DEFAULT_STRING_BYTES per value. Calibration
+(--calibrate) loads generated data at a few scale factors and measures the average
+byte length of every string column. It then fits one data and one index correction
+factor per table: the least-squares ratio of measured to modelled bytes, over the
+scale factors where the table fills more than the first 32 pages. The calibration
+file is then used for projections.
+
+Summary tables get their row counts from the base tables (derived_counts). The
+history tables grow with census activity instead: population_history gets a row per
+changed area_elements count per census, population_monthly a row per area, element
+and month with a change, and email_log a row per decrease (fewer if the outbox
+coalesces them, so its projection is an upper bound). Their counts come from a
+CensusActivity (--censuses-per-year, --changed-share, --declined-share, --years).
+Tables still without a row count are listed under the report.
+
+Usage:
+    python -m park_management.size_model --calibrate 0.01 0.05 0.1 --output results/size_calibration.json
+    python -m park_management.size_model --scale-factor 1 --per-year visitors=5000000 \\
+        visitor_excursions=7500000 --years 3 --calibration results/size_calibration.json
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import re
+import shutil
+import tempfile
+from dataclasses import dataclass
+
+from park_management import db, generator, index_profiles, schema
+from park_management.generator import plan_row_counts
+from park_management.loader import ParallelLoader
+from park_management.species_counts import BENCHMARK_DB
+
+PAGE_SIZE = 16384
+PAGE_OVERHEAD = 38 + 56 + 26 + 8  # FIL header, index page header, infimum/supremum, FIL trailer
+RECORDS_PER_DIRECTORY_SLOT = 4
+RECORD_HEADER = 5
+TRANSACTION_COLUMNS = 6 + 7  # DB_TRX_ID, DB_ROLL_PTR
+CLUSTERED_FILL = 15 / 16
+SECONDARY_FILL = 0.69
+FRAGMENT_PAGES = 32
+EXTENT_PAGES = 64
+DEFAULT_STRING_BYTES = 16
+BUFFER_POOL_CHUNK = 128 * 2 ** 20
+MIN_CALIBRATION_BYTES = FRAGMENT_PAGES * PAGE_SIZE
+
+FIXED_BYTES = {
+    'TINYINT': 1, 'BOOL': 1, 'BOOLEAN': 1, 'SMALLINT': 2, 'MEDIUMINT': 3, 'INT': 4, 'INTEGER': 4, 'BIGINT': 8,
+    'FLOAT': 4, 'DOUBLE': 8, 'DATE': 3, 'TIME': 3, 'DATETIME': 5, 'TIMESTAMP': 4, 'YEAR': 1,
+}
+_DECIMAL_LEFTOVER = (0, 1, 1, 2, 2, 3, 3, 4, 4, 4)
+_TYPE = re.compile(r'(\w+)\s*(?:\((.*)\))?', re.S)
+_PARTITION = re.compile(r'\bPARTITION\s+\w+\s+VALUES\b', re.I)
+
+
+@dataclass
+class TableEstimate:
+    table: str
+    rows: int
+    row_bytes: float
+    data_bytes: int
+    index_bytes: int
+
+    @property
+    def total_bytes(self):
+        return self.data_bytes + self.index_bytes
+
+
+@dataclass
+class CensusActivity:
+    """Census activity over the projected period, for the tables that grow with censuses."""
+    years: float = 1.0
+    censuses_per_year: float = 4
+    changed_share: float = 0.5  # area_elements rows whose count changes in a census
+    declined_share: float = 0.25  # area_elements rows whose count decreases in a census
+    email_keep_months: float = None  # email_retention --keep-months, if months are dropped
+
+
+def _decimal_bytes(digits):
+    return digits // 9 * 4 + _DECIMAL_LEFTOVER[digits % 9]
+
+
+def is_string(column_type):
+    return _TYPE.match(column_type).group(1).upper() in ('VARCHAR', 'CHAR')
+
+
+def column_bytes(column_type, string_bytes=None):
+    """Stored bytes of one value of a setup.sql column type (string_bytes: average for VARCHAR/CHAR)."""
+    name, arguments = _TYPE.match(column_type).groups()
+    name = name.upper()
+    if name in FIXED_BYTES:
+        return FIXED_BYTES[name]
+    if name in ('DECIMAL', 'NUMERIC'):
+        precision, scale = (int(part) for part in (arguments or '10,0').split(','))
+        return _decimal_bytes(precision - scale) + _decimal_bytes(scale)
+    if name == 'ENUM':
+        return 1 if arguments.count(',') < 255 else 2
+    if name == 'SET':
+        size = (arguments.count(',') + 8) // 8
+        return size if size <= 4 else 8
+    if name in ('VARCHAR', 'CHAR'):
+        return string_bytes if string_bytes is not None else min(int(arguments), DEFAULT_STRING_BYTES)
+    raise ValueError(f"no size for column type {column_type}")
+
+
+def allocated_pages(used_pages, minimum=1):
+    """Pages a segment allocates for used_pages: single pages up to 32, then 64-page extents."""
+    pages = max(minimum, math.ceil(used_pages))
+    if pages <= FRAGMENT_PAGES:
+        return pages
+    return FRAGMENT_PAGES + math.ceil((pages - FRAGMENT_PAGES) / EXTENT_PAGES) * EXTENT_PAGES
+
+
+def leaf_pages(rows, record_bytes, fill):
+    per_record = record_bytes + 2 / RECORDS_PER_DIRECTORY_SLOT
+    return rows * per_record / ((PAGE_SIZE - PAGE_OVERHEAD) * fill)
+
+
+def derived_counts(counts, activity=None):
+    """Row counts of the summary and history tables implied by the base table counts and activity."""
+    activity = activity or CensusActivity()
+    derived = {}
+    if 'provinces' in counts:
+        derived['province_park_stats'] = counts['provinces']
+    if 'natural_elements' in counts:
+        derived['species_park_counts'] = counts['natural_elements']
+    if 'area_elements' in counts:
+        # One row per (species, park). The generator puts a species in nearly every area of
+        # the parks it lives in (473,700 area_elements rows make 47,550 pairs at SF 0.05).
+        pairs = math.ceil(counts['area_elements'] / generator.AREAS_PER_PARK)
+        derived['species_park_areas'] = min(pairs, counts.get('natural_elements', 0) * counts.get('parks', 0)
+                                            or pairs)
+    if 'parks' in counts:
+        derived['park_visitor_counts'] = counts['parks'] * 16
+    if 'area_elements' in counts:
+        rows = counts['area_elements']
+        censuses = activity.censuses_per_year * activity.years
+        # The load records every count once; then one row per changed count and census day.
+        derived['population_history'] = math.ceil(rows * (1 + activity.changed_share * censuses))
+        # One row per (area, element, month) with a change: the chance that a month has a
+        # census that changed the count, or that at least one of its censuses did.
+        per_month = activity.censuses_per_year / 12
+        if per_month <= 1:
+            changed_in_month = per_month * activity.changed_share
+        else:
+            changed_in_month = 1 - (1 - activity.changed_share) ** per_month
+        derived['population_monthly'] = math.ceil(rows * (1 + math.ceil(12 * activity.years) * changed_in_month))
+        kept_years = activity.years
+        if activity.email_keep_months:
+            kept_years = min(kept_years, activity.email_keep_months / 12)
+        derived['email_log'] = math.ceil(rows * activity.declined_share * activity.censuses_per_year * kept_years)
+    return derived
+
+
+class SizeModel:
+    """Per-row and per-table size estimates for the tables of setup.sql."""
+
+    def __init__(self, tables=None, profile=None, calibration=None):
+        self.tables = tables or schema.parse_schema()
+        self.profile = profile
+        calibration = calibration or {}
+        self.string_bytes = calibration.get('string_bytes', {})
+        self.factors = calibration.get('factors', {})
+        self.partitions = {name: max(1, len(_PARTITION.findall(schema.create_statement(name))))
+                           for name in self.tables}
+
+    def _value_bytes(self, table, column):
+        return column_bytes(column.type, self.string_bytes.get(table.name, {}).get(column.name))
+
+    def _record_bytes(self, table, columns):
+        strings = [column for column in columns if is_string(column.type)]
+        length_bytes = sum(1 if self._value_bytes(table, column) <= 127 else 2 for column in strings)
+        null_bitmap = math.ceil(sum(column.nullable for column in columns) / 8)
+        return RECORD_HEADER + null_bitmap + length_bytes + sum(self._value_bytes(table, column) for column in columns)
+
+    def row_bytes(self, name):
+        """Bytes of one clustered index record of table name."""
+        table = self.tables[name]
+        return self._record_bytes(table, table.columns) + TRANSACTION_COLUMNS
+
+    def secondary_indexes(self, name):
+        """Column tuples of the secondary indexes of table name."""
+        table = self.tables[name]
+        indexes = list(table.indexes) + list(table.unique)
+        if self.profile:
+            indexes += [index.columns for index in index_profiles.PROFILES[self.profile] if index.table == name]
+        for foreign_key in table.foreign_keys:
+            if not any(columns[:len(foreign_key.columns)] == foreign_key.columns
+                       for columns in [table.primary_key] + indexes):
+                indexes.append(foreign_key.columns)
+        return indexes
+
+    def index_record_bytes(self, name, columns):
+        table = self.tables[name]
+        stored = list(columns) + [column for column in table.primary_key if column not in columns]
+        return self._record_bytes(table, [table.column(column) for column in stored])
+
+    def estimate(self, name, rows):
+        """TableEstimate of table name holding rows rows, with its calibration factors."""
+        partitions = self.partitions[name]
+        row_bytes = self.row_bytes(name)
+        data = allocated_pages(leaf_pages(rows, row_bytes, CLUSTERED_FILL), partitions) * PAGE_SIZE
+        index = sum(allocated_pages(leaf_pages(rows, self.index_record_bytes(name, columns), SECONDARY_FILL),
+                                    partitions) * PAGE_SIZE
+                    for columns in self.secondary_indexes(name))
+        factors = self.factors.get(name, {})
+        return TableEstimate(name, rows, row_bytes, round(data * factors.get('data', 1.0)),
+                             round(index * factors.get('index', 1.0)))
+
+    def project(self, counts, activity=None):
+        """TableEstimates for counts ({table: rows}) plus the summary and history tables they imply."""
+        counts = {**derived_counts(counts, activity), **counts}
+        return [self.estimate(name, counts[name]) for name in self.tables if name in counts]
+
+
+def fit(model, measurements):
+    """{table: {'data': factor, 'index': factor}} fitting model to measured sizes.
+
+    measurements: [{table: {'rows', 'data_bytes', 'index_bytes'}}], one per scale factor.
+    Each factor is sum(measured * modelled) / sum(modelled ** 2) over the measurements
+    where the modelled size exceeds the 32 single pages; tables without any keep 1.0.
+    """
+    factors = {}
+    for name in model.tables:
+        pairs = {'data': [], 'index': []}
+        for measured in measurements:
+            if name not in measured:
+                continue
+            estimate = model.estimate(name, measured[name]['rows'])
+            for kind, modelled in (('data', estimate.data_bytes), ('index', estimate.index_bytes)):
+                if modelled > MIN_CALIBRATION_BYTES:
+                    pairs[kind].append((measured[name][f'{kind}_bytes'], modelled))
+        fitted = {kind: round(sum(m * p for m, p in points) / sum(p * p for _, p in points), 4)
+                  for kind, points in pairs.items() if points}
+        if fitted:
+            factors[name] = fitted
+    return factors
+
+
+def measure(connection):
+    """{table: {'rows', 'data_bytes', 'index_bytes'}} of the current database, statistics refreshed."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT table_name FROM information_schema.TABLES "
+                       "WHERE table_schema = DATABASE() AND table_type = 'BASE TABLE'")
+        tables = [row[0] for row in cursor.fetchall()]
+        cursor.execute(f"ANALYZE TABLE {', '.join(tables)}")
+        cursor.fetchall()
+        cursor.execute("SELECT table_name, data_length, index_length FROM information_schema.TABLES "
+                       "WHERE table_schema = DATABASE() AND table_type = 'BASE TABLE'")
+        sizes = {table: {'data_bytes': int(data), 'index_bytes': int(index)}
+                 for table, data, index in cursor.fetchall()}
+        for table in tables:
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            sizes[table]['rows'] = cursor.fetchone()[0]
+    return sizes
+
+
+def string_lengths(connection, tables):
+    """{table: {column: average bytes}} of the VARCHAR/CHAR columns of the non-empty tables."""
+    averages = {}
+    with connection.cursor() as cursor:
+        for table in tables.values():
+            columns = [column.name for column in table.columns if is_string(column.type)]
+            if not columns:
+                continue
+            cursor.execute(f"SELECT COUNT(*), {', '.join(f'AVG(LENGTH({name}))' for name in columns)} "
+                           f"FROM {table.name}")
+            count, *lengths = cursor.fetchone()
+            if count:
+                averages[table.name] = {name: round(float(length or 0), 1) for name, length in zip(columns, lengths)}
+    return averages
+
+
+def calibrate(scale_factors, workers=4, seed=0, profile=None, connection_options=None, log=print):
+    """Load generated data at every scale factor, measure it and fit the model; returns the calibration."""
+    connection_options = {**(connection_options or {}), 'database': BENCHMARK_DB}
+    tables = schema.parse_schema()
+    calibration = {'created': datetime.datetime.now().isoformat(timespec='seconds'),
+                   'scale_factors': list(scale_factors), 'profile': profile, 'measurements': []}
+    for scale_factor in sorted(scale_factors):
+        work_dir = tempfile.mkdtemp(prefix='park_sizes_')
+        server = db.connect(**{**connection_options, 'database': None})
+        try:
+            generator.generate(work_dir, scale_factor, seed, log=None)
+            with server.cursor() as cursor:
+                cursor.execute(f"DROP DATABASE IF EXISTS {BENCHMARK_DB}")
+            db.run_script(server, schema.SETUP_SQL, {'park_management': BENCHMARK_DB})
+            ParallelLoader(work_dir, workers, connection_options=connection_options, log=None).run()
+            connection = db.connect(**connection_options)
+            try:
+                if profile:
+                    index_profiles.apply(connection, profile, log=None)
+                calibration['measurements'].append(measure(connection))
+                # The largest scale factor runs last and gives the string lengths.
+                calibration['string_bytes'] = string_lengths(connection, tables)
+            finally:
+                connection.close()
+            if log:
+                total = sum(size['data_bytes'] + size['index_bytes'] for size in calibration['measurements'][-1].values())
+                log(f"SF{scale_factor}: {total / 2 ** 20:.1f} MB measured")
+        finally:
+            with server.cursor() as cursor:
+                cursor.execute(f"DROP DATABASE IF EXISTS {BENCHMARK_DB}")
+            server.close()
+            shutil.rmtree(work_dir, ignore_errors=True)
+    model = SizeModel(tables, profile, {'string_bytes': calibration['string_bytes']})
+    calibration['factors'] = fit(model, calibration['measurements'])
+    return calibration
+
+
+def buffer_pool_bytes(estimates):
+    """Buffer pool that holds every page, with 10% for its own structures, in whole 128 MB chunks."""
+    total = sum(estimate.total_bytes for estimate in estimates) * 1.1
+    return max(1, math.ceil(total / BUFFER_POOL_CHUNK)) * BUFFER_POOL_CHUNK
+
+
+def report(estimates, log=print, skipped=()):
+    log(f"{'table':28}{'rows':>14}{'row B':>8}{'data MB':>12}{'index MB':>12}{'total MB':>12}")
+    for estimate in sorted(estimates, key=lambda estimate: -estimate.total_bytes):
+        log(f"{estimate.table:28}{estimate.rows:>14,}{estimate.row_bytes:>8.0f}{estimate.data_bytes / 2 ** 20:>12.1f}"
+            f"{estimate.index_bytes / 2 ** 20:>12.1f}{estimate.total_bytes / 2 ** 20:>12.1f}")
+    data = sum(estimate.data_bytes for estimate in estimates)
+    index = sum(estimate.index_bytes for estimate in estimates)
+    log(f"{'total':50}{data / 2 ** 20:>12.1f}{index / 2 ** 20:>12.1f}{(data + index) / 2 ** 20:>12.1f}")
+    log(f"innodb_buffer_pool_size to hold everything: {buffer_pool_bytes(estimates) // 2 ** 20} MB")
+    if skipped:
+        log(f"not projected (no row count): {', '.join(skipped)}")
+
+
+def _counts(text):
+    table, _, rows = text.partition('=')
+    if not rows.isdigit():
+        raise argparse.ArgumentTypeError(f"expected TABLE=ROWS, got {text}")
+    return table, int(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Project table data and index sizes from row counts.")
+    parser.add_argument('--calibrate', type=float, nargs='+', metavar='SF',
+                        help="Measure these scale factors and write the calibration to --output")
+    parser.add_argument('--output', help="JSON file for the calibration")
+    parser.add_argument('--calibration', help="Calibration JSON to project with")
+    parser.add_argument('--scale-factor', type=float, default=1.0,
+                        help="Base row counts of the generator at this scale factor")
+    parser.add_argument('--rows', type=_counts, nargs='+', default=[], metavar='TABLE=ROWS',
+                        help="Row counts that replace the base counts")
+    parser.add_argument('--per-year', type=_counts, nargs='+', default=[], metavar='TABLE=ROWS',
+                        help="Rows added per year, on top of the base counts")
+    parser.add_argument('--years', type=float, default=1.0)
+    parser.add_argument('--censuses-per-year', type=float, default=CensusActivity.censuses_per_year)
+    parser.add_argument('--changed-share', type=float, default=CensusActivity.changed_share,
+                        help="Share of area_elements counts that change in a census")
+    parser.add_argument('--declined-share', type=float, default=CensusActivity.declined_share,
+                        help="Share of area_elements counts that decrease in a census (email_log rows)")
+    parser.add_argument('--email-keep-months', type=float,
+                        help="email_retention --keep-months: email_log holds at most this many months")
+    parser.add_argument('--profile', choices=sorted(index_profiles.PROFILES),
+                        help="Include the indexes of this index profile")
+    parser.add_argument('--workers', type=int, default=4, help="Loader connections")
+    parser.add_argument('--seed', type=int, default=0)
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.calibrate:
+        calibration = calibrate(args.calibrate, args.workers, args.seed, args.profile, db.connection_options(args))
+        for table, factors in sorted(calibration['factors'].items()):
+            print(f"{table}: " + ', '.join(f"{kind} x{factor}" for kind, factor in factors.items()))
+        if args.output:
+            os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(calibration, f, indent=2)
+        return
+
+    calibration = None
+    if args.calibration:
+        with open(args.calibration, encoding='utf-8') as f:
+            calibration = json.load(f)
+    counts = {**plan_row_counts(args.scale_factor), **dict(args.rows)}
+    for table, rows in args.per_year:
+        counts[table] = counts.get(table, 0) + round(rows * args.years)
+    profile = args.profile or (calibration or {}).get('profile')
+    model = SizeModel(profile=profile, calibration=calibration)
+    activity = CensusActivity(args.years, args.censuses_per_year, args.changed_share, args.declined_share,
+                              args.email_keep_months)
+    estimates = model.project(counts, activity)
+    projected = {estimate.table for estimate in estimates}
+    report(estimates, skipped=[name for name in model.tables if name not in projected])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,371 @@
+"""Binary snapshot / restore of the park_management tables for fast fixture resets.
+
+Rebuilding a populated database from scratch means teardown.sql -> setup.sql ->
+populate_data.sql, which re-parses every CSV. A snapshot instead stores every table
+of sql/setup.sql in a compact columnar binary file (one file per table):
+
+    MAGIC | column blocks ... | footer (JSON) | footer length (uint64) | MAGIC
+
+Each column is stored as a bit-packed null mask plus either fixed-width int64
+values (INT, DECIMAL scaled by 10^scale, DATE as ordinal days, TIME/TIMESTAMP as
+microseconds) or, for strings, int64 end offsets plus one UTF-8 blob. Blocks are
+8-byte aligned so a reader can mmap the file and view any column as an array
+without parsing anything; any row range can be decoded independently.
+
+Summary tables (schema.SUMMARY_TABLES) are not stored: restore rebuilds them with
+their procedures once the base tables are back. Restore truncates the tables and
+reloads them in parallel: every table is cut into
+row ranges that worker processes decode straight from the memory-mapped file and
+insert with packed multi-row INSERTs (no local_infile needed), with FK and unique
+checks disabled for the session.
+
+Usage:
+    python -m park_management.snapshot dump snapshots/sf1
+    python -m park_management.snapshot restore snapshots/sf1 --workers 8
+"""
+import argparse
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+import tempfile
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pymysql
+
+from park_management import db, schema
+from park_management.ingest import build_statements
+
+MAGIC = b'PMSNAP1\n'
+SUFFIX = '.pmsnap'
+FLUSH_ROWS = 65536
+DEFAULT_RANGE_ROWS = 100_000
+_EPOCH = datetime(1970, 1, 1)
+
+
+def column_encoding(column):
+    """(encoding, scale) used to store a column of the given SQL type."""
+    sql_type = column.type.upper()
+    if re.match(r'(TINY|SMALL|MEDIUM|BIG)?INT', sql_type):
+        return 'int', 0
+    match = re.match(r'DECIMAL\s*\(\s*\d+\s*,\s*(\d+)\s*\)', sql_type)
+    if match:
+        return 'decimal', int(match.group(1))
+    if sql_type == 'DATE':
+        return 'date', 0
+    if sql_type == 'TIME':
+        return 'time', 0
+    if sql_type in ('TIMESTAMP', 'DATETIME'):
+        return 'datetime', 0
+    return 'string', 0
+
+
+def _encode(encoding, scale, value):
+    if encoding == 'int':
+        return int(value)
+    if encoding == 'decimal':
+        return int((Decimal(value) * (10 ** scale)).to_integral_value())
+    if encoding == 'date':
+        return value.toordinal()
+    if encoding == 'time':
+        return (value.days * 86400 + value.seconds) * 1_000_000 + value.microseconds
+    # datetime
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _decode(encoding, scale, number):
+    if encoding == 'int':
+        return number
+    if encoding == 'decimal':
+        return Decimal(number).scaleb(-scale)
+    if encoding == 'date':
+        return date.fromordinal(number)
+    if encoding == 'time':
+        return timedelta(microseconds=number)
+    return _EPOCH + timedelta(microseconds=number)
+
+
+class _ColumnWriter:
+    """Spools one column to temporary files while rows stream in."""
+
+    def __init__(self, work_dir, index, column):
+        self.column = column
+        self.encoding, self.scale = column_encoding(column)
+        self.paths = {part: os.path.join(work_dir, f"{index}.{part}") for part in ('nulls', 'values', 'offsets')}
+        self.files = {part: open(path, 'wb') for part, path in self.paths.items()}
+        self.null_bits = 0
+        self.null_count = 0
+        self.rows = 0
+        self.values = array('q')
+        self.offsets = array('q')
+        self.string_end = 0
+
+    def add(self, value):
+        if value is None:
+            self.null_bits |= 1 << (self.rows % 8)
+        if self.encoding == 'string':
+            if value is not None:
+                encoded = (value if isinstance(value, str) else str(value)).encode('utf-8')
+                self.files['values'].write(encoded)
+                self.string_end += len(encoded)
+            self.offsets.append(self.string_end)
+        else:
+            self.values.append(0 if value is None else _encode(self.encoding, self.scale, value))
+        self.rows += 1
+        if self.rows % 8 == 0:
+            self.files['nulls'].write(bytes((self.null_bits,)))
+            self.null_bits = 0
+        if len(self.values) >= FLUSH_ROWS or len(self.offsets) >= FLUSH_ROWS:
+            self.flush()
+
+    def flush(self):
+        if self.encoding == 'string':
+            self.offsets.tofile(self.files['offsets'])
+            self.offsets = array('q')
+        else:
+            self.values.tofile(self.files['values'])
+            self.values = array('q')
+
+    def close(self):
+        self.flush()
+        if self.rows % 8:
+            self.files['nulls'].write(bytes((self.null_bits,)))
+        for f in self.files.values():
+            f.close()
+
+
+def write_snapshot(path, table, rows, work_dir=None):
+    """Write rows (tuples in table.column_names order) to a snapshot file; returns the row count."""
+    own_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix='park_snapshot_')
+    try:
+        writers = [_ColumnWriter(work_dir, index, column) for index, column in enumerate(table.columns)]
+        count = 0
+        for row in rows:
+            for writer, value in zip(writers, row):
+                writer.add(value)
+            count += 1
+        for writer in writers:
+            writer.close()
+
+        footer = {'table': table.name, 'rows': count, 'columns': []}
+        with open(path + '.tmp', 'wb') as out:
+            out.write(MAGIC)
+            for writer in writers:
+                entry = {'name': writer.column.name, 'type': writer.column.type,
+                         'encoding': writer.encoding, 'scale': writer.scale}
+                parts = ('nulls', 'offsets', 'values') if writer.encoding == 'string' else ('nulls', 'values')
+                for part in parts:
+                    out.write(b'\0' * (-out.tell() % 8))  # 8-byte alignment for array views
+                    start = out.tell()
+                    with open(writer.paths[part], 'rb') as f:
+                        shutil.copyfileobj(f, out)
+                    entry[part] = [start, out.tell() - start]
+                footer['columns'].append(entry)
+            encoded = json.dumps(footer).encode('utf-8')
+            out.write(encoded)
+            out.write(struct.pack('<Q', len(encoded)))
+            out.write(MAGIC)
+        os.replace(path + '.tmp', path)
+        return count
+    finally:
+        if own_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+class SnapshotReader:
+    """Memory-mapped view over one snapshot file."""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        if self._map[:len(MAGIC)] != MAGIC or self._map[-len(MAGIC):] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a park_management snapshot")
+        footer_end = len(self._map) - len(MAGIC) - 8
+        (footer_length,) = struct.unpack('<Q', self._map[footer_end:footer_end + 8])
+        self.footer = json.loads(self._map[footer_end - footer_length:footer_end].decode('utf-8'))
+        self.table = self.footer['table']
+        self.rows = self.footer['rows']
+        self.column_names = [column['name'] for column in self.footer['columns']]
+
+    def _block(self, extent):
+        start, length = extent
+        return self._view[start:start + length]
+
+    def column(self, name):
+        """The raw int64 values of a fixed-width column as a memoryview (no copy)."""
+        entry = next(column for column in self.footer['columns'] if column['name'] == name)
+        return self._block(entry['values' if entry['encoding'] != 'string' else 'offsets']).cast('q')
+
+    def _decode_column(self, entry, start, stop):
+        nulls = self._block(entry['nulls'])
+        if entry['encoding'] == 'string':
+            offsets = self._block(entry['offsets']).cast('q')
+            data = self._block(entry['values'])
+            result = []
+            for row in range(start, stop):
+                if nulls[row >> 3] >> (row & 7) & 1:
+                    result.append(None)
+                else:
+                    begin = offsets[row - 1] if row else 0
+                    result.append(bytes(data[begin:offsets[row]]).decode('utf-8'))
+            return result
+        values = self._block(entry['values']).cast('q')
+        encoding, scale = entry['encoding'], entry['scale']
+        return [None if nulls[row >> 3] >> (row & 7) & 1 else _decode(encoding, scale, values[row])
+                for row in range(start, stop)]
+
+    def read_rows(self, start=0, stop=None):
+        """Decoded rows start..stop as tuples in column order."""
+        stop = self.rows if stop is None else min(stop, self.rows)
+        columns = [self._decode_column(entry, start, stop) for entry in self.footer['columns']]
+        return list(zip(*columns))
+
+    def close(self):
+        self._view.release()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def snapshot_path(directory, table_name):
+    return os.path.join(directory, table_name + SUFFIX)
+
+
+def dump(directory, connection_options=None, tables=None, log=print):
+    """Snapshot every table of setup.sql from one consistent read view; returns {table: rows}."""
+    os.makedirs(directory, exist_ok=True)
+    definitions = schema.parse_schema()
+    names = [name for name in definitions
+             if (not tables or name in tables) and name not in schema.SUMMARY_TABLES]
+    connection = db.connect(cursorclass=pymysql.cursors.SSCursor, **(connection_options or {}))
+    counts = {}
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+        for name in names:
+            table = definitions[name]
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT {', '.join(table.column_names)} FROM {name}")
+                counts[name] = write_snapshot(snapshot_path(directory, name), table, cursor)
+            if log:
+                log(f"{name}: {counts[name]} rows in {time.perf_counter() - started:.2f}s")
+        connection.commit()
+    finally:
+        connection.close()
+    return counts
+
+
+# --- parallel restore (worker processes) ---
+
+_worker = {}
+
+
+def _init_worker(connection_options, statement_bytes):
+    connection = db.connect(**connection_options)
+    with connection.cursor() as cursor:
+        cursor.execute("SET FOREIGN_KEY_CHECKS=0")
+        cursor.execute("SET UNIQUE_CHECKS=0")
+        cursor.execute("SET @skip_summary_triggers = 1")
+    _worker.update(connection=connection, statement_bytes=statement_bytes, tables=schema.parse_schema())
+
+
+def _restore_range(path, start, stop):
+    connection = _worker['connection']
+    with SnapshotReader(path) as reader:
+        rows = reader.read_rows(start, stop)
+        table = _worker['tables'][reader.table]
+        insert_table = schema.Table(table.name, table.columns, load_columns=tuple(reader.column_names))
+    with connection.cursor() as cursor:
+        for sql, _ in build_statements(insert_table, rows, _worker['statement_bytes']):
+            cursor.execute(sql)
+    connection.commit()
+    return insert_table.name, len(rows)
+
+
+def restore(directory, workers=4, range_rows=DEFAULT_RANGE_ROWS, connection_options=None,
+            statement_bytes=4 * 1024 * 1024, tables=None, log=print):
+    """Truncate the snapshotted tables and reload them in parallel; returns {table: rows}.
+
+    Summary tables are not stored; their triggers are skipped during the reload and
+    their rebuild procedures run once at the end. Without a population_history
+    snapshot, the restored counts are recorded as today's census.
+    """
+    connection_options = connection_options or {}
+    definitions = schema.parse_schema()
+    names = [name for name in definitions
+             if (not tables or name in tables) and os.path.exists(snapshot_path(directory, name))]
+
+    connection = db.connect(**connection_options)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SET FOREIGN_KEY_CHECKS=0")
+            for name in names:
+                cursor.execute(f"TRUNCATE TABLE {name}")
+            cursor.execute("SET FOREIGN_KEY_CHECKS=1")
+    finally:
+        connection.close()
+
+    tasks = []
+    for name in names:
+        path = snapshot_path(directory, name)
+        with SnapshotReader(path) as reader:
+            rows = reader.rows
+        tasks.extend((path, start, start + range_rows) for start in range(0, rows, range_rows))
+    # Biggest tables first so the long ranges do not end up last.
+    tasks.sort(key=lambda task: -os.path.getsize(task[0]))
+
+    counts = {name: 0 for name in names}
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(connection_options, statement_bytes)) as executor:
+        for name, rows in executor.map(_restore_range, *zip(*tasks)) if tasks else ():
+            counts[name] += rows
+
+    connection = db.connect(**connection_options)
+    try:
+        db.rebuild_summaries(connection, record_census='population_history' not in names)
+    finally:
+        connection.close()
+    if log:
+        total = sum(counts.values())
+        elapsed = time.perf_counter() - started
+        log(f"Restored {total} rows into {len(names)} tables in {elapsed:.2f}s "
+            f"({total / elapsed if elapsed else 0:,.0f} rows/s)")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot or restore the park_management tables.")
+    parser.add_argument('command', choices=('dump', 'restore'))
+    parser.add_argument('directory', help="Snapshot directory (one .pmsnap file per table)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help="Restore processes")
+    parser.add_argument('--range-rows', type=int, default=DEFAULT_RANGE_ROWS,
+                        help="Rows decoded and inserted per restore task")
+    parser.add_argument('--tables', nargs='*')
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.command == 'dump':
+        dump(args.directory, db.connection_options(args), args.tables)
+    else:
+        restore(args.directory, args.workers, args.range_rows, db.connection_options(args), tables=args.tables)
+
+
+if __name__ == '__main__':
+    main()
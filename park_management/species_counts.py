@@ -0,0 +1,228 @@
+"""Distribution queries over the trigger-maintained species_park_counts summary.
+
+setup.sql keeps two summaries of area_elements current with triggers:
+species_park_areas (areas per element and park) and species_park_counts (parks per
+element, indexed on park_count). FR2, AR3 and AR4 then become range scans on
+idx_species_park_counts_park_count instead of COUNT(DISTINCT park_id) over the full
+area_elements join. This module runs those queries, checks the summaries against
+area_elements, rebuilds them, and benchmarks both formulations at several scale
+factors on generated data.
+
+Usage:
+    python -m park_management.species_counts --query fr2
+    python -m park_management.species_counts --check
+    python -m park_management.species_counts --benchmark 0.01 0.1 --workers 8
+"""
+import argparse
+import csv
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import pymysql
+
+from park_management import db, generator, schema
+from park_management.loader import ParallelLoader
+
+BENCHMARK_DB = 'park_management_bench'
+
+# (GROUP BY query from sql/analyze_execution_plans.sql, equivalent query on the summary)
+QUERIES = {
+    'fr2': ("""
+        SELECT ne.scientific_name
+        FROM natural_elements ne
+        JOIN vegetal_elements ve ON ne.id = ve.element_id
+        JOIN area_elements ae ON ne.id = ae.element_id
+        GROUP BY ne.id, ne.scientific_name
+        HAVING COUNT(DISTINCT ae.park_id) >= (SELECT COUNT(*)/2 FROM parks)
+    """, """
+        SELECT ne.scientific_name
+        FROM species_park_counts c
+        JOIN vegetal_elements ve ON ve.element_id = c.element_id
+        JOIN natural_elements ne ON ne.id = c.element_id
+        WHERE c.park_count >= (SELECT COUNT(*)/2 FROM parks)
+    """),
+    'ar3': ("""
+        SELECT ne.scientific_name
+        FROM natural_elements ne
+        JOIN area_elements ae ON ne.id = ae.element_id
+        GROUP BY ne.id, ne.scientific_name
+        HAVING COUNT(DISTINCT ae.park_id) = (SELECT COUNT(*) FROM parks)
+    """, """
+        SELECT ne.scientific_name
+        FROM species_park_counts c
+        JOIN natural_elements ne ON ne.id = c.element_id
+        WHERE c.park_count = (SELECT COUNT(*) FROM parks)
+    """),
+    'ar4': ("""
+        SELECT ne.scientific_name
+        FROM natural_elements ne
+        JOIN area_elements ae ON ne.id = ae.element_id
+        GROUP BY ne.id, ne.scientific_name
+        HAVING COUNT(DISTINCT ae.park_id) = 1
+    """, """
+        SELECT ne.scientific_name
+        FROM species_park_counts c
+        JOIN natural_elements ne ON ne.id = c.element_id
+        WHERE c.park_count = 1
+    """),
+}
+
+_DRIFT = {
+    'species_park_counts': """
+        SELECT element_id, NULL AS park_id, SUM(stored) AS stored, SUM(actual) AS actual
+        FROM (
+            SELECT element_id, park_count AS stored, 0 AS actual FROM species_park_counts
+            UNION ALL
+            SELECT element_id, 0, COUNT(DISTINCT park_id) FROM area_elements GROUP BY element_id
+        ) t
+        GROUP BY element_id
+        HAVING SUM(stored) <> SUM(actual)
+    """,
+    'species_park_areas': """
+        SELECT element_id, park_id, SUM(stored) AS stored, SUM(actual) AS actual
+        FROM (
+            SELECT element_id, park_id, area_count AS stored, 0 AS actual FROM species_park_areas
+            UNION ALL
+            SELECT element_id, park_id, 0, COUNT(*) FROM area_elements GROUP BY element_id, park_id
+        ) t
+        GROUP BY element_id, park_id
+        HAVING SUM(stored) <> SUM(actual)
+    """,
+}
+
+
+def _fetch(connection, sql, args=None):
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(sql, args)
+        return list(cursor.fetchall())
+
+
+def run_query(connection, name, use_summary=True):
+    """Scientific names answering FR2 / AR3 / AR4 ('fr2', 'ar3', 'ar4')."""
+    group_by, summary = QUERIES[name]
+    return sorted(row['scientific_name'] for row in _fetch(connection, summary if use_summary else group_by))
+
+
+def areas_in_park(connection, element_id, park_id):
+    """Number of areas of a park where the element lives (0 if none)."""
+    rows = _fetch(connection, "SELECT area_count FROM species_park_areas WHERE element_id = %s AND park_id = %s",
+                  (element_id, park_id))
+    return rows[0]['area_count'] if rows else 0
+
+
+def check(connection):
+    """Rows of either summary that disagree with area_elements, tagged with their table."""
+    drift = []
+    for table, sql in _DRIFT.items():
+        drift.extend({'table': table, **row} for row in _fetch(connection, sql))
+    return drift
+
+
+def rebuild(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("CALL rebuild_species_park_counts()")
+    connection.commit()
+
+
+def time_query(connection, sql, repeat):
+    """Median wall time in milliseconds over repeat runs, and the sorted result."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            rows = cursor.fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), sorted(rows)
+
+
+def benchmark(scale_factors, repeat=5, workers=4, seed=0, connection_options=None, log=print):
+    """Compare GROUP BY and summary queries on generated data; returns a list of result dicts."""
+    connection_options = {**(connection_options or {}), 'database': BENCHMARK_DB}
+    results = []
+    for scale_factor in scale_factors:
+        work_dir = tempfile.mkdtemp(prefix='park_bench_')
+        server = db.connect(**{**connection_options, 'database': None})
+        try:
+            generator.generate(work_dir, scale_factor, seed, log=None)
+            with server.cursor() as cursor:
+                cursor.execute(f"DROP DATABASE IF EXISTS {BENCHMARK_DB}")
+            db.run_script(server, schema.SETUP_SQL, {'park_management': BENCHMARK_DB})
+            ParallelLoader(work_dir, workers, connection_options=connection_options, log=None).run()
+
+            connection = db.connect(**connection_options)
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE TABLE area_elements, species_park_counts, species_park_areas")
+                for name, (group_by, summary) in QUERIES.items():
+                    group_by_ms, expected = time_query(connection, group_by, repeat)
+                    summary_ms, actual = time_query(connection, summary, repeat)
+                    result = {'scale_factor': scale_factor, 'query': name, 'group_by_ms': round(group_by_ms, 3),
+                              'summary_ms': round(summary_ms, 3), 'rows': len(actual), 'same_result': expected == actual}
+                    results.append(result)
+                    if log:
+                        log(f"SF{scale_factor} {name}: GROUP BY {group_by_ms:.2f} ms, summary {summary_ms:.2f} ms "
+                            f"({group_by_ms / summary_ms if summary_ms else 0:.1f}x), {len(actual)} rows"
+                            f"{'' if expected == actual else ', RESULTS DIFFER'}")
+            finally:
+                connection.close()
+        finally:
+            with server.cursor() as cursor:
+                cursor.execute(f"DROP DATABASE IF EXISTS {BENCHMARK_DB}")
+            server.close()
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query, check, rebuild or benchmark the species_park_counts summary.")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--query', choices=sorted(QUERIES), help="fr2: vegetal in >= half the parks, "
+                        "ar3: in every park, ar4: in exactly one park")
+    action.add_argument('--check', action='store_true', help="Compare the summaries with area_elements")
+    action.add_argument('--rebuild', action='store_true')
+    action.add_argument('--benchmark', type=float, nargs='+', metavar='SCALE_FACTOR',
+                        help=f"Generate, load (into {BENCHMARK_DB}) and time both formulations per scale factor")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--output', help="CSV file for --benchmark results")
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        results = benchmark(args.benchmark, args.repeat, args.workers, connection_options=db.connection_options(args))
+        if args.output:
+            os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+            with open(args.output, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=list(results[0]), lineterminator='\n')
+                writer.writeheader()
+                writer.writerows(results)
+        return
+
+    connection = db.connect(**db.connection_options(args))
+    try:
+        if args.query:
+            names = run_query(connection, args.query)
+            for name in names:
+                print(name)
+            print(f"{len(names)} species")
+        elif args.rebuild:
+            rebuild(connection)
+            print("species_park_counts and species_park_areas rebuilt")
+        else:
+            drift = check(connection)
+            for row in drift:
+                print(f"{row['table']}: element {row['element_id']} park {row['park_id']}: "
+                      f"stored {row['stored']}, actual {row['actual']}")
+            print(f"{len(drift)} summary rows out of date" if drift else "species summaries are consistent")
+            sys.exit(1 if drift else 0)
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
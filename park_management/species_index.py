@@ -0,0 +1,222 @@
+"""In-memory species x park presence index for the distribution queries.
+
+FR2 (vegetal species in at least half of the parks), AR3 (species in every park) and
+AR4 (species in only one park) all run COUNT(DISTINCT park_id) over the full
+area_elements join. This index keeps, per natural_elements.id, one bitset of the
+parks where the element is present (any area), plus its popcount:
+
+* every park gets a dense bit position, so a bitset is at most ceil(parks / 8) bytes
+  (a Python int; absent high parks cost nothing);
+* "in >= k parks", "in all parks" and "in exactly one park" compare cached popcounts,
+  or popcount(bits & mask) when the question is restricted to a subset of parks;
+* results can be filtered to vegetal / animal / mineral elements;
+* refresh_parks() re-reads only the given parks (a primary-key prefix range scan
+  of area_elements), e.g. the parks touched by a delta sync.
+
+Usage:
+    python -m park_management.species_index --at-least-half --kind vegetal   # FR2
+    python -m park_management.species_index --all-parks                      # AR3
+    python -m park_management.species_index --only-one                       # AR4
+"""
+import argparse
+import time
+
+import pymysql
+
+from park_management import db
+
+KINDS = {
+    'vegetal': 'vegetal_elements',
+    'animal': 'animal_elements',
+    'mineral': 'mineral_elements',
+}
+FETCH_ROWS = 100_000
+
+
+class SpeciesParkIndex:
+    """Bitset of parks per element, with cached popcounts."""
+
+    def __init__(self, park_ids=(), kinds=None):
+        self.positions = {}
+        self.all_parks = 0
+        self.bits = {}
+        self.counts = {}
+        self.kinds = {kind: set(ids) for kind, ids in (kinds or {}).items()}
+        for park_id in park_ids:
+            self.add_park(park_id)
+
+    def add_park(self, park_id):
+        if park_id not in self.positions:
+            self.positions[park_id] = len(self.positions)
+        self.all_parks |= 1 << self.positions[park_id]
+
+    def remove_park(self, park_id):
+        """Forget a deleted park; its bit position is not reused."""
+        if park_id in self.positions:
+            self._clear_park(park_id)
+            self.all_parks &= ~(1 << self.positions[park_id])
+
+    @property
+    def park_count(self):
+        return self.all_parks.bit_count()
+
+    def add_pairs(self, pairs):
+        """Mark elements as present: pairs are (park_id, element_id), duplicates allowed."""
+        for park_id, element_id in pairs:
+            if park_id not in self.positions:
+                self.add_park(park_id)
+            bit = 1 << self.positions[park_id]
+            current = self.bits.get(element_id, 0)
+            if not current & bit:
+                self.bits[element_id] = current | bit
+                self.counts[element_id] = self.counts.get(element_id, 0) + 1
+
+    def _clear_park(self, park_id):
+        bit = 1 << self.positions[park_id]
+        for element_id, current in list(self.bits.items()):
+            if current & bit:
+                self.counts[element_id] -= 1
+                if current == bit:
+                    del self.bits[element_id]
+                    del self.counts[element_id]
+                else:
+                    self.bits[element_id] = current & ~bit
+
+    def replace_park(self, park_id, element_ids):
+        """Set the elements present in one park, replacing what the index had for it."""
+        if park_id in self.positions:
+            self._clear_park(park_id)
+        self.add_pairs((park_id, element_id) for element_id in element_ids)
+
+    def mask(self, park_ids=None):
+        if park_ids is None:
+            return self.all_parks
+        result = 0
+        for park_id in park_ids:
+            if park_id in self.positions:
+                result |= 1 << self.positions[park_id]
+        return result & self.all_parks
+
+    def parks_of(self, element_id):
+        bits = self.bits.get(element_id, 0) & self.all_parks
+        return sorted(park_id for park_id, position in self.positions.items() if bits >> position & 1)
+
+    def _candidates(self, kind):
+        if kind is None:
+            return self.bits.keys()
+        return self.kinds[kind].intersection(self.bits)
+
+    def park_counts(self, kind=None, park_ids=None):
+        """{element_id: number of parks} over all parks or the given subset."""
+        candidates = self._candidates(kind)
+        if park_ids is None:
+            return {element_id: self.counts[element_id] for element_id in candidates}
+        mask = self.mask(park_ids)
+        return {element_id: (self.bits[element_id] & mask).bit_count() for element_id in candidates}
+
+    def in_at_least(self, k, kind=None, park_ids=None):
+        return sorted(element_id for element_id, count in self.park_counts(kind, park_ids).items() if count >= k)
+
+    def in_at_least_half(self, kind=None, park_ids=None):
+        """FR2: present in >= parks / 2 parks."""
+        total = self.mask(park_ids).bit_count()
+        return self.in_at_least((total + 1) // 2, kind, park_ids) if total else []
+
+    def in_all_parks(self, kind=None, park_ids=None):
+        """AR3"""
+        total = self.mask(park_ids).bit_count()
+        return self.in_at_least(total, kind, park_ids) if total else []
+
+    def in_exactly_one(self, kind=None, park_ids=None):
+        """AR4"""
+        return sorted(element_id for element_id, count in self.park_counts(kind, park_ids).items() if count == 1)
+
+    # --- loading from MySQL ---
+
+    @classmethod
+    def build(cls, connection, log=None):
+        """Build the index from parks, the element subtype tables and area_elements."""
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT id FROM parks ORDER BY id")
+            park_ids = [row[0] for row in cursor.fetchall()]
+            kinds = {}
+            for kind, table in KINDS.items():
+                cursor.execute(f"SELECT element_id FROM {table}")
+                kinds[kind] = [row[0] for row in cursor.fetchall()]
+        index = cls(park_ids, kinds)
+        # Unbuffered scan in primary-key order; no DISTINCT so the server needs no temporary table.
+        with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+            cursor.execute("SELECT park_id, element_id FROM area_elements")
+            while True:
+                rows = cursor.fetchmany(FETCH_ROWS)
+                if not rows:
+                    break
+                index.add_pairs(rows)
+        if log:
+            log(f"Indexed {len(index.bits)} elements over {index.park_count} parks "
+                f"in {time.perf_counter() - started:.2f}s")
+        return index
+
+    def refresh_parks(self, connection, park_ids):
+        """Re-read the given parks from area_elements (and drop parks that no longer exist)."""
+        with connection.cursor() as cursor:
+            for park_id in park_ids:
+                cursor.execute("SELECT 1 FROM parks WHERE id = %s", (park_id,))
+                if not cursor.fetchone():
+                    self.remove_park(park_id)
+                    continue
+                self.add_park(park_id)
+                cursor.execute("SELECT DISTINCT element_id FROM area_elements WHERE park_id = %s", (park_id,))
+                self.replace_park(park_id, [row[0] for row in cursor.fetchall()])
+
+    def refresh_kinds(self, connection):
+        with connection.cursor() as cursor:
+            for kind, table in KINDS.items():
+                cursor.execute(f"SELECT element_id FROM {table}")
+                self.kinds[kind] = {row[0] for row in cursor.fetchall()}
+
+
+def scientific_names(connection, element_ids):
+    if not element_ids:
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT id, scientific_name FROM natural_elements "
+                       f"WHERE id IN ({', '.join(['%s'] * len(element_ids))})", tuple(element_ids))
+        return dict(cursor.fetchall())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer species distribution queries from a park bitset index.")
+    query = parser.add_mutually_exclusive_group(required=True)
+    query.add_argument('--min-parks', type=int, help="Species present in at least this many parks")
+    query.add_argument('--at-least-half', action='store_true', help="FR2: species in at least half of the parks")
+    query.add_argument('--all-parks', action='store_true', help="AR3: species in every park")
+    query.add_argument('--only-one', action='store_true', help="AR4: species in exactly one park")
+    parser.add_argument('--kind', choices=sorted(KINDS))
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    connection = db.connect(**db.connection_options(args))
+    try:
+        index = SpeciesParkIndex.build(connection, log=print)
+        started = time.perf_counter()
+        if args.min_parks is not None:
+            element_ids = index.in_at_least(args.min_parks, args.kind)
+        elif args.at_least_half:
+            element_ids = index.in_at_least_half(args.kind)
+        elif args.all_parks:
+            element_ids = index.in_all_parks(args.kind)
+        else:
+            element_ids = index.in_exactly_one(args.kind)
+        elapsed = time.perf_counter() - started
+        names = scientific_names(connection, element_ids)
+    finally:
+        connection.close()
+    for element_id in element_ids:
+        print(f"{names.get(element_id)}\t{index.counts[element_id]} parks")
+    print(f"{len(element_ids)} species ({elapsed * 1000:.2f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,360 @@
+"""Per-trigger overhead of the DML that the census and food-web loads run.
+
+The workload runs against a shadow copy of a database: <database>_trigger_profile,
+created from sql/setup.sql and filled with the source data while every trigger is
+dropped. The CREATE statement of each trigger is kept, so a run can reinstall any set
+of triggers. Each workload is a fixed list of single-row statements on one table and
+event:
+
+* element_food_insert: re-inserting food-web edges (check_element_food_before_insert);
+* element_food_update: same-value updates of edges (check_element_food_before_update);
+* area_elements_update: one-individual decreases (species_decrease_email and the
+  history and species-count triggers).
+
+Each workload runs with no triggers, with each trigger of its table and event alone,
+and with all of them, spread over --sessions concurrent connections working on
+disjoint rows. Statement latency comes from performance_schema
+(events_statements_summary_by_digest and events_statements_histogram_by_digest),
+or from client-side timings when performance_schema is unavailable. Those tables are
+server-wide, so they are never truncated: the workload statement's digest row and
+histogram buckets are read before and after each run, and the run is their difference. Row lock waits
+come from the Innodb_row_lock_* status counters. The cost of a trigger is its run's
+mean latency minus the no-trigger run's, per row because every statement touches one
+row. Touched rows are restored, and the email_log rows written are deleted, with the
+triggers off between runs.
+
+Usage:
+    python -m park_management.trigger_profile --rows 2000 --sessions 4 --output results/triggers/profile.csv
+"""
+import argparse
+import csv
+import math
+import os
+import statistics
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+import pymysql
+
+from park_management import db, schema
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+@dataclass
+class Workload:
+    table: str
+    event: str
+    select: str       # rows (statement arguments) to work on, given a LIMIT
+    statement: str    # timed, once per row
+    prepare: str = None  # untimed, per row, before the timed statements
+    restore: str = None  # untimed, per row, after them
+
+
+WORKLOADS = {
+    'element_food_insert': Workload(
+        'element_food', 'INSERT',
+        "SELECT element_id, food_element_id FROM element_food ORDER BY element_id, food_element_id LIMIT %s",
+        "INSERT INTO element_food (element_id, food_element_id) VALUES (%s, %s)",
+        prepare="DELETE FROM element_food WHERE element_id = %s AND food_element_id = %s"),
+    'element_food_update': Workload(
+        'element_food', 'UPDATE',
+        "SELECT food_element_id, element_id, food_element_id FROM element_food "
+        "ORDER BY element_id, food_element_id LIMIT %s",
+        "UPDATE element_food SET food_element_id = %s WHERE element_id = %s AND food_element_id = %s"),
+    'area_elements_update': Workload(
+        'area_elements', 'UPDATE',
+        "SELECT park_id, area_number, element_id FROM area_elements WHERE number_of_individuals > 0 "
+        "ORDER BY park_id, area_number, element_id LIMIT %s",
+        "UPDATE area_elements SET number_of_individuals = number_of_individuals - 1 "
+        "WHERE park_id = %s AND area_number = %s AND element_id = %s",
+        restore="UPDATE area_elements SET number_of_individuals = number_of_individuals + 1 "
+                "WHERE park_id = %s AND area_number = %s AND element_id = %s"),
+}
+
+
+@dataclass
+class RunStats:
+    workload: str
+    triggers: str
+    rows: int
+    seconds: float
+    mean_us: float
+    p50_us: float
+    p95_us: float
+    p99_us: float
+    lock_time_us: float
+    row_lock_waits: int
+    row_lock_time_ms: int
+    latency_source: str
+
+
+@dataclass
+class DigestSnapshot:
+    count: int
+    wait_ps: int
+    lock_ps: int
+    buckets: list  # (bucket upper bound in ps, statements in that bucket), by bucket number
+
+
+def percentiles(values, quantiles=QUANTILES):
+    """Nearest-rank percentiles of a list of numbers."""
+    ordered = sorted(values)
+    if not ordered:
+        return [0.0] * len(quantiles)
+    return [ordered[max(0, math.ceil(q * len(ordered)) - 1)] for q in quantiles]
+
+
+def histogram_percentiles(buckets, quantiles=QUANTILES):
+    """Percentiles from (bucket upper bound, count at or below it) rows of a performance_schema histogram."""
+    total = buckets[-1][1] if buckets else 0
+    if not total:
+        return [0.0] * len(quantiles)
+    result = []
+    for q in quantiles:
+        result.append(next(high for high, cumulative in buckets if cumulative >= q * total))
+    return result
+
+
+def digest_delta(before, after):
+    """(count, mean µs, percentiles µs, lock time µs) of the statements run between two DigestSnapshots, or None."""
+    count = after.count - before.count
+    if count <= 0:
+        return None
+    earlier = dict(before.buckets)
+    cumulative, buckets = 0, []
+    for high, bucket_count in after.buckets:
+        cumulative += bucket_count - earlier.get(high, 0)
+        buckets.append((high / 1e6, cumulative))
+    return (count, (after.wait_ps - before.wait_ps) / 1e6 / count, histogram_percentiles(buckets),
+            (after.lock_ps - before.lock_ps) / 1e6)
+
+
+def trigger_costs(runs):
+    """{(workload, trigger): added microseconds per row} from the runs of each workload."""
+    baseline = {run.workload: run.mean_us for run in runs if run.triggers == ''}
+    return {(run.workload, run.triggers): run.mean_us - baseline[run.workload]
+            for run in runs if run.triggers and run.workload in baseline}
+
+
+class TriggerProfiler:
+    """Shadow schema with removable triggers, and timed workload runs on it."""
+
+    def __init__(self, source, connection_options=None, sessions=1, log=print):
+        self.source = source
+        self.shadow = f"{source}_trigger_profile"
+        self.connection_options = {**(connection_options or {}), 'database': self.shadow}
+        self.sessions = sessions
+        self.log = log
+        self.definitions = {}  # trigger -> (table, event, CREATE statement)
+        self.installed = set()
+
+    def _connect(self, database=None):
+        return db.connect(**{**self.connection_options, 'database': database or self.shadow})
+
+    def create_shadow(self):
+        """Create the shadow schema from setup.sql, drop its triggers and copy the source data."""
+        server = self._connect(self.source)
+        try:
+            with server.cursor() as cursor:
+                cursor.execute(f"DROP DATABASE IF EXISTS {self.shadow}")
+            db.run_script(server, schema.SETUP_SQL, {'park_management': self.shadow})
+            with server.cursor() as cursor:
+                cursor.execute("""
+                    SELECT trigger_name, event_object_table, event_manipulation
+                    FROM information_schema.triggers WHERE trigger_schema = %s ORDER BY trigger_name
+                """, (self.shadow,))
+                for name, table, event in cursor.fetchall():
+                    cursor.execute(f"SHOW CREATE TRIGGER {self.shadow}.{name}")
+                    self.definitions[name] = (table, event, cursor.fetchone()[2])
+                    cursor.execute(f"DROP TRIGGER {self.shadow}.{name}")
+                cursor.execute("SET FOREIGN_KEY_CHECKS=0")
+                for name, table in schema.parse_schema().items():
+                    if name == 'email_log':
+                        continue  # only the alerts written by the runs, which delete them again
+                    columns = ', '.join(table.column_names)
+                    cursor.execute(f"INSERT INTO {self.shadow}.{name} ({columns}) "
+                                   f"SELECT {columns} FROM {self.source}.{name}")
+                cursor.execute("SET FOREIGN_KEY_CHECKS=1")
+            server.commit()
+        finally:
+            server.close()
+
+    def drop_shadow(self):
+        server = self._connect(self.source)
+        try:
+            with server.cursor() as cursor:
+                cursor.execute(f"DROP DATABASE IF EXISTS {self.shadow}")
+        finally:
+            server.close()
+
+    def triggers_for(self, workload):
+        return sorted(name for name, (table, event, _) in self.definitions.items()
+                      if table == workload.table and event == workload.event)
+
+    def install(self, connection, names):
+        """Leave exactly the given triggers installed on the shadow schema."""
+        with connection.cursor() as cursor:
+            for name in sorted(self.installed - set(names)):
+                cursor.execute(f"DROP TRIGGER {name}")
+            for name in sorted(set(names) - self.installed):
+                cursor.execute(self.definitions[name][2])
+        self.installed = set(names)
+
+    def _run_session(self, statement, rows, latencies, errors):
+        connection = self._connect()
+        try:
+            with connection.cursor() as cursor:
+                for args in rows:
+                    started = time.perf_counter()
+                    cursor.execute(statement, args)
+                    connection.commit()
+                    latencies.append((time.perf_counter() - started) * 1e6)
+        except pymysql.MySQLError as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    def _digest(self, cursor, statement, args):
+        """The performance_schema digest of statement, or None when it is unavailable."""
+        try:
+            cursor.execute("SELECT STATEMENT_DIGEST(%s)", (cursor.mogrify(statement, args),))
+            return cursor.fetchone()[0]
+        except pymysql.MySQLError:
+            return None
+
+    def _digest_snapshot(self, cursor, digest):
+        """DigestSnapshot of the digest in the shadow schema (zero before its first run), or None."""
+        try:
+            cursor.execute("""
+                SELECT COUNT_STAR, SUM_TIMER_WAIT, SUM_LOCK_TIME
+                FROM performance_schema.events_statements_summary_by_digest
+                WHERE SCHEMA_NAME = %s AND DIGEST = %s
+            """, (self.shadow, digest))
+            row = cursor.fetchone() or (0, 0, 0)
+            cursor.execute("""
+                SELECT BUCKET_TIMER_HIGH, COUNT_BUCKET
+                FROM performance_schema.events_statements_histogram_by_digest
+                WHERE SCHEMA_NAME = %s AND DIGEST = %s ORDER BY BUCKET_NUMBER
+            """, (self.shadow, digest))
+            buckets = [(high, count) for high, count in cursor.fetchall()]
+        except pymysql.MySQLError:
+            return None
+        return DigestSnapshot(*(int(value) for value in row), buckets)
+
+    def _row_lock_status(self, cursor):
+        cursor.execute("SHOW GLOBAL STATUS WHERE Variable_name IN ('Innodb_row_lock_waits', 'Innodb_row_lock_time')")
+        status = {name: int(value) for name, value in cursor.fetchall()}
+        return status.get('Innodb_row_lock_waits', 0), status.get('Innodb_row_lock_time', 0)
+
+    def run(self, name, rows, triggers):
+        """Run workload name over rows with the given triggers installed; returns RunStats."""
+        workload = WORKLOADS[name]
+        connection = self._connect()
+        try:
+            with connection.cursor() as cursor:
+                self.install(connection, [])
+                if workload.prepare:
+                    cursor.executemany(workload.prepare, rows)
+                connection.commit()
+                self.install(connection, triggers)
+                digest = self._digest(cursor, workload.statement, rows[0])
+                before = self._digest_snapshot(cursor, digest) if digest else None
+                waits_before, lock_ms_before = self._row_lock_status(cursor)
+
+                latencies, errors = [], []
+                sessions = [threading.Thread(target=self._run_session,
+                                             args=(workload.statement, rows[index::self.sessions], latencies, errors))
+                            for index in range(self.sessions)]
+                started = time.perf_counter()
+                for session in sessions:
+                    session.start()
+                for session in sessions:
+                    session.join()
+                seconds = time.perf_counter() - started
+                if errors:
+                    raise errors[0]
+
+                waits_after, lock_ms_after = self._row_lock_status(cursor)
+                after = self._digest_snapshot(cursor, digest) if before else None
+                stats = digest_delta(before, after) if after else None
+                self.install(connection, [])
+                if workload.restore:
+                    cursor.executemany(workload.restore, rows)
+                cursor.execute("DELETE FROM email_log")
+                connection.commit()
+        finally:
+            connection.close()
+
+        if stats:
+            _, mean_us, (p50, p95, p99), lock_us = stats
+            source = 'performance_schema'
+        else:
+            mean_us, (p50, p95, p99), lock_us = statistics.fmean(latencies), percentiles(latencies), 0.0
+            source = 'client'
+        return RunStats(name, '+'.join(triggers), len(rows), round(seconds, 3), round(mean_us, 1), round(p50, 1),
+                        round(p95, 1), round(p99, 1), round(lock_us, 1), waits_after - waits_before,
+                        lock_ms_after - lock_ms_before, source)
+
+    def profile(self, names, row_count, repeat=1):
+        """RunStats of every workload with no triggers, each trigger alone and all of them (median of repeat)."""
+        results = []
+        for name in names:
+            connection = self._connect()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(WORKLOADS[name].select, (row_count,))
+                    rows = [tuple(row) for row in cursor.fetchall()]
+            finally:
+                connection.close()
+            if not rows:
+                if self.log:
+                    self.log(f"{name}: no rows to work on, skipped")
+                continue
+            triggers = self.triggers_for(WORKLOADS[name])
+            configurations = [[]] + [[trigger] for trigger in triggers] + ([triggers] if len(triggers) > 1 else [])
+            for configuration in configurations:
+                runs = [self.run(name, rows, configuration) for _ in range(repeat)]
+                result = sorted(runs, key=lambda run: run.mean_us)[len(runs) // 2]
+                results.append(result)
+                if self.log:
+                    self.log(f"{name} [{result.triggers or 'no triggers'}]: {result.rows} rows in {result.seconds:.2f}s, "
+                             f"mean {result.mean_us:.0f} µs, p50/p95/p99 {result.p50_us:.0f}/{result.p95_us:.0f}/"
+                             f"{result.p99_us:.0f} µs, {result.row_lock_waits} row lock waits")
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the per-row cost of the schema's triggers.")
+    parser.add_argument('--workload', choices=sorted(WORKLOADS), nargs='+', default=sorted(WORKLOADS))
+    parser.add_argument('--rows', type=int, default=1000, help="Rows per workload")
+    parser.add_argument('--sessions', type=int, default=1, help="Concurrent connections per run")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per configuration (the median is kept)")
+    parser.add_argument('--keep-shadow', action='store_true', help="Leave the shadow schema in place")
+    parser.add_argument('--output', help="CSV file for the run statistics")
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    options = db.connection_options(args)
+    profiler = TriggerProfiler(options.pop('database'), options, args.sessions)
+    profiler.create_shadow()
+    try:
+        results = profiler.profile(args.workload, args.rows, args.repeat)
+    finally:
+        if not args.keep_shadow:
+            profiler.drop_shadow()
+
+    print("Added cost per row:")
+    for (workload, trigger), cost in trigger_costs(results).items():
+        print(f"  {workload} {trigger}: {cost:+.1f} µs")
+    if args.output and results:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(asdict(results[0])), lineterminator='\n')
+            writer.writeheader()
+            writer.writerows(asdict(result) for result in results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""Post-load integrity verifier for loads done with FOREIGN_KEY_CHECKS=0.
+
+populate_data.sql, the parallel loader and the INSERT ingest all disable FK checks,
+and LOAD DATA never fires the element_food triggers' checks on rows that break them
+in bulk. This tool pulls only the key columns of every table into NumPy int64 arrays
+and verifies, with sorted-array joins (np.sort + np.searchsorted) instead of per-row
+lookups in MySQL:
+
+* every FOREIGN KEY in sql/setup.sql (rows with a NULL in the FK are skipped, as in MySQL);
+* the check_element_food_before_* rules: a mineral is never food and a vegetal never eats.
+
+Parent key arrays are sorted once and reused by every FK that references them.
+Exits with status 1 when a violation is found.
+
+Usage:
+    python -m park_management.verify [--samples 5] [--tables area_elements element_food]
+"""
+import argparse
+import sys
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pymysql
+
+from park_management import db, schema
+
+FETCH_ROWS = 100_000
+NULL_KEY = np.iinfo(np.int64).min
+
+
+@dataclass
+class Violation:
+    check: str
+    table: str
+    columns: tuple
+    count: int
+    samples: list = field(default_factory=list)
+
+    def __str__(self):
+        return f"{self.check}: {self.count} rows of {self.table}({', '.join(self.columns)}); e.g. {self.samples}"
+
+
+def rows_to_array(rows, width):
+    """(n, width) int64 array from DB rows; NULL becomes NULL_KEY."""
+    if not rows:
+        return np.empty((0, width), dtype=np.int64)
+    block = np.array(rows, dtype=object).reshape(len(rows), width)
+    block[block == None] = NULL_KEY  # noqa: E711 - elementwise comparison
+    return block.astype(np.int64)
+
+
+def fetch_int_columns(connection, table, columns, fetch_rows=FETCH_ROWS):
+    """Integer columns of a table as an (n, len(columns)) int64 array, streamed in blocks."""
+    blocks = []
+    with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute(f"SELECT {', '.join(columns)} FROM {table}")
+        while True:
+            rows = cursor.fetchmany(fetch_rows)
+            if not rows:
+                break
+            blocks.append(rows_to_array(rows, len(columns)))
+    if not blocks:
+        return np.empty((0, len(columns)), dtype=np.int64)
+    return np.concatenate(blocks)
+
+
+def pack_keys(keys):
+    """One comparable value per row: the column itself, two INTs packed into an int64, or a void view."""
+    if keys.shape[1] == 1:
+        return keys[:, 0]
+    if keys.shape[1] == 2:
+        return (keys[:, 0] << 32) | (keys[:, 1] & 0xFFFFFFFF)
+    keys = np.ascontiguousarray(keys)
+    return keys.view(np.dtype((np.void, keys.dtype.itemsize * keys.shape[1])))[:, 0]
+
+
+def missing_keys(child, sorted_parent):
+    """Boolean mask of child values absent from the sorted parent array."""
+    if len(sorted_parent) == 0:
+        return np.ones(len(child), dtype=bool)
+    positions = np.searchsorted(sorted_parent, child)
+    positions[positions == len(sorted_parent)] = 0
+    return sorted_parent[positions] != child
+
+
+class Verifier:
+    """Checks FKs and element_food rules on a loaded database."""
+
+    def __init__(self, connection, tables=None, samples=5, fetch_rows=FETCH_ROWS, log=print):
+        self.connection = connection
+        self.samples = samples
+        self.fetch_rows = fetch_rows
+        self.log = log
+        self.schema = schema.parse_schema()
+        self.tables = [name for name in self.schema if not tables or name in tables]
+        self._sorted = {}
+
+    def fetch(self, table, columns):
+        return fetch_int_columns(self.connection, table, columns, self.fetch_rows)
+
+    def sorted_keys(self, table, columns):
+        """Sorted, de-duplicated packed keys of a parent table (cached)."""
+        cache_key = (table, tuple(columns))
+        if cache_key not in self._sorted:
+            self._sorted[cache_key] = np.unique(pack_keys(self.fetch(table, columns)))
+        return self._sorted[cache_key]
+
+    def _violation(self, check, table, columns, keys, mask):
+        count = int(mask.sum())
+        if not count:
+            return None
+        samples = [tuple(int(value) for value in row) for row in keys[mask][:self.samples]]
+        return Violation(check, table, tuple(columns), count, samples)
+
+    def check_foreign_key(self, table, fk):
+        keys = self.fetch(table, fk.columns)
+        keys = keys[(keys != NULL_KEY).all(axis=1)]
+        parent = self.sorted_keys(fk.ref_table, fk.ref_columns)
+        mask = missing_keys(pack_keys(keys), parent)
+        return self._violation(f"FK -> {fk.ref_table}({', '.join(fk.ref_columns)})", table, fk.columns, keys, mask)
+
+    def check_element_food(self):
+        """The rules of check_element_food_before_insert/_update."""
+        keys = self.fetch('element_food', ('element_id', 'food_element_id'))
+        minerals = self.sorted_keys('mineral_elements', ('element_id',))
+        vegetals = self.sorted_keys('vegetal_elements', ('element_id',))
+        return [
+            self._violation('mineral used as food', 'element_food', ('element_id', 'food_element_id'),
+                            keys, ~missing_keys(keys[:, 1], minerals)),
+            self._violation('vegetal feeding on an element', 'element_food', ('element_id', 'food_element_id'),
+                            keys, ~missing_keys(keys[:, 0], vegetals)),
+        ]
+
+    def run(self):
+        """Run every check; returns the list of Violations (empty when the data is consistent)."""
+        violations = []
+        for name in self.tables:
+            for fk in self.schema[name].foreign_keys:
+                started = time.perf_counter()
+                violation = self.check_foreign_key(name, fk)
+                if self.log:
+                    self.log(f"{name}({', '.join(fk.columns)}) -> {fk.ref_table}: "
+                             f"{violation.count if violation else 0} orphans ({time.perf_counter() - started:.2f}s)")
+                violations.append(violation)
+        if 'element_food' in self.tables:
+            violations.extend(self.check_element_food())
+        return [violation for violation in violations if violation]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify FKs and element_food rules after an unchecked bulk load.")
+    parser.add_argument('--tables', nargs='*', help="Only check FKs declared on these tables")
+    parser.add_argument('--samples', type=int, default=5, help="Offending keys to print per violation")
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    connection = db.connect(**db.connection_options(args))
+    try:
+        violations = Verifier(connection, args.tables, args.samples).run()
+    finally:
+        connection.close()
+    for violation in violations:
+        print(violation)
+    print(f"{len(violations)} violated checks" if violations else "No integrity violations found")
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == '__main__':
+    main()
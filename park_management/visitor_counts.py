@@ -0,0 +1,109 @@
+"""Visitor counts per park from the sharded park_visitor_counts table.
+
+FR3 counts visitors in parks with given codes. Instead of joining all of visitors,
+setup.sql keeps 16 counter rows per park (shard = visitor id % 16) current with
+triggers on visitors, so concurrent registrations in the same park rarely wait on
+each other's row locks. A park's count is the sum of its shards: a lookup on the
+parks.code unique index plus a 16-row primary-key range per park.
+
+Usage:
+    python -m park_management.visitor_counts A B      # visitors in parks with codes A and B
+    python -m park_management.visitor_counts --check
+    python -m park_management.visitor_counts --rebuild
+"""
+import argparse
+import sys
+
+import pymysql
+
+from park_management import db
+
+SHARDS = 16  # must match the "% 16" in the setup.sql triggers
+
+_DRIFT = """
+    SELECT park_id, SUM(stored) AS stored, SUM(actual) AS actual
+    FROM (
+        SELECT park_id, visitor_count AS stored, 0 AS actual FROM park_visitor_counts
+        UNION ALL
+        SELECT park_id, 0, COUNT(*) FROM visitors WHERE park_id IS NOT NULL GROUP BY park_id
+    ) t
+    GROUP BY park_id
+    HAVING SUM(stored) <> SUM(actual)
+"""
+
+
+def _fetch(connection, sql, args=None):
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(sql, args)
+        return list(cursor.fetchall())
+
+
+def visitors_in_parks(connection, codes):
+    """FR3: total visitors registered in the parks with the given codes."""
+    codes = list(codes)
+    if not codes:
+        return 0
+    rows = _fetch(connection, f"""
+        SELECT COALESCE(SUM(c.visitor_count), 0) AS visitor_count
+        FROM parks p
+        JOIN park_visitor_counts c ON c.park_id = p.id
+        WHERE p.code IN ({', '.join(['%s'] * len(codes))})
+    """, codes)
+    return int(rows[0]['visitor_count'])
+
+
+def visitors_by_park(connection, codes):
+    """{park code: visitors} for the given codes (parks without visitors map to 0)."""
+    codes = list(codes)
+    if not codes:
+        return {}
+    rows = _fetch(connection, f"""
+        SELECT p.code, COALESCE(SUM(c.visitor_count), 0) AS visitor_count
+        FROM parks p
+        LEFT JOIN park_visitor_counts c ON c.park_id = p.id
+        WHERE p.code IN ({', '.join(['%s'] * len(codes))})
+        GROUP BY p.id, p.code
+    """, codes)
+    return {row['code']: int(row['visitor_count']) for row in rows}
+
+
+def check(connection):
+    """Parks whose shard total disagrees with visitors (empty list when consistent)."""
+    return _fetch(connection, _DRIFT)
+
+
+def rebuild(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("CALL rebuild_park_visitor_counts()")
+    connection.commit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Visitor counts per park from the park_visitor_counts shards.")
+    parser.add_argument('codes', nargs='*', help="Park codes to count visitors for")
+    parser.add_argument('--check', action='store_true', help="Compare the counters with visitors")
+    parser.add_argument('--rebuild', action='store_true', help="Recompute the counters from visitors")
+    db.add_connection_arguments(parser)
+    args = parser.parse_args(argv)
+
+    connection = db.connect(**db.connection_options(args))
+    try:
+        if args.rebuild:
+            rebuild(connection)
+            print("park_visitor_counts rebuilt")
+        if args.check:
+            drift = check(connection)
+            for row in drift:
+                print(f"park {row['park_id']}: stored {row['stored']}, actual {row['actual']}")
+            print(f"{len(drift)} parks out of date" if drift else "park_visitor_counts is consistent")
+            sys.exit(1 if drift else 0)
+        if args.codes:
+            for code, count in sorted(visitors_by_park(connection, args.codes).items()):
+                print(f"{code}: {count}")
+            print(f"Total: {visitors_in_parks(connection, args.codes)}")
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -22,9 +22,9 @@ echo -e "${YELLOW}Starting data import process...${NC}"
 mkdir -p data/import
 echo -e "${GREEN}✓ Created data/import directory${NC}"
 
-# Run the Python parser script
+# Run the Python parser script; --publish copies the tables populate_data.sql loads into data/load
 echo -e "${YELLOW}Parsing CSV files...${NC}"
-python3 data/import/parse_csv_data.py
+python3 data/import/parse_csv_data.py --publish
 if [ $? -eq 0 ]; then
     echo -e "${GREEN}✓ CSV files parsed successfully${NC}"
 else
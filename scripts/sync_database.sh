@@ -0,0 +1,34 @@
+#!/bin/bash
+
+# Script to apply only the changes in data/load/*.csv to an already populated database,
+# instead of teardown + setup + populate.
+# The first time (right after populate_database.sh) it records the loaded files as the
+# baseline; later runs insert, update and delete only the rows that changed.
+# This script can be run from any directory within the project.
+
+# Determine the project root directory based on the script's location
+SCRIPT_DIR=$( cd -- "$( dirname -- "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )
+PROJECT_ROOT=$( cd -- "$SCRIPT_DIR/.." &> /dev/null && pwd )
+
+# Define MySQL connection details (adjust if necessary)
+MYSQL_USER="root"
+DATABASE="park_management"
+STATE_DIR="$PROJECT_ROOT/data/.sync_state/$DATABASE"
+
+cd "$PROJECT_ROOT" || { echo "ERROR: Failed to change directory to $PROJECT_ROOT"; exit 1; }
+
+if [ ! -f "$STATE_DIR/state.json" ]; then
+  echo "No sync state found; recording data/load as the loaded baseline..."
+  python -m park_management.delta --baseline --user "$MYSQL_USER" --database "$DATABASE"
+  exit $?
+fi
+
+echo "Applying data/load changes since the last sync..."
+python -m park_management.delta --user "$MYSQL_USER" --database "$DATABASE"
+if [ $? -ne 0 ]; then
+  echo "ERROR: Delta sync failed; the database was left unchanged."
+  exit 1
+fi
+echo "Delta sync successful."
+
+exit 0
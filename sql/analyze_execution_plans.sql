@@ -2,31 +2,40 @@
 -- Outputs results to files for better analysis
 USE park_management;
 
--- Create indexes for better query performance
-CREATE INDEX idx_park_provinces_province_id ON park_provinces(province_id);
-CREATE INDEX idx_area_elements_element_id ON area_elements(element_id);
-CREATE INDEX idx_area_elements_park_id ON area_elements(park_id);
-CREATE INDEX idx_natural_elements_scientific_name ON natural_elements(scientific_name);
-CREATE INDEX idx_parks_code ON parks(code);
-CREATE INDEX idx_visitors_park_id ON visitors(park_id);
+-- Create indexes for better query performance: the baseline profile of
+-- park_management/index_profiles.py (ensure_index skips indexes that already exist)
+CALL ensure_index('park_provinces', 'idx_park_provinces_province_id', 'province_id');
+CALL ensure_index('area_elements', 'idx_area_elements_element_id', 'element_id');
+CALL ensure_index('area_elements', 'idx_area_elements_park_id', 'park_id');
+CALL ensure_index('natural_elements', 'idx_natural_elements_scientific_name', 'scientific_name');
+CALL ensure_index('parks', 'idx_parks_code', 'code');
+CALL ensure_index('visitors', 'idx_visitors_park_id', 'park_id');
 
 -- =============================================
 -- FUNCTIONAL REQUIREMENT 1: Province with most parks
 -- =============================================
 SELECT '-- ANALYSIS: FUNCTIONAL REQUIREMENT 1: Province with most parks --' AS ' ';
 
--- Execution plan
+-- Execution plan (province_park_stats is kept current by triggers, see setup.sql)
 SELECT '-- Execution Plan (JSON): --' AS ' ';
 EXPLAIN FORMAT=JSON
-SELECT p.name, COUNT(pp.park_id) AS park_count
-FROM provinces p
-JOIN park_provinces pp ON p.id = pp.province_id
-GROUP BY p.id, p.name
-ORDER BY park_count DESC
+SELECT p.name, s.park_count
+FROM province_park_stats s
+JOIN provinces p ON p.id = s.province_id
+ORDER BY s.park_count DESC
 LIMIT 1;
 
 -- Actual query result
 SELECT '-- Query Result: --' AS ' ';
+SELECT p.name, s.park_count
+FROM province_park_stats s
+JOIN provinces p ON p.id = s.province_id
+ORDER BY s.park_count DESC
+LIMIT 1;
+
+-- Previous GROUP BY formulation, for comparison
+SELECT '-- Execution Plan without the summary table (JSON): --' AS ' ';
+EXPLAIN FORMAT=JSON
 SELECT p.name, COUNT(pp.park_id) AS park_count
 FROM provinces p
 JOIN park_provinces pp ON p.id = pp.province_id
@@ -59,6 +68,15 @@ JOIN area_elements ae ON ne.id = ae.element_id
 GROUP BY ne.id, ne.scientific_name
 HAVING park_count >= (SELECT COUNT(*)/2 FROM parks);
 
+-- Same question on the trigger-maintained species_park_counts summary (see setup.sql)
+SELECT '-- Execution Plan with species_park_counts (JSON): --' AS ' ';
+EXPLAIN FORMAT=JSON
+SELECT ne.scientific_name, c.park_count
+FROM species_park_counts c
+JOIN vegetal_elements ve ON ve.element_id = c.element_id
+JOIN natural_elements ne ON ne.id = c.element_id
+WHERE c.park_count >= (SELECT COUNT(*)/2 FROM parks);
+
 -- =============================================
 -- FUNCTIONAL REQUIREMENT 3: Count visitors in parks with codes A and B
 -- =============================================
@@ -79,6 +97,14 @@ FROM visitors v
 JOIN parks p ON v.park_id = p.id
 WHERE p.code IN ('A', 'B');
 
+-- Same question on the trigger-maintained park_visitor_counts shards (see setup.sql)
+SELECT '-- Execution Plan with park_visitor_counts (JSON): --' AS ' ';
+EXPLAIN FORMAT=JSON
+SELECT COALESCE(SUM(c.visitor_count), 0) AS visitor_count
+FROM parks p
+JOIN park_visitor_counts c ON c.park_id = p.id
+WHERE p.code IN ('A', 'B');
+
 -- =============================================
 -- ADDITIONAL REQUIREMENT 3: Species in all parks
 -- =============================================
@@ -102,6 +128,14 @@ JOIN area_elements ae ON ne.id = ae.element_id
 GROUP BY ne.id, ne.scientific_name
 HAVING COUNT(DISTINCT ae.park_id) = (SELECT COUNT(*) FROM parks);
 
+-- Same question on the trigger-maintained species_park_counts summary (see setup.sql)
+SELECT '-- Execution Plan with species_park_counts (JSON): --' AS ' ';
+EXPLAIN FORMAT=JSON
+SELECT ne.scientific_name
+FROM species_park_counts c
+JOIN natural_elements ne ON ne.id = c.element_id
+WHERE c.park_count = (SELECT COUNT(*) FROM parks);
+
 -- =============================================
 -- ADDITIONAL REQUIREMENT 4: Species in only one park
 -- =============================================
@@ -124,6 +158,51 @@ JOIN area_elements ae ON ne.id = ae.element_id
 GROUP BY ne.id, ne.scientific_name
 HAVING COUNT(DISTINCT ae.park_id) = 1;
 
+-- Same question on the trigger-maintained species_park_counts summary (see setup.sql)
+SELECT '-- Execution Plan with species_park_counts (JSON): --' AS ' ';
+EXPLAIN FORMAT=JSON
+SELECT ne.scientific_name
+FROM species_park_counts c
+JOIN natural_elements ne ON ne.id = c.element_id
+WHERE c.park_count = 1;
+
+-- =============================================
+-- Population trend of one species in one park (population_history)
+-- =============================================
+SELECT '-- ANALYSIS: Population trend of element 1 in park 1 --' AS ' ';
+
+-- Daily census rows of the last five years: a primary-key range on the pruned partitions
+SELECT '-- Execution Plan (JSON): --' AS ' ';
+EXPLAIN FORMAT=JSON
+SELECT census_day, area_number, individuals
+FROM population_history
+WHERE park_id = 1 AND element_id = 1
+  AND census_day BETWEEN DATEDIFF(CURRENT_DATE - INTERVAL 5 YEAR, '2000-01-01') AND DATEDIFF(CURRENT_DATE, '2000-01-01')
+ORDER BY census_day, area_number;
+
+-- Monthly rollup used for month and year resolution
+SELECT '-- Execution Plan with population_monthly (JSON): --' AS ' ';
+EXPLAIN FORMAT=JSON
+SELECT month_index, area_number, last_count
+FROM population_monthly
+WHERE park_id = 1 AND element_id = 1
+  AND month_index >= (YEAR(CURRENT_DATE) - 2005) * 12 + MONTH(CURRENT_DATE) - 1
+ORDER BY month_index, area_number;
+
+-- =============================================
+-- Latest decrease alerts of one species in one park (email_log, FR4)
+-- =============================================
+SELECT '-- ANALYSIS: Latest email_log alerts of element 1 in park 1 --' AS ' ';
+
+-- idx_email_log_park_element covers the filter, the order and the selected counts
+SELECT '-- Execution Plan (JSON): --' AS ' ';
+EXPLAIN FORMAT=JSON
+SELECT old_count, new_count, log_timestamp
+FROM email_log
+WHERE park_id = 1 AND element_id = 1
+ORDER BY log_timestamp DESC
+LIMIT 10;
+
 -- =============================================
 -- Summary of indexes created
 -- =============================================
@@ -1,5 +1,7 @@
 -- Script to analyze table sizes in the park_management database
 -- Outputs results to files for better analysis
+-- These are the sizes of the loaded data only; park_management/size_model.py projects
+-- data and index sizes for other row counts, calibrated against measured loads.
 USE park_management;
 
 -- Get table sizes in MB
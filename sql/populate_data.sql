@@ -7,6 +7,9 @@ USE park_management;
 -- Disable foreign key checks for bulk loading
 SET FOREIGN_KEY_CHECKS=0;
 
+-- Skip the summary-table triggers row by row; the summaries are rebuilt at the end
+SET @skip_summary_triggers = 1;
+
 -- =============================================
 -- LOAD DATA INTO TABLES
 -- =============================================
@@ -182,5 +185,14 @@ IGNORE 1 ROWS
 -- Re-enable foreign key checks
 SET FOREIGN_KEY_CHECKS=1;
 
+-- Rebuild the trigger-maintained summary tables and re-enable their triggers
+CALL rebuild_province_park_stats();
+CALL rebuild_species_park_counts();
+CALL rebuild_park_visitor_counts();
+SET @skip_summary_triggers = NULL;
+
+-- The loaded counts are the first census in population_history
+CALL record_population_census(CURRENT_DATE);
+
 -- Clean up temporary function if it exists from previous INSERT version
 DROP FUNCTION IF EXISTS random_individuals;
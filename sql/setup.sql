@@ -7,7 +7,43 @@ USE park_management;
 -- Drop existing triggers to avoid errors on re-run
 DROP TRIGGER IF EXISTS check_element_food_before_insert;
 DROP TRIGGER IF EXISTS check_element_food_before_update;
+DROP TRIGGER IF EXISTS vegetal_elements_kind_after_insert;
+DROP TRIGGER IF EXISTS vegetal_elements_kind_after_update;
+DROP TRIGGER IF EXISTS vegetal_elements_kind_after_delete;
+DROP TRIGGER IF EXISTS animal_elements_kind_after_insert;
+DROP TRIGGER IF EXISTS animal_elements_kind_after_update;
+DROP TRIGGER IF EXISTS animal_elements_kind_after_delete;
+DROP TRIGGER IF EXISTS mineral_elements_kind_after_insert;
+DROP TRIGGER IF EXISTS mineral_elements_kind_after_update;
+DROP TRIGGER IF EXISTS mineral_elements_kind_after_delete;
+DROP PROCEDURE IF EXISTS rebuild_element_kinds;
+DROP PROCEDURE IF EXISTS add_element_kind_column;
 DROP TRIGGER IF EXISTS species_decrease_email;
+DROP TRIGGER IF EXISTS park_provinces_stats_after_insert;
+DROP TRIGGER IF EXISTS park_provinces_stats_after_update;
+DROP TRIGGER IF EXISTS park_provinces_stats_after_delete;
+DROP TRIGGER IF EXISTS parks_stats_before_delete;
+DROP PROCEDURE IF EXISTS rebuild_province_park_stats;
+DROP TRIGGER IF EXISTS area_elements_species_counts_after_insert;
+DROP TRIGGER IF EXISTS area_elements_species_counts_after_update;
+DROP TRIGGER IF EXISTS area_elements_species_counts_after_delete;
+DROP TRIGGER IF EXISTS park_areas_species_counts_before_delete;
+DROP TRIGGER IF EXISTS parks_species_counts_before_delete;
+DROP PROCEDURE IF EXISTS species_park_counts_add;
+DROP PROCEDURE IF EXISTS species_park_counts_remove;
+DROP PROCEDURE IF EXISTS rebuild_species_park_counts;
+DROP TRIGGER IF EXISTS visitors_counts_after_insert;
+DROP TRIGGER IF EXISTS visitors_counts_after_update;
+DROP TRIGGER IF EXISTS visitors_counts_after_delete;
+DROP TRIGGER IF EXISTS parks_visitor_counts_after_insert;
+DROP PROCEDURE IF EXISTS rebuild_park_visitor_counts;
+DROP TRIGGER IF EXISTS area_elements_history_after_insert;
+DROP TRIGGER IF EXISTS area_elements_history_after_update;
+DROP PROCEDURE IF EXISTS record_population;
+DROP PROCEDURE IF EXISTS record_population_census;
+DROP PROCEDURE IF EXISTS ensure_index;
+DROP PROCEDURE IF EXISTS set_aside_email_log_v1;
+DROP PROCEDURE IF EXISTS copy_email_log_v1;
 
 -- Create tables (copied and adapted from test_database_connection.py)
 CREATE TABLE IF NOT EXISTS provinces (
@@ -43,10 +79,15 @@ CREATE TABLE IF NOT EXISTS park_areas (
     FOREIGN KEY (park_id) REFERENCES parks(id) ON DELETE CASCADE
 );
 
+-- kind records which subtype tables (vegetal_elements, animal_elements,
+-- mineral_elements) hold the element. The triggers on those tables keep it current
+-- (rebuild it with CALL rebuild_element_kinds();), so the element_food checks read one
+-- natural_elements row per element instead of probing the subtype tables.
 CREATE TABLE IF NOT EXISTS natural_elements (
     id INT AUTO_INCREMENT PRIMARY KEY,
     scientific_name VARCHAR(255) UNIQUE,
-    common_name VARCHAR(255)
+    common_name VARCHAR(255),
+    kind SET('vegetal', 'animal', 'mineral') NOT NULL DEFAULT ''
 );
 
 CREATE TABLE IF NOT EXISTS area_elements (
@@ -96,20 +137,17 @@ BEGIN
     DECLARE is_mineral INT;
     DECLARE is_vegetal INT;
 
-    -- Check if food_element_id is a mineral
-    SELECT COUNT(*) INTO is_mineral
-    FROM mineral_elements me
-    WHERE me.element_id = NEW.food_element_id;
+    -- One primary-key read of both elements: is the food a mineral, is the eater a vegetal?
+    SELECT COALESCE(MAX(id = NEW.food_element_id AND FIND_IN_SET('mineral', kind) > 0), 0),
+           COALESCE(MAX(id = NEW.element_id AND FIND_IN_SET('vegetal', kind) > 0), 0)
+    INTO is_mineral, is_vegetal
+    FROM natural_elements
+    WHERE id IN (NEW.food_element_id, NEW.element_id);
 
     IF is_mineral > 0 THEN
         SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Constraint violation: Minerals cannot be food (element_food).';
     END IF;
 
-    -- Check if element_id is a vegetal
-    SELECT COUNT(*) INTO is_vegetal
-    FROM vegetal_elements ve
-    WHERE ve.element_id = NEW.element_id;
-
     IF is_vegetal > 0 THEN
         SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Constraint violation: Vegetals cannot feed on other elements (element_food).';
     END IF;
@@ -122,27 +160,120 @@ BEGIN
     DECLARE is_mineral INT;
     DECLARE is_vegetal INT;
 
-    -- Check if food_element_id is a mineral
-    SELECT COUNT(*) INTO is_mineral
-    FROM mineral_elements me
-    WHERE me.element_id = NEW.food_element_id;
+    -- One primary-key read of both elements: is the food a mineral, is the eater a vegetal?
+    SELECT COALESCE(MAX(id = NEW.food_element_id AND FIND_IN_SET('mineral', kind) > 0), 0),
+           COALESCE(MAX(id = NEW.element_id AND FIND_IN_SET('vegetal', kind) > 0), 0)
+    INTO is_mineral, is_vegetal
+    FROM natural_elements
+    WHERE id IN (NEW.food_element_id, NEW.element_id);
 
     IF is_mineral > 0 THEN
         SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Constraint violation: Minerals cannot be food (element_food).';
     END IF;
 
-    -- Check if element_id is a vegetal
-    SELECT COUNT(*) INTO is_vegetal
-    FROM vegetal_elements ve
-    WHERE ve.element_id = NEW.element_id;
-
     IF is_vegetal > 0 THEN
         SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Constraint violation: Vegetals cannot feed on other elements (element_food).';
     END IF;
 END //
 
+-- natural_elements.kind follows the subtype tables. SET members are bits (vegetal 1,
+-- animal 2, mineral 4), so adding or removing one never touches the others. These run
+-- during bulk loads too: the element_food checks depend on them.
+CREATE TRIGGER vegetal_elements_kind_after_insert
+AFTER INSERT ON vegetal_elements
+FOR EACH ROW
+BEGIN
+    UPDATE natural_elements SET kind = kind | 1 WHERE id = NEW.element_id;
+END //
+
+CREATE TRIGGER vegetal_elements_kind_after_update
+AFTER UPDATE ON vegetal_elements
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.element_id <=> OLD.element_id) THEN
+        UPDATE natural_elements SET kind = kind & ~1 WHERE id = OLD.element_id;
+        UPDATE natural_elements SET kind = kind | 1 WHERE id = NEW.element_id;
+    END IF;
+END //
+
+CREATE TRIGGER vegetal_elements_kind_after_delete
+AFTER DELETE ON vegetal_elements
+FOR EACH ROW
+BEGIN
+    UPDATE natural_elements SET kind = kind & ~1 WHERE id = OLD.element_id;
+END //
+
+CREATE TRIGGER animal_elements_kind_after_insert
+AFTER INSERT ON animal_elements
+FOR EACH ROW
+BEGIN
+    UPDATE natural_elements SET kind = kind | 2 WHERE id = NEW.element_id;
+END //
+
+CREATE TRIGGER animal_elements_kind_after_update
+AFTER UPDATE ON animal_elements
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.element_id <=> OLD.element_id) THEN
+        UPDATE natural_elements SET kind = kind & ~2 WHERE id = OLD.element_id;
+        UPDATE natural_elements SET kind = kind | 2 WHERE id = NEW.element_id;
+    END IF;
+END //
+
+CREATE TRIGGER animal_elements_kind_after_delete
+AFTER DELETE ON animal_elements
+FOR EACH ROW
+BEGIN
+    UPDATE natural_elements SET kind = kind & ~2 WHERE id = OLD.element_id;
+END //
+
+CREATE TRIGGER mineral_elements_kind_after_insert
+AFTER INSERT ON mineral_elements
+FOR EACH ROW
+BEGIN
+    UPDATE natural_elements SET kind = kind | 4 WHERE id = NEW.element_id;
+END //
+
+CREATE TRIGGER mineral_elements_kind_after_update
+AFTER UPDATE ON mineral_elements
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.element_id <=> OLD.element_id) THEN
+        UPDATE natural_elements SET kind = kind & ~4 WHERE id = OLD.element_id;
+        UPDATE natural_elements SET kind = kind | 4 WHERE id = NEW.element_id;
+    END IF;
+END //
+
+CREATE TRIGGER mineral_elements_kind_after_delete
+AFTER DELETE ON mineral_elements
+FOR EACH ROW
+BEGIN
+    UPDATE natural_elements SET kind = kind & ~4 WHERE id = OLD.element_id;
+END //
+
+CREATE PROCEDURE rebuild_element_kinds()
+BEGIN
+    UPDATE natural_elements ne
+    SET ne.kind = IF(EXISTS (SELECT 1 FROM vegetal_elements v WHERE v.element_id = ne.id), 1, 0)
+                | IF(EXISTS (SELECT 1 FROM animal_elements a WHERE a.element_id = ne.id), 2, 0)
+                | IF(EXISTS (SELECT 1 FROM mineral_elements m WHERE m.element_id = ne.id), 4, 0);
+END //
+
+-- Databases created before kind existed keep their natural_elements table through
+-- CREATE TABLE IF NOT EXISTS, so the column is added (and filled) here.
+CREATE PROCEDURE add_element_kind_column()
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_schema = DATABASE() AND table_name = 'natural_elements' AND column_name = 'kind') THEN
+        ALTER TABLE natural_elements ADD COLUMN kind SET('vegetal', 'animal', 'mineral') NOT NULL DEFAULT '';
+        CALL rebuild_element_kinds();
+    END IF;
+END //
+
 DELIMITER ;
 
+CALL add_element_kind_column();
+
 
 CREATE TABLE IF NOT EXISTS personnel (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -235,40 +366,552 @@ CREATE TABLE IF NOT EXISTS visitor_excursions (
     FOREIGN KEY (excursion_id) REFERENCES excursions(id) ON DELETE CASCADE
 );
 
+-- Databases created before email_log v2 keep their v1 table (park_email and
+-- element_scientific_name strings) through CREATE TABLE IF NOT EXISTS, and the trigger
+-- below could not write to it. set_aside_email_log_v1 renames it to
+-- email_log_v1_unmigrated before email_log is created; copy_email_log_v1 then copies its
+-- rows with the strings resolved to ids, as already sent (v1 had no outbox), and renames
+-- it to email_log_v1. A failed copy leaves email_log_v1_unmigrated, and re-running this
+-- script retries it. python -m park_management.email_retention --migrate converts a v1
+-- table without re-running this script.
+DELIMITER //
+CREATE PROCEDURE set_aside_email_log_v1()
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.columns
+               WHERE table_schema = DATABASE() AND table_name = 'email_log' AND column_name = 'park_email') THEN
+        RENAME TABLE email_log TO email_log_v1_unmigrated;
+    END IF;
+END //
+
+CREATE PROCEDURE copy_email_log_v1()
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.tables
+               WHERE table_schema = DATABASE() AND table_name = 'email_log_v1_unmigrated') THEN
+        INSERT INTO email_log (park_id, element_id, old_count, new_count, log_timestamp, status)
+        SELECT p.id, ne.id, v1.old_count, v1.new_count, COALESCE(v1.log_timestamp, NOW()), 'sent'
+        FROM email_log_v1_unmigrated v1
+        LEFT JOIN (SELECT contact_email, MIN(id) AS id FROM parks GROUP BY contact_email) p
+          ON p.contact_email = v1.park_email
+        LEFT JOIN natural_elements ne ON ne.scientific_name = v1.element_scientific_name
+        ORDER BY v1.log_id;
+        RENAME TABLE email_log_v1_unmigrated TO email_log_v1;
+    END IF;
+END //
+DELIMITER ;
+
+CALL set_aside_email_log_v1();
+
 -- Table for Trigger Testing
+-- email_log v2: alerts store park_id and element_id (resolved to the contact email and
+-- scientific name when they are read), so the trigger needs no lookups and a row is a
+-- few dozen bytes. idx_email_log_park_element covers "latest alerts of an element in a
+-- park". The table is RANGE COLUMNS-partitioned by month of log_timestamp: retention
+-- (python -m park_management.email_retention) drops whole months instantly and adds
+-- future ones. Like population_history it has no foreign keys, which partitioned
+-- InnoDB tables do not support, and the primary key includes log_timestamp.
+-- email_log doubles as the outbox of park_management.outbox: workers claim pending
+-- rows with SELECT ... FOR UPDATE SKIP LOCKED plus a lease (claimed_until), send one
+-- digest per park and mark them sent, or schedule a retry (next_attempt_at).
+-- park_management.coalesce merges repeated pending alerts for the same park and
+-- element into one row (first old_count, last new_count, event_count decreases).
 CREATE TABLE IF NOT EXISTS email_log (
-    log_id INT AUTO_INCREMENT PRIMARY KEY,
-    park_email VARCHAR(255),
-    element_scientific_name VARCHAR(255),
+    log_id INT AUTO_INCREMENT,
+    park_id INT,
+    element_id INT,
     old_count INT,
     new_count INT,
-    log_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    log_timestamp DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    event_count SMALLINT UNSIGNED NOT NULL DEFAULT 1,
+    status ENUM('pending', 'sent', 'failed') NOT NULL DEFAULT 'pending',
+    attempts TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    next_attempt_at DATETIME,
+    claimed_until DATETIME,
+    claimed_by VARCHAR(64),
+    sent_at DATETIME,
+    last_error VARCHAR(255),
+    PRIMARY KEY (log_id, log_timestamp),
+    INDEX idx_email_log_park_element (park_id, element_id, log_timestamp, old_count, new_count),
+    INDEX idx_email_log_outbox (status, log_id)
+)
+PARTITION BY RANGE COLUMNS (log_timestamp) (
+    PARTITION p_old VALUES LESS THAN ('2025-01-01'),
+    PARTITION p202501 VALUES LESS THAN ('2025-02-01'),
+    PARTITION p202502 VALUES LESS THAN ('2025-03-01'),
+    PARTITION p202503 VALUES LESS THAN ('2025-04-01'),
+    PARTITION p202504 VALUES LESS THAN ('2025-05-01'),
+    PARTITION p202505 VALUES LESS THAN ('2025-06-01'),
+    PARTITION p202506 VALUES LESS THAN ('2025-07-01'),
+    PARTITION p202507 VALUES LESS THAN ('2025-08-01'),
+    PARTITION p202508 VALUES LESS THAN ('2025-09-01'),
+    PARTITION p202509 VALUES LESS THAN ('2025-10-01'),
+    PARTITION p202510 VALUES LESS THAN ('2025-11-01'),
+    PARTITION p202511 VALUES LESS THAN ('2025-12-01'),
+    PARTITION p202512 VALUES LESS THAN ('2026-01-01'),
+    PARTITION p202601 VALUES LESS THAN ('2026-02-01'),
+    PARTITION p202602 VALUES LESS THAN ('2026-03-01'),
+    PARTITION p202603 VALUES LESS THAN ('2026-04-01'),
+    PARTITION p202604 VALUES LESS THAN ('2026-05-01'),
+    PARTITION p202605 VALUES LESS THAN ('2026-06-01'),
+    PARTITION p202606 VALUES LESS THAN ('2026-07-01'),
+    PARTITION p202607 VALUES LESS THAN ('2026-08-01'),
+    PARTITION p202608 VALUES LESS THAN ('2026-09-01'),
+    PARTITION p202609 VALUES LESS THAN ('2026-10-01'),
+    PARTITION p202610 VALUES LESS THAN ('2026-11-01'),
+    PARTITION p202611 VALUES LESS THAN ('2026-12-01'),
+    PARTITION p202612 VALUES LESS THAN ('2027-01-01'),
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
 );
 
--- Trigger Implementation (Logging version)
+CALL copy_email_log_v1();
+
+-- Trigger Implementation (Logging version; park_management.outbox sends the logged rows)
 DELIMITER //
 CREATE TRIGGER species_decrease_email
 AFTER UPDATE ON area_elements
 FOR EACH ROW
 BEGIN
-    DECLARE park_contact_email VARCHAR(255);
-    DECLARE element_name VARCHAR(255);
+    -- Check if the number of individuals decreased. Bulk census updates
+    -- (park_management.census) SET @skip_decrease_email = 1 and log the whole batch
+    -- with one INSERT ... SELECT instead.
+    IF @skip_decrease_email IS NULL AND NEW.number_of_individuals < OLD.number_of_individuals THEN
+        -- Log the event instead of sending an email
+        INSERT INTO email_log (park_id, element_id, old_count, new_count)
+        VALUES (NEW.park_id, NEW.element_id, OLD.number_of_individuals, NEW.number_of_individuals);
+    END IF;
+END //
+DELIMITER ;
 
-    -- Check if the number of individuals decreased
-    IF NEW.number_of_individuals < OLD.number_of_individuals THEN
-        -- Get the park's contact email
-        SELECT contact_email INTO park_contact_email
-        FROM parks
-        WHERE id = NEW.park_id;
+-- Summary table for data requirement 2.b: parks and protected area per province.
+-- Kept current by the triggers below, so "parks per province" is a lookup instead of a
+-- GROUP BY over park_provinces. Rebuild it with CALL rebuild_province_park_stats();
+-- Bulk restores may SET @skip_summary_triggers = 1 and call the rebuild afterwards.
+CREATE TABLE IF NOT EXISTS province_park_stats (
+    province_id INT PRIMARY KEY,
+    park_count INT NOT NULL DEFAULT 0,
+    total_extension DECIMAL(17,2) NOT NULL DEFAULT 0,
+    INDEX idx_province_park_stats_park_count (park_count),
+    FOREIGN KEY (province_id) REFERENCES provinces(id) ON DELETE CASCADE
+);
 
-        -- Get the element's scientific name
-        SELECT scientific_name INTO element_name
-        FROM natural_elements
-        WHERE id = NEW.element_id;
+DELIMITER //
+CREATE TRIGGER park_provinces_stats_after_insert
+AFTER INSERT ON park_provinces
+FOR EACH ROW
+BEGIN
+    IF @skip_summary_triggers IS NULL THEN
+        INSERT INTO province_park_stats (province_id, park_count, total_extension)
+        VALUES (NEW.province_id, 1, COALESCE(NEW.extension_in_province, 0))
+        ON DUPLICATE KEY UPDATE
+            park_count = park_count + 1,
+            total_extension = total_extension + COALESCE(NEW.extension_in_province, 0);
+    END IF;
+END //
 
-        -- Log the event instead of sending an email
-        INSERT INTO email_log (park_email, element_scientific_name, old_count, new_count)
-        VALUES (park_contact_email, element_name, OLD.number_of_individuals, NEW.number_of_individuals);
+CREATE TRIGGER park_provinces_stats_after_update
+AFTER UPDATE ON park_provinces
+FOR EACH ROW
+BEGIN
+    IF @skip_summary_triggers IS NULL THEN
+        UPDATE province_park_stats
+        SET park_count = park_count - 1,
+            total_extension = total_extension - COALESCE(OLD.extension_in_province, 0)
+        WHERE province_id = OLD.province_id;
+
+        INSERT INTO province_park_stats (province_id, park_count, total_extension)
+        VALUES (NEW.province_id, 1, COALESCE(NEW.extension_in_province, 0))
+        ON DUPLICATE KEY UPDATE
+            park_count = park_count + 1,
+            total_extension = total_extension + COALESCE(NEW.extension_in_province, 0);
+    END IF;
+END //
+
+CREATE TRIGGER park_provinces_stats_after_delete
+AFTER DELETE ON park_provinces
+FOR EACH ROW
+BEGIN
+    IF @skip_summary_triggers IS NULL THEN
+        UPDATE province_park_stats
+        SET park_count = park_count - 1,
+            total_extension = total_extension - COALESCE(OLD.extension_in_province, 0)
+        WHERE province_id = OLD.province_id;
+    END IF;
+END //
+
+-- Rows removed from park_provinces by ON DELETE CASCADE do not fire its triggers,
+-- so deleting a park takes its share out of the summary here.
+CREATE TRIGGER parks_stats_before_delete
+BEFORE DELETE ON parks
+FOR EACH ROW
+BEGIN
+    IF @skip_summary_triggers IS NULL THEN
+        UPDATE province_park_stats s
+        JOIN park_provinces pp ON pp.province_id = s.province_id
+        SET s.park_count = s.park_count - 1,
+            s.total_extension = s.total_extension - COALESCE(pp.extension_in_province, 0)
+        WHERE pp.park_id = OLD.id;
+    END IF;
+END //
+
+CREATE PROCEDURE rebuild_province_park_stats()
+BEGIN
+    DELETE FROM province_park_stats;
+    INSERT INTO province_park_stats (province_id, park_count, total_extension)
+    SELECT province_id, COUNT(*), COALESCE(SUM(extension_in_province), 0)
+    FROM park_provinces
+    GROUP BY province_id;
+END //
+DELIMITER ;
+
+-- Summary tables for the species distribution queries (FR2, AR3, AR4).
+-- species_park_areas counts the areas of each park where an element lives;
+-- species_park_counts counts the parks, so "in >= half / all / one park" is a range
+-- scan on idx_species_park_counts_park_count instead of COUNT(DISTINCT park_id) over
+-- area_elements. Rebuild both with CALL rebuild_species_park_counts();
+CREATE TABLE IF NOT EXISTS species_park_areas (
+    element_id INT,
+    park_id INT,
+    area_count INT NOT NULL,
+    PRIMARY KEY (element_id, park_id),
+    INDEX idx_species_park_areas_park_id (park_id),
+    FOREIGN KEY (element_id) REFERENCES natural_elements(id) ON DELETE CASCADE,
+    FOREIGN KEY (park_id) REFERENCES parks(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS species_park_counts (
+    element_id INT PRIMARY KEY,
+    park_count INT NOT NULL,
+    INDEX idx_species_park_counts_park_count (park_count),
+    FOREIGN KEY (element_id) REFERENCES natural_elements(id) ON DELETE CASCADE
+);
+
+DELIMITER //
+CREATE PROCEDURE species_park_counts_add(IN p_element_id INT, IN p_park_id INT)
+BEGIN
+    INSERT INTO species_park_areas (element_id, park_id, area_count)
+    VALUES (p_element_id, p_park_id, 1)
+    ON DUPLICATE KEY UPDATE area_count = area_count + 1;
+
+    -- ROW_COUNT() is 1 for a new (element, park) pair and 2 for an existing one
+    IF ROW_COUNT() = 1 THEN
+        INSERT INTO species_park_counts (element_id, park_count)
+        VALUES (p_element_id, 1)
+        ON DUPLICATE KEY UPDATE park_count = park_count + 1;
+    END IF;
+END //
+
+CREATE PROCEDURE species_park_counts_remove(IN p_element_id INT, IN p_park_id INT)
+BEGIN
+    UPDATE species_park_areas
+    SET area_count = area_count - 1
+    WHERE element_id = p_element_id AND park_id = p_park_id;
+
+    DELETE FROM species_park_areas
+    WHERE element_id = p_element_id AND park_id = p_park_id AND area_count = 0;
+
+    IF ROW_COUNT() = 1 THEN
+        UPDATE species_park_counts
+        SET park_count = park_count - 1
+        WHERE element_id = p_element_id;
+
+        DELETE FROM species_park_counts
+        WHERE element_id = p_element_id AND park_count = 0;
+    END IF;
+END //
+
+CREATE TRIGGER area_elements_species_counts_after_insert
+AFTER INSERT ON area_elements
+FOR EACH ROW
+BEGIN
+    IF @skip_summary_triggers IS NULL THEN
+        CALL species_park_counts_add(NEW.element_id, NEW.park_id);
+    END IF;
+END //
+
+CREATE TRIGGER area_elements_species_counts_after_update
+AFTER UPDATE ON area_elements
+FOR EACH ROW
+BEGIN
+    IF @skip_summary_triggers IS NULL
+       AND (NEW.park_id <> OLD.park_id OR NEW.element_id <> OLD.element_id) THEN
+        CALL species_park_counts_remove(OLD.element_id, OLD.park_id);
+        CALL species_park_counts_add(NEW.element_id, NEW.park_id);
+    END IF;
+END //
+
+CREATE TRIGGER area_elements_species_counts_after_delete
+AFTER DELETE ON area_elements
+FOR EACH ROW
+BEGIN
+    IF @skip_summary_triggers IS NULL THEN
+        CALL species_park_counts_remove(OLD.element_id, OLD.park_id);
+    END IF;
+END //
+
+-- area_elements rows removed by ON DELETE CASCADE do not fire the triggers above,
+-- so deleting an area or a park adjusts the summaries here.
+CREATE TRIGGER park_areas_species_counts_before_delete
+BEFORE DELETE ON park_areas
+FOR EACH ROW
+BEGIN
+    IF @skip_summary_triggers IS NULL THEN
+        UPDATE species_park_areas a
+        JOIN area_elements ae ON ae.element_id = a.element_id AND ae.park_id = a.park_id
+        SET a.area_count = a.area_count - 1
+        WHERE ae.park_id = OLD.park_id AND ae.area_number = OLD.area_number;
+
+        UPDATE species_park_counts c
+        JOIN species_park_areas a ON a.element_id = c.element_id
+        SET c.park_count = c.park_count - 1
+        WHERE a.park_id = OLD.park_id AND a.area_count = 0;
+
+        DELETE FROM species_park_areas WHERE park_id = OLD.park_id AND area_count = 0;
+        DELETE FROM species_park_counts WHERE park_count = 0;
+    END IF;
+END //
+
+CREATE TRIGGER parks_species_counts_before_delete
+BEFORE DELETE ON parks
+FOR EACH ROW
+BEGIN
+    IF @skip_summary_triggers IS NULL THEN
+        UPDATE species_park_counts c
+        JOIN species_park_areas a ON a.element_id = c.element_id
+        SET c.park_count = c.park_count - 1
+        WHERE a.park_id = OLD.id;
+
+        DELETE FROM species_park_areas WHERE park_id = OLD.id;
+        DELETE FROM species_park_counts WHERE park_count = 0;
+    END IF;
+END //
+
+CREATE PROCEDURE rebuild_species_park_counts()
+BEGIN
+    DELETE FROM species_park_counts;
+    DELETE FROM species_park_areas;
+
+    INSERT INTO species_park_areas (element_id, park_id, area_count)
+    SELECT element_id, park_id, COUNT(*)
+    FROM area_elements
+    GROUP BY element_id, park_id;
+
+    INSERT INTO species_park_counts (element_id, park_count)
+    SELECT element_id, COUNT(*)
+    FROM species_park_areas
+    GROUP BY element_id;
+END //
+DELIMITER ;
+
+-- Visitors per park for FR3, kept by the triggers below. Each park has 16 counter rows
+-- (shard = visitor id % 16) so concurrent registrations in a popular park update
+-- different rows instead of queueing on one row lock; a park's count is the SUM of
+-- its shards. Rebuild with CALL rebuild_park_visitor_counts();
+CREATE TABLE IF NOT EXISTS park_visitor_counts (
+    park_id INT,
+    shard TINYINT,
+    visitor_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (park_id, shard),
+    FOREIGN KEY (park_id) REFERENCES parks(id) ON DELETE CASCADE
+);
+
+DELIMITER //
+-- Shard rows are created with the park, so registrations only ever update existing rows
+CREATE TRIGGER parks_visitor_counts_after_insert
+AFTER INSERT ON parks
+FOR EACH ROW
+BEGIN
+    IF @skip_summary_triggers IS NULL THEN
+        INSERT INTO park_visitor_counts (park_id, shard, visitor_count)
+        WITH RECURSIVE shards (shard) AS (SELECT 0 UNION ALL SELECT shard + 1 FROM shards WHERE shard < 15)
+        SELECT NEW.id, shard, 0 FROM shards;
+    END IF;
+END //
+
+CREATE TRIGGER visitors_counts_after_insert
+AFTER INSERT ON visitors
+FOR EACH ROW
+BEGIN
+    IF @skip_summary_triggers IS NULL AND NEW.park_id IS NOT NULL THEN
+        INSERT INTO park_visitor_counts (park_id, shard, visitor_count)
+        VALUES (NEW.park_id, NEW.id % 16, 1)
+        ON DUPLICATE KEY UPDATE visitor_count = visitor_count + 1;
+    END IF;
+END //
+
+CREATE TRIGGER visitors_counts_after_update
+AFTER UPDATE ON visitors
+FOR EACH ROW
+BEGIN
+    IF @skip_summary_triggers IS NULL AND NOT (NEW.park_id <=> OLD.park_id AND NEW.id = OLD.id) THEN
+        IF OLD.park_id IS NOT NULL THEN
+            UPDATE park_visitor_counts
+            SET visitor_count = visitor_count - 1
+            WHERE park_id = OLD.park_id AND shard = OLD.id % 16;
+        END IF;
+        IF NEW.park_id IS NOT NULL THEN
+            INSERT INTO park_visitor_counts (park_id, shard, visitor_count)
+            VALUES (NEW.park_id, NEW.id % 16, 1)
+            ON DUPLICATE KEY UPDATE visitor_count = visitor_count + 1;
+        END IF;
+    END IF;
+END //
+
+CREATE TRIGGER visitors_counts_after_delete
+AFTER DELETE ON visitors
+FOR EACH ROW
+BEGIN
+    IF @skip_summary_triggers IS NULL AND OLD.park_id IS NOT NULL THEN
+        UPDATE park_visitor_counts
+        SET visitor_count = visitor_count - 1
+        WHERE park_id = OLD.park_id AND shard = OLD.id % 16;
+    END IF;
+END //
+
+CREATE PROCEDURE rebuild_park_visitor_counts()
+BEGIN
+    DELETE FROM park_visitor_counts;
+
+    INSERT INTO park_visitor_counts (park_id, shard, visitor_count)
+    WITH RECURSIVE shards (shard) AS (SELECT 0 UNION ALL SELECT shard + 1 FROM shards WHERE shard < 15)
+    SELECT p.id, s.shard, 0
+    FROM parks p
+    CROSS JOIN shards s;
+
+    INSERT INTO park_visitor_counts (park_id, shard, visitor_count)
+    SELECT park_id, id % 16, COUNT(*)
+    FROM visitors
+    WHERE park_id IS NOT NULL
+    GROUP BY park_id, id % 16
+    ON DUPLICATE KEY UPDATE visitor_count = VALUES(visitor_count);
+END //
+DELIMITER ;
+
+-- Append-only census history of area_elements.number_of_individuals, which is
+-- otherwise overwritten in place. Days are stored as SMALLINT UNSIGNED days since
+-- 2000-01-01 and months as months since 2000-01, so a history row is 18 bytes of data.
+-- population_history keeps at most one row per area, element and day (the last
+-- count of the day) and is partitioned by year: a trend query only touches the
+-- partitions of its range, and old years are dropped with DROP PARTITION
+-- (python -m park_management.population --drop-before YEAR).
+-- population_monthly is the downsampled rollup (last, min and max count per area,
+-- element and month) that charts read instead of the raw rows; it is kept when
+-- raw partitions are dropped. Neither table has foreign keys (partitioned InnoDB
+-- tables cannot) because history outlives the parks and elements it describes.
+CREATE TABLE IF NOT EXISTS population_history (
+    park_id INT NOT NULL,
+    element_id INT NOT NULL,
+    census_day SMALLINT UNSIGNED NOT NULL,
+    area_number INT NOT NULL,
+    individuals INT NOT NULL,
+    PRIMARY KEY (park_id, element_id, census_day, area_number)
+)
+PARTITION BY RANGE (census_day) (
+    PARTITION p_old VALUES LESS THAN (7305),
+    PARTITION p2020 VALUES LESS THAN (7671),
+    PARTITION p2021 VALUES LESS THAN (8036),
+    PARTITION p2022 VALUES LESS THAN (8401),
+    PARTITION p2023 VALUES LESS THAN (8766),
+    PARTITION p2024 VALUES LESS THAN (9132),
+    PARTITION p2025 VALUES LESS THAN (9497),
+    PARTITION p2026 VALUES LESS THAN (9862),
+    PARTITION p2027 VALUES LESS THAN (10227),
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
+
+CREATE TABLE IF NOT EXISTS population_monthly (
+    park_id INT NOT NULL,
+    element_id INT NOT NULL,
+    month_index SMALLINT UNSIGNED NOT NULL,
+    area_number INT NOT NULL,
+    last_day SMALLINT UNSIGNED NOT NULL,
+    last_count INT NOT NULL,
+    min_count INT NOT NULL,
+    max_count INT NOT NULL,
+    PRIMARY KEY (park_id, element_id, month_index, area_number)
+);
+
+DELIMITER //
+CREATE PROCEDURE record_population(IN p_park_id INT, IN p_area_number INT, IN p_element_id INT,
+                                   IN p_individuals INT, IN p_day DATE)
+BEGIN
+    DECLARE v_day SMALLINT UNSIGNED DEFAULT DATEDIFF(p_day, '2000-01-01');
+
+    INSERT INTO population_history (park_id, element_id, census_day, area_number, individuals)
+    VALUES (p_park_id, p_element_id, v_day, p_area_number, p_individuals)
+    ON DUPLICATE KEY UPDATE individuals = VALUES(individuals);
+
+    -- Assignments run left to right: last_count compares against the old last_day
+    INSERT INTO population_monthly
+        (park_id, element_id, month_index, area_number, last_day, last_count, min_count, max_count)
+    VALUES (p_park_id, p_element_id, (YEAR(p_day) - 2000) * 12 + MONTH(p_day) - 1, p_area_number,
+            v_day, p_individuals, p_individuals, p_individuals)
+    ON DUPLICATE KEY UPDATE
+        last_count = IF(VALUES(last_day) >= last_day, VALUES(last_count), last_count),
+        last_day = GREATEST(last_day, VALUES(last_day)),
+        min_count = LEAST(min_count, VALUES(min_count)),
+        max_count = GREATEST(max_count, VALUES(max_count));
+END //
+
+CREATE TRIGGER area_elements_history_after_insert
+AFTER INSERT ON area_elements
+FOR EACH ROW
+BEGIN
+    IF @skip_summary_triggers IS NULL AND NEW.number_of_individuals IS NOT NULL THEN
+        CALL record_population(NEW.park_id, NEW.area_number, NEW.element_id, NEW.number_of_individuals, CURRENT_DATE);
+    END IF;
+END //
+
+CREATE TRIGGER area_elements_history_after_update
+AFTER UPDATE ON area_elements
+FOR EACH ROW
+BEGIN
+    IF @skip_summary_triggers IS NULL AND NEW.number_of_individuals IS NOT NULL
+       AND NOT (NEW.number_of_individuals <=> OLD.number_of_individuals
+                AND NEW.park_id = OLD.park_id AND NEW.area_number = OLD.area_number
+                AND NEW.element_id = OLD.element_id) THEN
+        CALL record_population(NEW.park_id, NEW.area_number, NEW.element_id, NEW.number_of_individuals, CURRENT_DATE);
+    END IF;
+END //
+
+-- Record the current count of every area_elements row as of p_day, e.g. as a
+-- baseline after a bulk load that skipped the triggers above.
+CREATE PROCEDURE record_population_census(IN p_day DATE)
+BEGIN
+    DECLARE v_day SMALLINT UNSIGNED DEFAULT DATEDIFF(p_day, '2000-01-01');
+    DECLARE v_month SMALLINT UNSIGNED DEFAULT (YEAR(p_day) - 2000) * 12 + MONTH(p_day) - 1;
+
+    INSERT INTO population_history (park_id, element_id, census_day, area_number, individuals)
+    SELECT park_id, element_id, v_day, area_number, number_of_individuals
+    FROM area_elements
+    WHERE number_of_individuals IS NOT NULL
+    ON DUPLICATE KEY UPDATE individuals = VALUES(individuals);
+
+    INSERT INTO population_monthly
+        (park_id, element_id, month_index, area_number, last_day, last_count, min_count, max_count)
+    SELECT park_id, element_id, v_month, area_number, v_day,
+           number_of_individuals, number_of_individuals, number_of_individuals
+    FROM area_elements
+    WHERE number_of_individuals IS NOT NULL
+    ON DUPLICATE KEY UPDATE
+        last_count = IF(VALUES(last_day) >= last_day, VALUES(last_count), last_count),
+        last_day = GREATEST(last_day, VALUES(last_day)),
+        min_count = LEAST(min_count, VALUES(min_count)),
+        max_count = GREATEST(max_count, VALUES(max_count));
+END //
+DELIMITER ;
+
+-- Add index p_index (p_columns) to p_table unless the table already has an index of
+-- that name, online (INPLACE, no lock). Lets sql/analyze_execution_plans.sql and
+-- park_management.index_profiles run more than once.
+DELIMITER //
+CREATE PROCEDURE ensure_index(IN p_table VARCHAR(64), IN p_index VARCHAR(64), IN p_columns VARCHAR(255))
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM information_schema.statistics
+                   WHERE table_schema = DATABASE() AND table_name = p_table AND index_name = p_index) THEN
+        SET @ensure_index_sql = CONCAT('ALTER TABLE `', p_table, '` ADD INDEX `', p_index, '` (', p_columns,
+                                       '), ALGORITHM=INPLACE, LOCK=NONE');
+        PREPARE ensure_index_statement FROM @ensure_index_sql;
+        EXECUTE ensure_index_statement;
+        DEALLOCATE PREPARE ensure_index_statement;
     END IF;
 END //
 DELIMITER ;
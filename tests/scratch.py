@@ -0,0 +1,46 @@
+"""Scratch schemas created from sql/setup.sql for the tests that need a MySQL server."""
+from unittest import TestCase
+
+from park_management import db, schema
+
+
+def create_scratch_db(connection, name):
+    """(Re)create database name from sql/setup.sql."""
+    drop_scratch_db(connection, name)
+    run_setup(connection, name)
+
+
+def run_setup(connection, name):
+    """Run sql/setup.sql on database name, as on an existing installation."""
+    db.run_script(connection, schema.SETUP_SQL, {'park_management': name})
+
+
+def drop_scratch_db(connection, name):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP DATABASE IF EXISTS {name};")
+
+
+class ScratchDatabaseTestCase(TestCase):
+    """Each test runs on a fresh scratch_db; self.connection has it selected."""
+
+    scratch_db = None
+
+    def setUp(self):
+        self.connection = db.connect(database=None)
+        create_scratch_db(self.connection, self.scratch_db)
+        self.connection.select_db(self.scratch_db)
+
+    def tearDown(self):
+        drop_scratch_db(self.connection, self.scratch_db)
+        self.connection.close()
+
+    def execute(self, *statements):
+        with self.connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+        self.connection.commit()
+
+    def query(self, sql):
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql)
+            return [tuple(row) for row in cursor.fetchall()]
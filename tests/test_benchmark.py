@@ -0,0 +1,66 @@
+import unittest
+from unittest import TestCase
+
+from park_management import benchmark
+from tests.scratch import ScratchDatabaseTestCase
+
+SCRATCH_DB = 'park_management_benchmark_test'
+
+
+class TestBenchmarkSuite(TestCase):
+    """Query extraction, statistics and baseline comparison; these do not need a MySQL server."""
+
+    def test_01_queries_come_from_the_analysis_script(self):
+        """Test that every requirement section yields its query and its alternative formulations"""
+        queries = benchmark.parse_queries()
+        for name in benchmark.DEFAULT_SECTIONS:
+            self.assertIn(name, queries)
+        self.assertIn('fr2:with_species_park_counts', queries)
+        self.assertTrue(queries['ar4'].startswith('SELECT ne.scientific_name'))
+        self.assertNotIn('EXPLAIN', ' '.join(queries.values()))
+
+    def test_02_summarize_and_compare(self):
+        """Test percentiles and throughput, and that only real p95 growth is a regression"""
+        result = benchmark.summarize('census_update', 'write', [0.001 * n for n in range(1, 101)], rows=10)
+        self.assertEqual((result['p50_ms'], result['p95_ms'], result['p99_ms']), (50.0, 95.0, 99.0))
+        self.assertEqual(result['throughput'], round(1000 / 5.05, 1))
+        baseline = {'results': [{'scale_factor': 0.01, 'name': 'fr1', 'p95_ms': 10.0},
+                                {'scale_factor': 0.01, 'name': 'fr2', 'p95_ms': 0.2}]}
+        results = [{'scale_factor': 0.01, 'name': 'fr1', 'p95_ms': 13.0},
+                   {'scale_factor': 0.01, 'name': 'fr2', 'p95_ms': 0.9},
+                   {'scale_factor': 0.1, 'name': 'fr1', 'p95_ms': 99.0}]
+        self.assertEqual([new['name'] for new, _ in benchmark.compare(results, baseline)], ['fr1'])
+        self.assertEqual(benchmark.compare(results, baseline, threshold=0.5), [])
+
+
+class TestRunSuite(ScratchDatabaseTestCase):
+    """The suite on a small hand-made schema."""
+
+    scratch_db = SCRATCH_DB
+
+    def setUp(self):
+        super().setUp()
+        with self.connection.cursor() as cursor:
+            for sql in ("INSERT INTO parks (id, name, declaration_date, code) VALUES (1, 'Parque A', '2020-01-01', 'A')",
+                        "INSERT INTO park_areas (park_id, area_number, name) VALUES (1, 1, 'Norte')",
+                        "INSERT INTO natural_elements (id, scientific_name) VALUES (1, 'Quercus ilex')",
+                        "INSERT INTO area_elements VALUES (1, 1, 1, 10)",
+                        "INSERT INTO excursions (id, day_of_week, time, type) VALUES (1, 'Monday', '09:00', 'foot')"):
+                cursor.execute(sql)
+        self.connection.commit()
+
+    def test_01_every_operation_is_reported(self):
+        """Test that the queries and both write paths run and are summarized"""
+        queries = {name: sql for name, sql in benchmark.parse_queries().items()
+                   if name.split(':')[0] in benchmark.DEFAULT_SECTIONS}
+        results = benchmark.run_suite(self.connection, queries, repeat=2, registrations=3, census_batches=2,
+                                      census_rows=1)
+        self.assertEqual([result['name'] for result in results], list(queries) + ['visitor_registration',
+                                                                                  'census_update'])
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT visitor_count FROM park_visitor_counts WHERE park_id = 1")
+            self.assertEqual(sum(row[0] for row in cursor.fetchall()), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
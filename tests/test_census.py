@@ -0,0 +1,76 @@
+import datetime
+import time
+import unittest
+
+from park_management import census
+from tests.scratch import ScratchDatabaseTestCase
+
+SCRATCH_DB = 'park_management_census_test'
+
+
+class TestBulkCensus(ScratchDatabaseTestCase):
+    """Set-based census updates on a scratch schema, compared with per-row UPDATEs."""
+
+    scratch_db = SCRATCH_DB
+
+    def setUp(self):
+        super().setUp()
+        self.execute("INSERT INTO parks (id, name, declaration_date, code, contact_email) VALUES "
+                     "(1, 'Parque A', '2020-01-01', 'A', 'a@example.com'), "
+                     "(2, 'Parque B', '2020-01-01', 'B', 'b@example.com')",
+                     "INSERT INTO park_areas (park_id, area_number, name) VALUES (1, 1, 'A1'), (2, 1, 'B1')",
+                     "INSERT INTO natural_elements (id, scientific_name) VALUES (1, 'Lynx pardinus'), "
+                     "(2, 'Quercus ilex'), (3, 'Aquila adalberti')",
+                     "INSERT INTO area_elements VALUES (1, 1, 1, 10), (1, 1, 2, 50), (1, 1, 3, 4), "
+                     "(2, 1, 1, 10), (2, 1, 2, 50), (2, 1, 3, 4)")
+
+    def test_01_same_log_as_the_trigger(self):
+        """Test that a bulk census writes the same email_log rows and history as per-row UPDATEs"""
+        changes = [(1, 1, 8), (1, 2, 50), (1, 3, 9), (1, 1, 7)]  # element 1 given twice: the last count wins
+        for _, element_id, count in changes[1:]:
+            self.execute(f"UPDATE area_elements SET number_of_individuals = {count} "
+                         f"WHERE park_id = 2 AND area_number = 1 AND element_id = {element_id}")
+        self.execute("DELETE FROM email_log")
+
+        result = census.apply_census(self.connection, [(1, 1, element_id, count) for _, element_id, count in changes]
+                                     + [('1', '9', '1', '3')])
+        self.assertEqual((result.staged, result.missing, result.updated, result.decreases), (5, 1, 2, 1))
+        self.assertEqual(self.query("SELECT park_id, element_id, old_count, new_count FROM email_log"),
+                         [(1, 1, 10, 7)])
+        self.assertEqual(self.query("SELECT element_id, number_of_individuals FROM area_elements "
+                                    "WHERE park_id = 1 ORDER BY element_id"),
+                         self.query("SELECT element_id, number_of_individuals FROM area_elements "
+                                    "WHERE park_id = 2 ORDER BY element_id"))
+        history = "SELECT element_id, individuals FROM population_history WHERE park_id = {} ORDER BY element_id"
+        self.assertEqual(self.query(history.format(1)), self.query(history.format(2)))
+        self.assertEqual(self.query("SELECT @skip_decrease_email, @skip_summary_triggers"), [(None, None)])
+
+    def test_02_large_census_in_seconds(self):
+        """Test that a 100k-row census is applied in seconds"""
+        self.execute("SET SESSION cte_max_recursion_depth = 100000",
+                     "INSERT INTO park_areas (park_id, area_number, name) "
+                     "WITH RECURSIVE n (i) AS (SELECT 2 UNION ALL SELECT i + 1 FROM n WHERE i < 33334) "
+                     "SELECT 1, i, CONCAT('A', i) FROM n",
+                     "INSERT INTO area_elements (park_id, area_number, element_id, number_of_individuals) "
+                     "SELECT park_id, area_number, e.id, 100 FROM park_areas "
+                     "CROSS JOIN natural_elements e WHERE park_id = 1 AND area_number > 1")
+        rows = [(1, area, element, 90 if area % 2 else 110) for area in range(2, 33335) for element in (1, 2, 3)]
+        started = time.perf_counter()
+        result = census.apply_census(self.connection, rows, today=datetime.date(2024, 6, 1))
+        elapsed = time.perf_counter() - started
+        self.assertEqual(result.updated, len(rows))
+        self.assertEqual(result.decreases, sum(1 for row in rows if row[3] < 100))
+        self.assertEqual(self.query("SELECT COUNT(*) FROM email_log WHERE new_count = 90"), [(result.decreases,)])
+        self.assertLess(elapsed, 30)
+
+    def test_03_caller_skip_flags_are_restored(self):
+        """Test that skip flags the caller had set are still set after the census"""
+        self.execute("SET @skip_summary_triggers = 1")
+        census.apply_census(self.connection, [(1, 1, 1, 7)])
+        self.assertEqual(self.query("SELECT @skip_decrease_email, @skip_summary_triggers"), [(None, 1)])
+        self.assertEqual(self.query("SELECT @census_skip_decrease_email, @census_skip_summary_triggers"),
+                         [(None, None)])
+
+
+if __name__ == '__main__':
+    unittest.main()
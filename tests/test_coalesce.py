@@ -0,0 +1,106 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import TestCase
+
+from park_management.coalesce import Coalescer, coalesce_pending
+from tests.scratch import ScratchDatabaseTestCase
+
+SCRATCH_DB = 'park_management_coalesce_test'
+T0 = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def at(seconds):
+    return T0 + timedelta(seconds=seconds)
+
+
+class TestCoalescer(TestCase):
+    """Streaming window merge over in-memory events; these do not need a MySQL server."""
+
+    def test_01_merges_within_the_window(self):
+        """Test first old count, last new count and event totals per key and window"""
+        coalescer = Coalescer(window_seconds=60)
+        self.assertEqual(coalescer.feed(1, 'lynx', at(0), 10, 8), [])
+        coalescer.feed(2, 'oak', at(5), 50, 45)
+        coalescer.feed(3, 'lynx', at(30), 8, 6)
+        coalescer.feed(4, 'lynx', at(60), 6, 5, events=2)
+        closed = coalescer.feed(5, 'lynx', at(61), 5, 4)  # past the first lynx window: a new group
+        self.assertEqual([(group.log_id, group.old_count, group.new_count, group.events, group.merged_ids)
+                          for group in closed], [(1, 10, 5, 4, [3, 4])])
+        closed = coalescer.feed(6, 'eagle', at(70), 3, 2)
+        self.assertEqual([group.log_id for group in closed], [2])
+        self.assertEqual([group.log_id for group in coalescer.close_all()], [5, 6])
+        self.assertEqual(coalescer.open, {})
+
+    def test_02_bounded_memory(self):
+        """Test that at most max_open groups stay open, closing the oldest early"""
+        coalescer = Coalescer(window_seconds=3600, max_open=3)
+        closed = []
+        for log_id in range(1, 11):
+            closed.extend(coalescer.feed(log_id, f"species {log_id}", at(log_id), 10, 9))
+            self.assertLessEqual(len(coalescer.open), 3)
+        self.assertEqual([group.log_id for group in closed], list(range(1, 8)))
+        self.assertEqual(coalescer.early_closes, 7)
+
+
+class TestCoalescePending(ScratchDatabaseTestCase):
+    """Coalescing of email_log rows written by the decrease trigger, on a scratch schema."""
+
+    scratch_db = SCRATCH_DB
+
+    def setUp(self):
+        super().setUp()
+        self.execute("INSERT INTO parks (id, name, declaration_date, code, contact_email) VALUES "
+                     "(1, 'Parque A', '2020-01-01', 'A', 'a@example.com')",
+                     "INSERT INTO park_areas (park_id, area_number, name) VALUES (1, 1, 'Norte'), (1, 2, 'Sur')",
+                     "INSERT INTO natural_elements (id, scientific_name) VALUES (1, 'Lynx pardinus'), "
+                     "(2, 'Quercus ilex')",
+                     "INSERT INTO area_elements VALUES (1, 1, 1, 10), (1, 2, 1, 20), (1, 1, 2, 50)")
+
+    def log(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT ne.scientific_name, l.old_count, l.new_count, l.event_count FROM email_log l "
+                           "JOIN natural_elements ne ON ne.id = l.element_id ORDER BY l.log_id")
+            return [tuple(row) for row in cursor.fetchall()]
+
+    def test_01_repeated_decreases_become_one_alert(self):
+        """Test that decreases in several areas and several updates merge per park and element"""
+        self.execute("UPDATE area_elements SET number_of_individuals = 8 WHERE element_id = 1 AND area_number = 1",
+                     "UPDATE area_elements SET number_of_individuals = 45 WHERE element_id = 2",
+                     "UPDATE area_elements SET number_of_individuals = 15 WHERE element_id = 1 AND area_number = 2",
+                     "UPDATE area_elements SET number_of_individuals = 6 WHERE element_id = 1 AND area_number = 1")
+        self.assertEqual(len(self.log()), 4)
+        stats = coalesce_pending(self.connection, window_seconds=300, page_rows=2)
+        self.assertEqual((stats.rows_read, stats.groups_merged, stats.rows_merged), (4, 1, 2))
+        self.assertEqual(self.log(), [('Lynx pardinus', 10, 6, 3), ('Quercus ilex', 50, 45, 1)])
+
+        # A second pass merges new rows into the open group instead of starting another one
+        self.execute("UPDATE area_elements SET number_of_individuals = 4 WHERE element_id = 1 AND area_number = 1")
+        coalesce_pending(self.connection, window_seconds=300)
+        self.assertEqual(self.log(), [('Lynx pardinus', 10, 4, 4), ('Quercus ilex', 50, 45, 1)])
+
+    def test_02_claimed_rows_are_left_alone(self):
+        """Test that rows already claimed by an outbox worker are not merged"""
+        self.execute("UPDATE area_elements SET number_of_individuals = 8 WHERE element_id = 1 AND area_number = 1",
+                     "UPDATE email_log SET claimed_until = NOW() + INTERVAL 1 HOUR",
+                     "UPDATE area_elements SET number_of_individuals = 6 WHERE element_id = 1 AND area_number = 1")
+        coalesce_pending(self.connection, window_seconds=300)
+        self.assertEqual(self.log(), [('Lynx pardinus', 10, 8, 1), ('Lynx pardinus', 8, 6, 1)])
+
+    def test_03_next_pass_starts_at_the_first_open_group(self):
+        """Test that a pass resumes at the earliest group still open and reads only the rows after it"""
+        self.execute("INSERT INTO email_log (log_id, park_id, element_id, old_count, new_count, log_timestamp) VALUES "
+                     "(1, 1, 1, 10, 8, NOW() - INTERVAL 1 HOUR), (2, 1, 1, 8, 7, NOW() - INTERVAL 59 MINUTE), "
+                     "(3, 1, 2, 50, 45, NOW())")
+        stats = coalesce_pending(self.connection, window_seconds=300)
+        self.assertEqual((stats.rows_read, stats.rows_merged, stats.resume_id), (3, 1, 2))
+
+        self.execute("INSERT INTO email_log (log_id, park_id, element_id, old_count, new_count) "
+                     "VALUES (4, 1, 2, 45, 40), (5, 1, 1, 7, 6)")
+        stats = coalesce_pending(self.connection, window_seconds=300, after_id=stats.resume_id)
+        self.assertEqual((stats.rows_read, stats.rows_merged, stats.resume_id), (3, 1, 2))
+        self.assertEqual(self.log(), [('Lynx pardinus', 10, 7, 2), ('Quercus ilex', 50, 40, 2),
+                                      ('Lynx pardinus', 7, 6, 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
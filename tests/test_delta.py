@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+from park_management import loadfiles, schema
+from park_management.delta import DeltaSync, TableDelta, diff_sorted, sorted_rows
+from tests.scratch import ScratchDatabaseTestCase
+
+SCRATCH_DB = 'park_management_delta_test'
+
+
+class TestDeltaDiff(TestCase):
+    """Sorting and diffing tests; these do not need a MySQL server."""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.table = schema.parse_schema()['area_elements']
+        self.key = loadfiles.key_function(self.table)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def test_01_external_sort_orders_by_numeric_key(self):
+        """Test that rows are sorted by primary key across several on-disk runs"""
+        rows = [[str(park), '1', str(element), '5'] for park in (10, 2, 1) for element in (30, 4, 200)]
+        result = list(sorted_rows(rows, self.key, self.work_dir, run_rows=2))
+        self.assertEqual(result, sorted(rows, key=self.key))
+        self.assertEqual(result[0], ['1', '1', '4', '5'])
+
+    def test_02_diff_finds_inserts_updates_and_deletes(self):
+        """Test that the merge join classifies every changed row and ignores equal ones"""
+        previous = [['1', '1', '1', '10'], ['1', '1', '2', '20'], ['2', '1', '1', '30']]
+        current = [['1', '1', '1', '10'], ['1', '1', '2', '15'], ['3', '1', '1', '40']]
+        changes = list(diff_sorted(iter(previous), iter(current), self.key))
+        self.assertEqual(changes, [
+            ('update', ['1', '1', '2', '15']),
+            ('delete', ['2', '1', '1', '30']),
+            ('insert', ['3', '1', '1', '40']),
+        ])
+
+    def test_03_spooled_upserts_drop_inline_notes(self):
+        """Test that rows of area_elements.csv with an inline note are spooled with their plain count"""
+        sync = DeltaSync(state_dir=self.work_dir, tables=['area_elements'], log=None)
+        result = TableDelta('area_elements')
+        sync._spool_changes('area_elements', result, self.work_dir)
+        with open(os.path.join(self.work_dir, 'area_elements.upserts.csv'), encoding='utf-8') as f:
+            upserts = f.read().splitlines()
+        self.assertEqual((result.inserted, result.deleted), (len(upserts), 0))
+        self.assertIn('insert,2,1,34,1000', upserts)
+        self.assertFalse(any('--' in line for line in upserts))
+
+    def test_04_deletes_that_would_cascade_to_kept_rows_are_refused(self):
+        """Test that dropping a park whose areas are still in park_areas.csv stops the sync before it connects"""
+        load_dir = os.path.join(self.work_dir, 'load')
+        shutil.copytree(schema.LOAD_DIR, load_dir)
+        sync = DeltaSync(load_dir, os.path.join(self.work_dir, 'state'), log=None)
+        sync.baseline()
+        with open(os.path.join(load_dir, 'parks.csv'), encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        with open(os.path.join(load_dir, 'parks.csv'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(line for line in lines if not line.startswith('1,')) + '\n')
+        with self.assertRaisesRegex(RuntimeError, r"park_areas \(park_id\) = \(1\) references a row deleted from parks"):
+            sync.run()
+        self.assertEqual(sorted(os.listdir(os.path.join(self.work_dir, 'state'))),
+                         sorted([f"{name}.sorted.csv" for name in sync.tables] + ['state.json']))
+
+
+class TestDeltaSyncIntegration(ScratchDatabaseTestCase):
+    """Runs delta syncs against a scratch copy of the schema."""
+
+    scratch_db = SCRATCH_DB
+
+    TABLES = ['provinces', 'parks', 'park_provinces']
+
+    def setUp(self):
+        super().setUp()
+        self.load_dir = tempfile.mkdtemp()
+        self.write('provinces', [])
+        self.write('parks', [])
+        self.write('park_provinces', [])
+        self.sync = DeltaSync(self.load_dir, os.path.join(self.load_dir, 'state'), batch_size=2,
+                              tables=self.TABLES, connection_options={'database': SCRATCH_DB}, log=None)
+        self.sync.baseline()
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.load_dir)
+
+    def write(self, table, rows):
+        columns = schema.parse_schema()[table].load_columns
+        with open(os.path.join(self.load_dir, f'{table}.csv'), 'w', newline='', encoding='utf-8') as f:
+            f.write(','.join(columns) + '\n')
+            loadfiles.write_rows(f, rows)
+
+    def fetch(self, sql):
+        self.connection.commit()  # end the snapshot so the sync's changes are visible
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchall()
+
+    def test_01_applies_only_the_changes(self):
+        """Test inserts, updates and deletes across FK-related tables, then an unchanged run"""
+        self.write('provinces', [['1', 'Salta', 'Org 1'], ['2', 'Jujuy', 'Org 2']])
+        self.write('parks', [['1', 'Calilegua', '1979-07-19', 'c@example.com', 'CA', '76306']])
+        self.write('park_provinces', [['1', '2', '76306']])
+        results = self.sync.run()
+        self.assertEqual(results['provinces'].inserted, 2)
+        self.assertEqual(self.fetch(f"SELECT COUNT(*) FROM {SCRATCH_DB}.park_provinces")[0][0], 1)
+
+        # Move the park to Salta, rename Salta's organization and drop Jujuy.
+        self.write('provinces', [['1', 'Salta', 'Org 1 bis']])
+        self.write('park_provinces', [['1', '1', '76306']])
+        results = self.sync.run()
+        self.assertTrue(results['parks'].skipped)
+        self.assertEqual((results['provinces'].updated, results['provinces'].deleted), (1, 1))
+        self.assertEqual((results['park_provinces'].inserted, results['park_provinces'].deleted), (1, 1))
+        self.assertEqual(self.fetch(f"SELECT id, responsible_organization FROM {SCRATCH_DB}.provinces"),
+                         ((1, 'Org 1 bis'),))
+        self.assertEqual(self.fetch(f"SELECT park_id, province_id FROM {SCRATCH_DB}.park_provinces"), ((1, 1),))
+
+        results = self.sync.run()
+        self.assertTrue(all(result.skipped for result in results.values()))
+
+    def test_02_new_key_with_the_same_unique_value(self):
+        """Test that a park re-keyed under the same code replaces the old row instead of colliding"""
+        self.write('provinces', [['1', 'Salta', 'Org 1']])
+        self.write('parks', [['1', 'Calilegua', '1979-07-19', 'c@example.com', 'CA', '76306']])
+        self.write('park_provinces', [['1', '1', '76306']])
+        self.sync.run()
+
+        self.write('parks', [['7', 'Calilegua', '1979-07-19', 'c@example.com', 'CA', '76306']])
+        self.write('park_provinces', [['7', '1', '76306']])
+        results = self.sync.run()
+        self.assertEqual((results['parks'].inserted, results['parks'].deleted), (1, 1))
+        self.assertEqual(self.fetch(f"SELECT id, code FROM {SCRATCH_DB}.parks"), ((7, 'CA'),))
+        self.assertEqual(self.fetch(f"SELECT park_id, province_id FROM {SCRATCH_DB}.park_provinces"), ((7, 1),))
+
+
+if __name__ == '__main__':
+    unittest.main()
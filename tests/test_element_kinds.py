@@ -0,0 +1,76 @@
+import unittest
+from unittest import TestCase
+
+import pymysql
+
+from park_management import element_kinds, schema
+from tests.scratch import ScratchDatabaseTestCase, run_setup
+
+SCRATCH_DB = 'park_management_element_kinds_test'
+
+
+class TestKindColumn(TestCase):
+    """natural_elements.kind in the parsed schema; these do not need a MySQL server."""
+
+    def test_01_kind_is_not_loaded(self):
+        """Test that kind is a column of natural_elements but not of its LOAD column list"""
+        table = schema.parse_schema()['natural_elements']
+        self.assertEqual(table.column('kind').type, "SET('vegetal', 'animal', 'mineral')")
+        self.assertNotIn('kind', table.load_columns)
+
+
+class TestElementKinds(ScratchDatabaseTestCase):
+    """kind maintenance and the element_food checks on a scratch schema."""
+
+    scratch_db = SCRATCH_DB
+
+    def setUp(self):
+        super().setUp()
+        self.execute("INSERT INTO natural_elements (id, scientific_name) VALUES "
+                     "(1, 'Lynx pardinus'), (2, 'Quercus ilex'), (3, 'Quartz'), (4, 'Oryctolagus cuniculus')",
+                     "INSERT INTO animal_elements (element_id) VALUES (1), (4)",
+                     "INSERT INTO vegetal_elements (element_id) VALUES (2)",
+                     "INSERT INTO mineral_elements (element_id) VALUES (3)")
+
+    def kinds(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT id, kind FROM natural_elements ORDER BY id")
+            return [tuple(row) for row in cursor.fetchall()]
+
+    def test_01_kind_follows_the_subtype_tables(self):
+        """Test inserts, moves and deletes in the subtype tables, including an element in two of them"""
+        self.assertEqual(self.kinds(), [(1, 'animal'), (2, 'vegetal'), (3, 'mineral'), (4, 'animal')])
+        self.execute("INSERT INTO vegetal_elements (element_id) VALUES (1)",
+                     "UPDATE mineral_elements SET element_id = 4 WHERE element_id = 3",
+                     "DELETE FROM animal_elements WHERE element_id = 1")
+        self.assertEqual(self.kinds(), [(1, 'vegetal'), (2, 'vegetal'), (3, ''), (4, 'animal,mineral')])
+        self.assertEqual(element_kinds.check(self.connection), [])
+
+    def test_02_element_food_checks(self):
+        """Test that minerals cannot be food and vegetals cannot eat, on insert and update"""
+        self.execute("INSERT INTO element_food VALUES (1, 2), (1, 4)")
+        for sql in ("INSERT INTO element_food VALUES (1, 3)", "INSERT INTO element_food VALUES (2, 4)",
+                    "UPDATE element_food SET food_element_id = 3 WHERE food_element_id = 4"):
+            with self.assertRaises(pymysql.err.OperationalError):
+                self.execute(sql)
+            self.connection.rollback()
+
+    def test_03_rebuild(self):
+        """Test that a stale kind is reported and rebuilt"""
+        self.execute("UPDATE natural_elements SET kind = '' WHERE id = 3")
+        self.assertEqual(element_kinds.check(self.connection), [(3, '', 'mineral')])
+        element_kinds.rebuild(self.connection)
+        self.assertEqual(element_kinds.check(self.connection), [])
+
+    def test_04_setup_adds_a_missing_kind(self):
+        """Test that re-running setup.sql on a database without kind adds and fills the column"""
+        self.execute("ALTER TABLE natural_elements DROP COLUMN kind")
+        run_setup(self.connection, SCRATCH_DB)
+        self.assertEqual(self.kinds(), [(1, 'animal'), (2, 'vegetal'), (3, 'mineral'), (4, 'animal')])
+        self.execute("INSERT INTO element_food VALUES (1, 4)")
+        with self.assertRaises(pymysql.err.OperationalError):
+            self.execute("INSERT INTO element_food VALUES (1, 3)")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import datetime
+import unittest
+from unittest import TestCase
+
+from park_management import email_retention, schema
+from tests.scratch import ScratchDatabaseTestCase, run_setup
+
+SCRATCH_DB = 'park_management_email_retention_test'
+
+
+class TestRetentionStatements(TestCase):
+    """Month arithmetic and partition statements; these do not need a MySQL server."""
+
+    def test_01_months(self):
+        """Test month steps across year ends and the YYYY-MM argument format"""
+        self.assertEqual(email_retention.add_months(datetime.date(2026, 11, 1), 3), datetime.date(2027, 2, 1))
+        self.assertEqual(email_retention.add_months(datetime.date(2026, 1, 1), -1), datetime.date(2025, 12, 1))
+        self.assertEqual(email_retention.parse_month('2027-06'), datetime.date(2027, 6, 1))
+
+    def test_02_reorganize_statement(self):
+        """Test that p_future is split into the missing monthly partitions"""
+        existing = [('p_old', datetime.date(2025, 1, 1)), ('p202612', datetime.date(2027, 1, 1)), ('p_future', None)]
+        statement = email_retention.reorganize_statement(existing, datetime.date(2027, 2, 1))
+        self.assertIn("PARTITION p202701 VALUES LESS THAN ('2027-02-01')", statement)
+        self.assertIn("PARTITION p202702 VALUES LESS THAN ('2027-03-01')", statement)
+        self.assertTrue(statement.endswith("PARTITION p_future VALUES LESS THAN (MAXVALUE)\n)"))
+        self.assertIsNone(email_retention.reorganize_statement(existing, datetime.date(2026, 12, 1)))
+
+    def test_03_partitioned_table_in_schema(self):
+        """Test that email_log v2 stores ids and its CREATE statement keeps the partition clause"""
+        table = schema.parse_schema()['email_log']
+        self.assertEqual(table.column_names[:3], ('log_id', 'park_id', 'element_id'))
+        self.assertEqual(table.primary_key, ('log_id', 'log_timestamp'))
+        self.assertIn("PARTITION p_future VALUES LESS THAN (MAXVALUE)", schema.create_statement('email_log'))
+
+
+class TestEmailRetention(ScratchDatabaseTestCase):
+    """Partition maintenance and migration of email_log on a scratch schema."""
+
+    scratch_db = SCRATCH_DB
+
+    def test_01_add_and_drop_partitions(self):
+        """Test adding months ahead and dropping old months, keeping any with pending alerts"""
+        email_retention.add_partitions(self.connection, datetime.date(2027, 3, 1))
+        names = [name for name, _ in email_retention.partitions(self.connection)]
+        self.assertEqual(names[-4:], ['p202701', 'p202702', 'p202703', 'p_future'])
+        self.execute("INSERT INTO email_log (park_id, element_id, old_count, new_count, log_timestamp, status) VALUES "
+                     "(1, 1, 10, 5, '2024-06-01', 'sent'), (1, 2, 10, 5, '2025-01-15', 'sent'), "
+                     "(1, 3, 10, 5, '2025-02-15', 'pending'), (1, 4, 10, 5, '2025-03-15', 'sent')")
+        dropped, kept = email_retention.drop_before(self.connection, datetime.date(2025, 4, 1))
+        self.assertEqual((dropped, kept), (['p_old', 'p202501', 'p202503'], ['p202502']))
+        self.assertEqual(self.query("SELECT element_id FROM email_log"), [(3,)])
+
+    def test_02_migrate_v1(self):
+        """Test that baseline v1 rows are copied with ids resolved, also after an earlier failed attempt"""
+        self.execute("DROP TABLE email_log",
+                     "CREATE TABLE email_log (log_id INT AUTO_INCREMENT PRIMARY KEY, park_email VARCHAR(255), "
+                     "element_scientific_name VARCHAR(255), old_count INT, new_count INT, "
+                     "log_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP)",
+                     "INSERT INTO parks (id, name, declaration_date, code, contact_email) "
+                     "VALUES (4, 'Parque A', '2020-01-01', 'A', 'a@example.com')",
+                     "INSERT INTO natural_elements (id, scientific_name) VALUES (9, 'Lynx pardinus')",
+                     "INSERT INTO email_log (park_email, element_scientific_name, old_count, new_count) "
+                     "VALUES ('a@example.com', 'Lynx pardinus', 10, 7)",
+                     "CREATE TABLE email_log_v2 (leftover INT)")
+        self.assertEqual(email_retention.migrate_v1(self.connection), 1)
+        self.assertEqual(self.query("SELECT park_id, element_id, old_count, new_count, event_count, status "
+                                    "FROM email_log"), [(4, 9, 10, 7, 1, 'sent')])
+        self.assertEqual(self.query("SELECT COUNT(*) FROM email_log_v1"), [(1,)])
+        self.assertIsNone(email_retention.migrate_v1(self.connection))
+
+    def test_03_setup_migrates_v1(self):
+        """Test that re-running setup.sql on a v1 email_log migrates it and decreases are logged again"""
+        self.execute("DROP TABLE email_log",
+                     "CREATE TABLE email_log (log_id INT AUTO_INCREMENT PRIMARY KEY, park_email VARCHAR(255), "
+                     "element_scientific_name VARCHAR(255), old_count INT, new_count INT, "
+                     "log_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP)",
+                     "INSERT INTO parks (id, name, declaration_date, code, contact_email) "
+                     "VALUES (4, 'Parque A', '2020-01-01', 'A', 'a@example.com')",
+                     "INSERT INTO park_areas (park_id, area_number) VALUES (4, 1)",
+                     "INSERT INTO natural_elements (id, scientific_name) VALUES (9, 'Lynx pardinus')",
+                     "INSERT INTO area_elements VALUES (4, 1, 9, 7)",
+                     "INSERT INTO email_log (park_email, element_scientific_name, old_count, new_count) "
+                     "VALUES ('a@example.com', 'Lynx pardinus', 10, 7)")
+        run_setup(self.connection, SCRATCH_DB)
+        self.execute("UPDATE area_elements SET number_of_individuals = 5")
+        self.assertEqual(self.query("SELECT park_id, element_id, old_count, new_count, status FROM email_log "
+                                    "ORDER BY log_id"), [(4, 9, 10, 7, 'sent'), (4, 9, 7, 5, 'pending')])
+        self.assertEqual(self.query("SELECT COUNT(*) FROM email_log_v1"), [(1,)])
+
+        # Running it once more changes nothing
+        run_setup(self.connection, SCRATCH_DB)
+        self.assertEqual(self.query("SELECT COUNT(*) FROM email_log"), [(2,)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import math
+import unittest
+from unittest import TestCase
+
+from park_management.foodweb import FoodWeb
+
+
+class TestFoodWeb(TestCase):
+    """Graph queries over small element_food edge lists; these do not need a MySQL server."""
+
+    def setUp(self):
+        # 1 and 2 are plants; 3 eats both, 4 eats 3, 5 eats 3 and 4; 6 has no relations.
+        predators, preys = zip((3, 1), (3, 2), (4, 3), (5, 3), (5, 4))
+        self.web = FoodWeb(predators, preys, element_ids=[1, 2, 3, 4, 5, 6])
+
+    def test_01_batched_dependents_and_food_chains(self):
+        """Test transitive closure in both directions for several sources in one call"""
+        dependents = self.web.dependents([1, 3, 5, 6, 99])
+        self.assertEqual(dependents[1].tolist(), [3, 4, 5])
+        self.assertEqual(dependents[3].tolist(), [4, 5])
+        self.assertEqual(dependents[5].tolist(), [])
+        self.assertEqual(dependents[99].tolist(), [])
+        self.assertEqual(self.web.dependents([1], max_depth=1)[1].tolist(), [3])
+        self.assertEqual(self.web.food_chain([5])[5].tolist(), [1, 2, 3, 4])
+        self.assertEqual(self.web.predators_of(3).tolist(), [4, 5])
+
+    def test_02_batches_wider_than_one_word(self):
+        """Test that more than 64 sources are answered correctly (several uint64 words per node)"""
+        chain = list(range(1, 151))
+        web = FoodWeb(chain[1:], chain[:-1])  # n + 1 eats n
+        result = web.dependents(chain)
+        self.assertEqual(result[1].tolist(), chain[1:])
+        self.assertEqual(result[100].tolist(), chain[100:])
+        self.assertEqual(result[150].tolist(), [])
+
+    def test_03_trophic_levels(self):
+        """Test fractional trophic levels: 1 + mean level of the food"""
+        levels = self.web.trophic_levels()
+        self.assertEqual((levels[1], levels[3], levels[4]), (1.0, 2.0, 3.0))
+        self.assertAlmostEqual(levels[5], 1 + (2.0 + 3.0) / 2)
+        self.assertEqual(levels[6], 1.0)
+
+    def test_04_cycles_and_incremental_updates(self):
+        """Test cycle detection, an ungrounded loop, and adding / removing edges"""
+        self.assertEqual(self.web.cycles(), [])
+        self.web.add_edges([3, 7, 8], [5, 8, 7])  # 3 -> 5 -> 3 loop; 7 <-> 8 with no basal food
+        self.assertEqual(sorted(self.web.cycles()), [[3, 4, 5], [7, 8]])
+        self.assertIn(3, self.web.dependents([3])[3].tolist())
+        self.assertTrue(math.isnan(self.web.trophic_levels()[7]))
+        self.assertEqual(self.web.remove_edges([3, 7], [5, 8]), 2)
+        self.assertEqual(self.web.cycles(), [])
+        self.assertEqual(self.web.replace_edges([3, 4], [1, 3]), (0, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+from park_management import generator, schema
+
+
+class TestDataGenerator(TestCase):
+    """Checks the generated CSVs against the schema without needing a MySQL server."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.output_dir = tempfile.mkdtemp()
+        cls.tables = schema.parse_schema()
+        cls.written = generator.generate(cls.output_dir, scale_factor=0.005, seed=7, log=None)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.output_dir)
+
+    def read_rows(self, table_name):
+        path = os.path.join(self.output_dir, os.path.basename(self.tables[table_name].load_file))
+        with open(path, newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+
+    def test_01_every_loaded_table_is_written(self):
+        """Test that a CSV is written for every LOAD DATA statement in populate_data.sql"""
+        expected = {table.name for table in schema.loaded_tables(self.tables)}
+        self.assertEqual(set(self.written), expected)
+
+    def test_02_headers_match_load_columns(self):
+        """Test that each CSV header matches the column list in populate_data.sql"""
+        for table in schema.loaded_tables(self.tables):
+            path = os.path.join(self.output_dir, os.path.basename(table.load_file))
+            with open(path, encoding='utf-8') as f:
+                header = f.readline().rstrip('\n').split(',')
+            self.assertEqual(tuple(header), table.load_columns, f"Header mismatch for {table.name}")
+
+    def test_03_primary_and_unique_keys_are_unique(self):
+        """Test that primary keys and UNIQUE columns have no duplicates"""
+        for table in schema.loaded_tables(self.tables):
+            rows = self.read_rows(table.name)
+            for key in [table.primary_key] + table.unique:
+                values = [tuple(row[column] for column in key) for row in rows]
+                self.assertEqual(len(values), len(set(values)), f"Duplicate {key} in {table.name}")
+
+    def test_04_foreign_keys_reference_existing_rows(self):
+        """Test that every foreign key value exists in the referenced table"""
+        for table in schema.loaded_tables(self.tables):
+            rows = self.read_rows(table.name)
+            for fk in table.foreign_keys:
+                referenced = {tuple(row[column] for column in fk.ref_columns) for row in self.read_rows(fk.ref_table)}
+                for row in rows:
+                    self.assertIn(tuple(row[column] for column in fk.columns), referenced,
+                                  f"Orphan {fk.columns} in {table.name}")
+
+    def test_05_element_food_follows_trigger_rules(self):
+        """Test that no mineral is food and no vegetal feeds (check_element_food_before_insert)"""
+        minerals = {row['element_id'] for row in self.read_rows('mineral_elements')}
+        vegetals = {row['element_id'] for row in self.read_rows('vegetal_elements')}
+        edges = self.read_rows('element_food')
+        self.assertTrue(edges)
+        for edge in edges:
+            self.assertNotIn(edge['food_element_id'], minerals)
+            self.assertNotIn(edge['element_id'], vegetals)
+
+    def test_06_same_seed_gives_same_rows(self):
+        """Test that generation is reproducible for a given seed"""
+        first = generator.DataGenerator(0.005, seed=3)
+        second = generator.DataGenerator(0.005, seed=3)
+        other = generator.DataGenerator(0.005, seed=4)
+        self.assertEqual(list(first.rows('visitors')), list(second.rows('visitors')))
+        self.assertNotEqual(list(first.rows('visitors')), list(other.rows('visitors')))
+
+    def test_07_functional_queries_have_answers(self):
+        """Test that some species are in every park and some in only one (Additional Reqs 3-4)"""
+        parks_per_element = {}
+        for row in self.read_rows('area_elements'):
+            parks_per_element.setdefault(row['element_id'], set()).add(row['park_id'])
+        total_parks = len(self.read_rows('parks'))
+        counts = [len(parks) for parks in parks_per_element.values()]
+        self.assertIn(total_parks, counts)
+        self.assertIn(1, counts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+from park_management.coalesce import coalesce_pending
+from park_management.foodweb import FoodWeb
+from park_management.impact import CascadeImpact, declines_since, write_report
+from tests.scratch import ScratchDatabaseTestCase
+
+SCRATCH_DB = 'park_management_impact_test'
+
+
+class TestCascadeImpact(TestCase):
+    """Cascade-impact ranking over in-memory area_elements; these do not need a MySQL server."""
+
+    def setUp(self):
+        # 1 and 2 are plants; 3 eats 1 and 2; 4 eats 3.
+        self.web = FoodWeb([3, 3, 4], [1, 2, 3])
+        # (park, area, element, individuals)
+        rows = [
+            (1, 1, 1, 30), (1, 1, 2, 10), (1, 1, 3, 5), (1, 1, 4, 2),
+            (1, 2, 1, 50), (1, 2, 3, 8),
+            (2, 1, 1, 100), (2, 1, 4, 1),
+        ]
+        self.impact = CascadeImpact(*zip(*rows), self.web)
+
+    def rows(self, result):
+        return [(int(r['park_id']), int(r['area_number']), int(r['element_id']), round(float(r['risk']), 6),
+                 int(r['level'])) for r in result]
+
+    def test_01_risk_is_food_share_times_decline(self):
+        """Test that predators are ranked by the declining prey's share of their food in each area"""
+        result = self.impact.analyze([1], [1], [0.5])
+        # Area 1: 3 eats 30 of 1 out of 40 -> 0.75 * 0.5; area 2: 1 is its only food -> 1.0 * 0.5.
+        self.assertEqual(self.rows(result), [(1, 2, 3, 0.5, 1), (1, 1, 3, 0.375, 1)])
+        self.assertEqual(result['declining_prey'].tolist(), [1, 1])
+        self.assertEqual(result['individuals'].tolist(), [8, 5])
+
+    def test_02_only_predators_in_the_same_area(self):
+        """Test that a decline in park 2 does not reach predators absent from its areas"""
+        self.assertEqual(len(self.impact.analyze([2], [1], [0.9])), 0)
+        self.assertEqual(len(self.impact.analyze([1], [99], [0.9])), 0)
+
+    def test_03_several_prey_sum_and_cap(self):
+        """Test that risks from several declining prey add up and are capped at 1"""
+        result = self.impact.analyze([1, 1], [1, 2], [1.0, 1.0])
+        self.assertEqual(self.rows(result)[0], (1, 1, 3, 1.0, 1))
+        self.assertEqual(int(result[0]['declining_prey']), 2)
+
+    def test_04_second_order_effects(self):
+        """Test that with depth 2 the predators of at-risk predators are reported at level 2"""
+        result = self.impact.analyze([1], [1], [0.5], depth=2)
+        self.assertEqual(self.rows(result), [(1, 2, 3, 0.5, 1), (1, 1, 3, 0.375, 1), (1, 1, 4, 0.375, 2)])
+
+    def test_05_write_report(self):
+        """Test the CSV report columns"""
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'impact', 'report.csv')
+            write_report(path, self.impact.analyze([1], [1], [0.5]))
+            with open(path, encoding='utf-8') as f:
+                rows = list(csv.reader(f))
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(rows[0][:4], ['park_id', 'area_number', 'element_id', 'risk'])
+        self.assertEqual(rows[1][:4], ['1', '2', '3', '0.500000'])
+
+
+class TestDeclinesSince(ScratchDatabaseTestCase):
+    """Reading declines from email_log on a scratch schema."""
+
+    scratch_db = SCRATCH_DB
+
+    def setUp(self):
+        super().setUp()
+        self.execute("INSERT INTO parks (id, name, declaration_date, code, contact_email) VALUES "
+                     "(1, 'Parque A', '2020-01-01', 'A', 'a@example.com')",
+                     "INSERT INTO park_areas (park_id, area_number, name) VALUES (1, 1, 'Norte')",
+                     "INSERT INTO natural_elements (id, scientific_name) VALUES (1, 'Lynx pardinus')",
+                     "INSERT INTO area_elements VALUES (1, 1, 1, 10)")
+
+    def test_01_declines_coalesced_after_a_run_are_not_lost(self):
+        """Test that a decline merged into an alert after an impact run is still reported, and email_log is only read"""
+        self.execute("UPDATE area_elements SET number_of_individuals = 8")
+        parks, _, fractions, last_log_id, processed = declines_since(self.connection, settle_seconds=600)
+        self.assertEqual((parks, fractions, last_log_id), ([1], [0.2], 0))
+        self.assertEqual(self.query("SELECT log_id, event_count FROM email_log"), list(processed.items()))
+
+        # The outbox merges a later decline into the first row while its window is open
+        self.execute("UPDATE area_elements SET number_of_individuals = 6")
+        self.assertEqual(self.query("SELECT COUNT(*) FROM email_log"), [(2,)])
+        coalesce_pending(self.connection, window_seconds=300)
+        self.assertEqual(self.query("SELECT COUNT(*) FROM email_log"), [(1,)])
+
+        parks, _, fractions, last_log_id, processed = declines_since(self.connection, last_log_id, processed,
+                                                                     settle_seconds=600)
+        self.assertEqual((parks, fractions), ([1], [0.4]))
+        self.assertEqual(declines_since(self.connection, last_log_id, processed, settle_seconds=600),
+                         ([], [], [], last_log_id, processed))
+
+    def test_02_one_fraction_per_row(self):
+        """Test that declines in different areas are not chained into one large decline"""
+        self.execute("INSERT INTO email_log (park_id, element_id, old_count, new_count) VALUES "
+                     "(1, 1, 1000, 900), (1, 1, 10, 5)")
+        self.assertEqual(declines_since(self.connection)[2], [0.1, 0.5])
+
+    def test_03_late_commits_are_not_skipped(self):
+        """Test that a row committed after a higher log_id is still read, and nothing is read twice"""
+        self.execute("INSERT INTO email_log (log_id, park_id, element_id, old_count, new_count, log_timestamp) "
+                     "VALUES (1, 1, 1, 10, 9, NOW() - INTERVAL 1 HOUR), (3, 1, 1, 9, 8, NOW())")
+        parks, _, fractions, last_log_id, processed = declines_since(self.connection, settle_seconds=600)
+        self.assertEqual((fractions, last_log_id, processed), ([0.1, 1 / 9], 1, {3: 1}))
+
+        # log_id 2 was taken by a transaction that commits only now
+        self.execute("INSERT INTO email_log (log_id, park_id, element_id, old_count, new_count, log_timestamp) "
+                     "VALUES (2, 1, 1, 8, 4, NOW() - INTERVAL 20 MINUTE)")
+        parks, _, fractions, last_log_id, processed = declines_since(self.connection, last_log_id, processed,
+                                                                     settle_seconds=600)
+        self.assertEqual((fractions, last_log_id, processed), ([0.5], 2, {3: 1}))
+
+
+if __name__ == '__main__':
+    unittest.main()
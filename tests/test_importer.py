@@ -0,0 +1,90 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+from park_management import importer, schema
+
+
+class TestCsvImport(TestCase):
+    """Tests for the data/ -> data/import conversion; no database needed."""
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def read_output(self, name):
+        with open(os.path.join(self.output_dir, name), newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+
+    def test_01_provinces_keep_ids_from_data_load(self):
+        """Test that imported provinces match data/load/provinces.csv and skip non-province rows"""
+        importer.run_import(output_dir=self.output_dir, log=None)
+        with open(os.path.join(schema.LOAD_DIR, 'provinces.csv'), newline='', encoding='utf-8') as f:
+            expected = list(csv.DictReader(f))
+        self.assertEqual(self.read_output('provinces.csv'), expected)
+
+    def test_02_output_uses_load_format(self):
+        """Test that outputs are comma separated, LF terminated and quote only strings"""
+        importer.run_import(output_dir=self.output_dir, log=None)
+        with open(os.path.join(self.output_dir, 'visitor_residency.csv'), 'rb') as f:
+            content = f.read()
+        self.assertNotIn(b'\r', content)
+        self.assertTrue(content.startswith(b'year,residents_percentage,non_residents_percentage\n2008,59.26,40.74\n'))
+
+    def test_03_unchanged_sources_are_skipped(self):
+        """Test that a second run skips every source and a changed source is re-imported"""
+        source_dir = os.path.join(self.output_dir, 'source')
+        os.makedirs(source_dir)
+        for source in importer.SOURCES:
+            shutil.copy(os.path.join(importer.DATA_DIR, source.filename), source_dir)
+        output_dir = os.path.join(self.output_dir, 'out')
+
+        first = importer.run_import(source_dir, output_dir, log=None)
+        self.assertTrue(all(rows is not None for rows in first.values()))
+        second = importer.run_import(source_dir, output_dir, log=None)
+        self.assertTrue(all(rows is None for rows in second.values()))
+
+        with open(os.path.join(source_dir, 'visitantes_registrados_en_los_parques_nacionales.csv'), 'a',
+                  encoding='utf-8') as f:
+            f.write('\r\n"2025";"60.00";"40.00"')
+        third = importer.run_import(source_dir, output_dir, log=None)
+        self.assertEqual(third['visitor_residency.csv'], 18)
+        self.assertIsNone(third['species_representation.csv'])
+
+    def test_04_latin1_and_decimal_comma_are_handled(self):
+        """Test that non UTF-8 sources and Spanish decimal commas are parsed"""
+        path = os.path.join(self.output_dir, 'latin1.csv')
+        with open(path, 'w', encoding='latin-1', newline='') as f:
+            f.write('"año";"residentes_en_porcentaje";"no_residentes_en_porcentaje"\r\n"2030";"55,5";"44,5"\r\n')
+        rows = list(importer._visitor_residency(importer.read_rows(path)))
+        self.assertEqual(rows, [(2030, 55.5, 44.5)])
+
+    def test_05_quoted_delimiters_are_kept(self):
+        """Test that semicolons inside quoted fields do not split the field"""
+        path = os.path.join(self.output_dir, 'quoted.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write('"grupo";"numero_de_especies_en_argentina";"numero_de_especies_en_apn";"porcentaje"\r\n'
+                    '"Aves; marinas";"10";"5";"50"\r\n')
+        rows = list(importer._species_groups(importer.read_rows(path)))
+        self.assertEqual(rows, [('Aves; marinas', 10, 5, 50.0)])
+
+
+    def test_06_publish_copies_only_schema_tables(self):
+        """Test that --publish puts provinces.csv into the load directory and leaves the statistics out"""
+        importer.run_import(output_dir=self.output_dir, log=None)
+        load_dir = os.path.join(self.output_dir, 'load')
+        os.makedirs(load_dir)
+        self.assertEqual(importer.publish(self.output_dir, load_dir, log=None), ['provinces.csv'])
+        self.assertEqual(os.listdir(load_dir), ['provinces.csv'])
+        with open(os.path.join(load_dir, 'provinces.csv'), 'rb') as published, \
+                open(os.path.join(self.output_dir, 'provinces.csv'), 'rb') as output:
+            self.assertEqual(published.read(), output.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
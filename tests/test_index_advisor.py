@@ -0,0 +1,86 @@
+import unittest
+from unittest import TestCase
+
+from park_management import index_advisor
+from park_management.benchmark import parse_queries
+from tests.scratch import ScratchDatabaseTestCase
+
+SCRATCH_DB = 'park_management_index_advisor_test'
+
+FR3_PLAN = {
+    "query_block": {
+        "cost_info": {"query_cost": "104.25"},
+        "grouping_operation": {
+            "nested_loop": [
+                {"table": {"table_name": "p", "access_type": "index", "key": "PRIMARY",
+                           "used_columns": ["id", "name"], "using_index": True}},
+                {"table": {"table_name": "v", "access_type": "ALL", "used_columns": ["id", "park_id"],
+                           "attached_condition": "(`park_management`.`v`.`park_id` = `park_management`.`p`.`id`)"}},
+            ]
+        }
+    }
+}
+
+REF_PLAN = {
+    "query_block": {
+        "table": {"table_name": "ae", "access_type": "ref", "key": "idx_area_elements_element_id",
+                  "used_key_parts": ["element_id"], "used_columns": ["park_id", "element_id",
+                                                                     "number_of_individuals"]}
+    }
+}
+
+
+class TestCandidates(TestCase):
+    """Workload parsing, candidate generation and ranking; these do not need a MySQL server."""
+
+    def test_01_aliases(self):
+        """Test that tables are resolved from their aliases in the analysis queries"""
+        self.assertEqual(index_advisor.aliases(parse_queries()['fr3']),
+                         {'visitors': 'visitors', 'v': 'visitors', 'parks': 'parks', 'p': 'parks'})
+        self.assertEqual(index_advisor.aliases("UPDATE area_elements SET number_of_individuals = 1 WHERE park_id = 1"),
+                         {'area_elements': 'area_elements'})
+
+    def test_02_candidates_from_plan(self):
+        """Test that a full scan gets a filter and a covering candidate, and existing prefixes are skipped"""
+        alias_map = index_advisor.aliases(parse_queries()['fr3'])
+        candidates = index_advisor.candidates_from_plan(FR3_PLAN, alias_map, {})
+        self.assertEqual([(c.table, c.columns) for c in candidates],
+                         [('visitors', ('park_id',)), ('visitors', ('park_id', 'id'))])
+        existing = {'visitors': [('park_id', 'id', 'name')]}
+        self.assertEqual(index_advisor.candidates_from_plan(FR3_PLAN, alias_map, existing), [])
+        covering = index_advisor.candidates_from_plan(REF_PLAN, {'ae': 'area_elements'},
+                                                      {'area_elements': [('element_id',)]})
+        self.assertEqual([c.columns for c in covering], [('element_id', 'park_id', 'number_of_individuals')])
+
+    def test_03_hints_and_ranking(self):
+        """Test NO_INDEX hint placement and that cheap, effective indexes rank first"""
+        self.assertEqual(index_advisor.with_hints("  select a FROM t", ["NO_INDEX(t idx)"]),
+                         "  select /*+ NO_INDEX(t idx) */ a FROM t")
+        advice = index_advisor.Advice(
+            add=[index_advisor.IndexCandidate('visitors', ('park_id',), '', read_benefit=50, write_us_per_row=9),
+                 index_advisor.IndexCandidate('visitors', ('park_id', 'id'), '', read_benefit=60, write_us_per_row=2)],
+            drop=[index_advisor.DropCandidate('parks', 'idx_parks_code', ('code',), '', read_cost=3.0),
+                  index_advisor.DropCandidate('natural_elements', 'idx_natural_elements_scientific_name',
+                                              ('scientific_name',), '', write_us_per_row=1.5)])
+        index_advisor.rank(advice)
+        self.assertEqual([c.columns for c in advice.add], [('park_id', 'id'), ('park_id',)])
+        self.assertEqual([d.index for d in advice.drop], ['idx_natural_elements_scientific_name', 'idx_parks_code'])
+
+
+class TestAdvise(ScratchDatabaseTestCase):
+    """Advising on a scratch schema."""
+
+    scratch_db = SCRATCH_DB
+
+    def test_01_unexplainable_statements_are_skipped(self):
+        """Test that a truncated digest sample is left out instead of failing the whole run"""
+        messages = []
+        advisor = index_advisor.IndexAdvisor(self.connection, sample_rows=10, repeat=1, log=messages.append)
+        truncated = index_advisor.Statement("SELECT v.id FROM visitors v WHERE v.park_id IN (1, 2, ", count=5)
+        advice = advisor.advise([index_advisor.Statement(parse_queries()['fr3']), truncated])
+        self.assertIsInstance(advice, index_advisor.Advice)
+        self.assertEqual(len([message for message in messages if message.startswith('skipped')]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import re
+import unittest
+from unittest import TestCase
+
+from park_management import index_profiles
+from park_management.benchmark import ANALYZE_SQL
+from park_management.index_profiles import PROFILES, ProfileIndex
+from tests.scratch import ScratchDatabaseTestCase
+
+SCRATCH_DB = 'park_management_index_profiles_test'
+
+
+class TestProfileSteps(TestCase):
+    """Profile declarations and apply steps; these do not need a MySQL server."""
+
+    def test_01_analysis_script_creates_the_baseline(self):
+        """Test that analyze_execution_plans.sql ensures exactly the baseline profile"""
+        with open(ANALYZE_SQL, encoding='utf-8') as f:
+            calls = re.findall(r"CALL ensure_index\('(\w+)', '(\w+)', '([^']+)'\)", f.read())
+        self.assertEqual([ProfileIndex(table, name, tuple(column.strip() for column in columns.split(',')))
+                          for table, name, columns in calls], list(PROFILES['baseline']))
+
+    def test_02_steps(self):
+        """Test that adds come before drops, changed columns are re-added and a matching set needs nothing"""
+        current = {index.name: index for index in PROFILES['baseline']}
+        self.assertEqual(index_profiles.steps(current, PROFILES['baseline']), [])
+        self.assertEqual([(action, index.name) for action, index in index_profiles.steps(current,
+                                                                                         PROFILES['read_optimized'])],
+                         [('add', 'idx_area_elements_element_park'), ('drop', 'idx_area_elements_element_id'),
+                          ('drop', 'idx_area_elements_park_id'), ('drop', 'idx_natural_elements_scientific_name'),
+                          ('drop', 'idx_parks_code')])
+        widened = ProfileIndex('visitors', 'idx_visitors_park_id', ('park_id', 'id'))
+        self.assertEqual(index_profiles.steps({widened.name: widened}, (PROFILES['baseline'][-1],))[1:],
+                         [('add', PROFILES['baseline'][-1])])
+
+
+class TestApply(ScratchDatabaseTestCase):
+    """Applying profiles to a scratch schema."""
+
+    scratch_db = SCRATCH_DB
+
+    def test_01_apply_is_idempotent(self):
+        """Test that each profile is reached exactly and re-applying it does nothing"""
+        for name in ('baseline', 'read_optimized', 'write_optimized', 'baseline'):
+            index_profiles.apply(self.connection, name, log=None)
+            self.assertEqual(set(index_profiles.managed_indexes(self.connection).values()), set(PROFILES[name]))
+            self.assertEqual(index_profiles.apply(self.connection, name, log=None), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+from park_management import db, loadfiles, schema
+from park_management.ingest import InsertIngest, PartialIngestError, build_statements
+from tests.scratch import ScratchDatabaseTestCase, create_scratch_db, drop_scratch_db
+
+SCRATCH_DB = 'park_management_ingest_test'
+
+
+class TestStatementBuilding(TestCase):
+    """Statement packing tests; these do not need a MySQL server."""
+
+    def setUp(self):
+        self.table = schema.parse_schema()['visitors']
+        self.rows = list(loadfiles.read_rows(os.path.join(schema.LOAD_DIR, 'visitors.csv')))
+
+    def test_01_statements_respect_the_byte_budget(self):
+        """Test that every statement fits the budget and all rows are included once"""
+        statements = list(build_statements(self.table, self.rows, 1024))
+        self.assertGreater(len(statements), 1)
+        for sql, _ in statements:
+            self.assertLessEqual(len(sql.encode('utf-8')), 1024)
+            self.assertTrue(sql.startswith('INSERT INTO visitors (id, DNI, name, address, profession, '
+                                           'accommodation_id, park_id) VALUES ('))
+        self.assertEqual(sum(count for _, count in statements), len(self.rows))
+
+    def test_02_values_are_escaped(self):
+        """Test that quotes are escaped and \\N becomes NULL"""
+        sql, count = next(build_statements(self.table, [['1', "O'Brien", 'x', None, 'p', '1', '1']], 1 << 20))
+        self.assertEqual(count, 1)
+        self.assertIn("'O\\'Brien'", sql)
+        self.assertIn(',NULL,', sql)
+
+    def test_03_inline_notes_are_not_values(self):
+        """Test that the ' -- note' after a row of area_elements.csv is not sent as part of the value"""
+        table = schema.parse_schema()['area_elements']
+        rows = list(loadfiles.read_rows(os.path.join(schema.LOAD_DIR, 'area_elements.csv')))
+        self.assertIn(['2', '1', '34', '1000'], rows)
+        self.assertTrue(all(row[-1] is None or row[-1].isdigit() for row in rows))
+        self.assertFalse(any('--' in sql for sql, _ in build_statements(table, rows, 1 << 20)))
+
+    def test_04_other_files_keep_a_dash_dash_value(self):
+        """Test that ' -- ' in the last field of a file without inline notes is part of the value"""
+        load_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(load_dir, 'natural_elements.csv')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('id,scientific_name,common_name\n1,"Lynx pardinus","Lince -- ibérico"\n')
+            self.assertEqual(list(loadfiles.read_rows(path)), [['1', 'Lynx pardinus', 'Lince -- ibérico']])
+        finally:
+            shutil.rmtree(load_dir)
+
+
+class TestInsertIngestIntegration(TestCase):
+    """Ingests data/load into a scratch copy of the schema with INSERTs only."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.connection = db.connect(database=None)
+        create_scratch_db(cls.connection, SCRATCH_DB)
+
+    @classmethod
+    def tearDownClass(cls):
+        drop_scratch_db(cls.connection, SCRATCH_DB)
+        cls.connection.close()
+
+    def test_01_ingests_every_row(self):
+        """Test that every non-comment CSV row ends up in its table"""
+        ingest = InsertIngest(workers=3, check_foreign_keys=True, max_statement_bytes=4096,
+                              connection_options={'database': SCRATCH_DB}, log=None)
+        stats = ingest.run()
+        self.connection.commit()
+        with self.connection.cursor() as cursor:
+            for name, table_stats in stats.items():
+                expected = sum(1 for _ in loadfiles.read_rows(ingest.csv_path(name)))
+                cursor.execute(f"SELECT COUNT(*) FROM {SCRATCH_DB}.{name};")
+                self.assertEqual(cursor.fetchone()[0], expected, name)
+                self.assertEqual(table_stats.rows, expected, name)
+
+    def test_02_area_elements_counts_come_from_the_csv(self):
+        """Test that rows of area_elements.csv with an inline note keep their number_of_individuals"""
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"SELECT number_of_individuals FROM {SCRATCH_DB}.area_elements "
+                           "WHERE park_id = 2 AND area_number = 1 AND element_id = 34")
+            self.assertEqual(cursor.fetchone()[0], 1000)
+
+    def test_03_loaded_counts_are_the_first_census(self):
+        """Test that the ingest records the loaded counts in population_history like populate_data.sql"""
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {SCRATCH_DB}.area_elements WHERE number_of_individuals IS NOT NULL")
+            expected = cursor.fetchone()[0]
+            cursor.execute(f"SELECT COUNT(*) FROM {SCRATCH_DB}.population_history")
+            self.assertEqual(cursor.fetchone()[0], expected)
+
+
+class TestPartialIngest(ScratchDatabaseTestCase):
+    """A failing statement on a scratch schema reports what was and was not loaded."""
+
+    scratch_db = SCRATCH_DB + '_partial'
+
+    def setUp(self):
+        super().setUp()
+        self.load_dir = tempfile.mkdtemp(prefix='park_ingest_')
+        for name in os.listdir(schema.LOAD_DIR):
+            shutil.copy(os.path.join(schema.LOAD_DIR, name), self.load_dir)
+        with open(os.path.join(self.load_dir, 'visitors.csv'), encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        with open(os.path.join(self.load_dir, 'visitors.csv'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines + [lines[-1]]) + '\n')  # the last visitor twice: duplicate key
+
+    def tearDown(self):
+        shutil.rmtree(self.load_dir, ignore_errors=True)
+        super().tearDown()
+
+    def test_01_failure_reports_the_partial_state(self):
+        """Test that a duplicate key names the failing table, the loaded tables and the committed rows"""
+        ingest = InsertIngest(self.load_dir, workers=2, max_statement_bytes=1024,
+                              connection_options={'database': self.scratch_db}, log=None)
+        with self.assertRaises(PartialIngestError) as raised:
+            ingest.run()
+        error = raised.exception
+        position = ingest.tables.index('visitors')
+        self.assertEqual(error.table, 'visitors')
+        self.assertEqual(error.loaded, ingest.tables[:position])
+        self.assertEqual(error.remaining, ingest.tables[position + 1:])
+        self.assertEqual(self.query("SELECT COUNT(*) FROM visitors"), [(error.committed_rows,)])
+        for name in error.loaded:
+            expected = sum(1 for _ in loadfiles.read_rows(ingest.csv_path(name)))
+            self.assertEqual(self.query(f"SELECT COUNT(*) FROM {name}"), [(expected,)], name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from contextlib import contextmanager
+from unittest import TestCase
+
+import pymysql
+
+from park_management import db, generator, schema
+from park_management.loader import ParallelLoader, split_csv
+from tests.scratch import create_scratch_db, drop_scratch_db
+
+SCRATCH_DB = 'park_management_loader_test'
+
+
+class RecordingLoader(ParallelLoader):
+    """ParallelLoader that records chunk order instead of talking to MySQL."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, log=None, **kwargs)
+        self.events = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def _fake_pool(self):
+        yield None
+
+    def _open_pool(self):
+        return self._fake_pool()
+
+    def _rebuild_summaries(self, pool):
+        self.events.append('rebuild_summaries')
+
+    def _load_chunk(self, pool, chunk):
+        with open(chunk.path, encoding='utf-8') as f:
+            rows = sum(1 for _ in f) - chunk.ignore_lines
+        with self.lock:
+            self.events.append(chunk.table)
+        return rows
+
+
+class TestParallelLoader(TestCase):
+    """Scheduling and chunking tests; these do not need a MySQL server."""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.tables = schema.parse_schema()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def test_01_split_csv_preserves_rows(self):
+        """Test that chunks are cut on line boundaries and contain every data row once"""
+        path = os.path.join(self.work_dir, 'visitors.csv')
+        lines = [f'{i},"V{i:06d}","Name {i}","Addr","Prof",1,1\n' for i in range(1, 2001)]
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('id,DNI,name,address,profession,accommodation_id,park_id\n')
+            f.writelines(lines)
+
+        chunks = split_csv('visitors', path, 4096, self.work_dir)
+        self.assertGreater(len(chunks), 1)
+        rebuilt = []
+        for chunk in chunks:
+            self.assertEqual(chunk.ignore_lines, 0)
+            with open(chunk.path, encoding='utf-8') as f:
+                rebuilt.extend(f.readlines())
+        self.assertEqual(rebuilt, lines)
+
+    def test_02_small_file_is_a_single_chunk(self):
+        """Test that files under the chunk size are loaded in place, skipping the header"""
+        chunks = split_csv('parks', os.path.join(schema.LOAD_DIR, 'parks.csv'), 1 << 20, self.work_dir)
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0].ignore_lines, 1)
+
+    def test_03_tables_start_after_their_parents(self):
+        """Test that no chunk of a table is loaded before all chunks of the tables it references"""
+        generator.generate(self.work_dir, scale_factor=0.002, seed=1, log=None)
+        loader = RecordingLoader(self.work_dir, workers=4, chunk_bytes=2048)
+        stats = loader.run()
+
+        for name in loader.tables:
+            first_own = loader.events.index(name)
+            for dep in self.tables[name].dependencies:
+                last_dep = len(loader.events) - 1 - loader.events[::-1].index(dep)
+                self.assertLess(last_dep, first_own, f"{name} started before {dep} finished")
+        self.assertGreater(stats['area_elements'].chunks, 1)
+
+    def test_04_row_counts_are_reported_per_table(self):
+        """Test that the per-table stats add up to the CSV row counts"""
+        loader = RecordingLoader(schema.LOAD_DIR, workers=2)
+        stats = loader.run()
+        for name, table_stats in stats.items():
+            with open(loader.csv_path(name), encoding='utf-8') as f:
+                expected = sum(1 for line in f if line.strip()) - 1
+            self.assertEqual(table_stats.rows, expected, name)
+
+    def test_05_element_food_waits_for_the_tables_its_trigger_checks(self):
+        """Test that element_food starts only after vegetal_elements and mineral_elements finished"""
+        loader = RecordingLoader(schema.LOAD_DIR, workers=4)
+        loader.run()
+        first_food = loader.events.index('element_food')
+        for dep in ('vegetal_elements', 'mineral_elements'):
+            self.assertLess(len(loader.events) - 1 - loader.events[::-1].index(dep), first_food, dep)
+
+
+class TestParallelLoaderIntegration(TestCase):
+    """Loads data/load into a scratch copy of the schema."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.connection = db.connect(database=None, local_infile=True)
+        with cls.connection.cursor() as cursor:
+            cursor.execute("SHOW GLOBAL VARIABLES LIKE 'local_infile';")
+            setting = cursor.fetchone()
+            if not setting or setting[1] != 'ON':
+                cls.connection.close()
+                raise unittest.SkipTest("local_infile is disabled on the server")
+        create_scratch_db(cls.connection, SCRATCH_DB)
+
+    @classmethod
+    def tearDownClass(cls):
+        drop_scratch_db(cls.connection, SCRATCH_DB)
+        cls.connection.close()
+
+    def test_01_loads_every_row_with_foreign_key_checks(self):
+        """Test that a parallel load with FK checks on loads the same rows as populate_data.sql"""
+        loader = ParallelLoader(workers=4, check_foreign_keys=True, log=None,
+                                connection_options={'database': SCRATCH_DB})
+        stats = loader.run()
+        with self.connection.cursor() as cursor:
+            for name, table_stats in stats.items():
+                cursor.execute(f"SELECT COUNT(*) FROM {SCRATCH_DB}.{name};")
+                self.assertEqual(cursor.fetchone()[0], table_stats.rows, name)
+                self.assertGreater(table_stats.rows, 0, name)
+
+    def test_02_invalid_food_edge_is_rejected(self):
+        """Test that a mineral used as food fails the parallel load like it fails populate_data.sql"""
+        work_dir = tempfile.mkdtemp()
+        try:
+            for name in os.listdir(schema.LOAD_DIR):
+                shutil.copy(os.path.join(schema.LOAD_DIR, name), work_dir)
+            with open(os.path.join(work_dir, 'element_food.csv'), 'a', encoding='utf-8') as f:
+                f.write('1,51\n')  # animal 1 eats mineral 51
+            create_scratch_db(self.connection, SCRATCH_DB)
+            loader = ParallelLoader(work_dir, workers=4, log=None, connection_options={'database': SCRATCH_DB})
+            with self.assertRaises(pymysql.MySQLError):
+                loader.run()
+        finally:
+            shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
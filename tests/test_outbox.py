@@ -0,0 +1,224 @@
+import asyncio
+import email
+import socketserver
+import threading
+import time
+import unittest
+from unittest import TestCase
+
+from park_management import db
+from park_management.outbox import Alert, OutboxStore, OutboxWorker, group_digests
+from tests.scratch import ScratchDatabaseTestCase
+
+SCRATCH_DB = 'park_management_outbox_test'
+
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            self.reply('220 localhost test SMTP')
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                command = line[:4].upper()
+                if command in (b'EHLO', b'HELO'):
+                    self.reply('250 localhost')
+                elif command == b'MAIL':
+                    with server.lock:
+                        refuse = server.refuse_next > 0
+                        server.refuse_next -= refuse
+                    self.reply('451 try again later' if refuse else '250 OK')
+                elif command == b'DATA':
+                    self.reply('354 end with .')
+                    data = b''.join(iter(self.rfile.readline, b'.\r\n'))
+                    time.sleep(server.delay)
+                    with server.lock:
+                        server.messages.append(email.message_from_bytes(data))
+                    self.reply('250 queued')
+                elif command == b'QUIT':
+                    self.reply('221 bye')
+                    return
+                elif command in (b'RCPT', b'RSET', b'NOOP'):
+                    self.reply('250 OK')
+                else:
+                    self.reply('502 not implemented')
+        finally:
+            with server.lock:
+                server.active -= 1
+
+
+class LocalSmtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, delay=0.0):
+        super().__init__(('127.0.0.1', 0), SmtpHandler)
+        self.lock = threading.Lock()
+        self.messages = []
+        self.active = self.max_active = self.refuse_next = 0
+        self.delay = delay
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def options(self):
+        return {'host': '127.0.0.1', 'port': self.server_address[1]}
+
+
+class MemoryStore:
+    """OutboxStore stand-in keeping the outbox columns in a dict."""
+
+    def __init__(self, alerts, max_attempts=3):
+        self.rows = {alert.log_id: {'alert': alert, 'status': 'pending', 'attempts': 0, 'claimed': False}
+                     for alert in alerts}
+        self.max_attempts = max_attempts
+
+    def coalesce(self):
+        return None
+
+    def claim(self, batch_size):
+        pending = [row for _, row in sorted(self.rows.items())
+                   if row['status'] == 'pending' and not row['claimed']][:batch_size]
+        for row in pending:
+            row['claimed'] = True
+        return [row['alert'] for row in pending]
+
+    def mark_sent(self, log_ids):
+        for log_id in log_ids:
+            self.rows[log_id].update(status='sent', claimed=False, attempts=self.rows[log_id]['attempts'] + 1)
+
+    def mark_failed(self, log_ids, error, permanent=False):
+        given_up = 0
+        for log_id in log_ids:
+            row = self.rows[log_id]
+            row['attempts'] += 1
+            row['claimed'] = False
+            if permanent or row['attempts'] >= self.max_attempts:
+                row['status'] = 'failed'
+                given_up += 1
+        return given_up
+
+    def statuses(self):
+        return {log_id: row['status'] for log_id, row in self.rows.items()}
+
+
+def alerts():
+    return [Alert(1, 'a@example.com', 'Lynx pardinus', 10, 7), Alert(2, 'b@example.com', 'Quercus ilex', 50, 40),
+            Alert(3, 'a@example.com', 'Aquila adalberti', 4, 3), Alert(4, None, 'Puma concolor', 5, 1),
+            Alert(5, 'c@example.com', 'Lynx pardinus', 9, 8), Alert(6, 'a@example.com', 'Lynx pardinus', 7, 6)]
+
+
+class TestOutboxWorker(TestCase):
+    """Digests and delivery against a local stand-in SMTP server; these do not need a MySQL server."""
+
+    def setUp(self):
+        self.server = LocalSmtpServer(delay=0.05)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_01_group_digests(self):
+        """Test one digest per park email, in first-seen order, with unaddressed alerts apart"""
+        digests, unaddressed = group_digests(alerts())
+        self.assertEqual([(digest.park_email, digest.log_ids) for digest in digests],
+                         [('a@example.com', [1, 3, 6]), ('b@example.com', [2]), ('c@example.com', [5])])
+        self.assertEqual([alert.log_id for alert in unaddressed], [4])
+        message = digests[0].message()
+        self.assertEqual(message['Subject'], "Species decrease alert: 2 species declined")
+        self.assertIn("Lynx pardinus: 7 -> 6", message.get_content())
+
+    def test_02_sends_one_digest_per_park_concurrently(self):
+        """Test that every park gets one message, sessions run in parallel and rows are marked"""
+        store = MemoryStore(alerts())
+        worker = OutboxWorker(store, self.server.options, concurrency=3, batch_size=100, log=None)
+        metrics = asyncio.run(worker.run(once=True))
+        self.assertEqual(sorted(message['To'] for message in self.server.messages),
+                         ['a@example.com', 'b@example.com', 'c@example.com'])
+        self.assertGreater(self.server.max_active, 1)
+        self.assertEqual(store.statuses(), {1: 'sent', 2: 'sent', 3: 'sent', 4: 'failed', 5: 'sent', 6: 'sent'})
+        self.assertEqual((metrics.alerts_sent, metrics.digests_sent, metrics.alerts_given_up), (5, 3, 1))
+
+    def test_03_retries_refused_messages(self):
+        """Test that a refused digest stays pending for a retry and is given up after max attempts"""
+        self.server.refuse_next = 1
+        store = MemoryStore(alerts()[:2], max_attempts=2)
+        worker = OutboxWorker(store, self.server.options, concurrency=1, batch_size=100, log=None)
+        asyncio.run(worker.process_batch())
+        self.assertEqual(sorted(store.statuses().values()), ['pending', 'sent'])
+        asyncio.run(worker.process_batch())
+        self.assertEqual(store.statuses(), {1: 'sent', 2: 'sent'})
+        self.assertEqual(worker.metrics.digests_failed, 1)
+
+        self.server.refuse_next = 2
+        store = MemoryStore(alerts()[:1], max_attempts=2)
+        worker = OutboxWorker(store, self.server.options, concurrency=1, log=None)
+        asyncio.run(worker.run(once=True))
+        self.assertEqual(store.statuses(), {1: 'failed'})
+
+
+class TestOutboxStore(ScratchDatabaseTestCase):
+    """Claims, leases and retries on email_log in a scratch schema."""
+
+    scratch_db = SCRATCH_DB
+
+    def setUp(self):
+        super().setUp()
+        with self.connection.cursor() as cursor:
+            cursor.executemany("INSERT INTO parks (id, name, declaration_date, code, contact_email) "
+                               "VALUES (%s, %s, '2020-01-01', %s, %s)",
+                               [(park_id, f"Parque {park_id}", f"P{park_id}", f"p{park_id}@example.com")
+                                for park_id in (1, 2, 3)])
+            cursor.executemany("INSERT INTO email_log (park_id, element_id, old_count, new_count) "
+                               "VALUES (%s, %s, %s, %s)",
+                               [(index % 3 + 1, index, 10, 5) for index in range(10)])
+        self.connection.commit()
+        self.other = db.connect(database=SCRATCH_DB)
+
+    def tearDown(self):
+        self.other.close()
+        super().tearDown()
+
+    def test_01_concurrent_claims_are_disjoint(self):
+        """Test that a batch locked by one worker is skipped, not waited for, by another"""
+        first, second = OutboxStore(self.connection, 'one'), OutboxStore(self.other, 'two')
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT log_id FROM email_log WHERE log_id <= 4 FOR UPDATE")
+            started = time.perf_counter()
+            claimed = second.claim(100)
+            self.assertLess(time.perf_counter() - started, 1)
+        self.connection.rollback()
+        self.assertEqual([alert.log_id for alert in claimed], [5, 6, 7, 8, 9, 10])
+        self.assertEqual(claimed[0].park_email, 'p2@example.com')
+        self.assertEqual([alert.log_id for alert in first.claim(100)], [1, 2, 3, 4])
+        self.assertEqual(first.claim(100), [])
+
+    def test_02_sent_and_failed_rows(self):
+        """Test marking sent, backoff for a retry, and giving up after max_attempts"""
+        store = OutboxStore(self.connection, max_attempts=2, backoff_base=3600)
+        store.claim(3)
+        store.mark_sent([1, 2])
+        self.assertEqual(store.mark_failed([3], 'refused'), 0)
+        self.assertEqual([alert.log_id for alert in store.claim(100)], list(range(4, 11)))  # 3 waits for its retry
+        with self.connection.cursor() as cursor:
+            cursor.execute("UPDATE email_log SET next_attempt_at = NULL, claimed_until = NULL")
+        self.connection.commit()
+        store.claim(100)
+        self.assertEqual(store.mark_failed([3], 'refused again'), 1)
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT log_id, status, attempts, last_error FROM email_log WHERE log_id <= 3")
+            self.assertEqual([tuple(row) for row in cursor.fetchall()],
+                             [(1, 'sent', 1, None), (2, 'sent', 1, None), (3, 'failed', 2, 'refused again')])
+
+
+if __name__ == '__main__':
+    unittest.main()
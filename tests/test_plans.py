@@ -0,0 +1,93 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+from park_management import plans
+
+GROUP_BY_PLAN = {
+    "query_block": {
+        "select_id": 1,
+        "grouping_operation": {
+            "using_temporary_table": True,
+            "using_filesort": False,
+            "nested_loop": [
+                {"table": {"table_name": "ne", "access_type": "ALL", "rows_examined_per_scan": 120,
+                           "filtered": "100.00"}},
+                {"table": {"table_name": "ae", "access_type": "ref", "key": "idx_area_elements_element_id",
+                           "rows_examined_per_scan": 3, "filtered": "100.00"}},
+            ],
+        },
+        "having_subqueries": [
+            {"query_block": {"select_id": 2, "table": {"table_name": "parks", "access_type": "index",
+                                                       "key": "idx_parks_code", "rows_examined_per_scan": 4}}},
+        ],
+    }
+}
+
+SUMMARY_PLAN = {
+    "query_block": {
+        "nested_loop": [
+            {"table": {"table_name": "c", "access_type": "ref", "key": "idx_species_park_counts_park_count",
+                       "rows_examined_per_scan": 2}},
+            {"table": {"table_name": "ne", "access_type": "eq_ref", "key": "PRIMARY", "rows_examined_per_scan": 1}},
+        ]
+    }
+}
+
+ANALYZE_TEXT = """-> Filter: (count(distinct ae.park_id) = 1)  (actual time=0.910..0.912 rows=2 loops=1)
+    -> Group aggregate: count(distinct ae.park_id)  (cost=52.10 rows=120) (actual time=0.101..0.880 rows=40 loops=1)
+        -> Nested loop inner join  (cost=40.10 rows=136) (actual time=0.050..0.600 rows=136 loops=1)
+            -> Table scan on ne  (cost=12.25 rows=120) (actual time=0.030..0.090 rows=120 loops=1)
+            -> Index lookup on ae using idx_area_elements_element_id (element_id=ne.id)  (cost=0.25 rows=1) (actual time=0.003..0.004 rows=1 loops=120)
+"""
+
+
+class TestPlanModel(TestCase):
+    """Plan parsing and diffs; these do not need a MySQL server."""
+
+    def test_01_parse_json_plan(self):
+        """Test that nested loops, subqueries and the temporary-table flag are found"""
+        plan = plans.parse_json_plan('ar4', json.dumps(GROUP_BY_PLAN))
+        self.assertEqual([(table.table, table.access_type, table.key) for table in plan.tables],
+                         [('ne', 'ALL', None), ('ae', 'ref', 'idx_area_elements_element_id'),
+                          ('parks', 'index', 'idx_parks_code')])
+        self.assertEqual(plan.table('ne').filtered, 100.0)
+        self.assertEqual(plan.flags, {'full scan on ne', 'temporary table'})
+
+    def test_02_parse_analyze(self):
+        """Test that the iterator tree gives depth, estimates, actual time and rows per table"""
+        steps = plans.parse_analyze(ANALYZE_TEXT)
+        self.assertEqual([step.depth for step in steps], [0, 1, 2, 3, 3])
+        self.assertEqual((steps[4].table, steps[4].index, steps[4].loops), ('ae', 'idx_area_elements_element_id', 120))
+        plan = plans.attach_steps(plans.parse_json_plan('ar4', GROUP_BY_PLAN), steps)
+        self.assertEqual((plan.table('ne').actual_ms, plan.table('ne').actual_rows), (0.09, 120.0))
+        self.assertIsNone(plan.table('parks').actual_ms)
+
+    def test_03_diff_flags_regressions(self):
+        """Test that a new full scan, temporary table and lost index are regressions, and fixes are not"""
+        before = {'ar4': plans.parse_json_plan('ar4', SUMMARY_PLAN)}
+        after = {'ar4': plans.parse_json_plan('ar4', GROUP_BY_PLAN)}
+        changes = plans.diff(before, after)
+        self.assertEqual(sorted((change.field, change.after) for change in changes if change.regression),
+                         [('access_type', 'ALL'), ('flag', 'full scan on ne'), ('flag', 'temporary table'),
+                          ('key', None), ('rows_examined', 120.0)])
+        self.assertFalse(any(change.regression for change in plans.diff(after, before)))
+
+    def test_04_save_and_load(self):
+        """Test that a capture round-trips through its JSON file"""
+        work_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(work_dir, 'plans.json')
+            captured = {'ar4': plans.attach_steps(plans.parse_json_plan('ar4', GROUP_BY_PLAN),
+                                                  plans.parse_analyze(ANALYZE_TEXT))}
+            plans.save(path, captured)
+            self.assertEqual(plans.load(path), captured)
+        finally:
+            shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import datetime
+import unittest
+from unittest import TestCase
+
+from park_management import population, schema
+from tests.scratch import ScratchDatabaseTestCase
+
+SCRATCH_DB = 'park_management_population_test'
+
+
+class TestPopulationEncoding(TestCase):
+    """Day/month encoding, carry-forward and partition statements; these do not need a MySQL server."""
+
+    def test_01_compact_dates(self):
+        """Test that day and month numbers round-trip and fit in SMALLINT UNSIGNED until 2179"""
+        date = datetime.date(2024, 2, 29)
+        self.assertEqual(population.day_date(population.census_day(date)), date)
+        self.assertEqual(population.month_date(population.month_index(date)), datetime.date(2024, 2, 1))
+        self.assertEqual(population.census_day(datetime.date(2021, 1, 1)), 7671)
+        self.assertLess(population.census_day(datetime.date(2179, 1, 1)), 2 ** 16)
+
+    def test_02_carry_forward(self):
+        """Test that each area keeps its last count until it is censused again"""
+        rows = [(1, 1, 10), (1, 2, 5), (3, 1, 8), (4, 2, 0), (4, 3, 7)]
+        self.assertEqual(population.carry_forward({}, rows), [(1, 15), (3, 13), (4, 15)])
+        self.assertEqual(population.carry_forward({2: 4}, [(1, 1, 10)]), [(1, 14)])
+
+    def test_03_reorganize_statement(self):
+        """Test that p_future is split into the missing yearly partitions"""
+        existing = [('p_old', 7305), ('p2027', 10227), ('p_future', None)]
+        statement = population.reorganize_statement(existing, 2029)
+        self.assertIn("PARTITION p2028 VALUES LESS THAN (10593)", statement)
+        self.assertIn("PARTITION p2029 VALUES LESS THAN (10958)", statement)
+        self.assertTrue(statement.rstrip().endswith("PARTITION p_future VALUES LESS THAN MAXVALUE\n)"))
+        self.assertIsNone(population.reorganize_statement(existing, 2027))
+
+    def test_04_partitioned_table_in_schema(self):
+        """Test that the PARTITION BY clause does not leak into the parsed columns"""
+        table = schema.parse_schema()['population_history']
+        self.assertEqual(table.column_names, ('park_id', 'element_id', 'census_day', 'area_number', 'individuals'))
+        self.assertEqual(table.primary_key, ('park_id', 'element_id', 'census_day', 'area_number'))
+
+
+class TestPopulationHistory(ScratchDatabaseTestCase):
+    """History triggers, rollups and trend queries on a scratch schema."""
+
+    scratch_db = SCRATCH_DB
+
+    def setUp(self):
+        super().setUp()
+        self.execute("INSERT INTO parks (id, name, declaration_date, code) VALUES (1, 'Parque A', '2020-01-01', 'A')",
+                     "INSERT INTO park_areas (park_id, area_number, name) VALUES (1, 1, 'Norte'), (1, 2, 'Sur')",
+                     "INSERT INTO natural_elements (id, scientific_name) VALUES (1, 'Lynx pardinus')")
+
+    def test_01_triggers_append_history(self):
+        """Test that inserts and count changes are recorded once per day and rolled up by month"""
+        self.execute("INSERT INTO area_elements VALUES (1, 1, 1, 10), (1, 2, 1, 4)",
+                     "UPDATE area_elements SET number_of_individuals = 8 WHERE area_number = 1",
+                     "UPDATE area_elements SET number_of_individuals = 6 WHERE area_number = 1")
+        self.assertEqual(self.query("SELECT area_number, individuals FROM population_history ORDER BY area_number"),
+                         [(1, 6), (2, 4)])
+        self.assertEqual(self.query("SELECT last_count, min_count, max_count FROM population_monthly "
+                                    "WHERE area_number = 1"), [(6, 6, 10)])
+        today = datetime.date.today()
+        self.assertEqual(population.trend(self.connection, 1, 1, 1, 'day'), [(today, 10)])
+        self.assertEqual(population.trend(self.connection, 1, 1, 1, 'year'), [(datetime.date(today.year, 1, 1), 10)])
+
+    def test_02_trend_across_months_and_retention(self):
+        """Test monthly trends over recorded censuses, and that dropping raw partitions keeps the rollup"""
+        self.execute("SET @skip_summary_triggers = 1",
+                     "INSERT INTO area_elements VALUES (1, 1, 1, 10), (1, 2, 1, 4)",
+                     "SET @skip_summary_triggers = NULL")
+        population.record_census(self.connection, datetime.date(2019, 11, 5))
+        self.execute("SET @skip_summary_triggers = 1",
+                     "UPDATE area_elements SET number_of_individuals = 7 WHERE area_number = 1",
+                     "SET @skip_summary_triggers = NULL")
+        population.record_census(self.connection, datetime.date(2020, 3, 2))
+        self.execute("CALL record_population(1, 2, 1, 1, '2020-05-20')")
+
+        today = datetime.date(2020, 11, 30)  # the 2019-11 census is the opening value
+        self.assertEqual(population.trend(self.connection, 1, 1, 1, 'month', today),
+                         [(datetime.date(2020, 3, 1), 11), (datetime.date(2020, 5, 1), 8)])
+        self.assertEqual(population.trend(self.connection, 1, 1, 1, 'day', today),
+                         [(datetime.date(2020, 3, 2), 11), (datetime.date(2020, 5, 20), 8)])
+
+        self.assertEqual(population.drop_before(self.connection, 2020), ['p_old'])
+        self.assertEqual(self.query("SELECT COUNT(*) FROM population_history"), [(3,)])
+        self.assertEqual(population.trend(self.connection, 1, 1, 2, 'year', today),
+                         [(datetime.date(2019, 1, 1), 14), (datetime.date(2020, 1, 1), 8)])
+        self.assertIsNotNone(population.add_partitions(self.connection, 2030))
+        self.assertIn(('p2030', 11323), population.partitions(self.connection))
+
+
+if __name__ == '__main__':
+    unittest.main()
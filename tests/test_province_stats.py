@@ -0,0 +1,60 @@
+import unittest
+
+from park_management import province_stats
+from tests.scratch import ScratchDatabaseTestCase
+
+SCRATCH_DB = 'park_management_province_stats_test'
+
+
+class TestProvinceParkStats(ScratchDatabaseTestCase):
+    """Trigger maintenance, queries and rebuild of province_park_stats on a scratch schema."""
+
+    scratch_db = SCRATCH_DB
+
+    def setUp(self):
+        super().setUp()
+        with self.connection.cursor() as cursor:
+            cursor.execute("INSERT INTO provinces VALUES (1, 'Salta', 'Org 1'), (2, 'Jujuy', 'Org 2')")
+            cursor.execute("INSERT INTO parks (id, name, declaration_date, code) VALUES "
+                           "(1, 'Calilegua', '1979-07-19', 'CA'), (2, 'El Rey', '1948-06-24', 'ER')")
+            cursor.execute("INSERT INTO park_provinces VALUES (1, 2, 76306), (2, 1, 44162), (2, 2, 100)")
+        self.connection.commit()
+
+    def stats(self, province_id):
+        row = province_stats.province_stats(self.connection, province_id)
+        return row['park_count'], row['total_extension']
+
+    def test_01_triggers_keep_the_summary_current(self):
+        """Test inserts, moves between provinces, updates and park deletions"""
+        top = province_stats.province_with_most_parks(self.connection)
+        self.assertEqual((top['name'], top['park_count'], top['total_extension']), ('Jujuy', 2, 76406))
+
+        # Park 1 moves from Jujuy to Salta, where only park 2 was
+        with self.connection.cursor() as cursor:
+            cursor.execute("UPDATE park_provinces SET province_id = 1, extension_in_province = 50 "
+                           "WHERE park_id = 1 AND province_id = 2")
+        self.connection.commit()
+        self.assertEqual(self.stats(1), (2, 44212))
+        self.assertEqual(self.stats(2), (1, 100))
+
+        with self.connection.cursor() as cursor:
+            cursor.execute("DELETE FROM parks WHERE id = 2")  # cascades to park_provinces
+        self.connection.commit()
+        self.assertEqual(self.stats(1), (1, 50))
+        self.assertEqual(self.stats(2), (0, 0))
+        self.assertEqual(province_stats.check(self.connection), [])
+
+    def test_02_check_reports_drift_and_rebuild_fixes_it(self):
+        """Test that the checker finds a tampered summary row and the rebuild restores it"""
+        with self.connection.cursor() as cursor:
+            cursor.execute("UPDATE province_park_stats SET park_count = 7 WHERE province_id = 1")
+        self.connection.commit()
+        drift = province_stats.check(self.connection)
+        self.assertEqual([(row['province_id'], row['actual_park_count']) for row in drift], [(1, 1)])
+
+        province_stats.rebuild(self.connection)
+        self.assertEqual(province_stats.check(self.connection), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from unittest import TestCase
+
+from park_management import schema, size_model
+from park_management.size_model import PAGE_SIZE, CensusActivity, SizeModel
+from tests.scratch import ScratchDatabaseTestCase
+
+SCRATCH_DB = 'park_management_size_model_test'
+
+
+class TestSizeModel(TestCase):
+    """Row costs, page allocation and calibration fitting; these do not need a MySQL server."""
+
+    def test_01_column_bytes(self):
+        """Test the stored size of the column types used in setup.sql"""
+        self.assertEqual([size_model.column_bytes(column_type) for column_type in
+                          ('INT', 'SMALLINT', 'DATE', 'DATETIME', 'TIME', 'DECIMAL(15,2)', 'DECIMAL(10, 2)',
+                           "ENUM('foot', 'vehicle')", "SET('vegetal', 'animal', 'mineral')", 'VARCHAR(10)')],
+                         [4, 2, 3, 5, 3, 7, 5, 1, 1, 10])
+        self.assertEqual(size_model.column_bytes('VARCHAR(255)'), size_model.DEFAULT_STRING_BYTES)
+        self.assertEqual(size_model.column_bytes('VARCHAR(255)', 40.5), 40.5)
+
+    def test_02_records_and_indexes(self):
+        """Test clustered and secondary record sizes and the implicit foreign key indexes"""
+        model = SizeModel()
+        # header 5, no NULL bitmap, trx id and roll pointer 13, three INT key columns and one nullable INT
+        self.assertEqual(model.row_bytes('area_elements'), 5 + 1 + 13 + 16)
+        self.assertEqual(model.secondary_indexes('area_elements'), [('element_id',)])
+        self.assertEqual(model.index_record_bytes('area_elements', ('element_id',)), 5 + 12)
+        self.assertEqual(SizeModel(profile='read_optimized').secondary_indexes('area_elements'),
+                         [('element_id', 'park_id')])
+        self.assertEqual(model.secondary_indexes('park_provinces'), [('province_id',)])
+
+    def test_03_allocation_and_partitions(self):
+        """Test single pages up to 32, whole extents beyond, one page per partition and derived counts"""
+        self.assertEqual([size_model.allocated_pages(pages) for pages in (0, 1.2, 32, 33, 96, 97)],
+                         [1, 2, 32, 96, 96, 160])
+        model = SizeModel()
+        self.assertEqual(model.estimate('parks', 0).data_bytes, PAGE_SIZE)
+        self.assertGreater(model.estimate('email_log', 0).data_bytes, 20 * PAGE_SIZE)
+        projected = {estimate.table: estimate.rows for estimate in model.project({'parks': 10, 'provinces': 2})}
+        self.assertEqual(projected, {'provinces': 2, 'parks': 10, 'province_park_stats': 2,
+                                     'park_visitor_counts': 160})
+        self.assertEqual(size_model.derived_counts({'area_elements': 473_700, 'natural_elements': 1_000,
+                                                    'parks': 50})['species_park_areas'], 47_370)
+        self.assertEqual(size_model.derived_counts({'area_elements': 1_000, 'natural_elements': 5,
+                                                    'parks': 2})['species_park_areas'], 10)
+
+    def test_04_fit(self):
+        """Test that factors scale the model onto measurements and ignore single-page tables"""
+        model = SizeModel()
+        modelled = model.estimate('visitors', 1_000_000)
+        measurements = [{'visitors': {'rows': 1_000_000, 'data_bytes': modelled.data_bytes * 1.25,
+                                      'index_bytes': modelled.index_bytes * 0.8},
+                         'parks': {'rows': 10, 'data_bytes': PAGE_SIZE * 3, 'index_bytes': PAGE_SIZE}}]
+        factors = size_model.fit(model, measurements)
+        self.assertEqual(factors, {'visitors': {'data': 1.25, 'index': 0.8}})
+        calibrated = SizeModel(calibration={'factors': factors}).estimate('visitors', 1_000_000)
+        self.assertEqual(calibrated.data_bytes, round(modelled.data_bytes * 1.25))
+
+    def test_05_history_tables_follow_census_activity(self):
+        """Test history and email_log counts from census activity, and the tables left without a count"""
+        activity = CensusActivity(years=2, censuses_per_year=24, changed_share=0.5, declined_share=0.25,
+                                  email_keep_months=6)
+        derived = size_model.derived_counts({'area_elements': 1_000}, activity)
+        self.assertEqual((derived['population_history'], derived['population_monthly'], derived['email_log']),
+                         (25_000, 19_000, 3_000))
+        quarterly = size_model.derived_counts({'area_elements': 1_000}, CensusActivity(censuses_per_year=4))
+        self.assertEqual((quarterly['population_history'], quarterly['population_monthly']), (3_000, 3_000))
+
+        lines = []
+        model = SizeModel()
+        estimates = model.project({'parks': 10})
+        size_model.report(estimates, log=lines.append, skipped=['email_log', 'population_history'])
+        self.assertEqual(lines[-1], "not projected (no row count): email_log, population_history")
+
+
+class TestMeasure(ScratchDatabaseTestCase):
+    """Measuring a scratch schema."""
+
+    scratch_db = SCRATCH_DB
+
+    def setUp(self):
+        super().setUp()
+        with self.connection.cursor() as cursor:
+            cursor.execute("INSERT INTO parks (id, name, declaration_date, code) VALUES "
+                           "(1, 'Parque A', '2020-01-01', 'A'), (2, 'Parque Nacional B', '2020-01-01', 'BB')")
+        self.connection.commit()
+
+    def test_01_measure_and_string_lengths(self):
+        """Test that row counts, sizes and average string lengths are read back"""
+        sizes = size_model.measure(self.connection)
+        self.assertEqual(sizes['parks']['rows'], 2)
+        self.assertGreaterEqual(sizes['parks']['data_bytes'], PAGE_SIZE)
+        lengths = size_model.string_lengths(self.connection, schema.parse_schema())
+        self.assertEqual(lengths['parks']['code'], 1.5)
+        self.assertEqual(lengths['parks']['name'], 12.5)
+        self.assertNotIn('visitors', lengths)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import TestCase
+
+from park_management import schema
+from park_management.snapshot import SnapshotReader, dump, restore, snapshot_path, write_snapshot
+from tests.scratch import ScratchDatabaseTestCase
+
+SCRATCH_DB = 'park_management_snapshot_test'
+
+
+class TestSnapshotFormat(TestCase):
+    """Round trips through the file format; these do not need a MySQL server."""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.tables = schema.parse_schema()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def round_trip(self, name, rows):
+        path = os.path.join(self.work_dir, name + '.pmsnap')
+        self.assertEqual(write_snapshot(path, self.tables[name], rows), len(rows))
+        return path
+
+    def test_01_round_trips_every_encoding(self):
+        """Test that ints, strings, dates and NULLs decode to the values that were written"""
+        rows = [(index, f'Parque {index}', date(1934, 10, 29) + timedelta(days=index),
+                 None if index % 3 else f'p{index}@example.com', f'P{index}', Decimal(index) / 4)
+                for index in range(1, 21)]
+        path = self.round_trip('parks', rows)
+        with SnapshotReader(path) as reader:
+            self.assertEqual(reader.rows, 20)
+            self.assertEqual(reader.read_rows(), rows)
+            self.assertEqual(reader.read_rows(9, 12), rows[9:12])
+            self.assertEqual(list(reader.column('id')), list(range(1, 21)))
+
+    def test_02_round_trips_times_and_timestamps(self):
+        """Test the TIME, ENUM and TIMESTAMP encodings"""
+        excursions = [(1, 'Monday', timedelta(hours=9, minutes=30), 'foot'), (2, 'Friday', timedelta(0), 'vehicle')]
+        with SnapshotReader(self.round_trip('excursions', excursions)) as reader:
+            self.assertEqual(reader.read_rows(), excursions)
+        log = [(1, 3, 7, 10, 4, datetime(2024, 5, 1, 12, 0, 1), 3,
+                'sent', 1, None, None, None, datetime(2024, 5, 1, 12, 0, 9), None)]
+        with SnapshotReader(self.round_trip('email_log', log)) as reader:
+            self.assertEqual(reader.read_rows(), log)
+
+    def test_03_rejects_other_files(self):
+        """Test that a file without the snapshot markers is refused"""
+        path = os.path.join(self.work_dir, 'parks.pmsnap')
+        with open(path, 'wb') as f:
+            f.write(b'not a snapshot' * 4)
+        with self.assertRaises(ValueError):
+            SnapshotReader(path)
+
+
+class TestSnapshotIntegration(ScratchDatabaseTestCase):
+    """Dumps and restores a scratch copy of the schema."""
+
+    scratch_db = SCRATCH_DB
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.options = {'database': SCRATCH_DB}
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.directory)
+
+    def fetch(self, sql):
+        self.connection.commit()
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchall()
+
+    def test_01_restore_resets_the_tables(self):
+        """Test that restore brings back the dumped rows and removes rows added afterwards"""
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {SCRATCH_DB}.provinces VALUES (1, 'Salta', 'Org 1'), (2, 'Jujuy', 'Org 2')")
+        self.connection.commit()
+        counts = dump(self.directory, self.options, log=None)
+        self.assertEqual(counts['provinces'], 2)
+        self.assertTrue(os.path.exists(snapshot_path(self.directory, 'parks')))
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"UPDATE {SCRATCH_DB}.provinces SET name = 'Changed'")
+            cursor.execute(f"INSERT INTO {SCRATCH_DB}.provinces VALUES (3, 'Tucumán', 'Org 3')")
+        self.connection.commit()
+
+        restore(self.directory, workers=2, range_rows=1, connection_options=self.options, log=None)
+        self.assertEqual(self.fetch(f"SELECT id, name, responsible_organization FROM {SCRATCH_DB}.provinces"),
+                         ((1, 'Salta', 'Org 1'), (2, 'Jujuy', 'Org 2')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from park_management import species_counts
+from tests.scratch import ScratchDatabaseTestCase
+
+SCRATCH_DB = 'park_management_species_counts_test'
+
+
+class TestSpeciesParkCounts(ScratchDatabaseTestCase):
+    """Trigger maintenance and queries of species_park_counts on a scratch schema."""
+
+    scratch_db = SCRATCH_DB
+
+    def setUp(self):
+        super().setUp()
+        self.execute(
+            "INSERT INTO parks (id, name, declaration_date, code) VALUES "
+            "(1, 'Calilegua', '1979-07-19', 'CA'), (2, 'El Rey', '1948-06-24', 'ER')",
+            "INSERT INTO park_areas (park_id, area_number, name) VALUES (1, 1, 'A1'), (1, 2, 'A2'), (2, 1, 'B1')",
+            "INSERT INTO natural_elements (id, scientific_name) VALUES (1, 'Plantus communis'), (2, 'Plantus rarus')",
+            "INSERT INTO vegetal_elements (element_id) VALUES (1), (2)",
+            "INSERT INTO area_elements VALUES (1, 1, 1, 10), (1, 2, 1, 5), (2, 1, 1, 7), (1, 2, 2, 3)",
+        )
+
+    def test_01_summary_answers_the_distribution_queries(self):
+        """Test FR2 / AR3 / AR4 on the summary against the GROUP BY formulation"""
+        self.assertEqual(species_counts.areas_in_park(self.connection, 1, 1), 2)
+        self.assertEqual(species_counts.run_query(self.connection, 'ar3'), ['Plantus communis'])
+        self.assertEqual(species_counts.run_query(self.connection, 'ar4'), ['Plantus rarus'])
+        for name in species_counts.QUERIES:
+            self.assertEqual(species_counts.run_query(self.connection, name),
+                             species_counts.run_query(self.connection, name, use_summary=False), name)
+
+    def test_02_triggers_follow_moves_and_cascading_deletes(self):
+        """Test row moves, single deletes and area / park deletions that cascade"""
+        self.execute("UPDATE area_elements SET park_id = 2, area_number = 1 WHERE element_id = 2")
+        self.assertEqual(species_counts.areas_in_park(self.connection, 2, 1), 0)
+        self.assertEqual(species_counts.areas_in_park(self.connection, 2, 2), 1)
+        self.execute("DELETE FROM area_elements WHERE park_id = 1 AND area_number = 1 AND element_id = 1")
+        self.assertEqual(species_counts.run_query(self.connection, 'ar3'), ['Plantus communis'])
+        self.execute("DELETE FROM park_areas WHERE park_id = 1 AND area_number = 2")
+        self.assertEqual(species_counts.run_query(self.connection, 'ar4'), ['Plantus communis', 'Plantus rarus'])
+        self.execute("DELETE FROM parks WHERE id = 2")
+        self.assertEqual(species_counts.run_query(self.connection, 'ar4'), [])
+        self.assertEqual(species_counts.check(self.connection), [])
+
+    def test_03_check_and_rebuild(self):
+        """Test that drift is reported per table and fixed by the rebuild procedure"""
+        self.execute("UPDATE species_park_counts SET park_count = 5 WHERE element_id = 2")
+        drift = species_counts.check(self.connection)
+        self.assertEqual([(row['table'], row['element_id'], row['actual']) for row in drift],
+                         [('species_park_counts', 2, 1)])
+        species_counts.rebuild(self.connection)
+        self.assertEqual(species_counts.check(self.connection), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from unittest import TestCase
+
+from park_management.species_index import SpeciesParkIndex
+
+
+class TestSpeciesParkIndex(TestCase):
+    """Bitset queries mirroring the FR2 / AR3 / AR4 fixtures; these do not need a MySQL server."""
+
+    def setUp(self):
+        # Element 1 (vegetal) is in parks 10, 20, 30; element 2 (vegetal) only in 10;
+        # element 3 (animal) only in 30, in two areas.
+        self.index = SpeciesParkIndex([10, 20, 30], {'vegetal': [1, 2], 'animal': [3], 'mineral': []})
+        self.index.add_pairs([(10, 1), (20, 1), (30, 1), (10, 2), (30, 3), (30, 3)])
+
+    def test_01_distribution_queries(self):
+        """Test at-least-half (FR2), all parks (AR3) and only one park (AR4), with kind filters"""
+        self.assertEqual(self.index.in_at_least_half(kind='vegetal'), [1])
+        self.assertEqual(self.index.in_all_parks(), [1])
+        self.assertEqual(self.index.in_exactly_one(), [2, 3])
+        self.assertEqual(self.index.in_exactly_one(kind='animal'), [3])
+        self.assertEqual(self.index.in_at_least(2), [1])
+        self.assertEqual(self.index.parks_of(1), [10, 20, 30])
+
+    def test_02_queries_restricted_to_a_subset_of_parks(self):
+        """Test that masks limit the counts to the given parks"""
+        self.assertEqual(self.index.in_all_parks(park_ids=[10, 30]), [1])
+        self.assertEqual(self.index.in_exactly_one(park_ids=[20, 30]), [3])
+        self.assertEqual(self.index.park_counts(park_ids=[10])[2], 1)
+
+    def test_03_incremental_park_updates(self):
+        """Test replacing the contents of one park and dropping a deleted park"""
+        self.index.replace_park(20, [2, 3])
+        self.assertEqual(self.index.counts, {1: 2, 2: 2, 3: 2})
+        self.index.remove_park(30)
+        self.assertEqual(self.index.park_count, 2)
+        self.assertEqual(self.index.in_all_parks(), [2])
+        self.assertEqual(self.index.in_exactly_one(), [1, 3])
+        self.index.add_park(40)
+        self.assertEqual(self.index.in_all_parks(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from unittest import TestCase
+
+from park_management import db
+from park_management.trigger_profile import (DigestSnapshot, RunStats, TriggerProfiler, WORKLOADS, digest_delta,
+                                             histogram_percentiles, percentiles, trigger_costs)
+from tests.scratch import ScratchDatabaseTestCase
+
+SOURCE_DB = 'park_management_trigger_source_test'
+
+
+def run(workload, triggers, mean_us):
+    return RunStats(workload, triggers, 10, 0.1, mean_us, 0, 0, 0, 0, 0, 0, 'client')
+
+
+class TestLatencyStatistics(TestCase):
+    """Percentiles and trigger costs; these do not need a MySQL server."""
+
+    def test_01_percentiles(self):
+        """Test nearest-rank percentiles of client timings and of a cumulative histogram"""
+        self.assertEqual(percentiles(range(1, 101)), [50, 95, 99])
+        self.assertEqual(percentiles([]), [0.0, 0.0, 0.0])
+        self.assertEqual(histogram_percentiles([(10, 50), (20, 90), (40, 99), (80, 100)]), [10, 40, 40])
+
+    def test_02_trigger_costs(self):
+        """Test that each trigger is charged its run's mean latency minus the no-trigger run"""
+        runs = [run('area_elements_update', '', 100), run('area_elements_update', 'species_decrease_email', 130),
+                run('area_elements_update', 'species_decrease_email+x', 170), run('element_food_insert', 'y', 90)]
+        self.assertEqual(trigger_costs(runs), {('area_elements_update', 'species_decrease_email'): 30,
+                                               ('area_elements_update', 'species_decrease_email+x'): 70})
+
+    def test_03_digest_delta(self):
+        """Test that a run is measured as the difference of two digest snapshots, not their totals"""
+        before = DigestSnapshot(100, 10 ** 9, 10 ** 7, [(10 ** 7, 60), (2 * 10 ** 7, 40)])
+        after = DigestSnapshot(200, 3 * 10 ** 9, 3 * 10 ** 7,
+                               [(10 ** 7, 70), (2 * 10 ** 7, 80), (4 * 10 ** 7, 50)])
+        # 100 new statements: 10 up to 10 µs, 40 up to 20 µs and 50 up to 40 µs
+        self.assertEqual(digest_delta(before, after), (100, 20.0, [20.0, 40.0, 40.0], 20.0))
+        self.assertIsNone(digest_delta(before, before))
+        self.assertEqual(digest_delta(DigestSnapshot(0, 0, 0, []), before)[:2], (100, 10.0))
+
+
+class TestTriggerProfiler(ScratchDatabaseTestCase):
+    """Shadow schema and workload runs against a small source schema."""
+
+    scratch_db = SOURCE_DB
+
+    def setUp(self):
+        super().setUp()
+        with self.connection.cursor() as cursor:
+            for sql in ("INSERT INTO parks (id, name, declaration_date, code) VALUES (1, 'Parque A', '2020-01-01', 'A')",
+                        "INSERT INTO park_areas (park_id, area_number, name) VALUES (1, 1, 'Norte')",
+                        "INSERT INTO natural_elements (id, scientific_name) VALUES (1, 'Lynx'), (2, 'Oryctolagus')",
+                        "INSERT INTO animal_elements (element_id) VALUES (1), (2)",
+                        "INSERT INTO element_food VALUES (1, 2)",
+                        "INSERT INTO area_elements VALUES (1, 1, 1, 10), (1, 1, 2, 50)"):
+                cursor.execute(sql)
+        self.connection.commit()
+        self.profiler = TriggerProfiler(SOURCE_DB, log=None)
+
+    def tearDown(self):
+        self.profiler.drop_shadow()
+        super().tearDown()
+
+    def test_01_profile_restores_the_shadow(self):
+        """Test that every configuration runs and the shadow data is back as copied afterwards"""
+        self.profiler.create_shadow()
+        self.assertIn('species_decrease_email', self.profiler.triggers_for(WORKLOADS['area_elements_update']))
+        results = self.profiler.profile(['element_food_insert', 'area_elements_update'], 10)
+        self.assertEqual(results[0].triggers, '')
+        self.assertIn('species_decrease_email', {result.triggers for result in results})
+        connection = db.connect(database=self.profiler.shadow)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT element_id, number_of_individuals FROM area_elements ORDER BY element_id")
+                self.assertEqual([tuple(row) for row in cursor.fetchall()], [(1, 10), (2, 50)])
+                cursor.execute("SELECT COUNT(*) FROM element_food")
+                self.assertEqual(cursor.fetchone()[0], 1)
+                cursor.execute("SELECT COUNT(*) FROM email_log")
+                self.assertEqual(cursor.fetchone()[0], 0)
+        finally:
+            connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from unittest import TestCase
+
+import numpy as np
+
+from park_management.verify import Verifier, missing_keys, pack_keys, rows_to_array
+
+
+class InMemoryVerifier(Verifier):
+    """Verifier reading key columns from dicts instead of MySQL."""
+
+    def __init__(self, data, **kwargs):
+        super().__init__(connection=None, log=None, **kwargs)
+        self.data = data
+
+    def fetch(self, table, columns):
+        rows = [tuple(row[column] for column in columns) for row in self.data.get(table, [])]
+        return rows_to_array(rows, len(columns))
+
+
+class TestVerifier(TestCase):
+    """Integrity checks over in-memory key columns; these do not need a MySQL server."""
+
+    def test_01_sorted_join_finds_missing_keys(self):
+        """Test the searchsorted anti-join, including keys past both ends of the parent array"""
+        parent = np.array([2, 4, 6], dtype=np.int64)
+        child = np.array([1, 2, 5, 6, 9], dtype=np.int64)
+        self.assertEqual(missing_keys(child, parent).tolist(), [True, False, True, False, True])
+        self.assertTrue(missing_keys(child, parent[:0]).all())
+
+    def test_02_composite_keys_pack_without_collisions(self):
+        """Test that two-column keys pack into distinct int64 values, including negative ones"""
+        keys = np.array([[1, 2], [2, 1], [1, -1], [-1, 1]], dtype=np.int64)
+        self.assertEqual(len(set(pack_keys(keys).tolist())), 4)
+
+    def test_03_reports_orphans_and_element_food_rules(self):
+        """Test orphan area_elements, NULL FKs and both element_food trigger rules"""
+        elements = [{'id': i} for i in (1, 2, 3, 4)]
+        data = {
+            'park_areas': [{'park_id': 1, 'area_number': 1}],
+            'natural_elements': elements,
+            'animal_elements': [{'element_id': 1}],
+            'vegetal_elements': [{'element_id': 2}],
+            'mineral_elements': [{'element_id': 3}],
+            'area_elements': [
+                {'park_id': 1, 'area_number': 1, 'element_id': 1},
+                {'park_id': 1, 'area_number': 2, 'element_id': 1},  # no such area
+                {'park_id': 1, 'area_number': 1, 'element_id': 9},  # no such element
+            ],
+            'element_food': [
+                {'element_id': 1, 'food_element_id': 2},
+                {'element_id': 1, 'food_element_id': 3},  # mineral as food
+                {'element_id': 2, 'food_element_id': 4},  # vegetal eating
+            ],
+            'research_projects': [{'element_id': None}],
+        }
+        tables = ['area_elements', 'element_food', 'research_projects', 'vegetal_elements']
+        violations = {(v.table, v.check): v for v in InMemoryVerifier(data, tables=tables).run()}
+        self.assertEqual(violations[('area_elements', 'FK -> park_areas(park_id, area_number)')].samples, [(1, 2)])
+        self.assertEqual(violations[('area_elements', 'FK -> natural_elements(id)')].samples, [(9,)])
+        self.assertEqual(violations[('element_food', 'mineral used as food')].samples, [(1, 3)])
+        self.assertEqual(violations[('element_food', 'vegetal feeding on an element')].samples, [(2, 4)])
+        self.assertEqual(len(violations), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
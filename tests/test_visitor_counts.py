@@ -0,0 +1,97 @@
+import contextlib
+import threading
+import unittest
+
+from park_management import db, visitor_counts
+from tests.scratch import ScratchDatabaseTestCase
+
+SCRATCH_DB = 'park_management_visitor_counts_test'
+
+
+class TestParkVisitorCounts(ScratchDatabaseTestCase):
+    """Trigger maintenance and concurrency of the park_visitor_counts shards on a scratch schema."""
+
+    scratch_db = SCRATCH_DB
+
+    def setUp(self):
+        super().setUp()
+        self.execute("INSERT INTO parks (id, name, declaration_date, code) VALUES "
+                     "(1, 'Parque A', '2020-01-01', 'A'), (2, 'Parque B', '2021-02-01', 'B'), "
+                     "(3, 'Parque C', '2022-03-01', 'C')")
+
+    def test_01_triggers_keep_counts_current(self):
+        """Test registrations, park changes and deletions, then a consistent check"""
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM park_visitor_counts WHERE park_id = 1")
+            self.assertEqual(cursor.fetchone()[0], visitor_counts.SHARDS)
+        self.execute("INSERT INTO visitors (id, DNI, name, park_id) VALUES "
+                     "(1, 'V1', 'One', 1), (2, 'V2', 'Two', 2), (3, 'V3', 'Three', 2), (4, 'V4', 'Four', 3)")
+        self.assertEqual(visitor_counts.visitors_in_parks(self.connection, ['A', 'B']), 3)
+
+        self.execute("UPDATE visitors SET park_id = 1 WHERE id = 3",
+                     "UPDATE visitors SET id = 20 WHERE id = 4",
+                     "DELETE FROM visitors WHERE id = 2")
+        self.assertEqual(visitor_counts.visitors_by_park(self.connection, ['A', 'B', 'C']), {'A': 2, 'B': 0, 'C': 1})
+        self.assertEqual(visitor_counts.check(self.connection), [])
+
+        self.execute("UPDATE park_visitor_counts SET visitor_count = 9 WHERE park_id = 3 AND shard = 0")
+        self.assertEqual(len(visitor_counts.check(self.connection)), 1)
+        visitor_counts.rebuild(self.connection)
+        self.assertEqual(visitor_counts.check(self.connection), [])
+
+    def test_02_parallel_registrations_in_one_park_do_not_serialize(self):
+        """Test that open transactions registering into the same park lock different shards and never wait"""
+        threads_count, per_thread = 8, 10
+        holding = threading.Barrier(threads_count + 1, timeout=30)
+        release = threading.Barrier(threads_count + 1, timeout=30)
+        errors = []
+
+        def register(worker):
+            connection = db.connect(database=SCRATCH_DB)
+            try:
+                with connection.cursor() as cursor:
+                    for n in range(per_thread):
+                        # ids worker + 1 + 16 n all land on shard worker + 1
+                        visitor_id = worker + 1 + visitor_counts.SHARDS * n
+                        cursor.execute("INSERT INTO visitors (id, DNI, name, park_id) VALUES (%s, %s, %s, 1)",
+                                       (visitor_id, f'W{visitor_id}', f'Visitor {visitor_id}'))
+                # With one shared counter row the second worker would block above and
+                # the barrier would break instead of every worker arriving here.
+                holding.wait()
+                release.wait()
+                connection.commit()
+            except Exception as error:
+                errors.append(error)
+                holding.abort()
+                release.abort()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=register, args=(worker,)) for worker in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        try:
+            holding.wait()
+            locked = self.query(f"""
+                SELECT DISTINCT LOCK_DATA FROM performance_schema.data_locks
+                WHERE OBJECT_SCHEMA = '{SCRATCH_DB}' AND OBJECT_NAME = 'park_visitor_counts'
+                  AND LOCK_TYPE = 'RECORD'""")
+            waits = self.query(f"""
+                SELECT COUNT(*) FROM performance_schema.data_lock_waits w
+                JOIN performance_schema.data_locks l ON l.ENGINE_LOCK_ID = w.REQUESTING_ENGINE_LOCK_ID
+                WHERE l.OBJECT_SCHEMA = '{SCRATCH_DB}'""")
+        finally:
+            with contextlib.suppress(threading.BrokenBarrierError):
+                release.wait()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        # LOCK_DATA of a (park_id, shard) primary key record is 'park_id, shard'
+        shards = {int(data.split(',')[1]) for (data,) in locked}
+        self.assertEqual(shards, set(range(1, threads_count + 1)))
+        self.assertEqual(waits, [(0,)])
+        self.assertEqual(visitor_counts.visitors_in_parks(self.connection, ['A']), threads_count * per_thread)
+
+if __name__ == '__main__':
+    unittest.main()